@@ -0,0 +1,214 @@
+//! Parsed cards per note, persisted in the app data dir so reopening a vault
+//! only re-reads and re-parses the notes that changed.
+//!
+//! An entry is reused without reading the file while its size and mtime are
+//! unchanged. When they differ the file is read again, and its cards are
+//! still reused if the content hash matches (e.g. after a checkout that only
+//! touched mtimes). The file is discarded when its schema or the parser
+//! version changes.
+//!
+//! Cards are kept as the JSON array sent to the frontend, so cache hits are
+//! copied into the response without being deserialized or re-serialized.
+
+use std::{
+    collections::HashMap,
+    fs,
+    path::{Path, PathBuf},
+    time::{Duration, SystemTime, UNIX_EPOCH},
+};
+
+use serde_json::value::RawValue;
+
+use crate::flashcards::{parse_flashcards, PARSER_VERSION};
+
+const CARD_CACHE_VERSION: u32 = 1;
+/// Least recently used entries are evicted beyond this many bytes of card JSON.
+const CARD_CACHE_MAX_BYTES: usize = 64 * 1024 * 1024;
+/// Files modified this close to when they were read may change again without
+/// a visible mtime or size change, so their cache entry is re-verified.
+const RACY_MTIME_WINDOW: Duration = Duration::from_secs(2);
+
+#[derive(serde::Serialize, serde::Deserialize, Clone)]
+pub struct CardCacheEntry {
+    size: u64,
+    mtime_ns: u64,
+    read_at_ns: u64,
+    hash: u64,
+    last_used: u64,
+    cards: Box<RawValue>,
+}
+
+#[derive(serde::Serialize, serde::Deserialize, Default)]
+struct CardCacheFile {
+    version: u32,
+    parser_version: u32,
+    /// Bumped once per lookup batch; entries remember when they were last used.
+    /// These stamps are saved along with the next entry change only, so a scan
+    /// in which every note was unchanged does not rewrite the file.
+    clock: u64,
+    entries: HashMap<String, CardCacheEntry>,
+}
+
+/// Outcome of looking up one note.
+pub enum CardLoad {
+    /// Size and mtime match the entry; the file was not read.
+    Unchanged,
+    /// The file was read; `entry` holds its cards, re-parsed only when the
+    /// content hash changed.
+    Read(CardCacheEntry),
+    Failed(String),
+}
+
+pub struct CardCache {
+    path: PathBuf,
+    data: CardCacheFile,
+    dirty: bool,
+}
+
+fn epoch_ns(time: SystemTime) -> u64 {
+    time.duration_since(UNIX_EPOCH)
+        .map(|duration| duration.as_nanos() as u64)
+        .unwrap_or(0)
+}
+
+/// 64-bit FNV-1a; stable across builds, unlike `DefaultHasher`.
+fn content_hash(contents: &str) -> u64 {
+    contents.bytes().fold(0xcbf2_9ce4_8422_2325, |hash, byte| {
+        (hash ^ u64::from(byte)).wrapping_mul(0x0100_0000_01b3)
+    })
+}
+
+impl CardCache {
+    /// Loads the cache file; a missing, unreadable or outdated file yields an
+    /// empty cache.
+    pub fn load(path: PathBuf) -> Self {
+        let data = fs::read(&path)
+            .ok()
+            .and_then(|bytes| serde_json::from_slice::<CardCacheFile>(&bytes).ok())
+            .filter(|data| {
+                data.version == CARD_CACHE_VERSION && data.parser_version == PARSER_VERSION
+            })
+            .unwrap_or_else(|| CardCacheFile {
+                version: CARD_CACHE_VERSION,
+                parser_version: PARSER_VERSION,
+                ..CardCacheFile::default()
+            });
+        Self {
+            path,
+            data,
+            dirty: false,
+        }
+    }
+
+    /// Checks one note against its entry. Takes `&self` so a worker pool can
+    /// run it in parallel; the results are applied with `record`.
+    pub fn lookup(&self, path: &str) -> CardLoad {
+        let cached = self.data.entries.get(path);
+        let metadata = fs::metadata(path).ok().filter(|metadata| metadata.is_file());
+        let stat = metadata.map(|metadata| {
+            let mtime_ns = metadata.modified().map(epoch_ns).unwrap_or(0);
+            (metadata.len(), mtime_ns)
+        });
+        if let (Some(entry), Some((size, mtime_ns))) = (cached, stat) {
+            let settled = mtime_ns + (RACY_MTIME_WINDOW.as_nanos() as u64) < entry.read_at_ns;
+            if entry.size == size && entry.mtime_ns == mtime_ns && settled {
+                return CardLoad::Unchanged;
+            }
+        }
+
+        let read_at_ns = epoch_ns(SystemTime::now());
+        let contents = match crate::read_markdown_file(Path::new(path)) {
+            Ok(contents) => contents,
+            Err(error) => return CardLoad::Failed(error),
+        };
+        let hash = content_hash(&contents);
+        let cards = match cached.filter(|entry| entry.hash == hash) {
+            Some(entry) => entry.cards.clone(),
+            None => match serde_json::value::to_raw_value(&parse_flashcards(&contents)) {
+                Ok(cards) => cards,
+                Err(error) => return CardLoad::Failed(error.to_string()),
+            },
+        };
+        let (size, mtime_ns) = stat.unwrap_or((contents.len() as u64, 0));
+        CardLoad::Read(CardCacheEntry {
+            size,
+            mtime_ns,
+            read_at_ns,
+            hash,
+            last_used: 0,
+            cards,
+        })
+    }
+
+    /// Starts a lookup batch; entries recorded until the next call share one
+    /// LRU timestamp.
+    pub fn begin_batch(&mut self) {
+        self.data.clock += 1;
+    }
+
+    /// Applies a `lookup` result and returns the note's cards as JSON.
+    pub fn record(&mut self, path: &str, load: CardLoad) -> Result<Box<RawValue>, String> {
+        let clock = self.data.clock;
+        match load {
+            CardLoad::Unchanged => match self.data.entries.get_mut(path) {
+                Some(entry) => {
+                    entry.last_used = clock;
+                    Ok(entry.cards.clone())
+                }
+                None => Err("File not found.".to_string()),
+            },
+            CardLoad::Read(mut entry) => {
+                entry.last_used = clock;
+                let cards = entry.cards.clone();
+                self.data.entries.insert(path.to_string(), entry);
+                self.dirty = true;
+                Ok(cards)
+            }
+            CardLoad::Failed(error) => {
+                self.dirty |= self.data.entries.remove(path).is_some();
+                Err(error)
+            }
+        }
+    }
+
+    /// Drops least recently used entries until the cards fit the size budget.
+    fn evict(&mut self) {
+        let mut total: usize = self.data.entries.values().map(|entry| entry.cards.get().len()).sum();
+        if total <= CARD_CACHE_MAX_BYTES {
+            return;
+        }
+        let mut by_age: Vec<(u64, String)> = self
+            .data
+            .entries
+            .iter()
+            .map(|(path, entry)| (entry.last_used, path.clone()))
+            .collect();
+        by_age.sort_unstable();
+        for (_, path) in by_age {
+            if total <= CARD_CACHE_MAX_BYTES {
+                break;
+            }
+            if let Some(entry) = self.data.entries.remove(&path) {
+                total -= entry.cards.get().len();
+            }
+        }
+    }
+
+    /// Writes the cache if it changed since the last save, replacing the file
+    /// atomically so a crash never leaves a truncated cache behind.
+    pub fn save(&mut self) -> Result<(), String> {
+        if !self.dirty {
+            return Ok(());
+        }
+        self.evict();
+        if let Some(parent) = self.path.parent() {
+            fs::create_dir_all(parent).map_err(|err| err.to_string())?;
+        }
+        let data = serde_json::to_vec(&self.data).map_err(|err| err.to_string())?;
+        let tmp_path = self.path.with_extension("json.tmp");
+        fs::write(&tmp_path, data).map_err(|err| err.to_string())?;
+        fs::rename(&tmp_path, &self.path).map_err(|err| err.to_string())?;
+        self.dirty = false;
+        Ok(())
+    }
+}
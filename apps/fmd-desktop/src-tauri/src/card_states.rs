@@ -0,0 +1,591 @@
+//! One user's spaced repetition card states in a compact, column-wise form.
+//!
+//! Card IDs are `card-` plus 16 hex digits, so a card is keyed by the `u64`
+//! its ID spells, and its state is a box, an attempt count, a result code and
+//! a review time in epoch milliseconds, each in its own vector. That is a few
+//! allocations per user instead of three heap strings per card. States that
+//! would not survive the round trip (legacy IDs, unknown results, timestamps
+//! not in `toISOString` form, the old `box` field) are kept as they are in a
+//! side map.
+//!
+//! The JSON object the frontend and the snapshot use is only built or read at
+//! the boundary: `CardStates` serializes to and deserializes from it directly.
+
+use std::{borrow::Cow, collections::HashMap, fmt};
+
+use serde::{
+    de::{MapAccess, Visitor},
+    ser::{SerializeMap, SerializeStruct},
+    Deserialize, Deserializer, Serialize, Serializer,
+};
+
+use crate::SpacedRepetitionCardState;
+
+/// `FlashcardResult` in the frontend; `None` is a card never answered.
+#[derive(Clone, Copy)]
+#[repr(u8)]
+enum ReviewResult {
+    None,
+    Correct,
+    Incorrect,
+    Neutral,
+}
+
+impl ReviewResult {
+    fn parse(value: Option<&str>) -> Option<Self> {
+        match value {
+            None => Some(Self::None),
+            Some("correct") => Some(Self::Correct),
+            Some("incorrect") => Some(Self::Incorrect),
+            Some("neutral") => Some(Self::Neutral),
+            Some(_) => None,
+        }
+    }
+
+    fn as_str(self) -> Option<&'static str> {
+        match self {
+            Self::None => None,
+            Self::Correct => Some("correct"),
+            Self::Incorrect => Some("incorrect"),
+            Self::Neutral => Some("neutral"),
+        }
+    }
+}
+
+/// `reviewed_at` of a card without a review time.
+const NEVER_REVIEWED: i64 = i64::MIN;
+
+/// Days since 1970-01-01 of a proleptic Gregorian date.
+fn days_from_civil(year: i64, month: i64, day: i64) -> i64 {
+    let year = if month <= 2 { year - 1 } else { year };
+    let era = year.div_euclid(400);
+    let year_of_era = year - era * 400;
+    let day_of_year = (153 * ((month + 9) % 12) + 2) / 5 + day - 1;
+    let day_of_era = year_of_era * 365 + year_of_era / 4 - year_of_era / 100 + day_of_year;
+    era * 146097 + day_of_era - 719468
+}
+
+fn civil_from_days(days: i64) -> (i64, i64, i64) {
+    let days = days + 719468;
+    let era = days.div_euclid(146097);
+    let day_of_era = days - era * 146097;
+    let year_of_era =
+        (day_of_era - day_of_era / 1460 + day_of_era / 36524 - day_of_era / 146096) / 365;
+    let day_of_year = day_of_era - (365 * year_of_era + year_of_era / 4 - year_of_era / 100);
+    let month_index = (5 * day_of_year + 2) / 153;
+    let day = day_of_year - (153 * month_index + 2) / 5 + 1;
+    let month = if month_index < 10 { month_index + 3 } else { month_index - 9 };
+    let year = year_of_era + era * 400 + i64::from(month <= 2);
+    (year, month, day)
+}
+
+/// Epoch milliseconds of a `Date.prototype.toISOString` timestamp
+/// (`2024-01-31T08:05:09.123Z`). Anything else is `None`, so formatting the
+/// result always gives back the same string.
+fn parse_timestamp(value: &str) -> Option<i64> {
+    let bytes = value.as_bytes();
+    if bytes.len() != 24 || bytes[23] != b'Z' {
+        return None;
+    }
+    for (index, separator) in [(4, b'-'), (7, b'-'), (10, b'T'), (13, b':'), (16, b':'), (19, b'.')] {
+        if bytes[index] != separator {
+            return None;
+        }
+    }
+    let number = |start: usize, end: usize| {
+        bytes[start..end].iter().try_fold(0i64, |value, &digit| {
+            digit.is_ascii_digit().then(|| value * 10 + i64::from(digit - b'0'))
+        })
+    };
+    let (year, month, day) = (number(0, 4)?, number(5, 7)?, number(8, 10)?);
+    let (hour, minute, second) = (number(11, 13)?, number(14, 16)?, number(17, 19)?);
+    let millisecond = number(20, 23)?;
+    let leap_year = year % 4 == 0 && (year % 100 != 0 || year % 400 == 0);
+    let month_days = match month {
+        2 if leap_year => 29,
+        2 => 28,
+        4 | 6 | 9 | 11 => 30,
+        1..=12 => 31,
+        _ => return None,
+    };
+    if day < 1 || day > month_days || hour > 23 || minute > 59 || second > 59 {
+        return None;
+    }
+    let seconds = ((days_from_civil(year, month, day) * 24 + hour) * 60 + minute) * 60 + second;
+    Some(seconds * 1000 + millisecond)
+}
+
+const HEX_DIGITS: &[u8; 16] = b"0123456789abcdef";
+
+/// Epoch milliseconds formatted the way `toISOString` does, on the stack.
+/// Only used for values from `parse_timestamp`, whose years have 4 digits.
+struct Timestamp([u8; 24]);
+
+impl Timestamp {
+    fn new(milliseconds: i64) -> Self {
+        let seconds = milliseconds.div_euclid(1000);
+        let (year, month, day) = civil_from_days(seconds.div_euclid(86400));
+        let second_of_day = seconds.rem_euclid(86400);
+        let mut text = *b"0000-00-00T00:00:00.000Z";
+        let mut put = |end: usize, digits: usize, mut value: i64| {
+            for index in (end - digits..end).rev() {
+                text[index] = b'0' + (value % 10) as u8;
+                value /= 10;
+            }
+        };
+        put(4, 4, year);
+        put(7, 2, month);
+        put(10, 2, day);
+        put(13, 2, second_of_day / 3600);
+        put(16, 2, second_of_day / 60 % 60);
+        put(19, 2, second_of_day % 60);
+        put(23, 3, milliseconds.rem_euclid(1000));
+        Self(text)
+    }
+
+    fn as_str(&self) -> &str {
+        std::str::from_utf8(&self.0).expect("timestamps are ASCII")
+    }
+}
+
+fn parse_card_key(card_id: &str) -> Option<u64> {
+    let hex = card_id.strip_prefix("card-")?;
+    if hex.len() != 16 || !hex.bytes().all(|byte| HEX_DIGITS.contains(&byte)) {
+        return None;
+    }
+    u64::from_str_radix(hex, 16).ok()
+}
+
+/// The card ID a key was parsed from, on the stack.
+struct CardKey([u8; 21]);
+
+impl CardKey {
+    fn new(key: u64) -> Self {
+        let mut card_id = *b"card-0000000000000000";
+        for index in 0..16 {
+            card_id[5 + index] = HEX_DIGITS[(key >> (60 - 4 * index)) as usize & 0xf];
+        }
+        Self(card_id)
+    }
+
+    fn as_str(&self) -> &str {
+        std::str::from_utf8(&self.0).expect("card IDs are ASCII")
+    }
+}
+
+/// A state as it is read, borrowing its strings where the input allows.
+#[derive(Deserialize, Default)]
+#[serde(rename_all = "camelCase", default)]
+struct CardStateInput<'a> {
+    #[serde(rename = "box")]
+    r#box: Option<u32>,
+    box_canonical: Option<u32>,
+    attempts: u32,
+    #[serde(borrow)]
+    last_result: Option<Text<'a>>,
+    #[serde(borrow)]
+    last_reviewed_at: Option<Text<'a>>,
+}
+
+impl CardStateInput<'_> {
+    fn into_state(self) -> SpacedRepetitionCardState {
+        SpacedRepetitionCardState {
+            r#box: self.r#box,
+            box_canonical: self.box_canonical,
+            attempts: self.attempts,
+            last_result: self.last_result.map(|text| text.0.into_owned()),
+            last_reviewed_at: self.last_reviewed_at.map(|text| text.0.into_owned()),
+        }
+    }
+}
+
+/// A string that is borrowed from the input unless it has escapes.
+struct Text<'a>(Cow<'a, str>);
+
+fn text_str<'a>(value: &'a Option<Text>) -> Option<&'a str> {
+    value.as_ref().map(|text| text.0.as_ref())
+}
+
+impl<'de: 'a, 'a> Deserialize<'de> for Text<'a> {
+    fn deserialize<D: Deserializer<'de>>(deserializer: D) -> Result<Self, D::Error> {
+        struct TextVisitor;
+
+        impl<'de> Visitor<'de> for TextVisitor {
+            type Value = Text<'de>;
+
+            fn expecting(&self, f: &mut fmt::Formatter) -> fmt::Result {
+                f.write_str("a string")
+            }
+
+            fn visit_borrowed_str<E>(self, value: &'de str) -> Result<Self::Value, E> {
+                Ok(Text(Cow::Borrowed(value)))
+            }
+
+            fn visit_str<E>(self, value: &str) -> Result<Self::Value, E> {
+                Ok(Text(Cow::Owned(value.to_string())))
+            }
+
+            fn visit_string<E>(self, value: String) -> Result<Self::Value, E> {
+                Ok(Text(Cow::Owned(value)))
+            }
+        }
+
+        deserializer.deserialize_str(TextVisitor)
+    }
+}
+
+#[derive(Default, Clone)]
+pub struct CardStates {
+    /// Row of each card in the columns below.
+    rows: HashMap<u64, u32>,
+    keys: Vec<u64>,
+    /// `boxCanonical`, 0 when absent.
+    boxes: Vec<u8>,
+    attempts: Vec<u32>,
+    results: Vec<ReviewResult>,
+    /// Epoch milliseconds, or `NEVER_REVIEWED`.
+    reviewed_at: Vec<i64>,
+    /// States that do not fit the columns, by card ID.
+    other: HashMap<String, SpacedRepetitionCardState>,
+}
+
+impl CardStates {
+    pub fn len(&self) -> usize {
+        self.keys.len() + self.other.len()
+    }
+
+    fn row(&self, card_id: &str) -> Option<usize> {
+        let row = self.rows.get(&parse_card_key(card_id)?)?;
+        Some(*row as usize)
+    }
+
+    pub fn contains_key(&self, card_id: &str) -> bool {
+        self.row(card_id).is_some() || self.other.contains_key(card_id)
+    }
+
+    pub fn get(&self, card_id: &str) -> Option<SpacedRepetitionCardState> {
+        match self.row(card_id) {
+            Some(row) => Some(self.row_state(row)),
+            None => self.other.get(card_id).cloned(),
+        }
+    }
+
+    fn row_state(&self, row: usize) -> SpacedRepetitionCardState {
+        SpacedRepetitionCardState {
+            r#box: None,
+            box_canonical: Some(u32::from(self.boxes[row])).filter(|&value| value != 0),
+            attempts: self.attempts[row],
+            last_result: self.results[row].as_str().map(str::to_string),
+            last_reviewed_at: Some(self.reviewed_at[row])
+                .filter(|&value| value != NEVER_REVIEWED)
+                .map(|value| Timestamp::new(value).as_str().to_string()),
+        }
+    }
+
+    /// Stores the state in the columns if it fits them and returns whether
+    /// it did. Any previous state of the card is replaced either way.
+    fn insert_row(&mut self, card_id: &str, state: &CardStateInput) -> bool {
+        let Some(key) = parse_card_key(card_id) else {
+            return false;
+        };
+        let box_canonical = match state.box_canonical {
+            None => Some(0),
+            Some(value) => u8::try_from(value).ok().filter(|&value| value != 0),
+        };
+        let reviewed_at = match text_str(&state.last_reviewed_at) {
+            None => Some(NEVER_REVIEWED),
+            Some(value) => parse_timestamp(value),
+        };
+        let (Some(box_canonical), Some(result), Some(reviewed_at), None) = (
+            box_canonical,
+            ReviewResult::parse(text_str(&state.last_result)),
+            reviewed_at,
+            state.r#box,
+        ) else {
+            self.remove_row(key);
+            return false;
+        };
+        let row = match self.rows.get(&key) {
+            Some(&row) => row as usize,
+            None => {
+                self.rows.insert(key, self.keys.len() as u32);
+                self.keys.push(key);
+                self.boxes.push(0);
+                self.attempts.push(0);
+                self.results.push(ReviewResult::None);
+                self.reviewed_at.push(NEVER_REVIEWED);
+                self.keys.len() - 1
+            }
+        };
+        self.boxes[row] = box_canonical;
+        self.attempts[row] = state.attempts;
+        self.results[row] = result;
+        self.reviewed_at[row] = reviewed_at;
+        true
+    }
+
+    fn insert_input(&mut self, card_id: Cow<str>, state: CardStateInput) {
+        if self.insert_row(&card_id, &state) {
+            self.other.remove(card_id.as_ref());
+        } else {
+            self.other.insert(card_id.into_owned(), state.into_state());
+        }
+    }
+
+    pub fn insert(&mut self, card_id: String, state: SpacedRepetitionCardState) {
+        let input = CardStateInput {
+            r#box: state.r#box,
+            box_canonical: state.box_canonical,
+            attempts: state.attempts,
+            last_result: state.last_result.map(|text| Text(Cow::Owned(text))),
+            last_reviewed_at: state.last_reviewed_at.map(|text| Text(Cow::Owned(text))),
+        };
+        self.insert_input(Cow::Owned(card_id), input);
+    }
+
+    fn remove_row(&mut self, key: u64) {
+        let Some(row) = self.rows.remove(&key) else {
+            return;
+        };
+        let row = row as usize;
+        self.keys.swap_remove(row);
+        self.boxes.swap_remove(row);
+        self.attempts.swap_remove(row);
+        self.results.swap_remove(row);
+        self.reviewed_at.swap_remove(row);
+        if let Some(&moved) = self.keys.get(row) {
+            self.rows.insert(moved, row as u32);
+        }
+    }
+
+    pub fn remove(&mut self, card_id: &str) {
+        if let Some(key) = parse_card_key(card_id) {
+            self.remove_row(key);
+        }
+        self.other.remove(card_id);
+    }
+
+    /// Every card with its state, materialized.
+    pub fn iter(&self) -> impl Iterator<Item = (String, SpacedRepetitionCardState)> + '_ {
+        let rows = self
+            .keys
+            .iter()
+            .enumerate()
+            .map(|(row, &key)| (CardKey::new(key).as_str().to_string(), self.row_state(row)));
+        let other = self
+            .other
+            .iter()
+            .map(|(card_id, state)| (card_id.clone(), state.clone()));
+        rows.chain(other)
+    }
+
+    /// The canonical box of every card (`boxCanonical`, else `box`, else 1).
+    pub fn canonical_boxes(&self) -> impl Iterator<Item = u32> + '_ {
+        let rows = self
+            .boxes
+            .iter()
+            .map(|&value| if value == 0 { 1 } else { u32::from(value) });
+        let other = self
+            .other
+            .values()
+            .map(|state| state.box_canonical.or(state.r#box).unwrap_or(1));
+        rows.chain(other)
+    }
+}
+
+impl FromIterator<(String, SpacedRepetitionCardState)> for CardStates {
+    fn from_iter<I: IntoIterator<Item = (String, SpacedRepetitionCardState)>>(iter: I) -> Self {
+        let mut states = CardStates::default();
+        for (card_id, state) in iter {
+            states.insert(card_id, state);
+        }
+        states
+    }
+}
+
+/// A row serialized like `SpacedRepetitionCardState`, without materializing it.
+struct RowView<'a>(&'a CardStates, usize);
+
+impl Serialize for RowView<'_> {
+    fn serialize<S: Serializer>(&self, serializer: S) -> Result<S::Ok, S::Error> {
+        let RowView(states, row) = *self;
+        let box_canonical = states.boxes[row];
+        let reviewed_at = states.reviewed_at[row];
+        let mut state = serializer
+            .serialize_struct("SpacedRepetitionCardState", 3 + usize::from(box_canonical != 0))?;
+        if box_canonical != 0 {
+            state.serialize_field("boxCanonical", &box_canonical)?;
+        } else {
+            state.skip_field("boxCanonical")?;
+        }
+        state.serialize_field("attempts", &states.attempts[row])?;
+        state.serialize_field("lastResult", &states.results[row].as_str())?;
+        let timestamp = (reviewed_at != NEVER_REVIEWED).then(|| Timestamp::new(reviewed_at));
+        state.serialize_field("lastReviewedAt", &timestamp.as_ref().map(Timestamp::as_str))?;
+        state.end()
+    }
+}
+
+impl Serialize for CardStates {
+    fn serialize<S: Serializer>(&self, serializer: S) -> Result<S::Ok, S::Error> {
+        let mut map = serializer.serialize_map(Some(self.len()))?;
+        for (row, &key) in self.keys.iter().enumerate() {
+            map.serialize_entry(CardKey::new(key).as_str(), &RowView(self, row))?;
+        }
+        for (card_id, state) in &self.other {
+            map.serialize_entry(card_id, state)?;
+        }
+        map.end()
+    }
+}
+
+impl<'de> Deserialize<'de> for CardStates {
+    fn deserialize<D: Deserializer<'de>>(deserializer: D) -> Result<Self, D::Error> {
+        struct CardStatesVisitor;
+
+        impl<'de> Visitor<'de> for CardStatesVisitor {
+            type Value = CardStates;
+
+            fn expecting(&self, f: &mut fmt::Formatter) -> fmt::Result {
+                f.write_str("card states by card ID")
+            }
+
+            fn visit_map<A: MapAccess<'de>>(self, mut map: A) -> Result<CardStates, A::Error> {
+                let mut states = CardStates::default();
+                let capacity = map.size_hint().unwrap_or(0);
+                states.rows.reserve(capacity);
+                states.keys.reserve(capacity);
+                states.boxes.reserve(capacity);
+                states.attempts.reserve(capacity);
+                states.results.reserve(capacity);
+                states.reviewed_at.reserve(capacity);
+                while let Some(card_id) = map.next_key::<Text>()? {
+                    let state = map.next_value::<CardStateInput>()?;
+                    states.insert_input(card_id.0, state);
+                }
+                Ok(states)
+            }
+        }
+
+        deserializer.deserialize_map(CardStatesVisitor)
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    /// Two states that fit the columns, then one of each kind that does not.
+    const STATES: &str = r#"{
+        "card-0123456789abcdef": {"boxCanonical": 3, "attempts": 4, "lastResult": "correct", "lastReviewedAt": "2024-01-31T08:05:09.123Z"},
+        "card-00000000000000ff": {"attempts": 0, "lastResult": null, "lastReviewedAt": null},
+        "legacy-what-is-a-monad": {"boxCanonical": 2, "attempts": 1, "lastResult": "incorrect", "lastReviewedAt": "2023-12-31T23:59:59.999Z"},
+        "card-0123456789ABCDEF": {"attempts": 1, "lastResult": "neutral", "lastReviewedAt": null},
+        "card-1111111111111111": {"box": 2, "attempts": 2, "lastResult": "correct", "lastReviewedAt": null},
+        "card-2222222222222222": {"boxCanonical": 1, "attempts": 1, "lastResult": "skipped", "lastReviewedAt": null},
+        "card-3333333333333333": {"attempts": 1, "lastResult": "correct", "lastReviewedAt": "2024-01-31T08:05:09Z"},
+        "card-4444444444444444": {"attempts": 1, "lastResult": "correct", "lastReviewedAt": "2023-02-29T00:00:00.000Z"},
+        "card-5555555555555555": {"boxCanonical": 300, "attempts": 1, "lastResult": "correct", "lastReviewedAt": null},
+        "card-6666666666666666": {"boxCanonical": 0, "attempts": 1, "lastResult": "correct", "lastReviewedAt": null}
+    }"#;
+
+    fn card(box_canonical: u32, last_reviewed_at: &str) -> SpacedRepetitionCardState {
+        SpacedRepetitionCardState {
+            box_canonical: Some(box_canonical),
+            attempts: 1,
+            last_result: Some("correct".to_string()),
+            last_reviewed_at: Some(last_reviewed_at.to_string()),
+            ..Default::default()
+        }
+    }
+
+    #[test]
+    fn json_round_trip() {
+        let json: serde_json::Value = serde_json::from_str(STATES).unwrap();
+        let states: CardStates = serde_json::from_str(STATES).unwrap();
+        assert_eq!(states.len(), 10);
+        assert_eq!(states.keys.len(), 2);
+        assert_eq!(serde_json::to_value(&states).unwrap(), json);
+
+        for (card_id, state) in json.as_object().unwrap() {
+            assert_eq!(serde_json::to_value(states.get(card_id)).unwrap(), *state);
+        }
+        let materialized: HashMap<_, _> = states.iter().collect();
+        assert_eq!(serde_json::to_value(materialized).unwrap(), json);
+    }
+
+    #[test]
+    fn timestamps_round_trip() {
+        for value in [
+            "1970-01-01T00:00:00.000Z",
+            "1969-12-31T23:59:59.999Z",
+            "2000-02-29T12:34:56.789Z",
+            "0001-01-01T00:00:00.000Z",
+            "9999-12-31T23:59:59.999Z",
+        ] {
+            let milliseconds = parse_timestamp(value).unwrap();
+            assert_eq!(Timestamp::new(milliseconds).as_str(), value);
+        }
+        assert_eq!(parse_timestamp("1970-01-01T00:00:01.000Z"), Some(1000));
+        for value in [
+            "2024-01-31T08:05:09Z",
+            "2024-13-01T00:00:00.000Z",
+            "2024-01-31 08:05:09.123Z",
+        ] {
+            assert_eq!(parse_timestamp(value), None);
+        }
+    }
+
+    #[test]
+    fn remove_and_reinsert() {
+        let ids = [
+            "card-0000000000000001",
+            "card-0000000000000002",
+            "card-0000000000000003",
+        ];
+        let mut states: CardStates = ids
+            .iter()
+            .enumerate()
+            .map(|(index, card_id)| {
+                (
+                    card_id.to_string(),
+                    card(index as u32 + 1, "2024-01-01T00:00:00.000Z"),
+                )
+            })
+            .collect();
+
+        // The last row moves into the removed one.
+        states.remove(ids[0]);
+        assert_eq!(states.len(), 2);
+        assert!(!states.contains_key(ids[0]));
+        assert!(states.get(ids[1]) == Some(card(2, "2024-01-01T00:00:00.000Z")));
+        assert!(states.get(ids[2]) == Some(card(3, "2024-01-01T00:00:00.000Z")));
+
+        states.insert(ids[0].to_string(), card(5, "2024-02-01T00:00:00.000Z"));
+        assert_eq!(states.len(), 3);
+        assert!(states.get(ids[0]) == Some(card(5, "2024-02-01T00:00:00.000Z")));
+        assert!(states.get(ids[2]) == Some(card(3, "2024-01-01T00:00:00.000Z")));
+
+        // A state that does not fit the columns replaces the row, and back.
+        let legacy_box = SpacedRepetitionCardState {
+            r#box: Some(4),
+            ..card(4, "2024-03-01T00:00:00.000Z")
+        };
+        states.insert(ids[1].to_string(), legacy_box.clone());
+        assert_eq!((states.keys.len(), states.other.len()), (2, 1));
+        assert!(states.get(ids[1]) == Some(legacy_box));
+        states.insert(ids[1].to_string(), card(2, "2024-03-02T00:00:00.000Z"));
+        assert_eq!((states.keys.len(), states.other.len()), (3, 0));
+        assert!(states.get(ids[1]) == Some(card(2, "2024-03-02T00:00:00.000Z")));
+
+        let mut boxes: Vec<u32> = states.canonical_boxes().collect();
+        boxes.sort();
+        assert_eq!(boxes, [2, 3, 5]);
+
+        for card_id in ids {
+            states.remove(card_id);
+        }
+        assert_eq!(states.len(), 0);
+        assert!(states.rows.is_empty());
+    }
+}
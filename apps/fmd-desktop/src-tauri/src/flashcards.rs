@@ -0,0 +1,910 @@
+//! Native port of the `#card ... #` parser in src/lib/flashcards.ts.
+//!
+//! Cards serialize to the same JSON as the TypeScript `Flashcard` objects, key
+//! for key and in the same order, because card IDs are hashes of that JSON.
+//! Keep both parsers (and tools/vault/flashcards.py) in sync when the card
+//! syntax changes.
+
+use std::{borrow::Cow, sync::OnceLock};
+
+use unicode_normalization::UnicodeNormalization;
+
+/// Bump whenever the parser output changes, so cached cards get re-parsed.
+pub const PARSER_VERSION: u32 = 3;
+
+const ANSWER_MARKERS: [&str; 18] = [
+    "Answer:",
+    "Antwort:",
+    "Réponse:",
+    "Respuesta:",
+    "Resposta:",
+    "Risposta:",
+    "Antwoord:",
+    "Svar:",
+    "Vastaus:",
+    "Odpowiedź:",
+    "Odpověď:",
+    "Odpoveď:",
+    "Válasz:",
+    "Răspuns:",
+    "Cevap:",
+    "Ответ:",
+    "Απάντηση:",
+    "إجابة:",
+];
+
+const TRUE_TOKENS: [&str; 19] = [
+    "true",
+    "wahr",
+    "vrai",
+    "verdadero",
+    "verdadeiro",
+    "vero",
+    "waar",
+    "sant",
+    "sann",
+    "sandt",
+    "tosi",
+    "prawda",
+    "pravda",
+    "igaz",
+    "adevărat",
+    "doğru",
+    "правда",
+    "αληθές",
+    "صحيح",
+];
+
+const FALSE_TOKENS: [&str; 17] = [
+    "false",
+    "falsch",
+    "faux",
+    "falso",
+    "onwaar",
+    "falskt",
+    "usann",
+    "falsk",
+    "epätosi",
+    "fałsz",
+    "nepravda",
+    "hamis",
+    "fals",
+    "yanlış",
+    "ложь",
+    "ψευδές",
+    "خطأ",
+];
+
+#[derive(serde::Serialize, Clone, Debug, PartialEq)]
+pub struct FlashcardOption {
+    key: String,
+    text: String,
+}
+
+#[derive(serde::Serialize, Clone, Debug, PartialEq)]
+pub struct TrueFalseItem {
+    id: String,
+    question: String,
+    correct: TrueFalseAnswer,
+}
+
+#[derive(serde::Serialize, Clone, Copy, Debug, PartialEq)]
+#[serde(rename_all = "lowercase")]
+pub enum TrueFalseAnswer {
+    Wahr,
+    Falsch,
+}
+
+#[derive(serde::Serialize, Clone, Copy, Debug, PartialEq)]
+#[serde(rename_all = "lowercase")]
+pub enum BlankKind {
+    Input,
+    Drag,
+}
+
+#[derive(serde::Serialize, Clone, Debug, PartialEq)]
+#[serde(tag = "type", rename_all = "lowercase")]
+pub enum ClozeSegment {
+    Text {
+        value: String,
+    },
+    Blank {
+        id: String,
+        kind: BlankKind,
+        solution: String,
+    },
+}
+
+#[derive(serde::Serialize, Clone, Debug, PartialEq)]
+pub struct ClozeDragToken {
+    id: String,
+    value: String,
+}
+
+#[derive(serde::Serialize, Clone, Debug, PartialEq)]
+#[serde(tag = "kind", rename_all = "kebab-case")]
+pub enum CardBody {
+    MultipleChoice {
+        question: String,
+        options: Vec<FlashcardOption>,
+        #[serde(rename = "correctKeys")]
+        correct_keys: Vec<String>,
+    },
+    FreeText {
+        front: String,
+        back: String,
+    },
+    TrueFalse {
+        items: Vec<TrueFalseItem>,
+    },
+    Cloze {
+        question: String,
+        segments: Vec<ClozeSegment>,
+        #[serde(rename = "dragTokens")]
+        drag_tokens: Vec<ClozeDragToken>,
+    },
+}
+
+#[derive(serde::Serialize, Clone, Debug, PartialEq)]
+#[serde(rename_all = "camelCase")]
+pub struct Flashcard {
+    /// Computed once by the parser, so it travels with (and is cached along
+    /// with) the card instead of being re-hashed by every consumer.
+    id: String,
+    #[serde(flatten)]
+    body: CardBody,
+    primary_type: DetectedType,
+    detected_types: Vec<DetectedType>,
+    is_mixed: bool,
+}
+
+#[derive(serde::Serialize, Clone, Copy, Debug, PartialEq)]
+#[serde(rename_all = "kebab-case")]
+pub enum DetectedType {
+    Qa,
+    MultipleChoice,
+    FillBlank,
+    Assignment,
+    TrueFalse,
+}
+
+/// What `String.prototype.trim()` strips: Unicode White_Space minus U+0085,
+/// plus the byte order mark.
+fn is_js_space(c: char) -> bool {
+    c == '\u{feff}' || (c.is_whitespace() && c != '\u{85}')
+}
+
+fn js_trim(value: &str) -> &str {
+    value.trim_matches(is_js_space)
+}
+
+fn js_trim_start(value: &str) -> &str {
+    value.trim_start_matches(is_js_space)
+}
+
+fn normalize_newlines(markdown: &str) -> Cow<'_, str> {
+    if markdown.contains('\r') {
+        Cow::Owned(markdown.replace("\r\n", "\n").replace('\r', "\n"))
+    } else {
+        Cow::Borrowed(markdown)
+    }
+}
+
+fn normalize_keyword(value: &str) -> String {
+    js_trim(value)
+        .to_lowercase()
+        .nfkd()
+        .filter(|c| !('\u{300}'..='\u{36f}').contains(c))
+        .collect()
+}
+
+struct Keywords {
+    true_tokens: Vec<String>,
+    false_tokens: Vec<String>,
+    answer_markers: Vec<(&'static str, String)>,
+    /// Byte length of the longest normalized answer marker.
+    answer_marker_len: usize,
+}
+
+fn keywords() -> &'static Keywords {
+    static KEYWORDS: OnceLock<Keywords> = OnceLock::new();
+    KEYWORDS.get_or_init(|| {
+        let answer_markers: Vec<_> = ANSWER_MARKERS
+            .iter()
+            .map(|marker| (*marker, normalize_keyword(marker)))
+            .collect();
+        Keywords {
+            true_tokens: TRUE_TOKENS.iter().map(|token| normalize_keyword(token)).collect(),
+            false_tokens: FALSE_TOKENS.iter().map(|token| normalize_keyword(token)).collect(),
+            answer_marker_len: answer_markers.iter().map(|(_, n)| n.len()).max().unwrap_or(0),
+            answer_markers,
+        }
+    })
+}
+
+fn trim_empty_lines<'a, S: AsRef<str>>(lines: &'a [S]) -> &'a [S] {
+    let mut start = 0;
+    let mut end = lines.len();
+    while start < end && js_trim(lines[start].as_ref()).is_empty() {
+        start += 1;
+    }
+    while end > start && js_trim(lines[end - 1].as_ref()).is_empty() {
+        end -= 1;
+    }
+    &lines[start..end]
+}
+
+fn join_lines<S: AsRef<str>>(lines: &[S]) -> String {
+    lines.iter().map(AsRef::as_ref).collect::<Vec<_>>().join("\n")
+}
+
+fn append_text(segments: &mut Vec<ClozeSegment>, text: &str) {
+    if text.is_empty() {
+        return;
+    }
+    if let Some(ClozeSegment::Text { value }) = segments.last_mut() {
+        value.push_str(text);
+    } else {
+        segments.push(ClozeSegment::Text {
+            value: text.to_string(),
+        });
+    }
+}
+
+#[derive(Default)]
+struct ClozeParse {
+    segments: Vec<ClozeSegment>,
+    drag_tokens: Vec<ClozeDragToken>,
+    blank_index: usize,
+}
+
+impl ClozeParse {
+    /// False when the line holds an empty `%% %%` blank, which voids the cloze.
+    fn handle_line(&mut self, line: &str) -> bool {
+        let mut cursor = 0;
+        while cursor < line.len() {
+            let rest = &line[cursor..];
+            let next_input = rest.find("%%").map(|index| cursor + index);
+            let next_drag = rest.find('`').map(|index| cursor + index);
+            let next_marker = match (next_input, next_drag) {
+                (Some(input), Some(drag)) => input.min(drag),
+                (Some(marker), None) | (None, Some(marker)) => marker,
+                (None, None) => {
+                    append_text(&mut self.segments, rest);
+                    break;
+                }
+            };
+            append_text(&mut self.segments, &line[cursor..next_marker]);
+
+            if Some(next_marker) == next_input {
+                let Some(end) = line[next_marker + 2..].find("%%").map(|i| next_marker + 2 + i)
+                else {
+                    append_text(&mut self.segments, &line[next_marker..]);
+                    break;
+                };
+                let solution = js_trim(&line[next_marker + 2..end]);
+                if solution.is_empty() {
+                    return false;
+                }
+                self.push_blank(BlankKind::Input, solution);
+                cursor = end + 2;
+                continue;
+            }
+
+            let Some(end) = line[next_marker + 1..].find('`').map(|i| next_marker + 1 + i) else {
+                append_text(&mut self.segments, &line[next_marker..]);
+                break;
+            };
+            let value = js_trim(&line[next_marker + 1..end]);
+            if value.is_empty() {
+                append_text(&mut self.segments, &line[next_marker..=end]);
+            } else {
+                self.drag_tokens.push(ClozeDragToken {
+                    id: format!("token-{}", self.drag_tokens.len()),
+                    value: value.to_string(),
+                });
+                self.push_blank(BlankKind::Drag, value);
+            }
+            cursor = end + 1;
+        }
+        true
+    }
+
+    fn push_blank(&mut self, kind: BlankKind, solution: &str) {
+        self.segments.push(ClozeSegment::Blank {
+            id: format!("blank-{}", self.blank_index),
+            kind,
+            solution: solution.to_string(),
+        });
+        self.blank_index += 1;
+    }
+}
+
+fn parse_cloze_segments(lines: &[&str]) -> Option<(Vec<ClozeSegment>, Vec<ClozeDragToken>)> {
+    let mut parse = ClozeParse::default();
+    let mut in_fence = false;
+    let lines = trim_empty_lines(lines);
+    for (index, line) in lines.iter().enumerate() {
+        let trimmed = js_trim_start(line);
+        if trimmed.starts_with("```") || trimmed.starts_with("~~~") {
+            in_fence = !in_fence;
+            append_text(&mut parse.segments, line);
+        } else if in_fence {
+            append_text(&mut parse.segments, line);
+        } else if !parse.handle_line(line) {
+            return None;
+        }
+        if index + 1 < lines.len() {
+            append_text(&mut parse.segments, "\n");
+        }
+    }
+    Some((parse.segments, parse.drag_tokens))
+}
+
+fn normalize_true_false_marker(value: &str) -> Option<TrueFalseAnswer> {
+    let trimmed = js_trim(value);
+    let raw_token = js_trim(trimmed.strip_prefix('-')?);
+    if raw_token.is_empty() {
+        return None;
+    }
+    let cleaned = raw_token.trim_end_matches(['.', ',', ';', ':', '!', '?']);
+    let normalized = normalize_keyword(cleaned);
+    let keywords = keywords();
+    if keywords.true_tokens.contains(&normalized) {
+        Some(TrueFalseAnswer::Wahr)
+    } else if keywords.false_tokens.contains(&normalized) {
+        Some(TrueFalseAnswer::Falsch)
+    } else {
+        None
+    }
+}
+
+fn parse_true_false_items(lines: &[&str]) -> Vec<TrueFalseItem> {
+    let mut items = Vec::new();
+    let mut index = 0;
+    while index < lines.len() {
+        let question = js_trim(lines[index]);
+        if question.is_empty() {
+            index += 1;
+            continue;
+        }
+        let mut marker_index = index + 1;
+        while marker_index < lines.len() && js_trim(lines[marker_index]).is_empty() {
+            marker_index += 1;
+        }
+        if marker_index >= lines.len() {
+            index += 1;
+            continue;
+        }
+        let Some(correct) = normalize_true_false_marker(lines[marker_index]) else {
+            index += 1;
+            continue;
+        };
+        items.push(TrueFalseItem {
+            id: format!("tf-{}", items.len()),
+            question: question.to_string(),
+            correct,
+        });
+        index = marker_index + 1;
+    }
+    items
+}
+
+/// Byte offset of the first `utf16_len` UTF-16 units of `value`, the way
+/// `String.prototype.slice` counts.
+fn utf16_offset(value: &str, utf16_len: usize) -> usize {
+    let mut units = 0;
+    for (offset, c) in value.char_indices() {
+        if units >= utf16_len {
+            return offset;
+        }
+        units += c.len_utf16();
+    }
+    value.len()
+}
+
+/// The line with leading whitespace removed and the byte offset where the
+/// answer starts, when the line opens with an answer marker.
+fn find_answer_marker_match(line: &str) -> Option<(&str, usize)> {
+    let trimmed_line = js_trim_start(line);
+    let keywords = keywords();
+    // Lowercasing and NFKD leave ASCII as is, so a long enough ASCII prefix
+    // decides the match without normalizing the whole line.
+    let ascii_len = trimmed_line.bytes().take_while(u8::is_ascii).count();
+    let (raw, _) = if ascii_len >= keywords.answer_marker_len || ascii_len == trimmed_line.len() {
+        let prefix = trimmed_line[..ascii_len].as_bytes();
+        keywords.answer_markers.iter().find(|(_, normalized)| {
+            prefix.len() >= normalized.len()
+                && prefix[..normalized.len()].eq_ignore_ascii_case(normalized.as_bytes())
+        })?
+    } else {
+        let normalized_line = normalize_keyword(trimmed_line);
+        keywords
+            .answer_markers
+            .iter()
+            .find(|(_, normalized)| normalized_line.starts_with(normalized.as_str()))?
+    };
+    let marker_end = match trimmed_line.find(':') {
+        Some(colon) => colon + 1,
+        None => utf16_offset(trimmed_line, raw.encode_utf16().count()),
+    };
+    Some((trimmed_line, marker_end))
+}
+
+fn split_answer_card(lines: &[&str]) -> Option<(String, String)> {
+    let (index, (trimmed_line, marker_end)) = lines
+        .iter()
+        .enumerate()
+        .find_map(|(index, line)| Some((index, find_answer_marker_match(line)?)))?;
+    let front_lines = trim_empty_lines(&lines[..index]);
+    let mut back_lines = vec![js_trim_start(&trimmed_line[marker_end..])];
+    back_lines.extend_from_slice(&lines[index + 1..]);
+    let front = js_trim(&join_lines(trim_empty_lines(front_lines))).to_string();
+    let back = js_trim(&join_lines(trim_empty_lines(&back_lines))).to_string();
+    if front.is_empty() || back.is_empty() {
+        return None;
+    }
+    Some((front, back))
+}
+
+/// `a) Option text` as `(key, text)`; mirrors `/^([A-Za-z])\)\s+(.*)$/`.
+fn match_option(trimmed: &str) -> Option<(char, &str)> {
+    let mut chars = trimmed.chars();
+    let key = chars.next().filter(char::is_ascii_alphabetic)?;
+    let rest = chars.as_str().strip_prefix(')')?;
+    let text = rest.trim_start_matches(is_js_space);
+    if text.len() == rest.len()
+        || text.contains(['\n', '\r', '\u{2028}', '\u{2029}'])
+    {
+        return None;
+    }
+    Some((key, text))
+}
+
+/// `-a` as `a`; mirrors `/^-([A-Za-z])$/`.
+fn match_marker(trimmed: &str) -> Option<char> {
+    let mut chars = trimmed.strip_prefix('-')?.chars();
+    let key = chars.next().filter(char::is_ascii_alphabetic)?;
+    chars.next().is_none().then_some(key)
+}
+
+fn push_unique<T: PartialEq>(items: &mut Vec<T>, value: T) {
+    if !items.contains(&value) {
+        items.push(value);
+    }
+}
+
+fn parse_card(card_lines: &[&str]) -> Option<Flashcard> {
+    let question_index = card_lines
+        .iter()
+        .position(|line| !js_trim(line).is_empty())?;
+    let question = js_trim(card_lines[question_index]).to_string();
+    let content_lines = &card_lines[question_index..];
+
+    let mut options = Vec::new();
+    let mut correct_keys = Vec::new();
+    let mut cloze_lines = Vec::new();
+    for raw_line in &content_lines[1..] {
+        let trimmed = js_trim(raw_line);
+        if trimmed.is_empty() {
+            cloze_lines.push("");
+        } else if let Some((key, text)) = match_option(trimmed) {
+            let text = js_trim(text);
+            if !text.is_empty() {
+                options.push(FlashcardOption {
+                    key: key.to_ascii_lowercase().to_string(),
+                    text: text.to_string(),
+                });
+            }
+        } else if let Some(key) = match_marker(trimmed) {
+            push_unique(&mut correct_keys, key.to_ascii_lowercase().to_string());
+        } else {
+            cloze_lines.push(raw_line);
+        }
+    }
+
+    let mut detected_types = Vec::new();
+    if !options.is_empty() {
+        push_unique(&mut detected_types, DetectedType::MultipleChoice);
+    }
+    let true_false_items = parse_true_false_items(content_lines);
+    if !true_false_items.is_empty() {
+        push_unique(&mut detected_types, DetectedType::TrueFalse);
+    }
+    let answer_card = split_answer_card(content_lines);
+    if answer_card.is_some() {
+        push_unique(&mut detected_types, DetectedType::Qa);
+    }
+    let parsed = parse_cloze_segments(&cloze_lines);
+    let blank_kinds: Vec<BlankKind> = parsed
+        .iter()
+        .flat_map(|(segments, _)| segments)
+        .filter_map(|segment| match segment {
+            ClozeSegment::Blank { kind, .. } => Some(*kind),
+            ClozeSegment::Text { .. } => None,
+        })
+        .collect();
+    let has_input_blanks = blank_kinds.contains(&BlankKind::Input);
+    let has_drag_blanks = blank_kinds.contains(&BlankKind::Drag);
+    if has_input_blanks {
+        push_unique(&mut detected_types, DetectedType::FillBlank);
+    }
+    if has_drag_blanks {
+        push_unique(&mut detected_types, DetectedType::Assignment);
+    }
+    let is_mixed = detected_types.len() >= 2;
+
+    let (body, primary_type) = if !options.is_empty() {
+        let body = CardBody::MultipleChoice {
+            question,
+            options,
+            correct_keys,
+        };
+        (body, DetectedType::MultipleChoice)
+    } else if !true_false_items.is_empty() {
+        let body = CardBody::TrueFalse {
+            items: true_false_items,
+        };
+        (body, DetectedType::TrueFalse)
+    } else if let Some((front, back)) = answer_card {
+        (CardBody::FreeText { front, back }, DetectedType::Qa)
+    } else {
+        let (segments, drag_tokens) = parsed?;
+        if !has_input_blanks && !has_drag_blanks {
+            return None;
+        }
+        let body = CardBody::Cloze {
+            question,
+            segments,
+            drag_tokens,
+        };
+        let primary_type = if has_input_blanks {
+            DetectedType::FillBlank
+        } else {
+            DetectedType::Assignment
+        };
+        (body, primary_type)
+    };
+    Some(Flashcard {
+        id: card_id(&body),
+        body,
+        primary_type,
+        detected_types,
+        is_mixed,
+    })
+}
+
+pub fn parse_flashcards(markdown: &str) -> Vec<Flashcard> {
+    let text = normalize_newlines(markdown);
+    let lines: Vec<&str> = text.split('\n').collect();
+    let mut cards = Vec::new();
+    let mut index = 0;
+    while index < lines.len() {
+        if js_trim(lines[index]) != "#card" {
+            index += 1;
+            continue;
+        }
+        index += 1;
+        let start = index;
+        let mut found_end = false;
+        while index < lines.len() {
+            let trimmed = js_trim(lines[index]);
+            if trimmed == "#" {
+                found_end = true;
+                break;
+            }
+            if trimmed == "#card" {
+                break;
+            }
+            index += 1;
+        }
+        if !found_end {
+            continue;
+        }
+        let card_lines = &lines[start..index];
+        index += 1;
+        if let Some(card) = parse_card(card_lines) {
+            cards.push(card);
+        }
+    }
+    cards
+}
+
+/// `hashString64` in src/lib/flashcards.ts: 64-bit FNV-1a over UTF-16 code
+/// units, as 16 hex digits.
+fn hash_string(value: &str) -> String {
+    let mut hash: u64 = 0xcbf29ce484222325;
+    for unit in value.encode_utf16() {
+        hash ^= u64::from(unit);
+        hash = hash.wrapping_mul(0x100000001b3);
+    }
+    format!("{hash:016x}")
+}
+
+/// `hashString`: the 32-bit FNV-1a legacy card IDs were made of.
+fn hash_string_32(value: &str) -> String {
+    let mut hash: u32 = 2166136261;
+    for unit in value.encode_utf16() {
+        hash ^= u32::from(unit);
+        hash = hash.wrapping_mul(16777619);
+    }
+    format!("{hash:x}")
+}
+
+/// Serializing only the body yields the identity payload `createFlashcardId`
+/// hashes: the kind plus the card's content, in the same key order.
+fn card_body_payload(body: &CardBody) -> String {
+    serde_json::to_string(body).expect("cards serialize to JSON")
+}
+
+/// The body as it is hashed, with multiple-choice correct keys sorted.
+fn identity_body(body: &CardBody) -> Cow<'_, CardBody> {
+    match body {
+        CardBody::MultipleChoice {
+            question,
+            options,
+            correct_keys,
+        } if !correct_keys.is_sorted() => {
+            // Keys are lowercase letters, where byte order matches
+            // `localeCompare`.
+            let mut correct_keys = correct_keys.clone();
+            correct_keys.sort();
+            Cow::Owned(CardBody::MultipleChoice {
+                question: question.clone(),
+                options: options.clone(),
+                correct_keys,
+            })
+        }
+        body => Cow::Borrowed(body),
+    }
+}
+
+/// The ID spaced repetition data is keyed by (`createFlashcardId`).
+fn card_id(body: &CardBody) -> String {
+    format!("card-{}", hash_string(&card_body_payload(&identity_body(body))))
+}
+
+impl Flashcard {
+    /// The ID spaced repetition data is keyed by.
+    pub fn id(&self) -> &str {
+        &self.id
+    }
+
+    /// IDs older data may key this card's state by, the most recent first:
+    /// the 32-bit ID (`createLegacyFlashcardId`) and, for multiple-choice
+    /// cards whose correct keys are out of order, the 32-bit ID of the keys in
+    /// note order.
+    pub fn legacy_ids(&self) -> Vec<String> {
+        let identity_body = identity_body(&self.body);
+        let mut legacy_ids = vec![format!(
+            "card-{}",
+            hash_string_32(&card_body_payload(&identity_body))
+        )];
+        if let Cow::Owned(_) = identity_body {
+            legacy_ids.push(format!(
+                "card-{}",
+                hash_string_32(&card_body_payload(&self.body))
+            ));
+        }
+        legacy_ids
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use serde_json::{json, Value};
+
+    use super::*;
+
+    /// The cards as the frontend receives them, IDs included.
+    fn parse(markdown: &str) -> Value {
+        serde_json::to_value(parse_flashcards(markdown)).expect("cards serialize to JSON")
+    }
+
+    fn kinds_and_ids(markdown: &str) -> Vec<(String, String)> {
+        parse(markdown)
+            .as_array()
+            .expect("a list of cards")
+            .iter()
+            .map(|card| {
+                (
+                    card["kind"].as_str().unwrap().to_string(),
+                    card["id"].as_str().unwrap().to_string(),
+                )
+            })
+            .collect()
+    }
+
+    #[test]
+    fn parses_multiple_choice_markers() {
+        let markdown = "#card\n1.5 Which SQL category controls access rights?\na) DML\nb) DDL\nc) TCL\nd) DCL\n\n-d\n#";
+        assert_eq!(
+            parse(markdown),
+            json!([{
+                "id": "card-eb408f41420cc99b",
+                "kind": "multiple-choice",
+                "question": "1.5 Which SQL category controls access rights?",
+                "options": [
+                    {"key": "a", "text": "DML"},
+                    {"key": "b", "text": "DDL"},
+                    {"key": "c", "text": "TCL"},
+                    {"key": "d", "text": "DCL"}
+                ],
+                "correctKeys": ["d"],
+                "primaryType": "multiple-choice",
+                "detectedTypes": ["multiple-choice"],
+                "isMixed": false
+            }])
+        );
+
+        let markdown = "#card\nChoose two.\na) One\nb) Two\nc) Three\n\n-a\n-d\n#";
+        let cards = parse(markdown);
+        assert_eq!(cards[0]["correctKeys"], json!(["a", "d"]));
+        assert_eq!(cards[0]["id"], "card-891c1903ba2e024d");
+    }
+
+    #[test]
+    fn parses_true_false_items() {
+        let markdown = "#card\n2. Water boils at 100C. Wahr/Falsch?\n-wahr\n3. The moon is a planet. Wahr/Falsch?\n-FALSCH\n#\n#card\nSpacing check.\n- falsch,\n#\n#card\nMissing marker. Wahr/Falsch?\n#";
+        assert_eq!(
+            parse(markdown),
+            json!([
+                {
+                    "id": "card-314e5f86c79e91bc",
+                    "kind": "true-false",
+                    "items": [
+                        {"id": "tf-0", "question": "2. Water boils at 100C. Wahr/Falsch?", "correct": "wahr"},
+                        {"id": "tf-1", "question": "3. The moon is a planet. Wahr/Falsch?", "correct": "falsch"}
+                    ],
+                    "primaryType": "true-false",
+                    "detectedTypes": ["true-false"],
+                    "isMixed": false
+                },
+                {
+                    "id": "card-fdf3e13c5b2f79d5",
+                    "kind": "true-false",
+                    "items": [{"id": "tf-0", "question": "Spacing check.", "correct": "falsch"}],
+                    "primaryType": "true-false",
+                    "detectedTypes": ["true-false"],
+                    "isMixed": false
+                }
+            ])
+        );
+    }
+
+    #[test]
+    fn parses_answer_markers() {
+        let markdown = "#card\nWhat is SQL used for?\nAnswer: Defining and querying data.\n#\n#card\n1. Was ist eine Transaktion?\nAntwort:\nEine atomare Einheit von Operationen.\n#\n#card\nQue signifie SQL ?\nReponse: Un langage de requete.\n#";
+        let cards = parse(markdown);
+        assert_eq!(
+            cards[0],
+            json!({
+                "id": "card-be8c302c1e5cbbc7",
+                "kind": "free-text",
+                "front": "What is SQL used for?",
+                "back": "Defining and querying data.",
+                "primaryType": "qa",
+                "detectedTypes": ["qa"],
+                "isMixed": false
+            })
+        );
+        assert_eq!(cards[1]["front"], "1. Was ist eine Transaktion?");
+        assert_eq!(cards[1]["back"], "Eine atomare Einheit von Operationen.");
+        assert_eq!(cards[1]["id"], "card-9fb286b987731a48");
+        assert_eq!(cards[2]["front"], "Que signifie SQL ?");
+        assert_eq!(cards[2]["back"], "Un langage de requete.");
+        assert_eq!(cards[2]["id"], "card-613529e522062261");
+    }
+
+    #[test]
+    fn parses_input_and_drag_blanks() {
+        let markdown = "#card\nDefine foreign key.\nA foreign key is an %% attribute set %% that references a `primary key`.\n#";
+        assert_eq!(
+            parse(markdown),
+            json!([{
+                "id": "card-38496698438f62a2",
+                "kind": "cloze",
+                "question": "Define foreign key.",
+                "segments": [
+                    {"type": "text", "value": "A foreign key is an "},
+                    {"type": "blank", "id": "blank-0", "kind": "input", "solution": "attribute set"},
+                    {"type": "text", "value": " that references a "},
+                    {"type": "blank", "id": "blank-1", "kind": "drag", "solution": "primary key"},
+                    {"type": "text", "value": "."}
+                ],
+                "dragTokens": [{"id": "token-0", "value": "primary key"}],
+                "primaryType": "fill-blank",
+                "detectedTypes": ["fill-blank", "assignment"],
+                "isMixed": true
+            }])
+        );
+
+        let markdown = "#card\r\nGaps\r\n\r\nFirst %%one%%\r\n\r\n\r\nSecond `two`\r\n\r\n#";
+        let cards = parse(markdown);
+        assert_eq!(
+            cards[0]["segments"],
+            json!([
+                {"type": "text", "value": "First "},
+                {"type": "blank", "id": "blank-0", "kind": "input", "solution": "one"},
+                {"type": "text", "value": "\n\n\nSecond "},
+                {"type": "blank", "id": "blank-1", "kind": "drag", "solution": "two"}
+            ])
+        );
+        assert_eq!(cards[0]["id"], "card-6d1c9ee344ce222e");
+    }
+
+    #[test]
+    fn keeps_unclosed_markers_as_text_and_skips_empty_blanks() {
+        let markdown = "#card\nBroken markers.\nValid %%answer%% and %%unfinished and `open.\n#\n#card\nEmpty blank.\n%%%%\n#";
+        let cards = parse(markdown);
+        assert_eq!(cards.as_array().unwrap().len(), 1);
+        assert_eq!(
+            cards[0]["segments"],
+            json!([
+                {"type": "text", "value": "Valid "},
+                {"type": "blank", "id": "blank-0", "kind": "input", "solution": "answer"},
+                {"type": "text", "value": " and %%unfinished and `open."}
+            ])
+        );
+        assert_eq!(cards[0]["dragTokens"], json!([]));
+        assert_eq!(cards[0]["id"], "card-46f05e5dd0de45c6");
+    }
+
+    #[test]
+    fn parses_mixed_blocks_between_notes() {
+        let markdown = "Intro text.\n- Not a marker.\n---\n#card\nFirst question?\na) One\nb) Two\n-b\n#\n---\n#card\nSecond.\nOnly `beta`.\n#\nNotes between.\n#card\nThe earth orbits the sun.\n-wahr\n#\n#card\nWhat is a key?\nAnswer: An identifier.\n#\nMore text.";
+        let expected = [
+            ("multiple-choice", "card-2b535bd8205c1af1"),
+            ("cloze", "card-fe79b7c6e6da366b"),
+            ("true-false", "card-29a15aa05456a098"),
+            ("free-text", "card-a9ced30e54719f04"),
+        ];
+        let expected: Vec<(String, String)> = expected
+            .iter()
+            .map(|(kind, id)| (kind.to_string(), id.to_string()))
+            .collect();
+        assert_eq!(kinds_and_ids(markdown), expected);
+    }
+
+    #[test]
+    fn skips_unterminated_blocks() {
+        let markdown = "#card\nDropped question?\na) Option\n#card\nKept question?\na) One\n-a\n#\n#card\nQuestion without end?\na) Option";
+        let cards = parse(markdown);
+        assert_eq!(cards.as_array().unwrap().len(), 1);
+        assert_eq!(cards[0]["question"], "Kept question?");
+        assert_eq!(cards[0]["id"], "card-402f74ba3bfa4cb0");
+    }
+
+    #[test]
+    fn ignores_markers_inside_fences() {
+        let markdown = "#card\nQuestion.\nCode:\n~~~\n`ignored`\n%%not%%\n~~~\nOutside `token` and %%blank%%.\n#";
+        let cards = parse(markdown);
+        assert_eq!(
+            cards[0]["dragTokens"],
+            json!([{"id": "token-0", "value": "token"}])
+        );
+        assert_eq!(
+            cards[0]["segments"],
+            json!([
+                {"type": "text", "value": "Code:\n~~~\n`ignored`\n%%not%%\n~~~\nOutside "},
+                {"type": "blank", "id": "blank-0", "kind": "drag", "solution": "token"},
+                {"type": "text", "value": " and "},
+                {"type": "blank", "id": "blank-1", "kind": "input", "solution": "blank"},
+                {"type": "text", "value": "."}
+            ])
+        );
+        assert_eq!(cards[0]["id"], "card-9763ac484ddc65e1");
+    }
+
+    #[test]
+    fn ids_ignore_the_order_of_correct_keys() {
+        let cards = parse_flashcards(
+            "#card\nPick\na) A\nb) B\nc) C\n-c\n-a\n#\n#card\nPick\na) A\nb) B\nc) C\n-a\n-c\n#",
+        );
+        // Same ID as src/lib/flashcards.test.ts and tools/vault/flashcards.py.
+        assert_eq!(cards[0].id(), "card-4679ed5ba455911a");
+        assert_eq!(cards[1].id(), cards[0].id());
+        assert_eq!(cards[0].legacy_ids().len(), 2);
+        assert_eq!(cards[1].legacy_ids(), cards[0].legacy_ids()[..1]);
+    }
+}
@@ -1,19 +1,436 @@
+mod card_cache;
+mod card_states;
+mod flashcards;
+#[cfg(feature = "sqlite")]
+mod review_db;
+mod review_journal;
+
 use std::{
-    collections::HashMap,
+    borrow::Cow,
+    collections::{BTreeSet, HashMap, HashSet},
+    ffi::OsStr,
     fs,
+    io::Write,
     path::{Path, PathBuf},
+    mem,
+    sync::{
+        atomic::{AtomicU64, AtomicUsize, Ordering},
+        Arc, Condvar, Mutex,
+    },
+    thread,
+    time::{Duration, Instant},
 };
 
-use tauri::Manager;
-use walkdir::{DirEntry, WalkDir};
+use card_states::CardStates;
+use ignore::gitignore::{Gitignore, GitignoreBuilder};
+use notify_debouncer_full::{
+    new_debouncer,
+    notify::{
+        event::{ModifyKind, RenameMode},
+        EventKind, RecommendedWatcher, RecursiveMode, Watcher,
+    },
+    DebounceEventResult, DebouncedEvent, Debouncer, FileIdMap,
+};
+use tauri::{ipc::Channel, Emitter, Manager};
 
-#[derive(serde::Serialize)]
+use card_cache::CardCache;
+use flashcards::parse_flashcards;
+#[cfg(feature = "sqlite")]
+use review_db::ReviewDb;
+use review_journal::{user_state_entries, JournalEntry, ReviewJournal, Snapshot};
+use serde_json::value::RawValue;
+
+/// Gitignore-style exclude rules read from the vault root.
+const IGNORE_FILE_NAME: &str = ".fmdignore";
+
+/// Quiet period before a burst of file system events (editor save storms,
+/// git checkouts) is turned into one `vault-changed` delta.
+const WATCH_DEBOUNCE: Duration = Duration::from_millis(300);
+const VAULT_CHANGED_EVENT: &str = "vault-changed";
+
+/// Files collected before a `VaultScanBatch` is pushed to the frontend.
+const SCAN_BATCH_SIZE: usize = 512;
+
+/// How long applied spaced repetition changes may wait before they are
+/// written, so a burst of answers shares one write and fsync.
+const REVIEW_FLUSH_DELAY: Duration = Duration::from_millis(500);
+
+/// Quiet period after the last settings change before `settings.json` is
+/// written, so toggling the theme or dragging a slider costs one write.
+const SETTINGS_FLUSH_DELAY: Duration = Duration::from_millis(400);
+
+/// Version of the spaced repetition data. 1: states under IDs of unsorted
+/// multiple-choice keys were migrated. 2: states under 32-bit IDs were
+/// migrated too, so card states are keyed by current card IDs only (see
+/// `Flashcard::legacy_ids`).
+const SPACED_REPETITION_SCHEMA_VERSION: u32 = 2;
+
+#[derive(serde::Serialize, Clone)]
 struct VaultFile {
     path: String,
     relative_path: String,
 }
 
-#[derive(serde::Deserialize, serde::Serialize, Default)]
+#[derive(serde::Serialize)]
+struct VaultScanStats {
+    files: usize,
+    directories: usize,
+    workers: usize,
+    elapsed_ms: f64,
+}
+
+/// Listing as sent over IPC, without repeating path prefixes. `dirs[0]` is
+/// the vault root; every other directory is `[parent, name]` and every file
+/// `[dir, name]`, indexing `dirs` and the interned `names`. Parents always
+/// come before their children. A file's absolute path is `root` followed by
+/// its directory and file names joined with `separator`.
+#[derive(serde::Serialize, Clone)]
+struct CompactListing {
+    root: String,
+    separator: char,
+    names: Vec<String>,
+    dirs: Vec<[u32; 2]>,
+    files: Vec<[u32; 2]>,
+}
+
+impl CompactListing {
+    fn new(root: &Path, files: &[VaultFile]) -> Self {
+        let mut root = root.to_string_lossy().to_string();
+        if !root.ends_with(std::path::is_separator) {
+            root.push(std::path::MAIN_SEPARATOR);
+        }
+        let mut names = vec![String::new()];
+        let mut name_ids = HashMap::new();
+        let mut dirs = vec![[0, 0]];
+        let mut dir_ids = HashMap::new();
+        let mut entries = Vec::with_capacity(files.len());
+
+        let mut intern = |name| {
+            *name_ids.entry(name).or_insert_with(|| {
+                names.push(String::from(name));
+                (names.len() - 1) as u32
+            })
+        };
+        for file in files {
+            let mut parts = file
+                .relative_path
+                .split(std::path::is_separator)
+                .filter(|part| !part.is_empty());
+            let Some(file_name) = parts.next_back() else {
+                continue;
+            };
+            let mut dir = 0;
+            for part in parts {
+                let key = [dir, intern(part)];
+                dir = *dir_ids.entry(key).or_insert_with(|| {
+                    dirs.push(key);
+                    (dirs.len() - 1) as u32
+                });
+            }
+            entries.push([dir, intern(file_name)]);
+        }
+
+        Self {
+            root,
+            separator: std::path::MAIN_SEPARATOR,
+            names,
+            dirs,
+            files: entries,
+        }
+    }
+}
+
+#[derive(serde::Serialize, Clone)]
+struct VaultScanBatch {
+    scan_id: u64,
+    listing: CompactListing,
+}
+
+#[derive(serde::Serialize)]
+struct VaultScanSummary {
+    scan_id: u64,
+    truncated: bool,
+    stats: VaultScanStats,
+}
+
+/// Where a scan stopped after hitting `max_files_per_scan`: directories not
+/// yet visited and files found beyond the budget.
+struct PendingScan {
+    context: ScanContext,
+    dirs: ScanDirs,
+    overflow: Vec<VaultFile>,
+}
+
+/// Relative paths of the files the open vault's scans sent to the frontend.
+/// The watcher keeps them up to date from there; while `complete` is false
+/// (a scan was cut short by `max_files_per_scan`) it leaves files outside the
+/// listing to `continue_vault_scan`.
+#[derive(Default)]
+struct ListedFiles {
+    root: PathBuf,
+    paths: BTreeSet<String>,
+    complete: bool,
+}
+
+#[derive(Default)]
+struct VaultScans {
+    next_id: AtomicU64,
+    pending: Mutex<HashMap<u64, PendingScan>>,
+    listed: Arc<Mutex<ListedFiles>>,
+}
+
+#[derive(serde::Serialize, Clone)]
+struct VaultRename {
+    from: String,
+    to: VaultFile,
+}
+
+/// Changes to the markdown listing since the last delta; paths in `removed`
+/// and `from` are relative paths.
+#[derive(serde::Serialize, Clone, Default)]
+struct VaultDelta {
+    vault_path: String,
+    added: Vec<VaultFile>,
+    removed: Vec<String>,
+    renamed: Vec<VaultRename>,
+    changed: Vec<VaultFile>,
+}
+
+impl VaultDelta {
+    fn is_empty(&self) -> bool {
+        self.added.is_empty()
+            && self.removed.is_empty()
+            && self.renamed.is_empty()
+            && self.changed.is_empty()
+    }
+}
+
+/// App settings, read from `settings.json` once and then served from memory.
+/// Changes are written by a debounced `flush`.
+struct SettingsStore {
+    path: PathBuf,
+    settings: AppSettings,
+    dirty: bool,
+    /// Bumped on every change, so a scheduled flush can tell whether another
+    /// change arrived while it waited.
+    generation: u64,
+}
+
+impl SettingsStore {
+    fn open(path: PathBuf) -> Result<Self, String> {
+        let settings = read_settings(&path)?;
+        Ok(Self {
+            path,
+            settings,
+            dirty: false,
+            generation: 0,
+        })
+    }
+
+    /// Replaces the settings and returns the generation to flush at, or
+    /// `None` when nothing changed.
+    fn set(&mut self, settings: AppSettings) -> Option<u64> {
+        if self.settings == settings {
+            return None;
+        }
+        self.settings = settings;
+        self.dirty = true;
+        self.generation += 1;
+        Some(self.generation)
+    }
+
+    fn flush(&mut self) -> Result<(), String> {
+        if !self.dirty {
+            return Ok(());
+        }
+        write_settings(&self.path, &self.settings)?;
+        self.dirty = false;
+        Ok(())
+    }
+}
+
+#[derive(Default)]
+struct SettingsState(Mutex<Option<SettingsStore>>);
+
+/// Parsed-card cache, loaded from disk on first use.
+#[derive(Default)]
+struct CardCacheState(Mutex<Option<CardCache>>);
+
+/// Where spaced repetition data is kept: the JSON snapshot plus review
+/// journal, or an SQLite database when built with the `sqlite` feature.
+enum ReviewBackend {
+    Journal(ReviewJournal),
+    #[cfg(feature = "sqlite")]
+    Db(ReviewDb),
+}
+
+/// The authoritative spaced repetition data. The frontend sends changes,
+/// which are applied here at once and written by a delayed `flush`.
+struct ReviewStore {
+    backend: ReviewBackend,
+    /// Version of the last delta applied per user since the frontend loaded.
+    versions: HashMap<String, u64>,
+    flush_scheduled: bool,
+}
+
+impl ReviewStore {
+    /// Everything stored. The database backend reads it from its tables.
+    fn load(&mut self) -> Result<Cow<'_, SpacedRepetitionStorage>, String> {
+        match &mut self.backend {
+            ReviewBackend::Journal(journal) => Ok(Cow::Borrowed(journal.storage())),
+            #[cfg(feature = "sqlite")]
+            ReviewBackend::Db(db) => db.load().map(Cow::Owned),
+        }
+    }
+
+    fn schema_version(&self) -> Result<Option<u32>, String> {
+        match &self.backend {
+            ReviewBackend::Journal(journal) => Ok(journal.storage().schema_version),
+            #[cfg(feature = "sqlite")]
+            ReviewBackend::Db(db) => db.schema_version(),
+        }
+    }
+
+    fn users(&self) -> Result<(Vec<SpacedRepetitionUser>, Option<String>), String> {
+        match &self.backend {
+            ReviewBackend::Journal(journal) => {
+                let storage = journal.storage();
+                Ok((storage.users.clone(), storage.last_active_user_id.clone()))
+            }
+            #[cfg(feature = "sqlite")]
+            ReviewBackend::Db(db) => db.users(),
+        }
+    }
+
+    /// `last_loaded_at` of the user's state, `None` when there is no state.
+    fn last_loaded_at(&self, user_id: &str) -> Result<Option<Option<String>>, String> {
+        match &self.backend {
+            ReviewBackend::Journal(journal) => Ok(journal
+                .storage()
+                .user_state_by_id
+                .get(user_id)
+                .map(|state| state.last_loaded_at.clone())),
+            #[cfg(feature = "sqlite")]
+            ReviewBackend::Db(db) => db.last_loaded_at(user_id),
+        }
+    }
+
+    /// Applies `entries` and returns true when a flush needs scheduling.
+    fn apply(&mut self, entries: Vec<JournalEntry>) -> Result<bool, String> {
+        if entries.is_empty() {
+            return Ok(false);
+        }
+        match &mut self.backend {
+            ReviewBackend::Journal(journal) => journal.apply(entries)?,
+            #[cfg(feature = "sqlite")]
+            ReviewBackend::Db(db) => db.apply(entries),
+        }
+        Ok(!mem::replace(&mut self.flush_scheduled, true))
+    }
+
+    fn apply_deltas(&mut self, deltas: Vec<SpacedRepetitionUserDelta>) -> Result<bool, String> {
+        // Checked up front so a rejected batch leaves nothing half applied.
+        for delta in &deltas {
+            let expected = self.versions.get(&delta.user_id).map_or(1, |version| version + 1);
+            if !delta.replace && delta.version != expected {
+                return Err(format!(
+                    "Spaced repetition changes for user {} are out of date.",
+                    delta.user_id
+                ));
+            }
+        }
+        let mut entries = Vec::new();
+        for delta in deltas {
+            self.versions.insert(delta.user_id.clone(), delta.version);
+            let last_loaded_at = self.last_loaded_at(&delta.user_id)?;
+            delta.push_entries(last_loaded_at, &mut entries);
+        }
+        self.apply(entries)
+    }
+
+    /// Writes applied changes. A journal snapshot that is due is returned
+    /// instead, to be written with `write_review_snapshot`.
+    fn flush(&mut self) -> Result<Option<Snapshot>, String> {
+        self.flush_scheduled = false;
+        match &mut self.backend {
+            ReviewBackend::Journal(journal) => Ok(journal.flush()),
+            #[cfg(feature = "sqlite")]
+            ReviewBackend::Db(db) => db.flush().map(|()| None),
+        }
+    }
+
+    fn writing_snapshot(&self) -> bool {
+        match &self.backend {
+            ReviewBackend::Journal(journal) => journal.writing_snapshot(),
+            #[cfg(feature = "sqlite")]
+            ReviewBackend::Db(_) => false,
+        }
+    }
+
+    fn finish_snapshot(&mut self, written: Result<u64, String>) -> Result<(), String> {
+        match &mut self.backend {
+            ReviewBackend::Journal(journal) => journal.finish_snapshot(written),
+            #[cfg(feature = "sqlite")]
+            ReviewBackend::Db(_) => written.map(|_| ()),
+        }
+    }
+
+    fn user_state(&mut self, user_id: &str) -> Result<Option<SpacedRepetitionUserState>, String> {
+        match &mut self.backend {
+            ReviewBackend::Journal(journal) => {
+                Ok(journal.storage().user_state_by_id.get(user_id).cloned())
+            }
+            #[cfg(feature = "sqlite")]
+            ReviewBackend::Db(db) => db.user_state(user_id),
+        }
+    }
+
+    /// IDs of the users with a stored state.
+    fn state_user_ids(&mut self) -> Result<Vec<String>, String> {
+        match &mut self.backend {
+            ReviewBackend::Journal(journal) => {
+                Ok(journal.storage().user_state_by_id.keys().cloned().collect())
+            }
+            #[cfg(feature = "sqlite")]
+            ReviewBackend::Db(db) => db.state_user_ids(),
+        }
+    }
+
+    fn box_counts(&mut self, user_id: &str, box_count: u32) -> Result<Vec<u32>, String> {
+        match &mut self.backend {
+            ReviewBackend::Journal(journal) => {
+                let box_count = box_count.max(1);
+                let mut counts = vec![0; box_count as usize];
+                if let Some(state) = journal.storage().user_state_by_id.get(user_id) {
+                    for canonical in state.card_states.canonical_boxes() {
+                        counts[canonical.clamp(1, box_count) as usize - 1] += 1;
+                    }
+                }
+                Ok(counts)
+            }
+            #[cfg(feature = "sqlite")]
+            ReviewBackend::Db(db) => db.box_counts(user_id, box_count),
+        }
+    }
+}
+
+/// Spaced repetition store, opened on first use.
+#[derive(Default)]
+struct ReviewStoreState(Mutex<Option<ReviewStore>>);
+
+#[derive(Default)]
+struct VaultWatcher(Mutex<Option<Debouncer<RecommendedWatcher, FileIdMap>>>);
+
+/// Cards of one note, parsed in the backend (a JSON array of `Flashcard`);
+/// `cards` is `None` when the file could not be read.
+#[derive(serde::Serialize)]
+struct FlashcardFileResult {
+    path: String,
+    cards: Option<Box<RawValue>>,
+    error: Option<String>,
+}
+
+#[derive(serde::Deserialize, serde::Serialize, Default, Clone, PartialEq)]
 struct AppSettings {
     active_note_path: Option<String>,
     vault_path: Option<String>,
@@ -22,6 +439,7 @@ struct AppSettings {
     language: Option<String>,
     max_files_per_scan: Option<String>,
     scan_parallelism: Option<String>,
+    scan_exclude_patterns: Option<String>,
     flashcard_order: Option<String>,
     flashcard_mode: Option<String>,
     flashcard_scope: Option<String>,
@@ -36,7 +454,7 @@ struct AppSettings {
     right_toolbar_collapsed: Option<bool>,
 }
 
-#[derive(serde::Deserialize, serde::Serialize, Default)]
+#[derive(serde::Deserialize, serde::Serialize, Default, Clone, PartialEq)]
 #[serde(rename_all = "camelCase", default)]
 struct SpacedRepetitionCardState {
     #[serde(rename = "box", skip_serializing_if = "Option::is_none")]
@@ -48,16 +466,16 @@ struct SpacedRepetitionCardState {
     last_reviewed_at: Option<String>,
 }
 
-#[derive(serde::Deserialize, serde::Serialize, Default)]
+#[derive(serde::Deserialize, serde::Serialize, Default, Clone)]
 #[serde(rename_all = "camelCase", default)]
 struct SpacedRepetitionUserState {
-    card_states: HashMap<String, SpacedRepetitionCardState>,
+    card_states: CardStates,
     last_loaded_at: Option<String>,
     #[serde(skip_serializing_if = "HashMap::is_empty")]
     completed_per_day: HashMap<String, u32>,
 }
 
-#[derive(serde::Deserialize, serde::Serialize, Default)]
+#[derive(serde::Deserialize, serde::Serialize, Default, Clone, PartialEq)]
 #[serde(rename_all = "camelCase")]
 struct SpacedRepetitionUser {
     id: String,
@@ -65,12 +483,94 @@ struct SpacedRepetitionUser {
     created_at: String,
 }
 
-#[derive(serde::Deserialize, serde::Serialize, Default)]
+#[derive(serde::Deserialize, serde::Serialize, Default, Clone)]
 #[serde(rename_all = "camelCase")]
 struct SpacedRepetitionStorage {
     users: Vec<SpacedRepetitionUser>,
     user_state_by_id: HashMap<String, SpacedRepetitionUserState>,
     last_active_user_id: Option<String>,
+    /// `SPACED_REPETITION_SCHEMA_VERSION` the data was migrated to, if any.
+    #[serde(default, skip_serializing_if = "Option::is_none")]
+    schema_version: Option<u32>,
+}
+
+/// `SpacedRepetitionStorage` without the user states.
+#[derive(serde::Serialize)]
+#[serde(rename_all = "camelCase")]
+struct SpacedRepetitionUsers {
+    users: Vec<SpacedRepetitionUser>,
+    last_active_user_id: Option<String>,
+    schema_version: Option<u32>,
+}
+
+/// What changed in one user's state since that user's previous delta. `null`
+/// card states and daily counts are removals.
+#[derive(serde::Deserialize)]
+#[serde(rename_all = "camelCase")]
+struct SpacedRepetitionUserDelta {
+    user_id: String,
+    /// One more than the user's previous delta; anything else means deltas
+    /// were lost and the frontend has to send a `replace` instead.
+    version: u64,
+    /// The delta holds the user's whole state.
+    #[serde(default)]
+    replace: bool,
+    #[serde(default)]
+    removed: bool,
+    #[serde(default)]
+    card_states: HashMap<String, Option<SpacedRepetitionCardState>>,
+    #[serde(default)]
+    completed_per_day: HashMap<String, Option<u32>>,
+    #[serde(default)]
+    last_loaded_at: Option<String>,
+}
+
+impl SpacedRepetitionUserDelta {
+    /// `last_loaded_at` is the stored state's, `None` without a stored state.
+    fn push_entries(self, last_loaded_at: Option<Option<String>>, entries: &mut Vec<JournalEntry>) {
+        let user_id = self.user_id;
+        if self.removed {
+            entries.push(JournalEntry::RemoveUserState { user_id });
+            return;
+        }
+        if self.replace {
+            let state = SpacedRepetitionUserState {
+                card_states: self
+                    .card_states
+                    .into_iter()
+                    .filter_map(|(card_id, card)| Some((card_id, card?)))
+                    .collect(),
+                last_loaded_at: self.last_loaded_at,
+                completed_per_day: self
+                    .completed_per_day
+                    .into_iter()
+                    .filter_map(|(day, count)| Some((day, count?)))
+                    .collect(),
+            };
+            entries.extend(user_state_entries(&user_id, &state));
+            return;
+        }
+        if last_loaded_at.as_ref() != Some(&self.last_loaded_at) {
+            entries.push(JournalEntry::LastLoaded {
+                user_id: user_id.clone(),
+                last_loaded_at: self.last_loaded_at,
+            });
+        }
+        for (card_id, state) in self.card_states {
+            entries.push(JournalEntry::Card {
+                user_id: user_id.clone(),
+                card_id,
+                state,
+            });
+        }
+        for (day, count) in self.completed_per_day {
+            entries.push(JournalEntry::Completed {
+                user_id: user_id.clone(),
+                day,
+                count,
+            });
+        }
+    }
 }
 
 impl AppSettings {
@@ -82,6 +582,7 @@ impl AppSettings {
             && self.language.is_none()
             && self.max_files_per_scan.is_none()
             && self.scan_parallelism.is_none()
+            && self.scan_exclude_patterns.is_none()
             && self.flashcard_order.is_none()
             && self.flashcard_mode.is_none()
             && self.flashcard_scope.is_none()
@@ -97,8 +598,8 @@ impl AppSettings {
     }
 }
 
-fn is_hidden(entry: &DirEntry) -> bool {
-    entry.file_name().to_string_lossy().starts_with('.')
+fn is_hidden(name: &OsStr) -> bool {
+    name.to_string_lossy().starts_with('.')
 }
 
 fn is_markdown(path: &Path) -> bool {
@@ -112,6 +613,84 @@ fn is_markdown(path: &Path) -> bool {
     }
 }
 
+fn scan_worker_count(scan_parallelism: Option<&str>) -> usize {
+    let cpus = thread::available_parallelism()
+        .map(|count| count.get())
+        .unwrap_or(1);
+    match scan_parallelism {
+        Some("low") => (cpus / 4).max(1),
+        Some("high") => cpus,
+        _ => (cpus / 2).max(1),
+    }
+}
+
+/// `max_files_per_scan` as a file budget; empty or `0` means unlimited.
+fn scan_file_budget(max_files_per_scan: Option<&str>) -> Option<usize> {
+    max_files_per_scan
+        .and_then(|value| value.trim().parse::<usize>().ok())
+        .filter(|budget| *budget > 0)
+}
+
+fn app_settings_or_default(app: &tauri::AppHandle) -> AppSettings {
+    with_settings(app, |store| store.settings.clone()).unwrap_or_default()
+}
+
+fn app_scan_worker_count(app: &tauri::AppHandle) -> usize {
+    scan_worker_count(app_settings_or_default(app).scan_parallelism.as_deref())
+}
+
+/// Runs `job` over `items` on up to `workers` threads and returns the results
+/// in input order, so callers get the same output regardless of scheduling.
+fn run_parallel<T, R, F>(items: &[T], workers: usize, job: F) -> Vec<R>
+where
+    T: Sync,
+    R: Send,
+    F: Fn(&T) -> R + Sync,
+{
+    let workers = workers.min(items.len());
+    if workers <= 1 {
+        return items.iter().map(job).collect();
+    }
+
+    let next = AtomicUsize::new(0);
+    let mut indexed: Vec<(usize, R)> = thread::scope(|scope| {
+        let handles: Vec<_> = (0..workers)
+            .map(|_| {
+                scope.spawn(|| {
+                    let mut local = Vec::new();
+                    loop {
+                        let index = next.fetch_add(1, Ordering::Relaxed);
+                        let Some(item) = items.get(index) else {
+                            break;
+                        };
+                        local.push((index, job(item)));
+                    }
+                    local
+                })
+            })
+            .collect();
+        handles
+            .into_iter()
+            .flat_map(|handle| handle.join().expect("scan worker panicked"))
+            .collect()
+    });
+    indexed.sort_unstable_by_key(|(index, _)| *index);
+    indexed.into_iter().map(|(_, result)| result).collect()
+}
+
+fn read_markdown_file(path: &Path) -> Result<String, String> {
+    if !path.exists() {
+        return Err("File not found.".to_string());
+    }
+    if !path.is_file() {
+        return Err("Path is not a file.".to_string());
+    }
+    if !is_markdown(path) {
+        return Err("Only markdown files are supported.".to_string());
+    }
+    fs::read_to_string(path).map_err(|err| err.to_string())
+}
+
 fn settings_path(app: &tauri::AppHandle) -> Result<PathBuf, String> {
     app.path()
         .app_data_dir()
@@ -119,6 +698,13 @@ fn settings_path(app: &tauri::AppHandle) -> Result<PathBuf, String> {
         .map(|dir| dir.join("settings.json"))
 }
 
+fn card_cache_path(app: &tauri::AppHandle) -> Result<PathBuf, String> {
+    app.path()
+        .app_data_dir()
+        .map_err(|err| err.to_string())
+        .map(|dir| dir.join("card_cache.json"))
+}
+
 fn spaced_repetition_path(app: &tauri::AppHandle) -> Result<PathBuf, String> {
     app.path()
         .app_data_dir()
@@ -147,8 +733,33 @@ fn write_settings(path: &Path, settings: &AppSettings) -> Result<(), String> {
         fs::create_dir_all(parent).map_err(|err| err.to_string())?;
     }
 
-    let data = serde_json::to_string_pretty(settings).map_err(|err| err.to_string())?;
-    fs::write(path, data).map_err(|err| err.to_string())
+    let data = serde_json::to_vec(settings).map_err(|err| err.to_string())?;
+    write_file_atomic(path, &data)
+}
+
+/// Makes a rename within `dir` durable. Directories cannot be opened for
+/// syncing on every platform, so this is best effort.
+fn sync_dir(dir: &Path) {
+    if let Ok(dir) = fs::File::open(dir) {
+        let _ = dir.sync_all();
+    }
+}
+
+/// Replaces `path` with `data` through a synced temporary file and a rename,
+/// so a crash leaves either the old or the new contents behind.
+fn write_file_atomic(path: &Path, data: &[u8]) -> Result<(), String> {
+    let mut tmp_name = path.file_name().unwrap_or_default().to_os_string();
+    tmp_name.push(".tmp");
+    let tmp_path = path.with_file_name(tmp_name);
+    let mut file = fs::File::create(&tmp_path).map_err(|err| err.to_string())?;
+    file.write_all(data)
+        .and_then(|_| file.sync_all())
+        .map_err(|err| err.to_string())?;
+    fs::rename(&tmp_path, path).map_err(|err| err.to_string())?;
+    if let Some(parent) = path.parent() {
+        sync_dir(parent);
+    }
+    Ok(())
 }
 
 fn read_spaced_repetition_data(path: &Path) -> Result<SpacedRepetitionStorage, String> {
@@ -163,22 +774,54 @@ fn read_spaced_repetition_data(path: &Path) -> Result<SpacedRepetitionStorage, S
     }
 }
 
-fn write_spaced_repetition_data(
-    path: &Path,
-    storage: &SpacedRepetitionStorage,
+fn with_settings<R>(
+    app: &tauri::AppHandle,
+    f: impl FnOnce(&mut SettingsStore) -> R,
+) -> Result<R, String> {
+    let state = app.state::<SettingsState>();
+    let mut guard = state.0.lock().expect("settings poisoned");
+    if guard.is_none() {
+        *guard = Some(SettingsStore::open(settings_path(app)?)?);
+    }
+    Ok(f(guard.as_mut().expect("settings opened above")))
+}
+
+fn update_settings(
+    app: tauri::AppHandle,
+    f: impl FnOnce(&mut AppSettings),
 ) -> Result<(), String> {
-    if let Some(parent) = path.parent() {
-        fs::create_dir_all(parent).map_err(|err| err.to_string())?;
+    let generation = with_settings(&app, |store| {
+        let mut settings = store.settings.clone();
+        f(&mut settings);
+        store.set(settings)
+    })?;
+    if let Some(generation) = generation {
+        tauri::async_runtime::spawn_blocking(move || {
+            thread::sleep(SETTINGS_FLUSH_DELAY);
+            let _ = with_settings(&app, |store| {
+                if store.generation == generation {
+                    store.flush()
+                } else {
+                    Ok(())
+                }
+            });
+        });
     }
+    Ok(())
+}
 
-    let data = serde_json::to_string_pretty(storage).map_err(|err| err.to_string())?;
-    fs::write(path, data).map_err(|err| err.to_string())
+/// Writes unsaved settings before the app exits.
+fn flush_settings(app: &tauri::AppHandle) {
+    let state = app.state::<SettingsState>();
+    let mut guard = state.0.lock().expect("settings poisoned");
+    if let Some(store) = guard.as_mut() {
+        let _ = store.flush();
+    }
 }
 
 #[tauri::command]
 fn load_app_settings(app: tauri::AppHandle) -> Result<AppSettings, String> {
-    let path = settings_path(&app)?;
-    read_settings(&path)
+    with_settings(&app, |store| store.settings.clone())
 }
 
 #[tauri::command]
@@ -191,6 +834,7 @@ fn save_app_settings(
     language: Option<String>,
     max_files_per_scan: Option<String>,
     scan_parallelism: Option<String>,
+    scan_exclude_patterns: Option<String>,
     flashcard_order: Option<String>,
     flashcard_mode: Option<String>,
     flashcard_scope: Option<String>,
@@ -204,7 +848,6 @@ fn save_app_settings(
     spaced_repetition_stats_view: Option<String>,
     right_toolbar_collapsed: Option<bool>,
 ) -> Result<(), String> {
-    let path = settings_path(&app)?;
     let settings = AppSettings {
         active_note_path,
         vault_path,
@@ -213,6 +856,7 @@ fn save_app_settings(
         language,
         max_files_per_scan,
         scan_parallelism,
+        scan_exclude_patterns,
         flashcard_order,
         flashcard_mode,
         flashcard_scope,
@@ -226,87 +870,954 @@ fn save_app_settings(
         spaced_repetition_stats_view,
         right_toolbar_collapsed,
     };
-    write_settings(&path, &settings)
+    update_settings(app, |current| *current = settings)
+}
+
+fn open_review_store(app: &tauri::AppHandle) -> Result<ReviewStore, String> {
+    let json_path = spaced_repetition_path(app)?;
+    #[cfg(feature = "sqlite")]
+    let backend = ReviewDb::open(&json_path.with_file_name("spaced_repetition.sqlite"), json_path)
+        .map(ReviewBackend::Db)?;
+    #[cfg(not(feature = "sqlite"))]
+    let backend = ReviewBackend::Journal(ReviewJournal::open(json_path));
+    Ok(ReviewStore {
+        backend,
+        versions: HashMap::new(),
+        flush_scheduled: false,
+    })
+}
+
+fn with_review_store<R>(
+    app: &tauri::AppHandle,
+    f: impl FnOnce(&mut ReviewStore) -> R,
+) -> Result<R, String> {
+    let state = app.state::<ReviewStoreState>();
+    let mut guard = state.0.lock().expect("review store poisoned");
+    if guard.is_none() {
+        *guard = Some(open_review_store(app)?);
+    }
+    Ok(f(guard.as_mut().expect("review store opened above")))
+}
+
+/// Writes a snapshot handed out by `ReviewStore::flush` without holding the
+/// store, so saving changes does not wait for it.
+fn write_review_snapshot(app: &tauri::AppHandle, snapshot: Snapshot) -> Result<(), String> {
+    let written = snapshot.write();
+    with_review_store(app, |store| store.finish_snapshot(written))?
+}
+
+/// Writes applied changes after `REVIEW_FLUSH_DELAY`, together with any
+/// applied in the meantime.
+fn schedule_review_flush(app: tauri::AppHandle) {
+    tauri::async_runtime::spawn_blocking(move || {
+        thread::sleep(REVIEW_FLUSH_DELAY);
+        if let Ok(Ok(Some(snapshot))) = with_review_store(&app, |store| store.flush()) {
+            let _ = write_review_snapshot(&app, snapshot);
+        }
+    });
+}
+
+/// Writes pending changes before the app exits, once a snapshot that is
+/// being written has landed.
+fn flush_review_store(app: &tauri::AppHandle) {
+    let state = app.state::<ReviewStoreState>();
+    loop {
+        let mut guard = state.0.lock().expect("review store poisoned");
+        let Some(store) = guard.as_mut() else {
+            return;
+        };
+        if store.writing_snapshot() {
+            drop(guard);
+            thread::sleep(Duration::from_millis(10));
+            continue;
+        }
+        if let Ok(Some(snapshot)) = store.flush() {
+            let written = snapshot.write();
+            let _ = store.finish_snapshot(written);
+        }
+        return;
+    }
 }
 
+/// The users without their states, for the frontend's initial load. A
+/// user's state is loaded once that user is active. Delta versions start over
+/// with it.
 #[tauri::command]
-fn load_spaced_repetition_data(app: tauri::AppHandle) -> Result<SpacedRepetitionStorage, String> {
-    let path = spaced_repetition_path(&app)?;
-    read_spaced_repetition_data(&path)
+fn load_spaced_repetition_users(app: tauri::AppHandle) -> Result<SpacedRepetitionUsers, String> {
+    with_review_store(&app, |store| {
+        store.versions.clear();
+        let (users, last_active_user_id) = store.users()?;
+        Ok(SpacedRepetitionUsers {
+            users,
+            last_active_user_id,
+            schema_version: store.schema_version()?,
+        })
+    })?
 }
 
+/// Current card ID to the legacy IDs of the vault's cards, the most recent
+/// first. Fails when a note cannot be read, as its cards could not be migrated.
+fn legacy_card_ids(
+    vault_path: &str,
+    settings: &AppSettings,
+) -> Result<HashMap<String, Vec<String>>, String> {
+    let root = PathBuf::from(vault_path);
+    check_vault_root(&root)?;
+    let workers = scan_worker_count(settings.scan_parallelism.as_deref());
+    let filter = ScanFilter::load(&root, settings.scan_exclude_patterns.as_deref());
+    let files = walk_markdown_files(&ScanContext::new(root, filter), workers);
+    let per_file = run_parallel(&files, workers, |file| {
+        let markdown = fs::read_to_string(&file.path)
+            .map_err(|err| format!("{}: {err}", file.relative_path))?;
+        Ok(parse_flashcards(&markdown)
+            .iter()
+            .map(|card| (card.id().to_string(), card.legacy_ids()))
+            .collect::<Vec<_>>())
+    });
+    let mut merged: HashMap<String, Vec<String>> = HashMap::new();
+    for cards in per_file {
+        for (card_id, legacy_ids) in cards? {
+            // Only cards whose contents collide share a current ID; each of
+            // their legacy states is a candidate.
+            let merged_ids = merged.entry(card_id).or_default();
+            for legacy_id in legacy_ids {
+                if !merged_ids.contains(&legacy_id) {
+                    merged_ids.push(legacy_id);
+                }
+            }
+        }
+    }
+    Ok(merged)
+}
+
+/// Gives every card without a state under its current ID the state of its
+/// most recent legacy ID, removes the legacy states and records the schema
+/// version. A legacy ID that several cards shared (a 32-bit collision) hands
+/// its state to each of them.
+fn legacy_card_id_entries(
+    storage: &SpacedRepetitionStorage,
+    legacy_ids: &HashMap<String, Vec<String>>,
+) -> Vec<JournalEntry> {
+    let mut entries = Vec::new();
+    for (user_id, state) in &storage.user_state_by_id {
+        let mut legacy_states = HashSet::new();
+        for (card_id, legacy_ids) in legacy_ids {
+            let mut found = legacy_ids
+                .iter()
+                .filter(|legacy_id| state.card_states.contains_key(*legacy_id));
+            let Some(legacy_id) = found.next() else {
+                continue;
+            };
+            if !state.card_states.contains_key(card_id) {
+                entries.push(JournalEntry::Card {
+                    user_id: user_id.clone(),
+                    card_id: card_id.clone(),
+                    state: state.card_states.get(legacy_id),
+                });
+            }
+            legacy_states.insert(legacy_id);
+            legacy_states.extend(found);
+        }
+        for legacy_id in legacy_states {
+            entries.push(JournalEntry::Card {
+                user_id: user_id.clone(),
+                card_id: legacy_id.clone(),
+                state: None,
+            });
+        }
+    }
+    entries.push(JournalEntry::SchemaVersion {
+        version: SPACED_REPETITION_SCHEMA_VERSION,
+    });
+    entries
+}
+
+/// Re-keys card states still stored under legacy card IDs to the current IDs
+/// of the vault's cards, once, and records `SPACED_REPETITION_SCHEMA_VERSION`
+/// so the frontend stops looking up legacy IDs. Without a vault there is
+/// nothing to match against and the data stays unmigrated. Returns the schema
+/// version of the data afterwards.
+/// tools/vault/idmigrate.py does the same offline.
+#[tauri::command]
+async fn migrate_spaced_repetition_card_ids(app: tauri::AppHandle) -> Result<Option<u32>, String> {
+    let migrated = with_review_store(&app, |store| {
+        store
+            .schema_version()
+            .map(|version| version >= Some(SPACED_REPETITION_SCHEMA_VERSION))
+    })??;
+    let settings = app_settings_or_default(&app);
+    let vault_path = match settings.vault_path.clone() {
+        Some(vault_path) if !migrated => vault_path,
+        _ => return with_review_store(&app, |store| store.schema_version())?,
+    };
+    let legacy_ids = tauri::async_runtime::spawn_blocking(move || {
+        legacy_card_ids(&vault_path, &settings)
+    })
+    .await
+    .map_err(|err| err.to_string())??;
+    let snapshot = with_review_store(&app, |store| {
+        let entries = legacy_card_id_entries(&store.load()?, &legacy_ids);
+        store.apply(entries)?;
+        store.flush()
+    })??;
+    if let Some(snapshot) = snapshot {
+        write_review_snapshot(&app, snapshot)?;
+    }
+    with_review_store(&app, |store| store.schema_version())?
+}
+
+/// Saves the user list and removes the stored states of users not in it, as
+/// the frontend only holds the states of users it has loaded.
+#[tauri::command]
+fn save_spaced_repetition_users(
+    app: tauri::AppHandle,
+    users: Vec<SpacedRepetitionUser>,
+    last_active_user_id: Option<String>,
+) -> Result<(), String> {
+    let flush = with_review_store(&app, |store| {
+        let user_ids: HashSet<&str> = users.iter().map(|user| user.id.as_str()).collect();
+        let mut entries: Vec<JournalEntry> = store
+            .state_user_ids()?
+            .into_iter()
+            .filter(|user_id| !user_ids.contains(user_id.as_str()))
+            .map(|user_id| JournalEntry::RemoveUserState { user_id })
+            .collect();
+        let (stored_users, stored_last_active_user_id) = store.users()?;
+        if stored_users != users || stored_last_active_user_id != last_active_user_id {
+            entries.push(JournalEntry::Users {
+                users,
+                last_active_user_id,
+            });
+        }
+        store.apply(entries)
+    })??;
+    if flush {
+        schedule_review_flush(app);
+    }
+    Ok(())
+}
+
+/// Merges per-user deltas into the stored state. Fails without applying
+/// anything when a delta's version shows that an earlier one was lost.
 #[tauri::command]
-fn save_spaced_repetition_data(
+fn save_spaced_repetition_changes(
     app: tauri::AppHandle,
-    storage: SpacedRepetitionStorage,
+    deltas: Vec<SpacedRepetitionUserDelta>,
 ) -> Result<(), String> {
-    let path = spaced_repetition_path(&app)?;
-    write_spaced_repetition_data(&path, &storage)
+    if with_review_store(&app, |store| store.apply_deltas(deltas))?? {
+        schedule_review_flush(app);
+    }
+    Ok(())
+}
+
+/// One user's card states and daily counts, without the other users' data.
+#[tauri::command]
+fn load_spaced_repetition_user_state(
+    app: tauri::AppHandle,
+    user_id: String,
+) -> Result<Option<SpacedRepetitionUserState>, String> {
+    with_review_store(&app, |store| store.user_state(&user_id))?
+}
+
+/// Card count per effective box (index 0 is box 1) for one user.
+#[tauri::command]
+fn load_spaced_repetition_box_counts(
+    app: tauri::AppHandle,
+    user_id: String,
+    box_count: u32,
+) -> Result<Vec<u32>, String> {
+    with_review_store(&app, |store| store.box_counts(&user_id, box_count))?
 }
 
 #[tauri::command]
 fn load_vault_path(app: tauri::AppHandle) -> Result<Option<String>, String> {
-    let path = settings_path(&app)?;
-    let settings = read_settings(&path)?;
-    Ok(settings.vault_path)
+    with_settings(&app, |store| store.settings.vault_path.clone())
 }
 
 #[tauri::command]
 fn save_vault_path(app: tauri::AppHandle, vault_path: Option<String>) -> Result<(), String> {
-    let path = settings_path(&app)?;
-    let mut settings = read_settings(&path)?;
-    settings.vault_path = vault_path;
-    write_settings(&path, &settings)
+    update_settings(app, |settings| settings.vault_path = vault_path)
 }
 
-#[tauri::command]
-fn list_markdown_files(vault_path: String) -> Result<Vec<VaultFile>, String> {
-    let root = PathBuf::from(vault_path);
+/// Exclude rules applied during the walk: `.fmdignore` in the vault root plus
+/// the `scan_exclude_patterns` setting (one pattern per line), both in
+/// gitignore syntax. Excluded directories are never entered.
+#[derive(Clone)]
+struct ScanFilter {
+    ignore: Gitignore,
+}
+
+impl ScanFilter {
+    fn load(root: &Path, exclude_patterns: Option<&str>) -> Self {
+        let mut builder = GitignoreBuilder::new(root);
+        let ignore_file = root.join(IGNORE_FILE_NAME);
+        if ignore_file.is_file() {
+            // Invalid lines are reported but the valid ones are still added.
+            let _ = builder.add(ignore_file);
+        }
+        for line in exclude_patterns.unwrap_or_default().lines() {
+            let _ = builder.add_line(None, line);
+        }
+        let ignore = builder.build().unwrap_or_else(|_| Gitignore::empty());
+        Self { ignore }
+    }
+
+    /// For entries met during a walk, whose parents were already checked.
+    fn excludes(&self, path: &Path, is_dir: bool) -> bool {
+        self.ignore.matched(path, is_dir).is_ignore()
+    }
+
+    /// For single paths (watcher events) that may sit in an excluded directory.
+    fn excludes_path(&self, path: &Path, is_dir: bool) -> bool {
+        self.ignore
+            .matched_path_or_any_parents(path, is_dir)
+            .is_ignore()
+    }
+}
+
+#[cfg(unix)]
+type DirKey = (u64, u64);
+#[cfg(not(unix))]
+type DirKey = PathBuf;
+
+/// Identity of a directory after resolving symlinks: device and inode on
+/// Unix, the canonical path elsewhere.
+#[cfg(unix)]
+fn dir_key(path: &Path) -> Option<DirKey> {
+    use std::os::unix::fs::MetadataExt;
+    let metadata = fs::metadata(path).ok()?;
+    Some((metadata.dev(), metadata.ino()))
+}
+
+#[cfg(not(unix))]
+fn dir_key(path: &Path) -> Option<DirKey> {
+    fs::canonicalize(path).ok()
+}
+
+/// Per-scan state shared by the walk workers.
+struct ScanContext {
+    root: PathBuf,
+    filter: ScanFilter,
+    visited: Mutex<HashSet<DirKey>>,
+}
+
+impl ScanContext {
+    fn new(root: PathBuf, filter: ScanFilter) -> Self {
+        Self {
+            root,
+            filter,
+            visited: Mutex::new(HashSet::new()),
+        }
+    }
+
+    /// False when the directory was walked before in this scan, which is how
+    /// symlinked directories are followed only once and loops end.
+    fn visit(&self, dir: &Path) -> bool {
+        match dir_key(dir) {
+            Some(key) => self.visited.lock().expect("scan visits poisoned").insert(key),
+            None => true,
+        }
+    }
+}
+
+/// Directories waiting to be listed. Symlinked ones are only taken once no
+/// regular directory is queued or being listed, in path order, so a directory
+/// reachable both ways is always listed under its own path and the listing
+/// does not depend on which worker got there first.
+#[derive(Default)]
+struct ScanDirs {
+    regular: Vec<PathBuf>,
+    linked: Vec<PathBuf>,
+}
+
+impl ScanDirs {
+    fn new(dir: PathBuf) -> Self {
+        Self {
+            regular: vec![dir],
+            linked: Vec::new(),
+        }
+    }
+
+    fn is_empty(&self) -> bool {
+        self.regular.is_empty() && self.linked.is_empty()
+    }
+
+    fn append(&mut self, other: &mut ScanDirs) {
+        self.regular.append(&mut other.regular);
+        self.linked.append(&mut other.linked);
+    }
+
+    fn pop_linked(&mut self) -> Option<PathBuf> {
+        let first = (0..self.linked.len()).min_by(|&a, &b| self.linked[a].cmp(&self.linked[b]))?;
+        Some(self.linked.swap_remove(first))
+    }
+}
+
+/// Lists one directory: markdown files go to `files`, sub-directories to
+/// `subdirs`. Hidden and excluded entries are skipped; symlinked directories
+/// are followed, symlinked files are not.
+fn scan_directory(
+    context: &ScanContext,
+    dir: &Path,
+    files: &mut Vec<VaultFile>,
+    subdirs: &mut ScanDirs,
+) {
+    let Ok(entries) = fs::read_dir(dir) else {
+        return;
+    };
+    for entry in entries.flatten() {
+        if is_hidden(&entry.file_name()) {
+            continue;
+        }
+        let Ok(file_type) = entry.file_type() else {
+            continue;
+        };
+        let path = entry.path();
+        if file_type.is_dir() {
+            if !context.filter.excludes(&path, true) {
+                subdirs.regular.push(path);
+            }
+        } else if file_type.is_symlink() && path.is_dir() {
+            if !context.filter.excludes(&path, true) {
+                subdirs.linked.push(path);
+            }
+        } else if file_type.is_file()
+            && is_markdown(&path)
+            && !context.filter.excludes(&path, false)
+        {
+            let relative = path.strip_prefix(&context.root).unwrap_or(&path);
+            files.push(VaultFile {
+                path: path.to_string_lossy().to_string(),
+                relative_path: relative.to_string_lossy().to_string(),
+            });
+        }
+    }
+}
+
+struct ScanQueue {
+    pending: ScanDirs,
+    active: usize,
+    stopped: bool,
+}
+
+/// Walks `pending` and everything below it with up to `workers` threads
+/// sharing one directory queue. The markdown files of each visited directory
+/// are handed to `sink`; once it returns false no further directories are
+/// taken. Returns the directories left unvisited and the number visited.
+fn walk_directories<F>(
+    context: &ScanContext,
+    pending: ScanDirs,
+    workers: usize,
+    sink: F,
+) -> (ScanDirs, usize)
+where
+    F: Fn(Vec<VaultFile>) -> bool + Sync,
+{
+    let queue = Mutex::new(ScanQueue {
+        pending,
+        active: 0,
+        stopped: false,
+    });
+    let ready = Condvar::new();
+
+    let worker = || {
+        let mut directories = 0;
+        loop {
+            let dir = {
+                let mut state = queue.lock().expect("scan queue poisoned");
+                loop {
+                    if state.stopped {
+                        break None;
+                    }
+                    if let Some(dir) = state.pending.regular.pop() {
+                        state.active += 1;
+                        break Some(dir);
+                    }
+                    if state.active == 0 {
+                        let dir = state.pending.pop_linked();
+                        state.active += usize::from(dir.is_some());
+                        break dir;
+                    }
+                    state = ready.wait(state).expect("scan queue poisoned");
+                }
+            };
+            let Some(dir) = dir else {
+                ready.notify_all();
+                break;
+            };
+
+            let mut files = Vec::new();
+            let mut subdirs = ScanDirs::default();
+            if context.visit(&dir) {
+                scan_directory(context, &dir, &mut files, &mut subdirs);
+                directories += 1;
+            }
+            let more = sink(files);
+
+            let mut state = queue.lock().expect("scan queue poisoned");
+            state.active -= 1;
+            state.stopped |= !more;
+            let wake = !subdirs.is_empty() || state.active == 0 || state.stopped;
+            state.pending.append(&mut subdirs);
+            drop(state);
+            if wake {
+                ready.notify_all();
+            }
+        }
+        directories
+    };
+
+    let directories = if workers <= 1 {
+        worker()
+    } else {
+        thread::scope(|scope| {
+            let handles: Vec<_> = (0..workers).map(|_| scope.spawn(&worker)).collect();
+            handles
+                .into_iter()
+                .map(|handle| handle.join().expect("scan worker panicked"))
+                .sum()
+        })
+    };
+
+    let remaining = queue.into_inner().expect("scan queue poisoned").pending;
+    (remaining, directories)
+}
+
+/// Walks the vault root and returns all markdown files sorted by relative
+/// path.
+fn walk_markdown_files(context: &ScanContext, workers: usize) -> Vec<VaultFile> {
+    let found = Mutex::new(Vec::new());
+    let start = ScanDirs::new(context.root.clone());
+    walk_directories(context, start, workers, |files| {
+        found.lock().expect("scan results poisoned").extend(files);
+        true
+    });
+    let mut files = found.into_inner().expect("scan results poisoned");
+    files.sort_by(|a, b| a.relative_path.cmp(&b.relative_path));
+    files
+}
+
+struct ScanBudget {
+    batch: Vec<VaultFile>,
+    overflow: Vec<VaultFile>,
+    taken: usize,
+    limit: usize,
+}
+
+impl ScanBudget {
+    /// Queues files up to the budget; the rest go to `overflow`. Returns a
+    /// full batch to send, if any, and whether there is budget left.
+    fn accept(&mut self, mut files: Vec<VaultFile>) -> (Option<Vec<VaultFile>>, bool) {
+        let take = (self.limit - self.taken).min(files.len());
+        self.overflow.extend(files.drain(take..));
+        self.batch.append(&mut files);
+        self.taken += take;
+        let full = (self.batch.len() >= SCAN_BATCH_SIZE).then(|| mem::take(&mut self.batch));
+        (full, self.taken < self.limit)
+    }
+}
+
+/// Continues `scan`, sending files to `send` in batches until the walk ends
+/// or `budget` files were sent. Returns the scan state to resume from when
+/// the budget cut it short.
+fn stream_scan<F>(
+    scan: PendingScan,
+    workers: usize,
+    budget: Option<usize>,
+    send: F,
+) -> (Option<PendingScan>, VaultScanStats)
+where
+    F: Fn(Vec<VaultFile>) + Sync,
+{
+    let started = Instant::now();
+    let PendingScan {
+        context,
+        dirs,
+        overflow,
+    } = scan;
+    let mut budget = ScanBudget {
+        batch: Vec::new(),
+        overflow: Vec::new(),
+        taken: 0,
+        limit: budget.unwrap_or(usize::MAX),
+    };
+
+    let (full, more) = budget.accept(overflow);
+    if let Some(batch) = full {
+        send(batch);
+    }
+    let (dirs, directories) = if more {
+        let state = Mutex::new(budget);
+        let result = walk_directories(&context, dirs, workers, |files| {
+            let (full, more) = state.lock().expect("scan budget poisoned").accept(files);
+            if let Some(batch) = full {
+                send(batch);
+            }
+            more
+        });
+        budget = state.into_inner().expect("scan budget poisoned");
+        result
+    } else {
+        (dirs, 0)
+    };
+    if !budget.batch.is_empty() {
+        send(mem::take(&mut budget.batch));
+    }
+
+    let stats = VaultScanStats {
+        files: budget.taken,
+        directories,
+        workers,
+        elapsed_ms: started.elapsed().as_secs_f64() * 1000.0,
+    };
+    let rest = (!dirs.is_empty() || !budget.overflow.is_empty()).then(|| PendingScan {
+        context,
+        dirs,
+        overflow: budget.overflow,
+    });
+    (rest, stats)
+}
+
+fn check_vault_root(root: &Path) -> Result<(), String> {
     if !root.exists() {
         return Err("Vault path does not exist.".to_string());
     }
     if !root.is_dir() {
         return Err("Vault path is not a directory.".to_string());
     }
+    Ok(())
+}
+
+fn resume_vault_scan(
+    app: &tauri::AppHandle,
+    scan_id: u64,
+    scan: PendingScan,
+    on_batch: &Channel<VaultScanBatch>,
+) -> VaultScanSummary {
+    let settings = app_settings_or_default(app);
+    let workers = scan_worker_count(settings.scan_parallelism.as_deref());
+    let budget = scan_file_budget(settings.max_files_per_scan.as_deref());
+    let root = scan.context.root.clone();
+    let scans = app.state::<VaultScans>();
+    let (rest, stats) = stream_scan(scan, workers, budget, |files| {
+        let listing = CompactListing::new(&root, &files);
+        let mut listed = scans.listed.lock().expect("vault listing poisoned");
+        listed
+            .paths
+            .extend(files.into_iter().map(|file| file.relative_path));
+        let _ = on_batch.send(VaultScanBatch { scan_id, listing });
+    });
+    let truncated = rest.is_some();
+    scans
+        .listed
+        .lock()
+        .expect("vault listing poisoned")
+        .complete = !truncated;
+    if let Some(rest) = rest {
+        scans
+            .pending
+            .lock()
+            .expect("vault scans poisoned")
+            .insert(scan_id, rest);
+    }
+    VaultScanSummary {
+        scan_id,
+        truncated,
+        stats,
+    }
+}
 
-    let mut files = Vec::new();
-    for entry in WalkDir::new(&root)
-        .into_iter()
-        .filter_entry(|entry| !is_hidden(entry))
-    {
-        let entry = match entry {
-            Ok(entry) => entry,
-            Err(_) => continue,
+/// Streams the vault listing to `on_batch` and stops after
+/// `max_files_per_scan` files; `continue_vault_scan` picks up from there.
+#[tauri::command]
+async fn start_vault_scan(
+    app: tauri::AppHandle,
+    vault_path: String,
+    on_batch: Channel<VaultScanBatch>,
+) -> Result<VaultScanSummary, String> {
+    let root = PathBuf::from(vault_path);
+    check_vault_root(&root)?;
+    let settings = app_settings_or_default(&app);
+    tauri::async_runtime::spawn_blocking(move || {
+        let scans = app.state::<VaultScans>();
+        let scan_id = scans.next_id.fetch_add(1, Ordering::Relaxed) + 1;
+        // Only one vault is open at a time; a new scan supersedes paused ones
+        // and the watch, which the frontend restarts once the scan is done.
+        scans.pending.lock().expect("vault scans poisoned").clear();
+        app.state::<VaultWatcher>()
+            .0
+            .lock()
+            .expect("vault watch poisoned")
+            .take();
+        *scans.listed.lock().expect("vault listing poisoned") = ListedFiles {
+            root: root.clone(),
+            ..ListedFiles::default()
         };
-        if entry.file_type().is_file() {
-            let path = entry.path();
-            if is_markdown(path) {
-                let relative = path.strip_prefix(&root).unwrap_or(path);
-                files.push(VaultFile {
-                    path: path.to_string_lossy().to_string(),
-                    relative_path: relative.to_string_lossy().to_string(),
-                });
+        let filter = ScanFilter::load(&root, settings.scan_exclude_patterns.as_deref());
+        let scan = PendingScan {
+            context: ScanContext::new(root.clone(), filter),
+            dirs: ScanDirs::new(root),
+            overflow: Vec::new(),
+        };
+        resume_vault_scan(&app, scan_id, scan, &on_batch)
+    })
+    .await
+    .map_err(|err| err.to_string())
+}
+
+#[tauri::command]
+async fn continue_vault_scan(
+    app: tauri::AppHandle,
+    scan_id: u64,
+    on_batch: Channel<VaultScanBatch>,
+) -> Result<VaultScanSummary, String> {
+    tauri::async_runtime::spawn_blocking(move || {
+        let scan = app
+            .state::<VaultScans>()
+            .pending
+            .lock()
+            .expect("vault scans poisoned")
+            .remove(&scan_id)
+            .ok_or_else(|| "Scan is no longer available; rescan the vault.".to_string())?;
+        Ok(resume_vault_scan(&app, scan_id, scan, &on_batch))
+    })
+    .await
+    .map_err(|err| err.to_string())?
+}
+
+fn vault_file(root: &Path, filter: &ScanFilter, path: &Path) -> Option<VaultFile> {
+    let relative = path.strip_prefix(root).ok()?;
+    if relative.iter().any(is_hidden) || !is_markdown(path) || filter.excludes_path(path, false)
+    {
+        return None;
+    }
+    Some(VaultFile {
+        path: path.to_string_lossy().to_string(),
+        relative_path: relative.to_string_lossy().to_string(),
+    })
+}
+
+/// Updates `known` (the listed files) for one touched path and records what
+/// changed. Directories are re-walked, vanished paths remove every known file
+/// below them.
+fn apply_touched_path(
+    root: &Path,
+    filter: &ScanFilter,
+    path: &Path,
+    known: &mut ListedFiles,
+    delta: &mut VaultDelta,
+) {
+    let Ok(relative) = path.strip_prefix(root) else {
+        return;
+    };
+    if relative.as_os_str().is_empty() || relative.iter().any(is_hidden) {
+        return;
+    }
+    match fs::symlink_metadata(path) {
+        Ok(metadata) if metadata.is_dir() || (metadata.is_symlink() && path.is_dir()) => {
+            if filter.excludes_path(path, true) || !known.complete {
+                return;
+            }
+            let context = ScanContext::new(root.to_path_buf(), filter.clone());
+            let found = Mutex::new(Vec::new());
+            walk_directories(&context, ScanDirs::new(path.to_path_buf()), 1, |files| {
+                found.lock().expect("scan results poisoned").extend(files);
+                true
+            });
+            for file in found.into_inner().expect("scan results poisoned") {
+                if known.paths.insert(file.relative_path.clone()) {
+                    delta.added.push(file);
+                }
+            }
+        }
+        Ok(metadata) if metadata.is_file() => {
+            let Some(file) = vault_file(root, filter, path) else {
+                return;
+            };
+            if known.paths.contains(&file.relative_path) {
+                delta.changed.push(file);
+            } else if known.complete {
+                known.paths.insert(file.relative_path.clone());
+                delta.added.push(file);
+            }
+        }
+        Ok(_) => {}
+        Err(_) => {
+            let relative = relative.to_string_lossy().to_string();
+            if known.paths.remove(&relative) {
+                delta.removed.push(relative);
+                return;
+            }
+            let prefix = format!("{}{}", relative, std::path::MAIN_SEPARATOR);
+            let below: Vec<String> = known
+                .paths
+                .range(prefix.clone()..)
+                .take_while(|entry| entry.starts_with(&prefix))
+                .cloned()
+                .collect();
+            for entry in below {
+                known.paths.remove(&entry);
+                delta.removed.push(entry);
             }
         }
     }
+}
 
-    files.sort_by(|a, b| a.relative_path.cmp(&b.relative_path));
-    Ok(files)
+/// Turns one debounced batch of file system events into a `VaultDelta`.
+fn vault_delta(
+    root: &Path,
+    filter: &ScanFilter,
+    events: &[DebouncedEvent],
+    known: &mut ListedFiles,
+) -> VaultDelta {
+    let mut delta = VaultDelta {
+        vault_path: root.to_string_lossy().to_string(),
+        ..VaultDelta::default()
+    };
+    let mut touched = BTreeSet::new();
+    for event in events {
+        match &event.kind {
+            EventKind::Access(_) => {}
+            EventKind::Modify(ModifyKind::Name(RenameMode::Both)) if event.paths.len() == 2 => {
+                let (from, to) = (&event.paths[0], &event.paths[1]);
+                let from_relative = from
+                    .strip_prefix(root)
+                    .map(|relative| relative.to_string_lossy().to_string());
+                match (from_relative, vault_file(root, filter, to)) {
+                    (Ok(from_relative), Some(to_file))
+                        if to.is_file() && known.paths.contains(&from_relative) =>
+                    {
+                        known.paths.remove(&from_relative);
+                        known.paths.insert(to_file.relative_path.clone());
+                        delta.renamed.push(VaultRename {
+                            from: from_relative,
+                            to: to_file,
+                        });
+                    }
+                    _ => {
+                        touched.insert(from.clone());
+                        touched.insert(to.clone());
+                    }
+                }
+            }
+            _ => touched.extend(event.paths.iter().cloned()),
+        }
+    }
+    for path in touched {
+        apply_touched_path(root, filter, &path, known, &mut delta);
+    }
+    delta
+}
+
+/// Watches the vault and emits `vault-changed` deltas (added, removed,
+/// renamed, changed files) after each debounced burst of events. Replaces any
+/// previous watch. Deltas are taken against the files the last scan of this
+/// vault listed, so the vault is not walked again here.
+#[tauri::command]
+async fn watch_vault(app: tauri::AppHandle, vault_path: String) -> Result<(), String> {
+    let root = PathBuf::from(vault_path);
+    check_vault_root(&root)?;
+    let settings = app_settings_or_default(&app);
+    tauri::async_runtime::spawn_blocking(move || {
+        let filter = ScanFilter::load(&root, settings.scan_exclude_patterns.as_deref());
+        let known = Arc::clone(&app.state::<VaultScans>().listed);
+        let handler_root = root.clone();
+        let handler_app = app.clone();
+        let mut debouncer = new_debouncer(
+            WATCH_DEBOUNCE,
+            None,
+            move |result: DebounceEventResult| {
+                let Ok(events) = result else {
+                    return;
+                };
+                let delta = {
+                    let mut known = known.lock().expect("vault listing poisoned");
+                    // A scan of another vault has taken over the listing.
+                    if known.root != handler_root {
+                        return;
+                    }
+                    vault_delta(&handler_root, &filter, &events, &mut known)
+                };
+                if !delta.is_empty() {
+                    let _ = handler_app.emit(VAULT_CHANGED_EVENT, delta);
+                }
+            },
+        )
+        .map_err(|err| err.to_string())?;
+        debouncer
+            .watcher()
+            .watch(&root, RecursiveMode::Recursive)
+            .map_err(|err| err.to_string())?;
+        debouncer.cache().add_root(&root, RecursiveMode::Recursive);
+
+        let watcher = app.state::<VaultWatcher>();
+        *watcher.0.lock().expect("vault watch poisoned") = Some(debouncer);
+        Ok(())
+    })
+    .await
+    .map_err(|err| err.to_string())?
+}
+
+#[tauri::command]
+fn unwatch_vault(app: tauri::AppHandle) {
+    let watcher = app.state::<VaultWatcher>();
+    watcher.0.lock().expect("vault watch poisoned").take();
 }
 
 #[tauri::command]
 fn read_text_file(path: String) -> Result<String, String> {
-    let path = PathBuf::from(path);
-    if !path.exists() {
-        return Err("File not found.".to_string());
-    }
-    if !path.is_file() {
-        return Err("Path is not a file.".to_string());
-    }
-    if !is_markdown(&path) {
-        return Err("Only markdown files are supported.".to_string());
-    }
-    fs::read_to_string(&path).map_err(|err| err.to_string())
+    read_markdown_file(&PathBuf::from(path))
+}
+
+/// Reads and parses `paths` on the scan worker pool, so only the cards cross
+/// IPC. Notes unchanged since they were last parsed come from the card cache.
+/// Results come back in request order.
+#[tauri::command]
+async fn read_flashcard_files(
+    app: tauri::AppHandle,
+    paths: Vec<String>,
+) -> Result<Vec<FlashcardFileResult>, String> {
+    let workers = app_scan_worker_count(&app);
+    let cache_path = card_cache_path(&app)?;
+    let handle = app.clone();
+    let results = tauri::async_runtime::spawn_blocking(move || {
+        let state = handle.state::<CardCacheState>();
+        let mut guard = state.0.lock().expect("card cache poisoned");
+        let cache = guard.get_or_insert_with(|| CardCache::load(cache_path));
+        let loads = {
+            let cache = &*cache;
+            run_parallel(&paths, workers, |path| cache.lookup(path))
+        };
+        cache.begin_batch();
+        paths
+            .into_iter()
+            .zip(loads)
+            .map(|(path, load)| match cache.record(&path, load) {
+                Ok(cards) => FlashcardFileResult {
+                    path,
+                    cards: Some(cards),
+                    error: None,
+                },
+                Err(error) => FlashcardFileResult {
+                    path,
+                    cards: None,
+                    error: Some(error),
+                },
+            })
+            .collect::<Vec<_>>()
+    })
+    .await
+    .map_err(|err| err.to_string())?;
+
+    // Persist after answering; the cache is only an accelerator.
+    tauri::async_runtime::spawn_blocking(move || {
+        let state = app.state::<CardCacheState>();
+        let mut guard = state.0.lock().expect("card cache poisoned");
+        if let Some(cache) = guard.as_mut() {
+            let _ = cache.save();
+        }
+    });
+    Ok(results)
 }
 
 #[tauri::command]
@@ -329,17 +1840,80 @@ pub fn run() {
     tauri::Builder::default()
         .plugin(tauri_plugin_dialog::init())
         .plugin(tauri_plugin_opener::init())
+        .manage(VaultScans::default())
+        .manage(VaultWatcher::default())
+        .manage(CardCacheState::default())
+        .manage(ReviewStoreState::default())
+        .manage(SettingsState::default())
+        .setup(|app| {
+            // Read once up front; a broken file is reported by the first load.
+            let _ = with_settings(app.handle(), |_| ());
+            Ok(())
+        })
         .invoke_handler(tauri::generate_handler![
             load_app_settings,
             save_app_settings,
-            load_spaced_repetition_data,
-            save_spaced_repetition_data,
+            load_spaced_repetition_users,
+            migrate_spaced_repetition_card_ids,
+            save_spaced_repetition_users,
+            save_spaced_repetition_changes,
+            load_spaced_repetition_user_state,
+            load_spaced_repetition_box_counts,
             load_vault_path,
             save_vault_path,
-            list_markdown_files,
+            start_vault_scan,
+            continue_vault_scan,
+            watch_vault,
+            unwatch_vault,
             read_text_file,
+            read_flashcard_files,
             write_text_file
         ])
-        .run(tauri::generate_context!())
-        .expect("error while running tauri application");
+        .build(tauri::generate_context!())
+        .expect("error while building tauri application")
+        .run(|app, event| {
+            if let tauri::RunEvent::Exit = event {
+                flush_settings(app);
+                flush_review_store(app);
+            }
+        });
+}
+
+#[cfg(test)]
+mod tests {
+    use serde_json::json;
+
+    use super::*;
+
+    /// The listing `decodeListing` in src/lib/tree.test.ts decodes back.
+    #[test]
+    fn compact_listing_interns_names_and_directories() {
+        let files: Vec<VaultFile> = [
+            "top.md",
+            "a/notes/x.md",
+            "b/notes/x.md",
+            "a/notes/deep/x.md",
+        ]
+        .into_iter()
+        .map(|relative_path| VaultFile {
+            path: format!("/vault/{relative_path}"),
+            relative_path: relative_path.to_string(),
+        })
+        .collect();
+        let root = format!("/vault{}", std::path::MAIN_SEPARATOR);
+
+        for vault in ["/vault", root.as_str()] {
+            let listing = CompactListing::new(Path::new(vault), &files);
+            assert_eq!(
+                serde_json::to_value(&listing).unwrap(),
+                json!({
+                    "root": root,
+                    "separator": std::path::MAIN_SEPARATOR.to_string(),
+                    "names": ["", "top.md", "a", "notes", "x.md", "b", "deep"],
+                    "dirs": [[0, 0], [0, 2], [1, 3], [0, 5], [3, 3], [2, 6]],
+                    "files": [[0, 1], [2, 4], [4, 4], [5, 4]]
+                })
+            );
+        }
+    }
 }
@@ -0,0 +1,593 @@
+//! Spaced repetition data in SQLite (the `sqlite` feature), as an alternative
+//! to the JSON snapshot and review journal.
+//!
+//! Users, card states and daily counts live in their own tables, card states
+//! keyed by user and card and indexed by user and box, so a review updates
+//! one row (committed in batches by `flush`) and the UI can ask for a single
+//! user's state or box counts without loading everything. Only the entries
+//! waiting for the next commit are held in memory; everything else is
+//! queried when asked for. On first open the existing JSON data (snapshot
+//! plus journal) is imported once; the JSON files are left in place
+//! untouched.
+
+use std::path::{Path, PathBuf};
+
+use rusqlite::{params, Connection, OptionalExtension, Transaction};
+
+use crate::{
+    review_journal::{user_state_entries, JournalEntry, ReviewJournal},
+    SpacedRepetitionCardState, SpacedRepetitionStorage, SpacedRepetitionUser,
+    SpacedRepetitionUserState,
+};
+
+const REVIEW_DB_SCHEMA_VERSION: &str = "1";
+
+const SCHEMA: &str = "
+    PRAGMA journal_mode = WAL;
+    PRAGMA synchronous = NORMAL;
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS users (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        position INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS user_states (
+        user_id TEXT PRIMARY KEY,
+        last_loaded_at TEXT
+    );
+    CREATE TABLE IF NOT EXISTS card_states (
+        user_id TEXT NOT NULL,
+        card_id TEXT NOT NULL,
+        box INTEGER,
+        box_canonical INTEGER,
+        attempts INTEGER NOT NULL,
+        last_result TEXT,
+        last_reviewed_at TEXT,
+        PRIMARY KEY (user_id, card_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS card_states_by_box
+        ON card_states (user_id, coalesce(box_canonical, box, 1));
+    CREATE TABLE IF NOT EXISTS daily_counts (
+        user_id TEXT NOT NULL,
+        day TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (user_id, day)
+    ) WITHOUT ROWID;
+";
+
+fn db_error(err: rusqlite::Error) -> String {
+    err.to_string()
+}
+
+fn read_card_state(
+    row: &rusqlite::Row,
+    offset: usize,
+) -> rusqlite::Result<SpacedRepetitionCardState> {
+    Ok(SpacedRepetitionCardState {
+        r#box: row.get(offset)?,
+        box_canonical: row.get(offset + 1)?,
+        attempts: row.get(offset + 2)?,
+        last_result: row.get(offset + 3)?,
+        last_reviewed_at: row.get(offset + 4)?,
+    })
+}
+
+fn read_users(conn: &Connection) -> rusqlite::Result<(Vec<SpacedRepetitionUser>, Option<String>)> {
+    let mut select =
+        conn.prepare_cached("SELECT id, name, created_at FROM users ORDER BY position")?;
+    let users = select
+        .query_map([], |row| {
+            Ok(SpacedRepetitionUser {
+                id: row.get(0)?,
+                name: row.get(1)?,
+                created_at: row.get(2)?,
+            })
+        })?
+        .collect::<rusqlite::Result<_>>()?;
+    let last_active_user_id = conn
+        .query_row(
+            "SELECT value FROM meta WHERE key = 'last_active_user_id'",
+            [],
+            |row| row.get(0),
+        )
+        .optional()?;
+    Ok((users, last_active_user_id))
+}
+
+/// The data's `SPACED_REPETITION_SCHEMA_VERSION`, not that of the tables.
+fn read_schema_version(conn: &Connection) -> rusqlite::Result<Option<u32>> {
+    let version: Option<String> = conn
+        .query_row(
+            "SELECT value FROM meta WHERE key = 'data_schema_version'",
+            [],
+            |row| row.get(0),
+        )
+        .optional()?;
+    Ok(version.and_then(|version| version.parse().ok()))
+}
+
+fn ensure_user_state(tx: &Transaction, user_id: &str) -> rusqlite::Result<()> {
+    tx.prepare_cached("INSERT OR IGNORE INTO user_states (user_id) VALUES (?1)")?
+        .execute(params![user_id])?;
+    Ok(())
+}
+
+fn apply_entry(tx: &Transaction, entry: &JournalEntry) -> rusqlite::Result<()> {
+    match entry {
+        JournalEntry::Users {
+            users,
+            last_active_user_id,
+        } => {
+            tx.execute("DELETE FROM users", [])?;
+            let mut insert = tx.prepare_cached(
+                "INSERT INTO users (id, name, created_at, position) VALUES (?1, ?2, ?3, ?4)",
+            )?;
+            for (position, user) in users.iter().enumerate() {
+                insert.execute(params![
+                    user.id,
+                    user.name,
+                    user.created_at,
+                    position as i64
+                ])?;
+            }
+            match last_active_user_id {
+                Some(user_id) => tx.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_active_user_id', ?1)",
+                    params![user_id],
+                )?,
+                None => tx.execute("DELETE FROM meta WHERE key = 'last_active_user_id'", [])?,
+            };
+        }
+        JournalEntry::RemoveUserState { user_id } => {
+            for table in ["user_states", "card_states", "daily_counts"] {
+                tx.execute(
+                    &format!("DELETE FROM {table} WHERE user_id = ?1"),
+                    params![user_id],
+                )?;
+            }
+        }
+        JournalEntry::LastLoaded {
+            user_id,
+            last_loaded_at,
+        } => {
+            tx.prepare_cached(
+                "INSERT INTO user_states (user_id, last_loaded_at) VALUES (?1, ?2)
+                 ON CONFLICT (user_id) DO UPDATE SET last_loaded_at = excluded.last_loaded_at",
+            )?
+            .execute(params![user_id, last_loaded_at])?;
+        }
+        JournalEntry::Card {
+            user_id,
+            card_id,
+            state,
+        } => {
+            ensure_user_state(tx, user_id)?;
+            match state {
+                Some(state) => tx
+                    .prepare_cached(
+                        "INSERT OR REPLACE INTO card_states
+                         (user_id, card_id, box, box_canonical, attempts, last_result, last_reviewed_at)
+                         VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7)",
+                    )?
+                    .execute(params![
+                        user_id,
+                        card_id,
+                        state.r#box,
+                        state.box_canonical,
+                        state.attempts,
+                        state.last_result,
+                        state.last_reviewed_at,
+                    ])?,
+                None => tx
+                    .prepare_cached("DELETE FROM card_states WHERE user_id = ?1 AND card_id = ?2")?
+                    .execute(params![user_id, card_id])?,
+            };
+        }
+        JournalEntry::Completed {
+            user_id,
+            day,
+            count,
+        } => {
+            ensure_user_state(tx, user_id)?;
+            match count {
+                Some(count) => tx
+                    .prepare_cached(
+                        "INSERT OR REPLACE INTO daily_counts (user_id, day, count) VALUES (?1, ?2, ?3)",
+                    )?
+                    .execute(params![user_id, day, count])?,
+                None => tx
+                    .prepare_cached("DELETE FROM daily_counts WHERE user_id = ?1 AND day = ?2")?
+                    .execute(params![user_id, day])?,
+            };
+        }
+        // Version of the data (see `SPACED_REPETITION_SCHEMA_VERSION`), not of
+        // the tables, which is `schema_version`.
+        JournalEntry::SchemaVersion { version } => {
+            tx.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('data_schema_version', ?1)",
+                params![version.to_string()],
+            )?;
+        }
+    }
+    Ok(())
+}
+
+pub struct ReviewDb {
+    conn: Connection,
+    /// Applied entries not yet committed.
+    pending: Vec<JournalEntry>,
+}
+
+impl ReviewDb {
+    /// Opens (or creates) the database at `path`, importing the JSON data at
+    /// `json_path` the first time.
+    pub fn open(path: &Path, json_path: PathBuf) -> Result<Self, String> {
+        if let Some(parent) = path.parent() {
+            std::fs::create_dir_all(parent).map_err(|err| err.to_string())?;
+        }
+        let mut conn = Connection::open(path).map_err(db_error)?;
+        conn.execute_batch(SCHEMA).map_err(db_error)?;
+
+        let version: Option<String> = conn
+            .query_row(
+                "SELECT value FROM meta WHERE key = 'schema_version'",
+                [],
+                |row| row.get(0),
+            )
+            .optional()
+            .map_err(db_error)?;
+        if version.is_none() {
+            let journal = ReviewJournal::open(json_path);
+            let imported = journal.storage();
+            let mut entries = vec![JournalEntry::Users {
+                users: imported.users.clone(),
+                last_active_user_id: imported.last_active_user_id.clone(),
+            }];
+            for (user_id, state) in &imported.user_state_by_id {
+                entries.extend(user_state_entries(user_id, state));
+            }
+            if let Some(version) = imported.schema_version {
+                entries.push(JournalEntry::SchemaVersion { version });
+            }
+            let tx = conn.transaction().map_err(db_error)?;
+            for entry in &entries {
+                apply_entry(&tx, entry).map_err(db_error)?;
+            }
+            tx.execute(
+                "INSERT INTO meta (key, value) VALUES ('schema_version', ?1)",
+                params![REVIEW_DB_SCHEMA_VERSION],
+            )
+            .map_err(db_error)?;
+            tx.commit().map_err(db_error)?;
+        }
+
+        Ok(Self {
+            conn,
+            pending: Vec::new(),
+        })
+    }
+
+    /// Everything stored, read from the tables after committing.
+    pub fn load(&mut self) -> Result<SpacedRepetitionStorage, String> {
+        self.flush()?;
+        Self::read_storage(&self.conn).map_err(db_error)
+    }
+
+    fn read_storage(conn: &Connection) -> rusqlite::Result<SpacedRepetitionStorage> {
+        let mut storage = SpacedRepetitionStorage::default();
+        (storage.users, storage.last_active_user_id) = read_users(conn)?;
+        storage.schema_version = read_schema_version(conn)?;
+
+        let mut states = conn.prepare("SELECT user_id, last_loaded_at FROM user_states")?;
+        let mut rows = states.query([])?;
+        while let Some(row) = rows.next()? {
+            let user_id: String = row.get(0)?;
+            storage.user_state_by_id.insert(
+                user_id,
+                SpacedRepetitionUserState {
+                    last_loaded_at: row.get(1)?,
+                    ..Default::default()
+                },
+            );
+        }
+        let mut cards = conn.prepare(
+            "SELECT user_id, card_id, box, box_canonical, attempts, last_result, last_reviewed_at
+             FROM card_states",
+        )?;
+        let mut rows = cards.query([])?;
+        while let Some(row) = rows.next()? {
+            let user_id: String = row.get(0)?;
+            storage
+                .user_state_by_id
+                .entry(user_id)
+                .or_default()
+                .card_states
+                .insert(row.get(1)?, read_card_state(row, 2)?);
+        }
+        let mut counts = conn.prepare("SELECT user_id, day, count FROM daily_counts")?;
+        let mut rows = counts.query([])?;
+        while let Some(row) = rows.next()? {
+            let user_id: String = row.get(0)?;
+            storage
+                .user_state_by_id
+                .entry(user_id)
+                .or_default()
+                .completed_per_day
+                .insert(row.get(1)?, row.get(2)?);
+        }
+        Ok(storage)
+    }
+
+    /// Queues `entries`; they are committed with the next `flush`.
+    pub fn apply(&mut self, entries: Vec<JournalEntry>) {
+        self.pending.extend(entries);
+    }
+
+    /// The user list and last active user, from a pending `Users` entry if
+    /// there is one.
+    pub fn users(&self) -> Result<(Vec<SpacedRepetitionUser>, Option<String>), String> {
+        let pending = self.pending.iter().rev().find_map(|entry| match entry {
+            JournalEntry::Users {
+                users,
+                last_active_user_id,
+            } => Some((users.clone(), last_active_user_id.clone())),
+            _ => None,
+        });
+        if let Some(pending) = pending {
+            return Ok(pending);
+        }
+        read_users(&self.conn).map_err(db_error)
+    }
+
+    /// `SPACED_REPETITION_SCHEMA_VERSION` the data was migrated to, if any.
+    pub fn schema_version(&self) -> Result<Option<u32>, String> {
+        let pending = self.pending.iter().rev().find_map(|entry| match entry {
+            JournalEntry::SchemaVersion { version } => Some(*version),
+            _ => None,
+        });
+        if pending.is_some() {
+            return Ok(pending);
+        }
+        read_schema_version(&self.conn).map_err(db_error)
+    }
+
+    /// `last_loaded_at` of the user's state, `None` when there is no state.
+    /// Pending entries are looked at first, so nothing is committed early.
+    pub fn last_loaded_at(&self, user_id: &str) -> Result<Option<Option<String>>, String> {
+        for entry in self.pending.iter().rev() {
+            match entry {
+                JournalEntry::LastLoaded {
+                    user_id: entry_user_id,
+                    last_loaded_at,
+                } if entry_user_id == user_id => return Ok(Some(last_loaded_at.clone())),
+                JournalEntry::RemoveUserState {
+                    user_id: entry_user_id,
+                } if entry_user_id == user_id => return Ok(None),
+                _ => {}
+            }
+        }
+        self.conn
+            .prepare_cached("SELECT last_loaded_at FROM user_states WHERE user_id = ?1")
+            .and_then(|mut select| {
+                select
+                    .query_row(params![user_id], |row| row.get(0))
+                    .optional()
+            })
+            .map_err(db_error)
+    }
+
+    /// Commits the pending entries in one transaction. They are kept for the
+    /// next flush if that fails.
+    pub fn flush(&mut self) -> Result<(), String> {
+        if self.pending.is_empty() {
+            return Ok(());
+        }
+        let tx = self.conn.transaction().map_err(db_error)?;
+        for entry in &self.pending {
+            apply_entry(&tx, entry).map_err(db_error)?;
+        }
+        tx.commit().map_err(db_error)?;
+        self.pending.clear();
+        Ok(())
+    }
+
+    pub fn user_state(
+        &mut self,
+        user_id: &str,
+    ) -> Result<Option<SpacedRepetitionUserState>, String> {
+        self.flush()?;
+        let query = || -> rusqlite::Result<Option<SpacedRepetitionUserState>> {
+            let Some(last_loaded_at) = self
+                .conn
+                .query_row(
+                    "SELECT last_loaded_at FROM user_states WHERE user_id = ?1",
+                    params![user_id],
+                    |row| row.get::<_, Option<String>>(0),
+                )
+                .optional()?
+            else {
+                return Ok(None);
+            };
+            let mut state = SpacedRepetitionUserState {
+                last_loaded_at,
+                ..Default::default()
+            };
+            let mut cards = self.conn.prepare_cached(
+                "SELECT card_id, box, box_canonical, attempts, last_result, last_reviewed_at
+                 FROM card_states WHERE user_id = ?1",
+            )?;
+            let mut rows = cards.query(params![user_id])?;
+            while let Some(row) = rows.next()? {
+                state
+                    .card_states
+                    .insert(row.get(0)?, read_card_state(row, 1)?);
+            }
+            let mut counts = self
+                .conn
+                .prepare_cached("SELECT day, count FROM daily_counts WHERE user_id = ?1")?;
+            let mut rows = counts.query(params![user_id])?;
+            while let Some(row) = rows.next()? {
+                state.completed_per_day.insert(row.get(0)?, row.get(1)?);
+            }
+            Ok(Some(state))
+        };
+        query().map_err(db_error)
+    }
+
+    /// IDs of the users with a stored state, after committing.
+    pub fn state_user_ids(&mut self) -> Result<Vec<String>, String> {
+        self.flush()?;
+        let query = || -> rusqlite::Result<Vec<String>> {
+            let mut select = self
+                .conn
+                .prepare_cached("SELECT user_id FROM user_states")?;
+            let user_ids = select
+                .query_map([], |row| row.get(0))?
+                .collect::<rusqlite::Result<_>>()?;
+            Ok(user_ids)
+        };
+        query().map_err(db_error)
+    }
+
+    /// Card count per effective box (index 0 is box 1), from the box index.
+    pub fn box_counts(&mut self, user_id: &str, box_count: u32) -> Result<Vec<u32>, String> {
+        self.flush()?;
+        let box_count = box_count.max(1);
+        let query = || -> rusqlite::Result<Vec<u32>> {
+            let mut counts = vec![0; box_count as usize];
+            let mut select = self.conn.prepare_cached(
+                "SELECT coalesce(box_canonical, box, 1) AS canonical, count(*)
+                 FROM card_states WHERE user_id = ?1 GROUP BY canonical",
+            )?;
+            let mut rows = select.query(params![user_id])?;
+            while let Some(row) = rows.next()? {
+                let canonical: i64 = row.get(0)?;
+                let count: u32 = row.get(1)?;
+                let index = canonical.clamp(1, box_count as i64) as usize - 1;
+                counts[index] += count;
+            }
+            Ok(counts)
+        };
+        query().map_err(db_error)
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use std::fs;
+
+    use super::*;
+
+    const SNAPSHOT: &str = r#"{
+        "users": [
+            {"id": "user-1", "name": "Ada", "createdAt": "2024-01-01T00:00:00.000Z"},
+            {"id": "user-2", "name": "Grace", "createdAt": "2024-01-02T00:00:00.000Z"}
+        ],
+        "userStateById": {
+            "user-1": {
+                "cardStates": {
+                    "card-0123456789abcdef": {"boxCanonical": 3, "attempts": 4, "lastResult": "correct", "lastReviewedAt": "2024-01-31T08:05:09.123Z"},
+                    "legacy-what-is-a-monad": {"box": 2, "attempts": 1, "lastResult": "incorrect", "lastReviewedAt": "2023-12-31"}
+                },
+                "lastLoadedAt": "2024-01-31T08:00:00.000Z",
+                "completedPerDay": {"2024-01-31": 2}
+            },
+            "user-2": {"cardStates": {}, "lastLoadedAt": null}
+        },
+        "lastActiveUserId": "user-2",
+        "schemaVersion": 1
+    }"#;
+
+    const JOURNAL: &str = concat!(
+        r#"{"op":"card","userId":"user-2","cardId":"card-00000000000000ff","state":{"attempts":1,"lastResult":"neutral","lastReviewedAt":null}}"#,
+        "\n",
+    );
+
+    fn temp_dir(name: &str) -> PathBuf {
+        let dir = std::env::temp_dir().join(format!("fmd-{name}-{}", std::process::id()));
+        let _ = fs::remove_dir_all(&dir);
+        fs::create_dir_all(&dir).unwrap();
+        dir
+    }
+
+    #[test]
+    fn imports_json_data_once() {
+        let dir = temp_dir("review-db-import");
+        let json_path = dir.join("spaced_repetition.json");
+        let db_path = dir.join("spaced_repetition.sqlite");
+        fs::write(&json_path, SNAPSHOT).unwrap();
+        fs::write(json_path.with_extension("journal"), JOURNAL).unwrap();
+        let expected =
+            serde_json::to_value(ReviewJournal::open(json_path.clone()).storage()).unwrap();
+
+        let mut db = ReviewDb::open(&db_path, json_path.clone()).unwrap();
+        assert_eq!(serde_json::to_value(db.load().unwrap()).unwrap(), expected);
+        assert_eq!(db.schema_version().unwrap(), Some(1));
+        assert_eq!(db.last_loaded_at("user-2").unwrap(), Some(None));
+        assert_eq!(db.last_loaded_at("user-3").unwrap(), None);
+        assert_eq!(db.box_counts("user-1", 3).unwrap(), [0, 1, 1]);
+        let mut user_ids = db.state_user_ids().unwrap();
+        user_ids.sort();
+        assert_eq!(user_ids, ["user-1", "user-2"]);
+        let user_state = db.user_state("user-1").unwrap().unwrap();
+        assert_eq!(
+            serde_json::to_value(user_state).unwrap(),
+            expected["userStateById"]["user-1"]
+        );
+        drop(db);
+
+        // Later changes to the JSON files are not imported again.
+        fs::write(&json_path, "{}").unwrap();
+        let mut db = ReviewDb::open(&db_path, json_path).unwrap();
+        assert_eq!(serde_json::to_value(db.load().unwrap()).unwrap(), expected);
+    }
+
+    #[test]
+    fn answers_from_pending_entries_before_committing() {
+        let dir = temp_dir("review-db-pending");
+        let mut db = ReviewDb::open(
+            &dir.join("spaced_repetition.sqlite"),
+            dir.join("missing.json"),
+        )
+        .unwrap();
+        assert!(db.users().unwrap() == (Vec::new(), None));
+
+        let users = vec![SpacedRepetitionUser {
+            id: "user-1".to_string(),
+            name: "Ada".to_string(),
+            created_at: "2024-01-01T00:00:00.000Z".to_string(),
+        }];
+        db.apply(vec![
+            JournalEntry::Users {
+                users: users.clone(),
+                last_active_user_id: Some("user-1".to_string()),
+            },
+            JournalEntry::LastLoaded {
+                user_id: "user-1".to_string(),
+                last_loaded_at: Some("2024-01-31T08:00:00.000Z".to_string()),
+            },
+            JournalEntry::SchemaVersion { version: 1 },
+        ]);
+        let last_loaded_at = Some(Some("2024-01-31T08:00:00.000Z".to_string()));
+        assert!(db.users().unwrap() == (users.clone(), Some("user-1".to_string())));
+        assert_eq!(db.last_loaded_at("user-1").unwrap(), last_loaded_at);
+        assert_eq!(db.schema_version().unwrap(), Some(1));
+
+        db.flush().unwrap();
+        assert!(db.pending.is_empty());
+        assert!(db.users().unwrap() == (users, Some("user-1".to_string())));
+        assert_eq!(db.last_loaded_at("user-1").unwrap(), last_loaded_at);
+        assert_eq!(db.schema_version().unwrap(), Some(1));
+
+        db.apply(vec![JournalEntry::RemoveUserState {
+            user_id: "user-1".to_string(),
+        }]);
+        assert_eq!(db.last_loaded_at("user-1").unwrap(), None);
+        db.flush().unwrap();
+        assert_eq!(db.last_loaded_at("user-1").unwrap(), None);
+    }
+}
@@ -0,0 +1,474 @@
+//! Spaced repetition data as a snapshot plus an append-only review journal.
+//!
+//! `spaced_repetition.json` holds a full snapshot and `spaced_repetition.journal`
+//! the changes made since, one JSON entry per line. Applied entries are
+//! buffered and appended (and fsync'd) together by `flush`, so answering a
+//! card writes a line instead of the whole file. Once the journal outgrows
+//! the snapshot both are folded into a new snapshot that replaces the old one
+//! atomically. `flush` only hands out a copy of the state for that, which the
+//! caller writes without holding up further changes before reporting back to
+//! `finish_snapshot`.
+//!
+//! Every entry sets a value rather than adjusting one, so replaying a journal
+//! over a snapshot that already contains it is harmless. On load the journal
+//! is replayed up to its last complete line; a line torn by a crash is cut off.
+
+use std::{
+    fs::{self, File, OpenOptions},
+    io::Write,
+    path::PathBuf,
+};
+
+use crate::{
+    read_spaced_repetition_data, write_file_atomic, SpacedRepetitionCardState,
+    SpacedRepetitionStorage, SpacedRepetitionUser, SpacedRepetitionUserState,
+};
+
+/// The journal is compacted once it is larger than the snapshot and this size.
+const JOURNAL_COMPACT_MIN_BYTES: u64 = 1024 * 1024;
+
+#[derive(serde::Serialize, serde::Deserialize, Clone)]
+#[serde(tag = "op", rename_all = "camelCase")]
+pub enum JournalEntry {
+    #[serde(rename_all = "camelCase")]
+    Users {
+        users: Vec<SpacedRepetitionUser>,
+        last_active_user_id: Option<String>,
+    },
+    #[serde(rename_all = "camelCase")]
+    RemoveUserState { user_id: String },
+    #[serde(rename_all = "camelCase")]
+    LastLoaded {
+        user_id: String,
+        last_loaded_at: Option<String>,
+    },
+    #[serde(rename_all = "camelCase")]
+    Card {
+        user_id: String,
+        card_id: String,
+        state: Option<SpacedRepetitionCardState>,
+    },
+    #[serde(rename_all = "camelCase")]
+    Completed {
+        user_id: String,
+        day: String,
+        count: Option<u32>,
+    },
+    SchemaVersion { version: u32 },
+}
+
+impl JournalEntry {
+    pub fn apply(self, storage: &mut SpacedRepetitionStorage) {
+        match self {
+            JournalEntry::Users {
+                users,
+                last_active_user_id,
+            } => {
+                storage.users = users;
+                storage.last_active_user_id = last_active_user_id;
+            }
+            JournalEntry::RemoveUserState { user_id } => {
+                storage.user_state_by_id.remove(&user_id);
+            }
+            JournalEntry::LastLoaded {
+                user_id,
+                last_loaded_at,
+            } => {
+                storage.user_state_by_id.entry(user_id).or_default().last_loaded_at =
+                    last_loaded_at;
+            }
+            JournalEntry::Card {
+                user_id,
+                card_id,
+                state,
+            } => {
+                let card_states = &mut storage.user_state_by_id.entry(user_id).or_default().card_states;
+                match state {
+                    Some(state) => {
+                        card_states.insert(card_id, state);
+                    }
+                    None => {
+                        card_states.remove(&card_id);
+                    }
+                }
+            }
+            JournalEntry::Completed {
+                user_id,
+                day,
+                count,
+            } => {
+                let completed = &mut storage
+                    .user_state_by_id
+                    .entry(user_id)
+                    .or_default()
+                    .completed_per_day;
+                match count {
+                    Some(count) => {
+                        completed.insert(day, count);
+                    }
+                    None => {
+                        completed.remove(&day);
+                    }
+                }
+            }
+            JournalEntry::SchemaVersion { version } => {
+                storage.schema_version = Some(version);
+            }
+        }
+    }
+}
+
+/// Entries that make `state` the whole state of `user_id`, replacing any
+/// state it had.
+pub fn user_state_entries(user_id: &str, state: &SpacedRepetitionUserState) -> Vec<JournalEntry> {
+    let mut entries = Vec::with_capacity(2 + state.card_states.len() + state.completed_per_day.len());
+    entries.push(JournalEntry::RemoveUserState {
+        user_id: user_id.to_string(),
+    });
+    entries.push(JournalEntry::LastLoaded {
+        user_id: user_id.to_string(),
+        last_loaded_at: state.last_loaded_at.clone(),
+    });
+    for (card_id, card) in state.card_states.iter() {
+        entries.push(JournalEntry::Card {
+            user_id: user_id.to_string(),
+            card_id,
+            state: Some(card),
+        });
+    }
+    for (day, count) in &state.completed_per_day {
+        entries.push(JournalEntry::Completed {
+            user_id: user_id.to_string(),
+            day: day.clone(),
+            count: Some(*count),
+        });
+    }
+    entries
+}
+
+pub struct ReviewJournal {
+    snapshot_path: PathBuf,
+    journal_path: PathBuf,
+    /// What the snapshot plus journal on disk add up to.
+    storage: SpacedRepetitionStorage,
+    journal: Option<File>,
+    journal_bytes: u64,
+    snapshot_bytes: u64,
+    /// Applied entries not yet written, one JSON line each.
+    pending: Vec<u8>,
+    /// Set when an append failed, so the files on disk lag behind `storage`
+    /// until the next snapshot is written.
+    needs_snapshot: bool,
+    /// A `Snapshot` is being written; entries stay pending until it is done.
+    writing_snapshot: bool,
+}
+
+/// A copy of the state to write as the new snapshot, away from whatever lock
+/// guards the journal.
+pub struct Snapshot {
+    path: PathBuf,
+    storage: SpacedRepetitionStorage,
+}
+
+impl Snapshot {
+    /// Writes the snapshot atomically and returns its size in bytes.
+    pub fn write(&self) -> Result<u64, String> {
+        if let Some(parent) = self.path.parent() {
+            fs::create_dir_all(parent).map_err(|err| err.to_string())?;
+        }
+        let data = serde_json::to_vec(&self.storage).map_err(|err| err.to_string())?;
+        write_file_atomic(&self.path, &data)?;
+        Ok(data.len() as u64)
+    }
+}
+
+impl ReviewJournal {
+    /// Reads the snapshot at `snapshot_path` and replays the journal next to it.
+    pub fn open(snapshot_path: PathBuf) -> Self {
+        let journal_path = snapshot_path.with_extension("journal");
+        let mut storage = read_spaced_repetition_data(&snapshot_path).unwrap_or_default();
+        let snapshot_bytes = fs::metadata(&snapshot_path).map_or(0, |meta| meta.len());
+
+        let mut journal_bytes = 0;
+        if let Ok(data) = fs::read(&journal_path) {
+            for line in data.split_inclusive(|&byte| byte == b'\n') {
+                if !line.ends_with(b"\n") {
+                    break;
+                }
+                match serde_json::from_slice::<JournalEntry>(line) {
+                    Ok(entry) => entry.apply(&mut storage),
+                    Err(_) => break,
+                }
+                journal_bytes += line.len() as u64;
+            }
+            // New entries must not land behind a torn line, where replay stops.
+            if journal_bytes < data.len() as u64 {
+                if let Ok(file) = OpenOptions::new().write(true).open(&journal_path) {
+                    let _ = file.set_len(journal_bytes).and_then(|_| file.sync_all());
+                }
+            }
+        }
+
+        Self {
+            snapshot_path,
+            journal_path,
+            storage,
+            journal: None,
+            journal_bytes,
+            snapshot_bytes,
+            pending: Vec::new(),
+            needs_snapshot: false,
+            writing_snapshot: false,
+        }
+    }
+
+    pub fn storage(&self) -> &SpacedRepetitionStorage {
+        &self.storage
+    }
+
+    /// Applies `entries` in memory; they reach the disk with the next `flush`.
+    pub fn apply(&mut self, entries: Vec<JournalEntry>) -> Result<(), String> {
+        for entry in entries {
+            serde_json::to_writer(&mut self.pending, &entry).map_err(|err| err.to_string())?;
+            self.pending.push(b'\n');
+            entry.apply(&mut self.storage);
+        }
+        Ok(())
+    }
+
+    fn append(&mut self, data: &[u8]) -> Result<(), String> {
+        if self.journal.is_none() {
+            if let Some(parent) = self.journal_path.parent() {
+                fs::create_dir_all(parent).map_err(|err| err.to_string())?;
+            }
+            let file = OpenOptions::new()
+                .create(true)
+                .append(true)
+                .open(&self.journal_path)
+                .map_err(|err| err.to_string())?;
+            self.journal = Some(file);
+        }
+        let file = self.journal.as_mut().expect("journal opened above");
+        file.write_all(data)
+            .and_then(|_| file.sync_data())
+            .map_err(|err| err.to_string())
+    }
+
+    pub fn writing_snapshot(&self) -> bool {
+        self.writing_snapshot
+    }
+
+    fn append_pending(&mut self) {
+        if self.needs_snapshot || self.pending.is_empty() {
+            return;
+        }
+        let pending = std::mem::take(&mut self.pending);
+        if self.append(&pending).is_ok() {
+            self.journal_bytes += pending.len() as u64;
+        } else {
+            // A partial append would hide everything after it from replay,
+            // so write a full snapshot, which also starts a new journal.
+            self.journal = None;
+            self.needs_snapshot = true;
+        }
+    }
+
+    /// Appends and syncs the pending entries. Once the journal has grown past
+    /// the snapshot, which keeps the cost per review constant, or an append
+    /// failed, returns the `Snapshot` to write and pass to `finish_snapshot`.
+    pub fn flush(&mut self) -> Option<Snapshot> {
+        if self.writing_snapshot {
+            return None;
+        }
+        self.append_pending();
+        if !self.needs_snapshot
+            && self.journal_bytes < self.snapshot_bytes.max(JOURNAL_COMPACT_MIN_BYTES)
+        {
+            return None;
+        }
+        // The copy holds every entry applied so far.
+        self.pending.clear();
+        self.writing_snapshot = true;
+        Some(Snapshot {
+            path: self.snapshot_path.clone(),
+            storage: self.storage.clone(),
+        })
+    }
+
+    /// Takes the outcome of `Snapshot::write`. Once the snapshot is in place
+    /// the journal is emptied; either way the entries applied while it was
+    /// written are appended. After a failed write the journal still holds
+    /// everything and the next flush tries again.
+    pub fn finish_snapshot(&mut self, written: Result<u64, String>) -> Result<(), String> {
+        self.writing_snapshot = false;
+        let result = written.and_then(|snapshot_bytes| {
+            self.snapshot_bytes = snapshot_bytes;
+            self.truncate_journal()
+        });
+        self.append_pending();
+        result
+    }
+
+    /// Empties the journal once everything in it is in the snapshot. Should
+    /// this fail, the old entries are simply replayed over the new snapshot.
+    fn truncate_journal(&mut self) -> Result<(), String> {
+        let journal = OpenOptions::new()
+            .create(true)
+            .append(true)
+            .open(&self.journal_path)
+            .map_err(|err| err.to_string())?;
+        journal
+            .set_len(0)
+            .and_then(|_| journal.sync_all())
+            .map_err(|err| err.to_string())?;
+        self.journal = Some(journal);
+        self.journal_bytes = 0;
+        self.needs_snapshot = false;
+        Ok(())
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use std::path::Path;
+
+    use super::*;
+
+    fn temp_dir(name: &str) -> PathBuf {
+        let dir = std::env::temp_dir().join(format!("fmd-{name}-{}", std::process::id()));
+        let _ = fs::remove_dir_all(&dir);
+        fs::create_dir_all(&dir).unwrap();
+        dir
+    }
+
+    fn card_entry(card_id: &str, box_canonical: u32) -> JournalEntry {
+        JournalEntry::Card {
+            user_id: "user-1".to_string(),
+            card_id: card_id.to_string(),
+            state: Some(SpacedRepetitionCardState {
+                box_canonical: Some(box_canonical),
+                attempts: box_canonical,
+                last_result: Some("correct".to_string()),
+                last_reviewed_at: Some("2024-01-31T08:05:09.123Z".to_string()),
+                ..Default::default()
+            }),
+        }
+    }
+
+    fn dump(storage: &SpacedRepetitionStorage) -> serde_json::Value {
+        serde_json::to_value(storage).unwrap()
+    }
+
+    fn reopened(path: &Path) -> serde_json::Value {
+        dump(ReviewJournal::open(path.to_path_buf()).storage())
+    }
+
+    #[test]
+    fn replays_journal_over_snapshot_up_to_torn_line() {
+        let path = temp_dir("journal-replay").join("spaced_repetition.json");
+        let journal_path = path.with_extension("journal");
+        let mut snapshot = SpacedRepetitionStorage::default();
+        card_entry("card-0000000000000001", 1).apply(&mut snapshot);
+        Snapshot {
+            path: path.clone(),
+            storage: snapshot,
+        }
+        .write()
+        .unwrap();
+
+        let mut journal = ReviewJournal::open(path.clone());
+        journal
+            .apply(vec![
+                card_entry("card-0000000000000001", 2),
+                card_entry("card-0000000000000002", 1),
+                JournalEntry::Completed {
+                    user_id: "user-1".to_string(),
+                    day: "2024-01-31".to_string(),
+                    count: Some(3),
+                },
+            ])
+            .unwrap();
+        assert!(journal.flush().is_none());
+        let expected = dump(journal.storage());
+        let complete_bytes = fs::metadata(&journal_path).unwrap().len();
+
+        let mut file = OpenOptions::new().append(true).open(&journal_path).unwrap();
+        file.write_all(br#"{"op":"card","userId":"user-1","cardId":"card-00"#)
+            .unwrap();
+        drop(file);
+
+        let mut replayed = ReviewJournal::open(path.clone());
+        assert_eq!(dump(replayed.storage()), expected);
+        assert_eq!(fs::metadata(&journal_path).unwrap().len(), complete_bytes);
+
+        // Appended after the cut, not behind the torn line.
+        replayed
+            .apply(vec![card_entry("card-0000000000000003", 1)])
+            .unwrap();
+        assert!(replayed.flush().is_none());
+        assert_eq!(reopened(&path), dump(replayed.storage()));
+        assert_eq!(
+            replayed.storage().user_state_by_id["user-1"]
+                .card_states
+                .len(),
+            3
+        );
+    }
+
+    #[test]
+    fn keeps_changes_made_while_a_snapshot_is_written() {
+        let path = temp_dir("journal-snapshot").join("spaced_repetition.json");
+        let journal_path = path.with_extension("journal");
+        let mut journal = ReviewJournal::open(path.clone());
+        let mut next = 0;
+        let mut entries = |count: usize| {
+            (0..count)
+                .map(|_| {
+                    next += 1;
+                    card_entry(&format!("card-{:016x}", next % 5000), next % 8 + 1)
+                })
+                .collect::<Vec<_>>()
+        };
+        let snapshot = loop {
+            journal.apply(entries(500)).unwrap();
+            if let Some(snapshot) = journal.flush() {
+                break snapshot;
+            }
+        };
+
+        // Changes made while the snapshot is written stay pending.
+        journal.apply(entries(10)).unwrap();
+        assert!(journal.flush().is_none());
+        let written = snapshot.write();
+        // A crash at this point replays the full journal over the new snapshot.
+        assert_eq!(
+            ReviewJournal::open(path.clone()).storage().user_state_by_id["user-1"]
+                .card_states
+                .len(),
+            5000
+        );
+        journal.finish_snapshot(written).unwrap();
+        assert!(!journal.writing_snapshot());
+        assert!(fs::metadata(&journal_path).unwrap().len() > 0);
+        assert_eq!(reopened(&path), dump(journal.storage()));
+
+        // A failed write keeps the journal, and the next flush tries again.
+        let snapshot = loop {
+            journal.apply(entries(500)).unwrap();
+            if let Some(snapshot) = journal.flush() {
+                break snapshot;
+            }
+        };
+        drop(snapshot);
+        journal.apply(entries(3)).unwrap();
+        assert!(journal
+            .finish_snapshot(Err("disk full".to_string()))
+            .is_err());
+        assert_eq!(reopened(&path), dump(journal.storage()));
+        let snapshot = journal.flush().unwrap();
+        let written = snapshot.write();
+        journal.finish_snapshot(written).unwrap();
+        assert_eq!(fs::metadata(&journal_path).unwrap().len(), 0);
+        assert_eq!(reopened(&path), dump(journal.storage()));
+    }
+}
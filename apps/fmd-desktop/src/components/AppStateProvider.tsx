@@ -24,6 +24,7 @@ type AppActions = {
   handleCopyAccent: () => Promise<void>;
   handleCopyVaultPath: () => Promise<void>;
   handleRescanVault: () => void;
+  handleContinueScan: () => void;
   handleMaxFilesPerScanChange: (value: string) => void;
 };
 
@@ -97,7 +98,8 @@ export const AppStateProvider = ({ children }: { children: ReactNode }) => {
     settingsLoaded,
     vaultPath: storedVaultPath,
   } = settings;
-  const { loadVault, pickVault, rescanVault, setVaultPath, vaultPath } = vault;
+  const { continueScan, loadVault, pickVault, rescanVault, setVaultPath, vaultPath } =
+    vault;
   const {
     resetPreview,
     restoreSnapshot: restorePreviewSnapshot,
@@ -306,6 +308,10 @@ export const AppStateProvider = ({ children }: { children: ReactNode }) => {
     void rescanVault();
   }, [rescanVault]);
 
+  const handleContinueScan = useCallback(() => {
+    void continueScan();
+  }, [continueScan]);
+
   const handleMaxFilesPerScanChange = useCallback(
     (value: string) => {
       const nextValue = value.trim();
@@ -326,6 +332,7 @@ export const AppStateProvider = ({ children }: { children: ReactNode }) => {
       handleCopyAccent,
       handleCopyVaultPath,
       handleRescanVault,
+      handleContinueScan,
       handleMaxFilesPerScanChange,
     },
     flashcards,
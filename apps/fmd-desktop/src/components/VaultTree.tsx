@@ -1,68 +1,113 @@
-import { useMemo } from "react";
+import { memo, useMemo, useState } from "react";
 import { FileIcon, FolderIcon } from "./icons";
 import { vaultBaseName } from "../lib/path";
-import { buildTree, type TreeNode, type VaultFile } from "../lib/tree";
+import { type TreeNode, type VaultFile } from "../lib/tree";
 import { type LoadState } from "../lib/types";
 
 type VaultTreeProps = {
   fileCountLabel: string;
-  files: VaultFile[];
   listError: string;
   listState: LoadState;
   onSelectFile: (file: VaultFile) => void;
   selectedFile: VaultFile | null;
+  tree: TreeNode[];
   vaultPath: string | null;
 };
 
+type TreeNodesProps = {
+  nodes: TreeNode[];
+  onSelectFile: (file: VaultFile) => void;
+  selectedPath: string | null;
+};
+
+// Children are only mounted while their directory is open, and unchanged
+// subtrees keep their identity across patches, so memo skips them.
+const TreeNodes = memo(({ nodes, onSelectFile, selectedPath }: TreeNodesProps) => (
+  <>
+    {nodes.map((node) =>
+      node.type === "dir" ? (
+        <TreeDirectory
+          key={node.path}
+          node={node}
+          onSelectFile={onSelectFile}
+          selectedPath={selectedPath}
+        />
+      ) : (
+        <TreeFile
+          key={node.path}
+          node={node}
+          onSelectFile={onSelectFile}
+          selectedPath={selectedPath}
+        />
+      ),
+    )}
+  </>
+));
+
+type TreeNodeProps = {
+  node: TreeNode;
+  onSelectFile: (file: VaultFile) => void;
+  selectedPath: string | null;
+};
+
+const TreeDirectory = memo(({ node, onSelectFile, selectedPath }: TreeNodeProps) => {
+  const [open, setOpen] = useState(false);
+  return (
+    <details
+      className="tree-dir"
+      open={open}
+      onToggle={(event) => setOpen(event.currentTarget.open)}
+    >
+      <summary className="tree-item">
+        <span className="tree-icon">
+          <FolderIcon />
+        </span>
+        <span className="tree-name">{node.name}</span>
+      </summary>
+      {open ? (
+        <div className="tree-children">
+          <TreeNodes
+            nodes={node.children ?? []}
+            onSelectFile={onSelectFile}
+            selectedPath={selectedPath}
+          />
+        </div>
+      ) : null}
+    </details>
+  );
+});
+
+const TreeFile = memo(({ node, onSelectFile, selectedPath }: TreeNodeProps) => {
+  const fileRef =
+    node.file ?? (node.fullPath ? { path: node.fullPath, relative_path: node.path } : null);
+  const isActive = !!fileRef && selectedPath === fileRef.path;
+
+  return (
+    <button
+      type="button"
+      className={`tree-item tree-file ${isActive ? "active" : ""}`}
+      onClick={() => fileRef && onSelectFile(fileRef)}
+      title={node.path}
+      disabled={!fileRef}
+    >
+      <span className="tree-icon">
+        <FileIcon />
+      </span>
+      <span className="tree-name">{node.name}</span>
+    </button>
+  );
+});
+
 export const VaultTree = ({
   fileCountLabel,
-  files,
   listError,
   listState,
   onSelectFile,
   selectedFile,
+  tree,
   vaultPath,
 }: VaultTreeProps) => {
   const vaultRootName = useMemo(() => vaultBaseName(vaultPath), [vaultPath]);
-  const treeNodes = useMemo(() => buildTree(files), [files]);
-
-  const renderTreeNodes = (nodes: TreeNode[]) =>
-    nodes.map((node) => {
-      if (node.type === "dir") {
-        return (
-          <details className="tree-dir" key={node.path}>
-            <summary className="tree-item">
-              <span className="tree-icon">
-                <FolderIcon />
-              </span>
-              <span className="tree-name">{node.name}</span>
-            </summary>
-            <div className="tree-children">{renderTreeNodes(node.children ?? [])}</div>
-          </details>
-        );
-      }
-
-      const fileRef =
-        node.file ??
-        (node.fullPath ? { path: node.fullPath, relative_path: node.path } : null);
-      const isActive = !!fileRef && selectedFile?.path === fileRef.path;
-
-      return (
-        <button
-          type="button"
-          key={node.path}
-          className={`tree-item tree-file ${isActive ? "active" : ""}`}
-          onClick={() => fileRef && onSelectFile(fileRef)}
-          title={node.path}
-          disabled={!fileRef}
-        >
-          <span className="tree-icon">
-            <FileIcon />
-          </span>
-          <span className="tree-name">{node.name}</span>
-        </button>
-      );
-    });
 
   return (
     <details className="vault-details">
@@ -78,10 +123,10 @@ export const VaultTree = ({
         ) : null}
         {listState === "loading" ? <span className="chip">Scanne...</span> : null}
         {listError ? <div className="error">{listError}</div> : null}
-        {vaultPath && listState === "idle" && treeNodes.length === 0 ? (
+        {vaultPath && listState === "idle" && tree.length === 0 ? (
           <div className="empty-state">Keine Markdown-Dateien in diesem Vault.</div>
         ) : null}
-        {vaultPath && listState === "idle" && treeNodes.length > 0 ? (
+        {vaultPath && listState === "idle" && tree.length > 0 ? (
           <div className="vault-tree">
             <details className="tree-dir" open>
               <summary className="tree-item">
@@ -90,7 +135,13 @@ export const VaultTree = ({
                 </span>
                 <span className="tree-name">{vaultRootName}</span>
               </summary>
-              <div className="tree-children">{renderTreeNodes(treeNodes)}</div>
+              <div className="tree-children">
+                <TreeNodes
+                  nodes={tree}
+                  onSelectFile={onSelectFile}
+                  selectedPath={selectedFile?.path ?? null}
+                />
+              </div>
             </details>
           </div>
         ) : null}
@@ -1,14 +1,18 @@
 type PerformanceSectionProps = {
   maxFilesPerScan: string;
   onMaxFilesPerScanChange: (value: string) => void;
+  scanExcludePatterns: string;
   scanParallelism: "low" | "medium" | "high";
+  setScanExcludePatterns: (value: string) => void;
   setScanParallelism: (value: "low" | "medium" | "high") => void;
 };
 
 export const PerformanceSection = ({
   maxFilesPerScan,
   onMaxFilesPerScanChange,
+  scanExcludePatterns,
   scanParallelism,
+  setScanExcludePatterns,
   setScanParallelism,
 }: PerformanceSectionProps) => (
   <section className="panel performance-panel">
@@ -44,6 +48,21 @@ export const PerformanceSection = ({
         ))}
       </div>
     </div>
+    <div className="setting-row">
+      <span className="label">Exclude from scans</span>
+      <textarea
+        className="text-input"
+        rows={4}
+        value={scanExcludePatterns}
+        onChange={(event) => setScanExcludePatterns(event.target.value)}
+        placeholder={"attachments/\narchive/\n*.excalidraw.md"}
+        aria-label="Exclude from scans"
+      />
+      <span className="helper-text">
+        One gitignore-style pattern per line, applied together with the vault&apos;s
+        .fmdignore file. Takes effect on the next scan.
+      </span>
+    </div>
     <div className="setting-row">
       <span className="label">Watcher debounce/throttle</span>
       <input
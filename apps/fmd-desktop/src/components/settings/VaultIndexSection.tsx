@@ -3,19 +3,25 @@ import { type LoadState } from "../../lib/types";
 type VaultIndexSectionProps = {
   lastOpenedFile: string | null;
   listState: LoadState;
+  onContinueScan: () => void;
   onCopyVaultPath: () => void;
   onRescanVault: () => void;
+  scanTruncated: boolean;
   vaultIndexedComplete: boolean;
   vaultPath: string | null;
+  watcherActive: boolean;
 };
 
 export const VaultIndexSection = ({
   lastOpenedFile,
   listState,
+  onContinueScan,
   onCopyVaultPath,
   onRescanVault,
+  scanTruncated,
   vaultIndexedComplete,
   vaultPath,
+  watcherActive,
 }: VaultIndexSectionProps) => (
   <section className="panel vault-index-panel">
     <div>
@@ -56,21 +62,18 @@ export const VaultIndexSection = ({
           <span className="helper-text">All notes have been scanned and indexed.</span>
         </div>
         <div className="status-item">
-          <div className="status-row">
+          <label className="status-checkbox">
+            <input
+              type="checkbox"
+              checked={watcherActive}
+              disabled
+              aria-label="Watcher active"
+            />
             <span>Watcher active</span>
-            <div className="toggle-row">
-              <span className="toggle-label">Coming later</span>
-              <label className="switch">
-                <input
-                  type="checkbox"
-                  checked={false}
-                  disabled
-                  aria-label="Watcher active (coming later)"
-                />
-                <span className="slider" />
-              </label>
-            </div>
-          </div>
+          </label>
+          <span className="helper-text">
+            File changes in the vault update the note list automatically.
+          </span>
         </div>
         <div className="status-item">
           <div className="status-row">
@@ -102,10 +105,25 @@ export const VaultIndexSection = ({
         >
           Rescan vault
         </button>
+        {scanTruncated ? (
+          <button
+            type="button"
+            className="ghost small"
+            onClick={onContinueScan}
+            disabled={listState === "loading"}
+          >
+            Continue scanning
+          </button>
+        ) : null}
         <button type="button" className="ghost small" disabled>
           Reset index
         </button>
       </div>
+      {scanTruncated ? (
+        <span className="helper-text">
+          Scan stopped at the max files per vault scan limit.
+        </span>
+      ) : null}
       <span className="helper-text">Reset index is coming later.</span>
     </div>
   </section>
@@ -1,9 +1,10 @@
-import { useCallback, useEffect, useMemo, useState, type DragEvent } from "react";
+import { useCallback, useEffect, useMemo, useRef, useState, type DragEvent } from "react";
 import { invoke } from "@tauri-apps/api/core";
 import {
-  parseFlashcards,
+  reparseFlashcards,
   type Flashcard,
   type FlashcardDetectedType,
+  type ParsedFlashcards,
 } from "../../lib/flashcards";
 import {
   evaluateFlashcardResult,
@@ -112,6 +113,13 @@ const matchesFlashcardMode = (card: Flashcard, mode: FlashcardMode) => {
   return primaryType === resolvedMode;
 };
 
+// Cards parsed by the backend's port of `parseFlashcards`.
+type FlashcardFileResult = {
+  path: string;
+  cards: Flashcard[] | null;
+  error: string | null;
+};
+
 type ScanOptions = {
   scopeOverride?: FlashcardScope;
   allowVaultFallback?: boolean;
@@ -147,6 +155,7 @@ export const useFlashcards = ({
   settings,
 }: UseFlashcardsOptions) => {
   const [flashcards, setFlashcards] = useState<Flashcard[]>([]);
+  const lastParsedPreviewRef = useRef<ParsedFlashcards | null>(null);
   const {
     flashcardMode,
     flashcardOrder,
@@ -380,33 +389,36 @@ export const useFlashcards = ({
           return [];
         }
 
-        const results = await Promise.allSettled(
-          files.map(async (file) => {
-            const contents = await invoke<string>("read_text_file", {
-              path: file.path,
-            });
-            return parseFlashcards(contents);
-          }),
-        );
+        // The backend reads and parses on a worker pool sized by
+        // scan_parallelism and returns results in request order, i.e. sorted
+        // by relative_path.
+        let results: FlashcardFileResult[] = [];
+        try {
+          results = await invoke<FlashcardFileResult[]>("read_flashcard_files", {
+            paths: files.map((file) => file.path),
+          });
+        } catch (error) {
+          console.warn("Failed to read markdown files", error);
+        }
 
         const merged: Flashcard[] = [];
-        results.forEach((result, index) => {
-          if (result.status === "fulfilled") {
-            merged.push(...result.value);
-          } else {
-            console.warn(
-              "Failed to read markdown file",
-              files[index]?.path,
-              result.reason,
-            );
+        results.forEach((result) => {
+          if (result.cards === null) {
+            console.warn("Failed to read markdown file", result.path, result.error);
+            return;
+          }
+          for (const card of result.cards) {
+            merged.push(card);
           }
         });
 
         return merged;
       }
 
-      const cards = parseFlashcards(preview);
-      return cards;
+      // Re-scanning an edited note only parses the #card blocks that changed.
+      const parsed = reparseFlashcards(preview, lastParsedPreviewRef.current);
+      lastParsedPreviewRef.current = parsed;
+      return parsed.cards;
     },
     [files, flashcardScope, preview, selectedFile, vaultPath],
   );
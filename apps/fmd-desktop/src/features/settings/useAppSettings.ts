@@ -32,6 +32,7 @@ type AppSettings = {
   language?: AppLanguage | null;
   max_files_per_scan?: string | null;
   scan_parallelism?: string | null;
+  scan_exclude_patterns?: string | null;
   flashcard_order?: string | null;
   flashcard_mode?: string | null;
   flashcard_scope?: string | null;
@@ -54,6 +55,7 @@ type PersistUpdates = {
   language?: AppLanguage;
   maxFilesPerScan?: string;
   scanParallelism?: "low" | "medium" | "high";
+  scanExcludePatterns?: string;
   flashcardOrder?: FlashcardOrder;
   flashcardMode?: FlashcardMode;
   flashcardScope?: FlashcardScope;
@@ -95,6 +97,7 @@ export const useAppSettings = () => {
   const [scanParallelism, setScanParallelism] = useState<
     "low" | "medium" | "high"
   >(DEFAULT_SCAN_PARALLELISM);
+  const [scanExcludePatterns, setScanExcludePatterns] = useState("");
   const [flashcardOrder, setFlashcardOrder] =
     useState<FlashcardOrder>(DEFAULT_FLASHCARD_ORDER);
   const [flashcardMode, setFlashcardMode] =
@@ -135,6 +138,7 @@ export const useAppSettings = () => {
       language: AppLanguage;
       maxFilesPerScan: string;
       scanParallelism: "low" | "medium" | "high";
+      scanExcludePatterns: string;
       flashcardOrder: FlashcardOrder;
       flashcardMode: FlashcardMode;
       flashcardScope: FlashcardScope;
@@ -157,6 +161,7 @@ export const useAppSettings = () => {
           language: settings.language,
           maxFilesPerScan: settings.maxFilesPerScan || null,
           scanParallelism: settings.scanParallelism,
+          scanExcludePatterns: settings.scanExcludePatterns.trim() || null,
           flashcardOrder: settings.flashcardOrder,
           flashcardMode: settings.flashcardMode,
           flashcardScope: settings.flashcardScope,
@@ -193,6 +198,7 @@ export const useAppSettings = () => {
         language: updates.language ?? language,
         maxFilesPerScan: updates.maxFilesPerScan ?? maxFilesPerScan,
         scanParallelism: updates.scanParallelism ?? scanParallelism,
+        scanExcludePatterns: updates.scanExcludePatterns ?? scanExcludePatterns,
         flashcardOrder: updates.flashcardOrder ?? flashcardOrder,
         flashcardMode: updates.flashcardMode ?? flashcardMode,
         flashcardScope: updates.flashcardScope ?? flashcardScope,
@@ -233,6 +239,7 @@ export const useAppSettings = () => {
       language,
       maxFilesPerScan,
       saveSettings,
+      scanExcludePatterns,
       scanParallelism,
       settingsLoaded,
       solutionRevealEnabled,
@@ -281,6 +288,10 @@ export const useAppSettings = () => {
           settings.scan_parallelism === "medium"
             ? settings.scan_parallelism
             : DEFAULT_SCAN_PARALLELISM;
+        const storedScanExcludePatterns =
+          typeof settings.scan_exclude_patterns === "string"
+            ? settings.scan_exclude_patterns
+            : "";
         const storedFlashcardOrder =
           settings.flashcard_order === "random"
             ? "random"
@@ -374,6 +385,7 @@ export const useAppSettings = () => {
         setLanguage(storedLanguage);
         setMaxFilesPerScan(storedMaxFilesPerScan);
         setScanParallelism(storedScanParallelism);
+        setScanExcludePatterns(storedScanExcludePatterns);
         setFlashcardOrder(storedFlashcardOrder);
         setFlashcardMode(storedFlashcardMode);
         setFlashcardScope(storedFlashcardScope);
@@ -432,6 +444,7 @@ export const useAppSettings = () => {
         language,
         maxFilesPerScan,
         scanParallelism,
+        scanExcludePatterns,
         flashcardOrder,
         flashcardMode,
         flashcardScope,
@@ -462,6 +475,7 @@ export const useAppSettings = () => {
     language,
     maxFilesPerScan,
     saveSettings,
+    scanExcludePatterns,
     scanParallelism,
     settingsLoaded,
     solutionRevealEnabled,
@@ -488,6 +502,7 @@ export const useAppSettings = () => {
     language,
     maxFilesPerScan,
     persistSettings,
+    scanExcludePatterns,
     scanParallelism,
     setAccentColor,
     setAccentDraft,
@@ -500,6 +515,7 @@ export const useAppSettings = () => {
     setLanguage,
     setMaxFilesPerScan,
     setRightToolbarCollapsed,
+    setScanExcludePatterns,
     setScanParallelism,
     setSolutionRevealEnabled,
     setSpacedRepetitionBoxes,
@@ -0,0 +1,96 @@
+import { describe, expect, it } from "vitest";
+import {
+  advanceDueIndex,
+  createDueIndex,
+  summarizeDueIndex,
+  takeDueCardIds,
+} from "./dueIndex";
+import { createSeededRandom, normalizeSpacedRepetitionCardProgress } from "./logic";
+
+const reviewedAt = (minute: number | null) =>
+  minute === null ? null : new Date(Date.UTC(2024, 0, 1, 0, minute)).toISOString();
+
+const createCardStates = (cards: [string, number, number | null][]) =>
+  Object.fromEntries(
+    cards.map(([cardId, boxCanonical, minute]) => [
+      cardId,
+      normalizeSpacedRepetitionCardProgress({
+        boxCanonical,
+        attempts: minute === null ? 0 : 1,
+        lastResult: minute === null ? "neutral" : "correct",
+        lastReviewedAt: reviewedAt(minute),
+      }),
+    ]),
+  );
+
+describe("due index", () => {
+  it("orders by effective box, then by least recent review", () => {
+    const index = createDueIndex(
+      createCardStates([
+        ["a", 2, 5],
+        ["b", 1, 9],
+        ["c", 1, null],
+        ["d", 1, 3],
+        ["e", 6, 1],
+        ["f", 3, 2],
+      ]),
+    );
+
+    expect(takeDueCardIds(index, 10, { boxCount: 8 })).toEqual(["c", "d", "b", "a", "f", "e"]);
+    // With three boxes, boxes 3 and 6 share the last effective box.
+    expect(takeDueCardIds(index, 10, { boxCount: 3, box: 3 })).toEqual(["e", "f"]);
+    expect(takeDueCardIds(index, 2, { boxCount: 8, accept: (id) => id !== "c" })).toEqual([
+      "d",
+      "b",
+    ]);
+    expect(summarizeDueIndex(index, 3)).toEqual({
+      total: 6,
+      attempted: 5,
+      correct: 5,
+      incorrect: 0,
+      boxCounts: [3, 1, 2],
+    });
+  });
+
+  it("matches a rebuilt index after in-place updates", () => {
+    const random = createSeededRandom(7);
+    let cardStates = createCardStates(
+      Array.from({ length: 200 }, (_, card) => [
+        `card-${card}`,
+        1 + Math.floor(random() * 8),
+        random() < 0.2 ? null : Math.floor(random() * 1000),
+      ]),
+    );
+    const index = createDueIndex(cardStates);
+
+    for (let review = 0; review < 500; review += 1) {
+      const cardId = `card-${Math.floor(random() * 220)}`;
+      const next = { ...cardStates };
+      if (random() < 0.1) {
+        delete next[cardId];
+      } else {
+        next[cardId] = normalizeSpacedRepetitionCardProgress({
+          boxCanonical: 1 + Math.floor(random() * 8),
+          attempts: 1,
+          lastResult: random() < 0.5 ? "correct" : "incorrect",
+          lastReviewedAt: reviewedAt(1000 + review),
+        });
+      }
+      expect(advanceDueIndex(index, cardStates, next, [cardId])).toBe(true);
+      cardStates = next;
+    }
+
+    const rebuilt = createDueIndex(cardStates);
+    expect(summarizeDueIndex(index, 5)).toEqual(summarizeDueIndex(rebuilt, 5));
+    expect(takeDueCardIds(index, 300, { boxCount: 5 })).toEqual(
+      takeDueCardIds(rebuilt, 300, { boxCount: 5 }),
+    );
+  });
+
+  it("leaves an index on another record alone", () => {
+    const cardStates = createCardStates([["a", 1, null]]);
+    const index = createDueIndex(cardStates);
+    expect(advanceDueIndex(index, { ...cardStates }, {}, ["a"])).toBe(false);
+    expect(index.source).toBe(cardStates);
+  });
+});
@@ -0,0 +1,302 @@
+import { MAX_SPACED_REPETITION_BOX, type SpacedRepetitionCardProgress } from "./logic";
+
+type DueEntry = {
+  cardId: string;
+  progress: SpacedRepetitionCardProgress;
+  /** Never-reviewed cards use "", which sorts before every ISO timestamp. */
+  reviewedAt: string;
+  position: number;
+};
+
+/**
+ * Card states bucketed by canonical box, each bucket a binary min-heap on the last
+ * review time. Effective boxes only fold the canonical ones at or above the box
+ * count together, so the same buckets serve every box count setting.
+ *
+ * The index is tied to one card-state record (`source`) and is moved along with
+ * `advanceDueIndex` whenever that record is replaced by a copy with a few changed
+ * cards, so a review costs O(log n) instead of a pass over the whole history.
+ */
+export type DueIndex = {
+  source: Record<string, SpacedRepetitionCardProgress>;
+  buckets: DueEntry[][];
+  entries: Map<string, DueEntry>;
+  attempted: number;
+  correct: number;
+  incorrect: number;
+};
+
+export type DueIndexSummary = {
+  total: number;
+  attempted: number;
+  correct: number;
+  incorrect: number;
+  /** Card count per effective box, index 0 is box 1. */
+  boxCounts: number[];
+};
+
+// Card IDs break ties so the order does not depend on the heap's history.
+const isBefore = (a: DueEntry, b: DueEntry) =>
+  a.reviewedAt !== b.reviewedAt ? a.reviewedAt < b.reviewedAt : a.cardId < b.cardId;
+
+const place = (bucket: DueEntry[], entry: DueEntry, position: number) => {
+  bucket[position] = entry;
+  entry.position = position;
+};
+
+const siftUp = (bucket: DueEntry[], position: number) => {
+  const entry = bucket[position];
+  while (position > 0) {
+    const parent = (position - 1) >> 1;
+    if (!isBefore(entry, bucket[parent])) {
+      break;
+    }
+    place(bucket, bucket[parent], position);
+    position = parent;
+  }
+  place(bucket, entry, position);
+};
+
+const siftDown = (bucket: DueEntry[], position: number) => {
+  const entry = bucket[position];
+  const length = bucket.length;
+  for (;;) {
+    let child = position * 2 + 1;
+    if (child >= length) {
+      break;
+    }
+    if (child + 1 < length && isBefore(bucket[child + 1], bucket[child])) {
+      child += 1;
+    }
+    if (!isBefore(bucket[child], entry)) {
+      break;
+    }
+    place(bucket, bucket[child], position);
+    position = child;
+  }
+  place(bucket, entry, position);
+};
+
+const getBucketIndex = (progress: SpacedRepetitionCardProgress) =>
+  Math.min(MAX_SPACED_REPETITION_BOX, Math.max(1, progress.boxCanonical)) - 1;
+
+const countProgress = (
+  index: DueIndex,
+  progress: SpacedRepetitionCardProgress,
+  delta: number,
+) => {
+  if (progress.attempts > 0) {
+    index.attempted += delta;
+  }
+  if (progress.lastResult === "correct") {
+    index.correct += delta;
+  } else if (progress.lastResult === "incorrect") {
+    index.incorrect += delta;
+  }
+};
+
+const removeEntry = (index: DueIndex, entry: DueEntry) => {
+  const bucket = index.buckets[getBucketIndex(entry.progress)];
+  const last = bucket.pop() as DueEntry;
+  if (last !== entry) {
+    place(bucket, last, entry.position);
+    siftDown(bucket, last.position);
+    siftUp(bucket, last.position);
+  }
+  index.entries.delete(entry.cardId);
+  countProgress(index, entry.progress, -1);
+};
+
+const insertEntry = (
+  index: DueIndex,
+  cardId: string,
+  progress: SpacedRepetitionCardProgress,
+) => {
+  const bucket = index.buckets[getBucketIndex(progress)];
+  const entry: DueEntry = {
+    cardId,
+    progress,
+    reviewedAt: progress.lastReviewedAt ?? "",
+    position: bucket.length,
+  };
+  bucket.push(entry);
+  siftUp(bucket, entry.position);
+  index.entries.set(cardId, entry);
+  countProgress(index, progress, 1);
+};
+
+/** Builds the index over normalized card states in O(n). */
+export const createDueIndex = (
+  cardStates: Record<string, SpacedRepetitionCardProgress>,
+): DueIndex => {
+  const index: DueIndex = {
+    source: cardStates,
+    buckets: Array.from({ length: MAX_SPACED_REPETITION_BOX }, () => []),
+    entries: new Map(),
+    attempted: 0,
+    correct: 0,
+    incorrect: 0,
+  };
+  for (const cardId in cardStates) {
+    const progress = cardStates[cardId];
+    const bucket = index.buckets[getBucketIndex(progress)];
+    const entry: DueEntry = {
+      cardId,
+      progress,
+      reviewedAt: progress.lastReviewedAt ?? "",
+      position: bucket.length,
+    };
+    bucket.push(entry);
+    index.entries.set(cardId, entry);
+    countProgress(index, progress, 1);
+  }
+  for (const bucket of index.buckets) {
+    for (let position = (bucket.length >> 1) - 1; position >= 0; position -= 1) {
+      siftDown(bucket, position);
+    }
+  }
+  return index;
+};
+
+/** Sets (or with `undefined`, removes) one card's progress in O(log n). */
+export const setDueIndexProgress = (
+  index: DueIndex,
+  cardId: string,
+  progress: SpacedRepetitionCardProgress | undefined,
+) => {
+  const entry = index.entries.get(cardId);
+  if (entry?.progress === progress) {
+    return;
+  }
+  if (entry) {
+    removeEntry(index, entry);
+  }
+  if (progress) {
+    insertEntry(index, cardId, progress);
+  }
+};
+
+/**
+ * Moves the index from `previous` to `next`, which may only differ in `changedIds`.
+ * An index that is not on `previous` is left alone and rebuilt on its next use.
+ */
+export const advanceDueIndex = (
+  index: DueIndex | undefined,
+  previous: Record<string, SpacedRepetitionCardProgress>,
+  next: Record<string, SpacedRepetitionCardProgress>,
+  changedIds: Iterable<string>,
+) => {
+  if (!index || index.source !== previous) {
+    return false;
+  }
+  for (const cardId of changedIds) {
+    setDueIndexProgress(index, cardId, next[cardId]);
+  }
+  index.source = next;
+  return true;
+};
+
+export const summarizeDueIndex = (index: DueIndex, boxCount: number): DueIndexSummary => {
+  const boxCounts = Array.from({ length: boxCount }, () => 0);
+  index.buckets.forEach((bucket, bucketIndex) => {
+    boxCounts[Math.min(bucketIndex, boxCount - 1)] += bucket.length;
+  });
+  return {
+    total: index.entries.size,
+    attempted: index.attempted,
+    correct: index.correct,
+    incorrect: index.incorrect,
+    boxCounts,
+  };
+};
+
+type Candidate = { entry: DueEntry; box: number; bucket: DueEntry[] };
+
+const isCandidateBefore = (a: Candidate, b: Candidate) =>
+  a.box !== b.box ? a.box < b.box : isBefore(a.entry, b.entry);
+
+const pushCandidate = (frontier: Candidate[], candidate: Candidate) => {
+  let position = frontier.length;
+  frontier.push(candidate);
+  while (position > 0) {
+    const parent = (position - 1) >> 1;
+    if (!isCandidateBefore(candidate, frontier[parent])) {
+      break;
+    }
+    frontier[position] = frontier[parent];
+    position = parent;
+  }
+  frontier[position] = candidate;
+};
+
+const popCandidate = (frontier: Candidate[]) => {
+  const top = frontier[0];
+  const last = frontier.pop() as Candidate;
+  if (frontier.length > 0) {
+    let position = 0;
+    for (;;) {
+      let child = position * 2 + 1;
+      if (child >= frontier.length) {
+        break;
+      }
+      if (
+        child + 1 < frontier.length &&
+        isCandidateBefore(frontier[child + 1], frontier[child])
+      ) {
+        child += 1;
+      }
+      if (!isCandidateBefore(frontier[child], last)) {
+        break;
+      }
+      frontier[position] = frontier[child];
+      position = child;
+    }
+    frontier[position] = last;
+  }
+  return top;
+};
+
+/**
+ * Up to `count` card IDs in due order: lowest effective box first, then least
+ * recently reviewed. The bucket heaps are walked in place through a frontier of
+ * their next-smallest nodes, so this costs O(k log k) for k visited cards and
+ * leaves the index untouched. `box` limits the walk to one effective box and
+ * `accept` skips cards (for example ones that are no longer in the vault).
+ */
+export const takeDueCardIds = (
+  index: DueIndex,
+  count: number,
+  options: {
+    boxCount: number;
+    box?: number | null;
+    accept?: (cardId: string) => boolean;
+  },
+) => {
+  const frontier: Candidate[] = [];
+  index.buckets.forEach((bucket, bucketIndex) => {
+    if (bucket.length === 0) {
+      return;
+    }
+    const box = Math.min(bucketIndex + 1, options.boxCount);
+    if (typeof options.box === "number" && box !== options.box) {
+      return;
+    }
+    pushCandidate(frontier, { entry: bucket[0], box, bucket });
+  });
+
+  const cardIds: string[] = [];
+  while (cardIds.length < count && frontier.length > 0) {
+    const { entry, box, bucket } = popCandidate(frontier);
+    if (!options.accept || options.accept(entry.cardId)) {
+      cardIds.push(entry.cardId);
+    }
+    const child = entry.position * 2 + 1;
+    if (child < bucket.length) {
+      pushCandidate(frontier, { entry: bucket[child], box, bucket });
+    }
+    if (child + 1 < bucket.length) {
+      pushCandidate(frontier, { entry: bucket[child + 1], box, bucket });
+    }
+  }
+  return cardIds;
+};
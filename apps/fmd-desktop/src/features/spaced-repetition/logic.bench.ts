@@ -0,0 +1,39 @@
+import { bench, describe } from "vitest";
+import type { Flashcard } from "../../lib/flashcards";
+import {
+  buildSpacedRepetitionSession,
+  createSeededRandom,
+  getFlashcardId,
+  normalizeSpacedRepetitionCardProgress,
+  type SpacedRepetitionCardProgress,
+} from "./logic";
+
+const createDeck = (size: number) => {
+  const random = createSeededRandom(size);
+  const cards: Flashcard[] = [];
+  const cardStates: Record<string, SpacedRepetitionCardProgress> = {};
+  for (let index = 0; index < size; index += 1) {
+    const card: Flashcard = {
+      kind: "free-text",
+      front: `Question ${index}`,
+      back: `Answer ${index}`,
+    };
+    cards.push(card);
+    cardStates[getFlashcardId(card)] = normalizeSpacedRepetitionCardProgress({
+      boxCanonical: 1 + Math.floor(random() * 7),
+    });
+  }
+  return { cards, cardStates };
+};
+
+// Doubling steps up to 100k cards; the time per card should stay near flat.
+describe.each([12500, 25000, 50000, 100000])("repetition order, %i cards", (size) => {
+  const { cards, cardStates } = createDeck(size);
+
+  bench("buildSpacedRepetitionSession", () => {
+    buildSpacedRepetitionSession(cards, cardStates, {
+      order: "repetition",
+      random: createSeededRandom(1),
+    });
+  });
+});
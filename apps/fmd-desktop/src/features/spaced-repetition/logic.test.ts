@@ -0,0 +1,161 @@
+import { describe, expect, it } from "vitest";
+import { createLegacyFlashcardId, hashString, type Flashcard } from "../../lib/flashcards";
+import {
+  buildSpacedRepetitionSession,
+  buildSpacedRepetitionUserDelta,
+  createSeededRandom,
+  getFlashcardId,
+  normalizeSpacedRepetitionCardProgress,
+} from "./logic";
+
+const createDeck = (boxes: number[]) => {
+  const cards: Flashcard[] = boxes.map((_, index) => ({
+    kind: "free-text",
+    front: `Question ${index}`,
+    back: `Answer ${index}`,
+  }));
+  const cardStates = Object.fromEntries(
+    cards.map((card, index) => [
+      getFlashcardId(card),
+      normalizeSpacedRepetitionCardProgress({ boxCanonical: boxes[index] }),
+    ]),
+  );
+  return { cards, cardStates };
+};
+
+describe("buildSpacedRepetitionSession repetition order", () => {
+  it("is reproducible with a seeded random source", () => {
+    const { cards, cardStates } = createDeck([1, 2, 3, 4, 5, 1, 2, 3]);
+    const build = () =>
+      buildSpacedRepetitionSession(cards, cardStates, {
+        order: "repetition",
+        random: createSeededRandom(42),
+      }).cardIds;
+
+    expect(build()).toEqual(build());
+    expect(build()).toHaveLength(cards.length);
+  });
+
+  it("leaves out cards in the last box", () => {
+    const { cards, cardStates } = createDeck([1, 8, 2]);
+
+    const session = buildSpacedRepetitionSession(cards, cardStates, {
+      order: "repetition",
+      random: createSeededRandom(1),
+    });
+
+    expect(session.flashcards).toHaveLength(2);
+    expect(session.flashcards).not.toContain(cards[1]);
+  });
+
+  it("picks cards in proportion to their box weight", () => {
+    // Medium strength weighs boxes 1, 2 and 3 as 8, 5 and 3.
+    const { cards, cardStates } = createDeck([1, 2, 3]);
+    const random = createSeededRandom(7);
+    const runs = 20000;
+    const firstPicks = [0, 0, 0];
+
+    for (let run = 0; run < runs; run += 1) {
+      const session = buildSpacedRepetitionSession(cards, cardStates, {
+        order: "repetition",
+        random,
+      });
+      firstPicks[cards.indexOf(session.flashcards[0])] += 1;
+    }
+
+    expect(firstPicks[0] / runs).toBeCloseTo(8 / 16, 1);
+    expect(firstPicks[1] / runs).toBeCloseTo(5 / 16, 1);
+    expect(firstPicks[2] / runs).toBeCloseTo(3 / 16, 1);
+  });
+});
+
+describe("buildSpacedRepetitionSession legacy card IDs", () => {
+  it("only moves legacy states over when asked to", () => {
+    const card: Flashcard = {
+      kind: "multiple-choice",
+      question: "Pick",
+      options: [
+        { key: "a", text: "A" },
+        { key: "b", text: "B" },
+      ],
+      correctKeys: ["b", "a"],
+    };
+    const progress = normalizeSpacedRepetitionCardProgress({ boxCanonical: 4 });
+    const legacyId = `card-${hashString(JSON.stringify(card))}`;
+    const cardId = getFlashcardId(card);
+    expect(legacyId).not.toBe(cardId);
+
+    const migrated = buildSpacedRepetitionSession([card], { [legacyId]: progress }, {
+      legacyCardIds: true,
+    });
+    expect(migrated.cardProgressById).toEqual({ [cardId]: progress });
+
+    const current = buildSpacedRepetitionSession([card], { [legacyId]: progress });
+    expect(current.cardProgressById[cardId].boxCanonical).toBe(1);
+    expect(current.cardProgressById[legacyId]).toBe(progress);
+  });
+
+  it("gives a 32-bit ID's state to every card that shared it", () => {
+    // These two cards collide on their 32-bit IDs.
+    const first: Flashcard = { kind: "free-text", front: "Q1439599", back: "A" };
+    const second: Flashcard = { kind: "free-text", front: "Q1622382", back: "A" };
+    const legacyId = createLegacyFlashcardId(first);
+    expect(createLegacyFlashcardId(second)).toBe(legacyId);
+    expect(getFlashcardId(first)).not.toBe(getFlashcardId(second));
+    expect(getFlashcardId(first)).toMatch(/^card-[0-9a-f]{16}$/);
+
+    const progress = normalizeSpacedRepetitionCardProgress({ boxCanonical: 3 });
+    const session = buildSpacedRepetitionSession([first, second], { [legacyId]: progress }, {
+      legacyCardIds: true,
+    });
+    expect(session.cardProgressById).toEqual({
+      [getFlashcardId(first)]: progress,
+      [getFlashcardId(second)]: progress,
+    });
+  });
+});
+
+describe("buildSpacedRepetitionUserDelta", () => {
+  const progress = (boxCanonical: number) =>
+    normalizeSpacedRepetitionCardProgress({ boxCanonical });
+  const state = {
+    cardStates: { a: progress(1), b: progress(2) },
+    lastLoadedAt: "2024-01-01T00:00:00.000Z",
+    completedPerDay: { "2024-01-01": 3 },
+  };
+
+  it("sends only the changed cards and days", () => {
+    const next = {
+      ...state,
+      cardStates: { a: state.cardStates.a, c: progress(1) },
+      completedPerDay: { "2024-01-01": 4 },
+    };
+
+    expect(buildSpacedRepetitionUserDelta("u", 2, state, next)).toEqual({
+      userId: "u",
+      version: 2,
+      cardStates: { b: null, c: next.cardStates.c },
+      completedPerDay: { "2024-01-01": 4 },
+      lastLoadedAt: state.lastLoadedAt,
+    });
+    expect(buildSpacedRepetitionUserDelta("u", 2, state, { ...state })).toBeNull();
+    // Known changed IDs limit the comparison to those cards.
+    expect(buildSpacedRepetitionUserDelta("u", 2, state, next, ["b"])?.cardStates).toEqual({
+      b: null,
+    });
+  });
+
+  it("replaces new users and removes deleted ones", () => {
+    expect(buildSpacedRepetitionUserDelta("u", 1, undefined, state)).toEqual({
+      userId: "u",
+      version: 1,
+      replace: true,
+      ...state,
+    });
+    expect(buildSpacedRepetitionUserDelta("u", 3, state, undefined)).toEqual({
+      userId: "u",
+      version: 3,
+      removed: true,
+    });
+  });
+});
@@ -1,4 +1,9 @@
-import type { Flashcard } from "../../lib/flashcards";
+import {
+  createFlashcardId,
+  createLegacyFlashcardId,
+  hashString,
+  type Flashcard,
+} from "../../lib/flashcards";
 import type {
   FlashcardResult,
   FlashcardSelfGrade,
@@ -6,6 +11,12 @@ import type {
 } from "../flashcards/logic";
 
 export const MAX_SPACED_REPETITION_BOX = 8;
+/**
+ * Version of the stored spaced repetition data. From 1 on, states under IDs of
+ * unsorted multiple-choice keys were migrated by the backend; from 2 on, states
+ * under 32-bit IDs were too, so card states are only keyed by `getFlashcardId`.
+ */
+export const SPACED_REPETITION_SCHEMA_VERSION = 2;
 export type SpacedRepetitionRepetitionStrength = "weak" | "medium" | "strong";
 
 // Index 0..7 maps to boxes 1..8 for weighted repetition order.
@@ -54,10 +65,26 @@ export type SpacedRepetitionUserState = {
   completedPerDay: Record<string, number>;
 };
 
-export type SpacedRepetitionStorage = {
+/** What `load_spaced_repetition_users` returns; states are loaded per user. */
+export type SpacedRepetitionUsers = {
   users: SpacedRepetitionUser[];
-  userStateById: Record<string, SpacedRepetitionUserState>;
   lastActiveUserId: string | null;
+  schemaVersion?: number | null;
+};
+
+/**
+ * One user's changes since the previous delta, for `save_spaced_repetition_changes`.
+ * `null` card states and daily counts are removals. The backend rejects a delta
+ * whose version does not follow the previous one, unless it is a `replace`.
+ */
+export type SpacedRepetitionUserDelta = {
+  userId: string;
+  version: number;
+  replace?: boolean;
+  removed?: boolean;
+  cardStates?: Record<string, SpacedRepetitionCardProgress | null>;
+  completedPerDay?: Record<string, number | null>;
+  lastLoadedAt?: string | null;
 };
 
 export const createSpacedRepetitionUserId = () => {
@@ -67,48 +94,6 @@ export const createSpacedRepetitionUserId = () => {
   return `user-${Date.now()}-${Math.random().toString(16).slice(2)}`;
 };
 
-export const hashString = (value: string) => {
-  let hash = 2166136261;
-  for (let index = 0; index < value.length; index += 1) {
-    hash ^= value.charCodeAt(index);
-    hash = Math.imul(hash, 16777619);
-  }
-  return (hash >>> 0).toString(16);
-};
-
-const getFlashcardIdentityPayload = (card: Flashcard) => {
-  if (card.kind === "multiple-choice") {
-    return {
-      kind: card.kind,
-      question: card.question,
-      options: card.options,
-      correctKeys: [...card.correctKeys].sort((a, b) => a.localeCompare(b)),
-    };
-  }
-
-  if (card.kind === "true-false") {
-    return {
-      kind: card.kind,
-      items: card.items,
-    };
-  }
-
-  if (card.kind === "free-text") {
-    return {
-      kind: card.kind,
-      front: card.front,
-      back: card.back,
-    };
-  }
-
-  return {
-    kind: card.kind,
-    question: card.question,
-    segments: card.segments,
-    dragTokens: card.dragTokens,
-  };
-};
-
 const getFlashcardLegacyIdentityPayload = (card: Flashcard) => {
   if (card.kind === "multiple-choice") {
     return {
@@ -142,11 +127,15 @@ const getFlashcardLegacyIdentityPayload = (card: Flashcard) => {
   };
 };
 
-export const getFlashcardId = (card: Flashcard) =>
-  `card-${hashString(JSON.stringify(getFlashcardIdentityPayload(card)))}`;
+/** Parsed cards carry their ID; it is only computed for cards built elsewhere. */
+export const getFlashcardId = (card: Flashcard) => card.id ?? createFlashcardId(card);
 
-const getFlashcardLegacyId = (card: Flashcard) =>
-  `card-${hashString(JSON.stringify(getFlashcardLegacyIdentityPayload(card)))}`;
+/** IDs older data may key the card's state by, the most recent first. */
+const getFlashcardLegacyIds = (card: Flashcard) => {
+  const legacyId = createLegacyFlashcardId(card);
+  const unsortedId = `card-${hashString(JSON.stringify(getFlashcardLegacyIdentityPayload(card)))}`;
+  return unsortedId === legacyId ? [legacyId] : [legacyId, unsortedId];
+};
 
 export const createEmptySpacedRepetitionSession = (): SpacedRepetitionSession => ({
   flashcards: [],
@@ -205,45 +194,55 @@ export const getSpacedRepetitionEffectiveBox = (
   boxCount: number,
 ) => Math.min(progress.boxCanonical, boxCount);
 
-const shuffleEntries = <T>(entries: T[]) => {
+/** Uniform random number in [0, 1), like `Math.random`. */
+export type RandomSource = () => number;
+
+/** Deterministic `RandomSource` (mulberry32) for tests and benchmarks. */
+export const createSeededRandom = (seed: number): RandomSource => {
+  let state = seed >>> 0;
+  return () => {
+    state = (state + 0x6d2b79f5) >>> 0;
+    let value = state;
+    value = Math.imul(value ^ (value >>> 15), value | 1);
+    value ^= value + Math.imul(value ^ (value >>> 7), value | 61);
+    return ((value ^ (value >>> 14)) >>> 0) / 4294967296;
+  };
+};
+
+const shuffleEntries = <T>(entries: T[], random: RandomSource) => {
   const copy = [...entries];
   for (let index = copy.length - 1; index > 0; index -= 1) {
-    const swapIndex = Math.floor(Math.random() * (index + 1));
+    const swapIndex = Math.floor(random() * (index + 1));
     [copy[index], copy[swapIndex]] = [copy[swapIndex], copy[index]];
   }
   return copy;
 };
 
+/**
+ * Weighted sampling without replacement: each pick is proportional to the
+ * weights of the cards still left. Sorting by exponential keys `E / weight`
+ * (E ~ Exp(1)) yields exactly that distribution in O(n log n) instead of
+ * re-summing the remaining weights for every pick.
+ */
 const buildWeightedOrder = <T extends { progress: SpacedRepetitionCardProgress }>(
   entries: T[],
   boxCount: number,
   strength: SpacedRepetitionRepetitionStrength,
+  random: RandomSource,
 ) => {
   const weights = REPETITION_WEIGHTS[strength];
-  const candidates = entries
-    .map((entry) => {
-      const effectiveBox = getSpacedRepetitionEffectiveBox(entry.progress, boxCount);
-      return {
-        entry,
-        effectiveBox,
-        weight: Math.max(1, weights[effectiveBox - 1] ?? 1),
-      };
-    })
-    .filter((candidate) => candidate.effectiveBox < boxCount);
-
-  const ordered: T[] = [];
-  while (candidates.length > 0) {
-    const totalWeight = candidates.reduce((sum, candidate) => sum + candidate.weight, 0);
-    let threshold = Math.random() * totalWeight;
-    const index = candidates.findIndex((candidate) => {
-      threshold -= candidate.weight;
-      return threshold <= 0;
-    });
-    const pickedIndex = index >= 0 ? index : candidates.length - 1;
-    const [picked] = candidates.splice(pickedIndex, 1);
-    ordered.push(picked.entry);
+  const keyed: { entry: T; key: number }[] = [];
+  for (const entry of entries) {
+    const effectiveBox = getSpacedRepetitionEffectiveBox(entry.progress, boxCount);
+    if (effectiveBox >= boxCount) {
+      continue;
+    }
+    const weight = Math.max(1, weights[effectiveBox - 1] ?? 1);
+    // 1 - random() lies in (0, 1], so the logarithm stays finite.
+    keyed.push({ entry, key: -Math.log(1 - random()) / weight });
   }
-  return ordered;
+  keyed.sort((a, b) => a.key - b.key);
+  return keyed.map((candidate) => candidate.entry);
 };
 
 export const buildSpacedRepetitionSession = (
@@ -253,28 +252,54 @@ export const buildSpacedRepetitionSession = (
     order?: "in-order" | "random" | "repetition";
     boxCount?: number;
     repetitionStrength?: SpacedRepetitionRepetitionStrength;
+    random?: RandomSource;
+    /**
+     * Moves states still keyed by legacy IDs over to the current IDs. Only needed
+     * for data below `SPACED_REPETITION_SCHEMA_VERSION`. A legacy ID several cards
+     * shared hands its state to each of them.
+     */
+    legacyCardIds?: boolean;
+    /** Called for every card ID whose state is added or removed. */
+    onCardStateChange?: (cardId: string) => void;
   },
 ): SpacedRepetitionSession => {
-  const nextCardStates = Object.fromEntries(
-    Object.entries(existingCardStates).map(([cardId, progress]) => [
-      cardId,
-      normalizeSpacedRepetitionCardProgress(progress),
-    ]),
-  );
+  // Stored states are normalized when they are restored, so the record is only
+  // copied once a card actually needs a new or migrated state.
+  let nextCardStates = existingCardStates;
+  const changeCardState = (
+    cardId: string,
+    progress: SpacedRepetitionCardProgress | undefined,
+  ) => {
+    if (nextCardStates === existingCardStates) {
+      nextCardStates = { ...existingCardStates };
+    }
+    if (progress) {
+      nextCardStates[cardId] = progress;
+    } else {
+      delete nextCardStates[cardId];
+    }
+    options?.onCardStateChange?.(cardId);
+  };
 
+  const migratedLegacyIds = new Set<string>();
   const cardIds = flashcards.map((card) => {
     const cardId = getFlashcardId(card);
-    const legacyId = getFlashcardLegacyId(card);
     if (!nextCardStates[cardId]) {
-      if (legacyId !== cardId && nextCardStates[legacyId]) {
-        nextCardStates[cardId] = nextCardStates[legacyId];
-        delete nextCardStates[legacyId];
+      const legacyId = options?.legacyCardIds
+        ? getFlashcardLegacyIds(card).find((id) => existingCardStates[id])
+        : undefined;
+      if (legacyId) {
+        changeCardState(cardId, existingCardStates[legacyId]);
+        migratedLegacyIds.add(legacyId);
       } else {
-        nextCardStates[cardId] = normalizeSpacedRepetitionCardProgress(null);
+        changeCardState(cardId, normalizeSpacedRepetitionCardProgress(null));
       }
     }
     return cardId;
   });
+  for (const legacyId of migratedLegacyIds) {
+    changeCardState(legacyId, undefined);
+  }
 
   const entries = flashcards.map((card, index) => ({
     card,
@@ -283,14 +308,16 @@ export const buildSpacedRepetitionSession = (
   }));
   const order = options?.order ?? "in-order";
   const boxCount = options?.boxCount ?? MAX_SPACED_REPETITION_BOX;
+  const random = options?.random ?? Math.random;
   const orderedEntries =
     order === "random"
-      ? shuffleEntries(entries)
+      ? shuffleEntries(entries, random)
       : order === "repetition"
         ? buildWeightedOrder(
             entries,
             boxCount,
             options?.repetitionStrength ?? "medium",
+            random,
           )
         : entries;
 
@@ -301,3 +328,84 @@ export const buildSpacedRepetitionSession = (
     cardProgressById: nextCardStates,
   };
 };
+
+const diffRecord = <T>(
+  previous: Record<string, T>,
+  next: Record<string, T>,
+  keys?: Iterable<string>,
+) => {
+  const changes: Record<string, T | null> = {};
+  let changed = false;
+  if (keys) {
+    for (const key of keys) {
+      if (next[key] !== previous[key]) {
+        changes[key] = next[key] ?? null;
+        changed = true;
+      }
+    }
+    return changed ? changes : null;
+  }
+  for (const key in next) {
+    if (next[key] !== previous[key]) {
+      changes[key] = next[key];
+      changed = true;
+    }
+  }
+  for (const key in previous) {
+    if (!(key in next)) {
+      changes[key] = null;
+      changed = true;
+    }
+  }
+  return changed ? changes : null;
+};
+
+/**
+ * The delta from `previous` to `next`, or null when nothing changed. States are
+ * copied on write, so unchanged cards are found by identity. Without `previous`
+ * the delta replaces the user's whole state; without `next` it removes it.
+ * `changedCardIds`, when known, limits the card comparison to those cards, which
+ * spares a pass over every card state on each review.
+ */
+export const buildSpacedRepetitionUserDelta = (
+  userId: string,
+  version: number,
+  previous: SpacedRepetitionUserState | undefined,
+  next: SpacedRepetitionUserState | undefined,
+  changedCardIds?: Iterable<string>,
+): SpacedRepetitionUserDelta | null => {
+  if (previous === next) {
+    return null;
+  }
+  if (!next) {
+    return { userId, version, removed: true };
+  }
+  if (!previous) {
+    return {
+      userId,
+      version,
+      replace: true,
+      cardStates: next.cardStates,
+      completedPerDay: next.completedPerDay,
+      lastLoadedAt: next.lastLoadedAt,
+    };
+  }
+  const cardStates =
+    previous.cardStates === next.cardStates
+      ? null
+      : diffRecord(previous.cardStates, next.cardStates, changedCardIds);
+  const completedPerDay =
+    previous.completedPerDay === next.completedPerDay
+      ? null
+      : diffRecord(previous.completedPerDay, next.completedPerDay);
+  if (!cardStates && !completedPerDay && previous.lastLoadedAt === next.lastLoadedAt) {
+    return null;
+  }
+  return {
+    userId,
+    version,
+    cardStates: cardStates ?? {},
+    completedPerDay: completedPerDay ?? {},
+    lastLoadedAt: next.lastLoadedAt,
+  };
+};
@@ -1,4 +1,4 @@
-import { useCallback, useEffect, useMemo, useState, type DragEvent } from "react";
+import { useCallback, useEffect, useMemo, useRef, useState, type DragEvent } from "react";
 import { invoke } from "@tauri-apps/api/core";
 import {
   evaluateFlashcardResult,
@@ -7,9 +7,17 @@ import {
   type TrueFalseSelection,
 } from "../flashcards/logic";
 import type { FlashcardOrder, FlashcardScope } from "../flashcards/useFlashcards";
-import type { Flashcard } from "../../lib/flashcards";
+import { findFlashcardIdCollisions, type Flashcard } from "../../lib/flashcards";
+import {
+  advanceDueIndex,
+  createDueIndex,
+  summarizeDueIndex,
+  takeDueCardIds,
+  type DueIndex,
+} from "./dueIndex";
 import {
   buildSpacedRepetitionSession,
+  buildSpacedRepetitionUserDelta,
   createEmptySpacedRepetitionSession,
   createEmptySpacedRepetitionUserState,
   createSpacedRepetitionUserId,
@@ -17,11 +25,14 @@ import {
   getSpacedRepetitionEffectiveBox,
   MAX_SPACED_REPETITION_BOX,
   normalizeSpacedRepetitionCardProgress,
+  SPACED_REPETITION_SCHEMA_VERSION,
+  type SpacedRepetitionCardProgress,
   type SpacedRepetitionRepetitionStrength,
   type SpacedRepetitionSession,
-  type SpacedRepetitionStorage,
   type SpacedRepetitionUser,
+  type SpacedRepetitionUserDelta,
   type SpacedRepetitionUserState,
+  type SpacedRepetitionUsers,
 } from "./logic";
 
 export type SpacedRepetitionPageSize = 1 | 2 | 3 | 5;
@@ -81,6 +92,23 @@ const normalizeCompletedPerDay = (value: unknown) => {
   );
 };
 
+const normalizeStoredUserState = (value: unknown): SpacedRepetitionUserState => {
+  if (!value || typeof value !== "object") {
+    return createEmptySpacedRepetitionUserState();
+  }
+  const state = value as Partial<SpacedRepetitionUserState>;
+  return {
+    cardStates: Object.fromEntries(
+      Object.entries(state.cardStates ?? {}).map(([cardId, progress]) => [
+        cardId,
+        normalizeSpacedRepetitionCardProgress(progress),
+      ]),
+    ),
+    completedPerDay: normalizeCompletedPerDay(state.completedPerDay),
+    lastLoadedAt: typeof state.lastLoadedAt === "string" ? state.lastLoadedAt : null,
+  };
+};
+
 const normalizeSpacedRepetitionPageSize = (value: number) => {
   if (value === 10) {
     return 5;
@@ -90,6 +118,46 @@ const normalizeSpacedRepetitionPageSize = (value: number) => {
     : DEFAULT_SPACED_REPETITION_PAGE_SIZE;
 };
 
+const resolveDueIndex = (
+  dueIndexes: Map<string, DueIndex>,
+  userId: string,
+  cardStates: Record<string, SpacedRepetitionCardProgress>,
+) => {
+  const current = dueIndexes.get(userId);
+  if (current?.source === cardStates) {
+    return current;
+  }
+  const next = createDueIndex(cardStates);
+  dueIndexes.set(userId, next);
+  return next;
+};
+
+/** Card IDs changed on the way from one card-state record to another. */
+type CardStateChanges = {
+  from: Record<string, SpacedRepetitionCardProgress>;
+  to: Record<string, SpacedRepetitionCardProgress>;
+  cardIds: Set<string>;
+};
+
+// Extends the user's chain of changes, or starts a new one at `previous`.
+const trackCardStateChanges = (
+  changes: Map<string, CardStateChanges>,
+  userId: string,
+  previous: Record<string, SpacedRepetitionCardProgress>,
+  next: Record<string, SpacedRepetitionCardProgress>,
+  cardIds: Iterable<string>,
+) => {
+  const current = changes.get(userId);
+  if (current?.to === previous) {
+    for (const cardId of cardIds) {
+      current.cardIds.add(cardId);
+    }
+    current.to = next;
+    return;
+  }
+  changes.set(userId, { from: previous, to: next, cardIds: new Set(cardIds) });
+};
+
 type UseSpacedRepetitionOptions = {
   isFlashcardScanning: boolean;
   scanFlashcards: (options?: {
@@ -143,13 +211,32 @@ export const useSpacedRepetition = ({
     useState("");
   const [spacedRepetitionUserError, setSpacedRepetitionUserError] =
     useState("");
+  // Only users that were active (or created) since startup; a user's state
+  // is loaded from the backend once that user becomes active.
   const [spacedRepetitionUserStateById, setSpacedRepetitionUserStateById] =
     useState<Record<string, SpacedRepetitionUserState>>({});
+  // The backend's box counts of the active user, shown until its state is in.
+  const [spacedRepetitionStoredBoxCounts, setSpacedRepetitionStoredBoxCounts] =
+    useState<{ userId: string; counts: number[] } | null>(null);
   const [spacedRepetitionDataLoaded, setSpacedRepetitionDataLoaded] =
     useState(false);
+  // Until the stored data is migrated, sessions also look up legacy card IDs.
+  const [spacedRepetitionLegacyCardIds, setSpacedRepetitionLegacyCardIds] =
+    useState(true);
   const [spacedRepetitionSessions, setSpacedRepetitionSessions] = useState<
     Record<string, SpacedRepetitionSession>
   >({});
+  // Per-user due index, kept in step with the card states on each review.
+  const spacedRepetitionDueIndexes = useRef(new Map<string, DueIndex>());
+  // The user states last sent to the backend and the version of each user's
+  // last delta, so a save only carries what changed since.
+  const spacedRepetitionSavedUserStates = useRef<
+    Record<string, SpacedRepetitionUserState>
+  >({});
+  const spacedRepetitionSaveVersions = useRef(new Map<string, number>());
+  const spacedRepetitionCardStateChanges = useRef(new Map<string, CardStateChanges>());
+  // "Load" stamps of users whose state was not loaded yet when they were stamped.
+  const spacedRepetitionPendingLoadedAt = useRef(new Map<string, string>());
 
   const spacedRepetitionActiveUser = spacedRepetitionActiveUserId
     ? spacedRepetitionUsers.find((user) => user.id === spacedRepetitionActiveUserId)
@@ -230,24 +317,23 @@ export const useSpacedRepetition = ({
     ? "Click the active user to load cards."
     : "Select a user to begin.";
 
+  const spacedRepetitionDueSummary = useMemo(
+    () =>
+      summarizeDueIndex(
+        resolveDueIndex(
+          spacedRepetitionDueIndexes.current,
+          spacedRepetitionActiveUserId ?? "",
+          spacedRepetitionCardStates,
+        ),
+        spacedRepetitionBoxes,
+      ),
+    [spacedRepetitionActiveUserId, spacedRepetitionBoxes, spacedRepetitionCardStates],
+  );
   const {
-    correctCount: spacedRepetitionCorrectCount,
-    incorrectCount: spacedRepetitionIncorrectCount,
+    correct: spacedRepetitionCorrectCount,
+    incorrect: spacedRepetitionIncorrectCount,
     total: spacedRepetitionTotalQuestions,
-  } = useMemo(() => {
-    const cardStates = Object.values(spacedRepetitionCardStates);
-    let correct = 0;
-    let incorrect = 0;
-    cardStates.forEach((state) => {
-      const normalized = normalizeSpacedRepetitionCardProgress(state);
-      if (normalized.lastResult === "correct") {
-        correct += 1;
-      } else if (normalized.lastResult === "incorrect") {
-        incorrect += 1;
-      }
-    });
-    return { correctCount: correct, incorrectCount: incorrect, total: cardStates.length };
-  }, [spacedRepetitionCardStates]);
+  } = spacedRepetitionDueSummary;
 
   const spacedRepetitionCorrectPercent = useMemo(() => {
     const total = spacedRepetitionCorrectCount + spacedRepetitionIncorrectCount;
@@ -258,8 +344,7 @@ export const useSpacedRepetition = ({
   }, [spacedRepetitionCorrectCount, spacedRepetitionIncorrectCount]);
 
   const spacedRepetitionProgressStats = useMemo(() => {
-    const cardStates = Object.values(spacedRepetitionCardStates);
-    const total = cardStates.length;
+    const { total, attempted, boxCounts } = spacedRepetitionDueSummary;
     if (total === 0) {
       return {
         dueNow: 0,
@@ -270,25 +355,10 @@ export const useSpacedRepetition = ({
     }
 
     const dueTodayThreshold = Math.min(2, spacedRepetitionBoxes);
-    let dueNow = 0;
+    const dueNow = boxCounts[0] ?? 0;
     let dueToday = 0;
-    let completedEver = 0;
-
-    for (const progress of cardStates) {
-      const normalized = normalizeSpacedRepetitionCardProgress(progress);
-      const effectiveBox = getSpacedRepetitionEffectiveBox(
-        normalized,
-        spacedRepetitionBoxes,
-      );
-      if (normalized.attempts > 0) {
-        completedEver += 1;
-      }
-      if (effectiveBox <= 1) {
-        dueNow += 1;
-      }
-      if (effectiveBox <= dueTodayThreshold) {
-        dueToday += 1;
-      }
+    for (let box = 1; box <= dueTodayThreshold; box += 1) {
+      dueToday += boxCounts[box - 1] ?? 0;
     }
 
     const todayKey = buildBerlinDateKey(new Date());
@@ -299,28 +369,20 @@ export const useSpacedRepetition = ({
     return {
       dueNow,
       dueToday,
-      inQueue: total - completedEver,
+      inQueue: total - attempted,
       completedToday,
     };
   }, [
     spacedRepetitionBoxes,
-    spacedRepetitionCardStates,
     spacedRepetitionCompletedPerDay,
+    spacedRepetitionDueSummary,
   ]);
 
-  const spacedRepetitionBoxCounts = useMemo(() => {
-    const counts = Array.from({ length: spacedRepetitionBoxes }, () => 0);
-    Object.values(spacedRepetitionCardStates).forEach((progress) => {
-      const normalized = normalizeSpacedRepetitionCardProgress(progress);
-      const effectiveBox = getSpacedRepetitionEffectiveBox(
-        normalized,
-        spacedRepetitionBoxes,
-      );
-      const index = Math.max(1, Math.min(spacedRepetitionBoxes, effectiveBox)) - 1;
-      counts[index] += 1;
-    });
-    return counts;
-  }, [spacedRepetitionBoxes, spacedRepetitionCardStates]);
+  const spacedRepetitionBoxCounts =
+    !spacedRepetitionActiveUserState &&
+    spacedRepetitionStoredBoxCounts?.userId === spacedRepetitionActiveUserId
+      ? spacedRepetitionStoredBoxCounts.counts
+      : spacedRepetitionDueSummary.boxCounts;
 
   const spacedRepetitionCompletedSeries = useMemo(() => {
     const days = buildLastSevenDays();
@@ -356,16 +418,28 @@ export const useSpacedRepetition = ({
   useEffect(() => {
     let cancelled = false;
 
-    const restoreSpacedRepetitionData = async () => {
+    const restoreSpacedRepetitionUsers = async () => {
       try {
-        const storage = await invoke<SpacedRepetitionStorage>(
-          "load_spaced_repetition_data",
+        const stored = await invoke<SpacedRepetitionUsers>(
+          "load_spaced_repetition_users",
         );
+        let schemaVersion = stored.schemaVersion ?? 0;
+        if (schemaVersion < SPACED_REPETITION_SCHEMA_VERSION) {
+          try {
+            schemaVersion =
+              (await invoke<number | null>("migrate_spaced_repetition_card_ids")) ?? 0;
+          } catch (error) {
+            console.error("Failed to migrate spaced repetition card IDs", error);
+          }
+        }
         if (cancelled) {
           return;
         }
-        const users = Array.isArray(storage.users)
-          ? storage.users
+        setSpacedRepetitionLegacyCardIds(
+          schemaVersion < SPACED_REPETITION_SCHEMA_VERSION,
+        );
+        const users = Array.isArray(stored.users)
+          ? stored.users
               .map((user) => {
                 if (!user || typeof user !== "object") {
                   return null;
@@ -384,57 +458,16 @@ export const useSpacedRepetition = ({
               })
               .filter((user): user is SpacedRepetitionUser => Boolean(user))
           : [];
-        const userStateByIdRaw =
-          storage.userStateById && typeof storage.userStateById === "object"
-            ? storage.userStateById
-            : {};
-        const userIds = new Set(users.map((user) => user.id));
-        const userStateById = Object.fromEntries(
-          Object.entries(userStateByIdRaw)
-            .filter(([userId]) => userIds.has(userId))
-            .map(([userId, state]) => {
-              const cardStatesRaw =
-                state && typeof state === "object" && "cardStates" in state
-                  ? (state as SpacedRepetitionUserState).cardStates
-                  : {};
-              const normalizedCardStates = Object.fromEntries(
-                Object.entries(cardStatesRaw ?? {}).map(([cardId, progress]) => [
-                  cardId,
-                  normalizeSpacedRepetitionCardProgress(progress),
-                ]),
-              );
-              const completedPerDayRaw =
-                state && typeof state === "object" && "completedPerDay" in state
-                  ? (state as SpacedRepetitionUserState).completedPerDay
-                  : {};
-              const completedPerDay = normalizeCompletedPerDay(completedPerDayRaw);
-              const lastLoadedAt =
-                state &&
-                typeof state === "object" &&
-                "lastLoadedAt" in state &&
-                typeof (state as SpacedRepetitionUserState).lastLoadedAt === "string"
-                  ? (state as SpacedRepetitionUserState).lastLoadedAt
-                  : null;
-              return [
-                userId,
-                {
-                  cardStates: normalizedCardStates,
-                  completedPerDay,
-                  lastLoadedAt,
-                },
-              ];
-            }),
-        );
         const lastActiveUserId =
-          storage.lastActiveUserId &&
-          users.some((user) => user.id === storage.lastActiveUserId)
-            ? storage.lastActiveUserId
+          stored.lastActiveUserId &&
+          users.some((user) => user.id === stored.lastActiveUserId)
+            ? stored.lastActiveUserId
             : null;
 
+        // Saving the users also removes the stored states of unknown users.
         setSpacedRepetitionUsers(users);
-        setSpacedRepetitionUserStateById(userStateById);
 
-        if (lastActiveUserId && users.some((user) => user.id === lastActiveUserId)) {
+        if (lastActiveUserId) {
           setSpacedRepetitionActiveUserId(lastActiveUserId);
           setSpacedRepetitionSelectedUserId(lastActiveUserId);
         }
@@ -453,7 +486,7 @@ export const useSpacedRepetition = ({
       }
     };
 
-    void restoreSpacedRepetitionData();
+    void restoreSpacedRepetitionUsers();
 
     return () => {
       cancelled = true;
@@ -464,19 +497,134 @@ export const useSpacedRepetition = ({
     if (!spacedRepetitionDataLoaded) {
       return;
     }
-    const storage: SpacedRepetitionStorage = {
+    void invoke("save_spaced_repetition_users", {
       users: spacedRepetitionUsers,
-      userStateById: spacedRepetitionUserStateById,
       lastActiveUserId: spacedRepetitionActiveUserId,
-    };
-    void invoke("save_spaced_repetition_data", { storage }).catch((error) => {
+    }).catch((error) => {
+      console.error("Failed to save spaced repetition users", error);
+    });
+  }, [spacedRepetitionActiveUserId, spacedRepetitionDataLoaded, spacedRepetitionUsers]);
+
+  useEffect(() => {
+    if (!spacedRepetitionDataLoaded) {
+      return;
+    }
+    const saved = spacedRepetitionSavedUserStates.current;
+    const versions = spacedRepetitionSaveVersions.current;
+    const userIds = new Set([
+      ...Object.keys(saved),
+      ...Object.keys(spacedRepetitionUserStateById),
+    ]);
+    const deltas: SpacedRepetitionUserDelta[] = [];
+    for (const userId of userIds) {
+      const previous = saved[userId];
+      const next = spacedRepetitionUserStateById[userId];
+      // The tracked card IDs only cover the whole change when their chain runs
+      // from the saved record to the current one.
+      const changes = spacedRepetitionCardStateChanges.current.get(userId);
+      const delta = buildSpacedRepetitionUserDelta(
+        userId,
+        (versions.get(userId) ?? 0) + 1,
+        previous,
+        next,
+        changes?.from === previous?.cardStates && changes?.to === next?.cardStates
+          ? changes?.cardIds
+          : undefined,
+      );
+      if (delta) {
+        versions.set(userId, delta.version);
+        deltas.push(delta);
+      }
+    }
+    spacedRepetitionSavedUserStates.current = spacedRepetitionUserStateById;
+    spacedRepetitionCardStateChanges.current.clear();
+    if (deltas.length === 0) {
+      return;
+    }
+
+    void invoke("save_spaced_repetition_changes", { deltas }).catch((error) => {
       console.error("Failed to save spaced repetition data", error);
+      // Nothing of the batch was applied, so send the latest whole state of
+      // these users, which also puts their versions back in step.
+      const latest = spacedRepetitionSavedUserStates.current;
+      const replacements = deltas.map(({ userId }) => {
+        const version = versions.get(userId) ?? 0;
+        return (
+          buildSpacedRepetitionUserDelta(userId, version, undefined, latest[userId]) ?? {
+            userId,
+            version,
+            replace: true,
+            removed: true,
+          }
+        );
+      });
+      void invoke("save_spaced_repetition_changes", { deltas: replacements }).catch(
+        (retryError) => {
+          console.error("Failed to save spaced repetition data", retryError);
+        },
+      );
     });
+  }, [spacedRepetitionDataLoaded, spacedRepetitionUserStateById]);
+
+  const spacedRepetitionActiveUserLoaded = spacedRepetitionActiveUserState !== null;
+
+  // Loads the active user's state when it is not in yet, and meanwhile the
+  // user's box counts, which the backend answers without reading the states.
+  useEffect(() => {
+    if (
+      !spacedRepetitionDataLoaded ||
+      !spacedRepetitionActiveUserId ||
+      spacedRepetitionActiveUserLoaded
+    ) {
+      return;
+    }
+    const userId = spacedRepetitionActiveUserId;
+    let cancelled = false;
+    void invoke<number[]>("load_spaced_repetition_box_counts", {
+      userId,
+      boxCount: spacedRepetitionBoxes,
+    })
+      .then((counts) => {
+        if (!cancelled) {
+          setSpacedRepetitionStoredBoxCounts({ userId, counts });
+        }
+      })
+      .catch((error) => {
+        console.error("Failed to load spaced repetition box counts", error);
+      });
+    void invoke<SpacedRepetitionUserState | null>("load_spaced_repetition_user_state", {
+      userId,
+    })
+      .then((stored) => {
+        if (cancelled) {
+          return;
+        }
+        const state = normalizeStoredUserState(stored);
+        const lastLoadedAt = spacedRepetitionPendingLoadedAt.current.get(userId);
+        spacedRepetitionPendingLoadedAt.current.delete(userId);
+        setSpacedRepetitionUserStateById((prev) => {
+          if (prev[userId]) {
+            return prev;
+          }
+          // The stored state is the save baseline, so only the stamp is sent.
+          spacedRepetitionSavedUserStates.current = {
+            ...spacedRepetitionSavedUserStates.current,
+            [userId]: state,
+          };
+          return { ...prev, [userId]: lastLoadedAt ? { ...state, lastLoadedAt } : state };
+        });
+      })
+      .catch((error) => {
+        console.error("Failed to load spaced repetition user state", error);
+      });
+    return () => {
+      cancelled = true;
+    };
   }, [
     spacedRepetitionActiveUserId,
+    spacedRepetitionActiveUserLoaded,
+    spacedRepetitionBoxes,
     spacedRepetitionDataLoaded,
-    spacedRepetitionUserStateById,
-    spacedRepetitionUsers,
   ]);
 
   useEffect(() => {
@@ -496,12 +644,15 @@ export const useSpacedRepetition = ({
       }
       const storedState =
         spacedRepetitionUserStateById[spacedRepetitionActiveUserId];
+      if (!storedState) {
+        return prev;
+      }
       return {
         ...prev,
         [spacedRepetitionActiveUserId]: {
           ...createEmptySpacedRepetitionSession(),
-          cardProgressById: storedState?.cardStates ?? {},
-          completedPerDay: storedState?.completedPerDay ?? {},
+          cardProgressById: storedState.cardStates,
+          completedPerDay: storedState.completedPerDay,
         },
       };
     });
@@ -590,15 +741,20 @@ export const useSpacedRepetition = ({
       return;
     }
     setSpacedRepetitionActiveUserId(spacedRepetitionSelectedUserId);
+    const lastLoadedAt = new Date().toISOString();
     setSpacedRepetitionUserStateById((prev) => {
-      const current =
-        prev[spacedRepetitionSelectedUserId] ?? createEmptySpacedRepetitionUserState();
+      const current = prev[spacedRepetitionSelectedUserId];
+      if (!current) {
+        // Stamped once the stored state is in.
+        spacedRepetitionPendingLoadedAt.current.set(
+          spacedRepetitionSelectedUserId,
+          lastLoadedAt,
+        );
+        return prev;
+      }
       return {
         ...prev,
-        [spacedRepetitionSelectedUserId]: {
-          ...current,
-          lastLoadedAt: new Date().toISOString(),
-        },
+        [spacedRepetitionSelectedUserId]: { ...current, lastLoadedAt },
       };
     });
     setSpacedRepetitionUserError("");
@@ -641,7 +797,12 @@ export const useSpacedRepetition = ({
   const handleSpacedRepetitionActiveUserLoadCards = useCallback(async (
     options?: { boxFilter?: number | null },
   ) => {
-    if (!spacedRepetitionActiveUserId || isFlashcardScanning) {
+    // Nothing to load cards against until the user's stored state is in.
+    if (
+      !spacedRepetitionActiveUserId ||
+      !spacedRepetitionActiveUserState ||
+      isFlashcardScanning
+    ) {
       return;
     }
     const activeUserId = spacedRepetitionActiveUserId;
@@ -653,6 +814,11 @@ export const useSpacedRepetition = ({
         scopeOverride: "vault",
         orderOverride: "in-order",
       });
+      const collidingCardIds = findFlashcardIdCollisions(cards);
+      if (collidingCardIds.length > 0) {
+        // These cards share progress; editing one of them gives it a new ID.
+        console.warn("Cards with different content share an ID", collidingCardIds);
+      }
       const storedCardStates =
         spacedRepetitionUserStateById[activeUserId]?.cardStates ?? {};
       const storedCompletedPerDay =
@@ -661,25 +827,67 @@ export const useSpacedRepetition = ({
         boxFilter && spacedRepetitionOrder === "repetition"
           ? "in-order"
           : spacedRepetitionOrder;
+      const changedCardIds: string[] = [];
       const nextSession = buildSpacedRepetitionSession(cards, storedCardStates, {
         order: loadOrder,
         boxCount: spacedRepetitionBoxes,
         repetitionStrength: spacedRepetitionRepetitionStrength,
+        legacyCardIds: spacedRepetitionLegacyCardIds,
+        onCardStateChange: (cardId) => changedCardIds.push(cardId),
       });
+      advanceDueIndex(
+        spacedRepetitionDueIndexes.current.get(activeUserId),
+        storedCardStates,
+        nextSession.cardProgressById,
+        changedCardIds,
+      );
+      trackCardStateChanges(
+        spacedRepetitionCardStateChanges.current,
+        activeUserId,
+        storedCardStates,
+        nextSession.cardProgressById,
+        changedCardIds,
+      );
       const filteredSession =
         boxFilter === null
           ? nextSession
           : (() => {
+              if (spacedRepetitionOrder === "repetition") {
+                // Within one box every card has the same weight, so the due index
+                // serves them least recently reviewed first.
+                const cardsById = new Map(
+                  nextSession.cardIds.map((cardId, index) => [
+                    cardId,
+                    nextSession.flashcards[index],
+                  ]),
+                );
+                const dueCardIds = takeDueCardIds(
+                  resolveDueIndex(
+                    spacedRepetitionDueIndexes.current,
+                    activeUserId,
+                    nextSession.cardProgressById,
+                  ),
+                  cardsById.size,
+                  {
+                    boxCount: spacedRepetitionBoxes,
+                    box: boxFilter,
+                    accept: (cardId) => cardsById.has(cardId),
+                  },
+                );
+                return {
+                  ...nextSession,
+                  flashcards: dueCardIds.map((cardId) => cardsById.get(cardId) as Flashcard),
+                  cardIds: dueCardIds,
+                  page: 0,
+                };
+              }
               const entries = nextSession.flashcards.map((card, index) => {
                 const cardId = nextSession.cardIds[index] ?? getFlashcardId(card);
-                const progress = normalizeSpacedRepetitionCardProgress(
-                  nextSession.cardProgressById[cardId],
-                );
                 return {
                   card,
                   cardId,
                   effectiveBox: getSpacedRepetitionEffectiveBox(
-                    progress,
+                    nextSession.cardProgressById[cardId],
                     spacedRepetitionBoxes,
                   ),
                 };
@@ -720,7 +928,9 @@ export const useSpacedRepetition = ({
     scanFlashcards,
     setIsFlashcardScanning,
     spacedRepetitionActiveUserId,
+    spacedRepetitionActiveUserState,
     spacedRepetitionBoxes,
+    spacedRepetitionLegacyCardIds,
     spacedRepetitionOrder,
     spacedRepetitionRepetitionStrength,
     spacedRepetitionUserStateById,
@@ -824,20 +1034,41 @@ export const useSpacedRepetition = ({
             }
           : session.completedPerDay;
 
+        const nextCardProgressById = {
+          ...session.cardProgressById,
+          [cardId]: nextProgress,
+        };
+        if (spacedRepetitionActiveUserId) {
+          advanceDueIndex(
+            spacedRepetitionDueIndexes.current.get(spacedRepetitionActiveUserId),
+            session.cardProgressById,
+            nextCardProgressById,
+            [cardId],
+          );
+          trackCardStateChanges(
+            spacedRepetitionCardStateChanges.current,
+            spacedRepetitionActiveUserId,
+            session.cardProgressById,
+            nextCardProgressById,
+            [cardId],
+          );
+        }
+
         return {
           ...session,
           cardIds,
           submissions: { ...session.submissions, [cardIndex]: true },
           selfGrades: nextSelfGrades,
-          cardProgressById: {
-            ...session.cardProgressById,
-            [cardId]: nextProgress,
-          },
+          cardProgressById: nextCardProgressById,
           completedPerDay: nextCompletedPerDay,
         };
       });
     },
-    [spacedRepetitionBoxes, updateActiveSpacedRepetitionSession],
+    [
+      spacedRepetitionActiveUserId,
+      spacedRepetitionBoxes,
+      updateActiveSpacedRepetitionSession,
+    ],
   );
 
   const handleSpacedRepetitionTextInputChange = useCallback(
@@ -1,9 +1,20 @@
-import { useCallback, useState } from "react";
-import { invoke } from "@tauri-apps/api/core";
+import { useCallback, useEffect, useRef, useState } from "react";
+import { Channel, invoke } from "@tauri-apps/api/core";
+import { listen } from "@tauri-apps/api/event";
 import { open } from "@tauri-apps/plugin-dialog";
 import { asErrorMessage } from "../../lib/errors";
 import { type LoadState } from "../../lib/types";
-import { type VaultFile } from "../../lib/tree";
+import {
+  applyTreeDelta,
+  applyVaultDelta,
+  decodeListing,
+  mergeVaultFiles,
+  patchTree,
+  type CompactListing,
+  type TreeNode,
+  type VaultDelta,
+  type VaultFile,
+} from "../../lib/tree";
 
 type LoadOptions = {
   persist: boolean;
@@ -17,11 +28,31 @@ type PickOptions = {
   onLoadFailed?: () => void;
 };
 
+export type VaultScanStats = {
+  files: number;
+  directories: number;
+  workers: number;
+  elapsed_ms: number;
+};
+
+type VaultScanBatch = {
+  scan_id: number;
+  listing: CompactListing;
+};
+
+type VaultScanSummary = {
+  scan_id: number;
+  truncated: boolean;
+  stats: VaultScanStats;
+};
+
 export type VaultSnapshot = {
   vaultPath: string | null;
   files: VaultFile[];
+  tree: TreeNode[];
   listState: LoadState;
   listError: string;
+  pendingScanId: number | null;
 };
 
 type UseVaultOptions = {
@@ -31,24 +62,107 @@ type UseVaultOptions = {
 export const useVault = ({ persistSettings }: UseVaultOptions) => {
   const [vaultPath, setVaultPath] = useState<string | null>(null);
   const [files, setFiles] = useState<VaultFile[]>([]);
+  // Patched alongside `files` by scan batches and watcher deltas, never rebuilt.
+  const [tree, setTree] = useState<TreeNode[]>([]);
   const [listState, setListState] = useState<LoadState>("idle");
   const [listError, setListError] = useState("");
+  const [scanStats, setScanStats] = useState<VaultScanStats | null>(null);
+  // Set while max_files_per_scan cut the listing short; continueScan resumes it.
+  const [pendingScanId, setPendingScanId] = useState<number | null>(null);
+  const activeScan = useRef<Channel<VaultScanBatch> | null>(null);
+  const [watcherActive, setWatcherActive] = useState(false);
+
+  useEffect(() => {
+    if (!vaultPath) {
+      setWatcherActive(false);
+      void invoke("unwatch_vault").catch(() => undefined);
+      return;
+    }
+    let disposed = false;
+    const unlisten = listen<VaultDelta>("vault-changed", (event) => {
+      if (disposed || event.payload.vault_path !== vaultPath) {
+        return;
+      }
+      setFiles((current) => applyVaultDelta(current, event.payload));
+      setTree((current) => applyTreeDelta(current, event.payload));
+    });
+    return () => {
+      disposed = true;
+      void unlisten.then((stop) => stop());
+    };
+  }, [vaultPath]);
+
+  const watchVault = useCallback(async (path: string) => {
+    try {
+      await invoke("watch_vault", { vaultPath: path });
+      setWatcherActive(true);
+    } catch (error) {
+      console.warn("Failed to watch vault", error);
+      setWatcherActive(false);
+    }
+  }, []);
+
+  // Runs a streaming scan command; batches are merged into `files` as they
+  // arrive, at most once per animation frame.
+  const streamScan = useCallback(
+    async (command: "start_vault_scan" | "continue_vault_scan", args: object) => {
+      const channel = new Channel<VaultScanBatch>();
+      activeScan.current = channel;
+      let buffered: VaultFile[] = [];
+      let frame: number | null = null;
+      const flush = () => {
+        frame = null;
+        if (activeScan.current !== channel || buffered.length === 0) {
+          return;
+        }
+        const batch = buffered;
+        buffered = [];
+        setFiles((current) => mergeVaultFiles(current, batch));
+        setTree((current) => patchTree(current, batch));
+      };
+      channel.onmessage = (batch) => {
+        buffered = buffered.concat(decodeListing(batch.listing));
+        if (frame === null) {
+          frame = requestAnimationFrame(flush);
+        }
+      };
+
+      const summary = await invoke<VaultScanSummary>(command, {
+        ...args,
+        onBatch: channel,
+      });
+      if (frame !== null) {
+        cancelAnimationFrame(frame);
+      }
+      flush();
+      if (activeScan.current === channel) {
+        setScanStats(summary.stats);
+        setPendingScanId(summary.truncated ? summary.scan_id : null);
+      }
+      return summary;
+    },
+    [],
+  );
 
   const takeSnapshot = useCallback(
     (): VaultSnapshot => ({
       vaultPath,
       files,
+      tree,
       listState,
       listError,
+      pendingScanId,
     }),
-    [files, listError, listState, vaultPath],
+    [files, listError, listState, pendingScanId, tree, vaultPath],
   );
 
   const restoreSnapshot = useCallback((snapshot: VaultSnapshot) => {
     setVaultPath(snapshot.vaultPath);
     setFiles(snapshot.files);
+    setTree(snapshot.tree);
     setListState(snapshot.listState);
     setListError(snapshot.listError);
+    setPendingScanId(snapshot.pendingScanId);
   }, []);
 
   const loadVault = useCallback(
@@ -56,13 +170,13 @@ export const useVault = ({ persistSettings }: UseVaultOptions) => {
       setListError("");
       setVaultPath(path);
       setFiles([]);
+      setTree([]);
+      setPendingScanId(null);
       setListState("loading");
       try {
-        const results = await invoke<VaultFile[]>("list_markdown_files", {
-          vaultPath: path,
-        });
-        setFiles(results);
+        await streamScan("start_vault_scan", { vaultPath: path });
         setListState("idle");
+        void watchVault(path);
         if (options.persist) {
           await persistSettings({ vaultPath: path });
         }
@@ -78,7 +192,7 @@ export const useVault = ({ persistSettings }: UseVaultOptions) => {
         return false;
       }
     },
-    [persistSettings],
+    [persistSettings, streamScan, watchVault],
   );
 
   const pickVault = useCallback(
@@ -121,21 +235,40 @@ export const useVault = ({ persistSettings }: UseVaultOptions) => {
       return;
     }
     setListError("");
+    setFiles([]);
+    setTree([]);
+    setPendingScanId(null);
     setListState("loading");
     try {
-      const results = await invoke<VaultFile[]>("list_markdown_files", {
-        vaultPath,
-      });
-      setFiles(results);
+      await streamScan("start_vault_scan", { vaultPath });
       setListState("idle");
+      void watchVault(vaultPath);
     } catch (error) {
       const message = asErrorMessage(error, "Vault konnte nicht neu gescannt werden.");
       setListError(message);
       setListState("error");
     }
-  }, [listState, vaultPath]);
+  }, [listState, streamScan, vaultPath, watchVault]);
+
+  const continueScan = useCallback(async () => {
+    if (pendingScanId === null || listState === "loading") {
+      return;
+    }
+    setListError("");
+    setListState("loading");
+    try {
+      await streamScan("continue_vault_scan", { scanId: pendingScanId });
+      setListState("idle");
+    } catch (error) {
+      const message = asErrorMessage(error, "Scan konnte nicht fortgesetzt werden.");
+      setListError(message);
+      setPendingScanId(null);
+      setListState("idle");
+    }
+  }, [listState, pendingScanId, streamScan]);
 
   return {
+    continueScan,
     files,
     listError,
     listState,
@@ -143,11 +276,14 @@ export const useVault = ({ persistSettings }: UseVaultOptions) => {
     pickVault,
     rescanVault,
     restoreSnapshot,
-    setFiles,
+    scanStats,
+    scanTruncated: pendingScanId !== null,
     setListError,
     setListState,
     setVaultPath,
     takeSnapshot,
+    tree,
     vaultPath,
+    watcherActive,
   };
 };
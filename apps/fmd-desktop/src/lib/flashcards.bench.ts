@@ -0,0 +1,69 @@
+import { bench, describe } from "vitest";
+import { parseFlashcards, reparseFlashcards } from "./flashcards";
+
+const repeat = (count: number, line: (index: number) => string) =>
+  Array.from({ length: count }, (_, index) => line(index)).join("\n");
+
+const multipleChoiceCard = (index: number) => `#card
+Question ${index}: which option is correct?
+a) First option
+b) Second option
+c) Third option
+d) Fourth option
+-b
+#`;
+
+const clozeCard = (index: number) => `#card
+Fill in the blanks ${index}
+The %%quick%% brown fox jumps over the \`lazy\` dog.
+${repeat(6, (line) => `Line ${line} with %%blank ${line}%% and a \`token${line}\`.`)}
+#`;
+
+const answerCard = (index: number) => `#card
+What does note ${index} explain?
+Answer: A longer explanation
+${repeat(8, (line) => `spanning several lines of prose, line ${line}.`)}
+#`;
+
+const trueFalseCard = (index: number) => `#card
+Statement ${index} one
+-wahr
+Statement ${index} two
+-falsch
+#`;
+
+const cardKinds = [multipleChoiceCard, clozeCard, answerCard, trueFalseCard];
+
+const largeFile = repeat(2000, (index) =>
+  [`## Section ${index}`, "Some notes between the cards.", cardKinds[index % 4](index)].join(
+    "\n\n",
+  ),
+);
+
+const largeCards = [
+  `#card\nLarge cloze\n${repeat(5000, (line) => `Row ${line}: %%value ${line}%% and \`drag${line}\``)}\n#`,
+  `#card\nLarge answer\nAnswer:\n${repeat(5000, (line) => `Paragraph line ${line} of the answer.`)}\n#`,
+  `#card\nLarge statements\n${repeat(2500, (line) => `Statement ${line}\n-${line % 2 ? "wahr" : "falsch"}`)}\n#`,
+].join("\n\n");
+
+// Saving a long note after editing one card in the middle.
+const parsedLargeFile = reparseFlashcards(largeFile);
+const editedLargeFile = largeFile.replace("Question 1000:", "Edited question 1000:");
+
+describe("parseFlashcards", () => {
+  bench("large file (2000 mixed cards)", () => {
+    parseFlashcards(largeFile);
+  });
+
+  bench("large cards (5000 lines each)", () => {
+    parseFlashcards(largeCards);
+  });
+
+  bench("edited large file, full parse", () => {
+    parseFlashcards(editedLargeFile);
+  });
+
+  bench("edited large file, reparseFlashcards", () => {
+    reparseFlashcards(editedLargeFile, parsedLargeFile);
+  });
+});
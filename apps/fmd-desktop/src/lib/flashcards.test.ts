@@ -1,5 +1,13 @@
 import { describe, expect, it } from "vitest";
-import { isDragAnswerMatch, isInputAnswerMatch, parseFlashcards } from "./flashcards";
+import {
+  createFlashcardId,
+  findFlashcardIdCollisions,
+  isDragAnswerMatch,
+  isInputAnswerMatch,
+  parseFlashcards,
+  reparseFlashcards,
+  type Flashcard,
+} from "./flashcards";
 
 describe("parseFlashcards", () => {
   it("parses a single card", () => {
@@ -314,6 +322,42 @@ a) Option`;
     expect(cards).toHaveLength(0);
   });
 
+  it("restarts at a #card that interrupts an unterminated card", () => {
+    const markdown = `#card
+Dropped question?
+a) Option
+#card
+Kept question?
+a) One
+-a
+#`;
+
+    const cards = parseFlashcards(markdown);
+
+    expect(cards).toHaveLength(1);
+    expect(cards[0].kind).toBe("multiple-choice");
+    if (cards[0].kind === "multiple-choice") {
+      expect(cards[0].question).toBe("Kept question?");
+    }
+  });
+
+  it("keeps inner blank lines of cloze text and drops the outer ones", () => {
+    const markdown = "#card\r\nGaps\r\n\r\nFirst %%one%%\r\n\r\n\r\nSecond `two`\r\n\r\n#";
+
+    const cards = parseFlashcards(markdown);
+
+    expect(cards).toHaveLength(1);
+    if (cards[0].kind === "cloze") {
+      expect(cards[0].segments).toEqual([
+        { type: "text", value: "First " },
+        { type: "blank", id: "blank-0", kind: "input", solution: "one" },
+        { type: "text", value: "\n\n\nSecond " },
+        { type: "blank", id: "blank-1", kind: "drag", solution: "two" },
+      ]);
+      expect(cards[0].detectedTypes).toEqual(["fill-blank", "assignment"]);
+    }
+  });
+
   it("parses cloze cards with %% blanks", () => {
     const markdown = `#card
 Define foreign key.
@@ -514,6 +558,27 @@ Empty blank.
     expect(cards).toHaveLength(0);
   });
 
+  it("stores the card ID on each card", () => {
+    const [card] = parseFlashcards("#card\nPick\na) A\nb) B\nc) C\n-c\n-a\n#");
+
+    // Same ID as the backend parser and tools/vault/flashcards.py; correct keys
+    // are sorted before hashing, so their order in the note does not matter.
+    expect(card.id).toBe("card-4679ed5ba455911a");
+    const { id: _id, ...withoutId } = card;
+    expect(createFlashcardId(withoutId as Flashcard)).toBe(card.id);
+  });
+
+  it("reports IDs shared by cards with different content", () => {
+    const [first, reordered] = parseFlashcards(
+      "#card\nPick\na) A\nb) B\n-b\n-a\n#\n#card\nPick\na) A\nb) B\n-a\n-b\n#",
+    );
+    expect(reordered.id).toBe(first.id);
+    expect(findFlashcardIdCollisions([first, reordered, first])).toEqual([]);
+
+    const other: Flashcard = { id: first.id, kind: "free-text", front: "Q", back: "A" };
+    expect(findFlashcardIdCollisions([first, reordered, other])).toEqual([first.id]);
+  });
+
   it("matches input blanks case-insensitively with trim", () => {
     expect(isInputAnswerMatch(" Atomic Values ", "atomic values")).toBe(true);
     expect(isInputAnswerMatch("Atomic", "atom")).toBe(false);
@@ -525,3 +590,39 @@ Empty blank.
     expect(isDragAnswerMatch("token", "Token")).toBe(false);
   });
 });
+
+describe("reparseFlashcards", () => {
+  const markdown = `#card
+First question?
+a) One
+-a
+#
+
+#card
+Second question?
+Answer: Two
+#
+
+#card
+First question?
+a) One
+-a
+#`;
+
+  it("matches parseFlashcards", () => {
+    expect(reparseFlashcards(markdown).cards).toEqual(parseFlashcards(markdown));
+  });
+
+  it("reuses the cards of unchanged blocks after an edit", () => {
+    const previous = reparseFlashcards(markdown);
+    const edited = markdown.replace("Answer: Two", "Answer: Three");
+
+    const next = reparseFlashcards(edited, previous);
+
+    expect(next.cards).toEqual(parseFlashcards(edited));
+    expect(next.cards[0]).toBe(previous.cards[0]);
+    expect(next.cards[1]).not.toBe(previous.cards[1]);
+    expect(next.cards[2]).toBe(previous.cards[2]);
+    expect(next.cards[2]).not.toBe(next.cards[0]);
+  });
+});
@@ -22,6 +22,9 @@ import { answerMarkers, falseTokens, trueTokens } from "./flashcardKeywords";
  * #
  *
  * Invalid cards (missing end marker, empty question, no options/blanks/tokens) are skipped.
+ *
+ * Vault scans parse in the backend (src-tauri/src/flashcards.rs), whose output must stay
+ * identical to this parser's; change both together.
  */
 export type FlashcardOption = {
   key: string;
@@ -76,6 +79,11 @@ export type FlashcardDetectedType =
   | "true-false";
 
 export type FlashcardMetadata = {
+  /**
+   * `createFlashcardId` of the card, computed once by the parser (or the backend's
+   * port) so sessions and stats never hash cards again.
+   */
+  id?: string;
   primaryType?: FlashcardDetectedType;
   detectedTypes?: FlashcardDetectedType[];
   isMixed?: boolean;
@@ -94,8 +102,10 @@ export const normalizeDragAnswer = (value: string) => value.trim();
 export const isDragAnswerMatch = (tokenValue: string, solution: string) =>
   normalizeDragAnswer(tokenValue) === normalizeDragAnswer(solution);
 
-const normalizeLines = (markdown: string) =>
-  markdown.replace(/\r\n?/g, "\n").split("\n");
+const normalizeNewlines = (markdown: string) =>
+  markdown.includes("\r") ? markdown.replace(/\r\n?/g, "\n") : markdown;
+
+const normalizeLines = (markdown: string) => normalizeNewlines(markdown).split("\n");
 
 const optionPattern = /^([A-Za-z])\)\s+(.*)$/;
 const markerPattern = /^-([A-Za-z])$/;
@@ -114,20 +124,71 @@ const normalizedAnswerMarkers = answerMarkers.map((marker) => ({
   normalized: normalizeKeyword(marker),
 }));
 
-const trimEmptyLines = (lines: string[]) => {
-  let start = 0;
-  let end = lines.length;
+const longestAnswerMarker = Math.max(
+  ...normalizedAnswerMarkers.map((marker) => marker.normalized.length),
+);
+
+type AnswerMarker = (typeof normalizedAnswerMarkers)[number];
+// Markers whose normalized form is ASCII, keyed by first character, for ASCII lines.
+const asciiAnswerMarkers = new Map<string, AnswerMarker[]>();
+normalizedAnswerMarkers.forEach((marker) => {
+  if (!/^[\x00-\x7f]+$/.test(marker.normalized)) {
+    return;
+  }
+  const initial = marker.normalized[0];
+  asciiAnswerMarkers.set(initial, [...(asciiAnswerMarkers.get(initial) ?? []), marker]);
+});
 
-  while (start < end && lines[start].trim() === "") {
-    start += 1;
+/**
+ * Each card line is trimmed and classified once by the lexer, and every card-kind
+ * detector (options, true/false items, answer marker, cloze blanks) consumes that
+ * classification as the line goes by, instead of re-walking the card per kind.
+ */
+type LineToken =
+  | { kind: "empty" }
+  | { kind: "option"; key: string; text: string }
+  | { kind: "marker"; key: string }
+  | { kind: "text" };
+
+const emptyToken: LineToken = { kind: "empty" };
+const textToken: LineToken = { kind: "text" };
+
+const tokenizeBodyLine = (trimmed: string): LineToken => {
+  if (!trimmed) {
+    return emptyToken;
   }
-  while (end > start && lines[end - 1].trim() === "") {
-    end -= 1;
+  // Cheap shape checks first; the patterns only run on likely candidates.
+  if (trimmed.charCodeAt(1) === 0x29) {
+    const optionMatch = optionPattern.exec(trimmed);
+    if (optionMatch) {
+      return { kind: "option", key: optionMatch[1].toLowerCase(), text: optionMatch[2].trim() };
+    }
+  } else if (trimmed.length === 2 && trimmed.charCodeAt(0) === 0x2d) {
+    const markerMatch = markerPattern.exec(trimmed);
+    if (markerMatch) {
+      return { kind: "marker", key: markerMatch[1].toLowerCase() };
+    }
   }
+  return textToken;
+};
 
-  return lines.slice(start, end);
+type ClozeState = {
+  segments: ClozeSegment[];
+  dragTokens: ClozeDragToken[];
+  blankIndex: number;
+  tokenIndex: number;
+  inFence: boolean;
+  started: boolean;
+  // Empty lines are only emitted once more text follows, which trims trailing ones.
+  pendingBreaks: number;
+  // Cleared by an empty input blank, which invalidates the whole cloze part.
+  valid: boolean;
+  hasInputBlanks: boolean;
+  hasDragBlanks: boolean;
 };
 
+const fencePattern = /^(```|~~~)/;
+
 const appendText = (segments: ClozeSegment[], text: string) => {
   if (!text) {
     return;
@@ -140,105 +201,101 @@ const appendText = (segments: ClozeSegment[], text: string) => {
   }
 };
 
-const parseClozeSegments = (lines: string[]) => {
-  const segments: ClozeSegment[] = [];
-  const dragTokens: ClozeDragToken[] = [];
-  let blankIndex = 0;
-  let tokenIndex = 0;
-  let inFence = false;
-  const fencePattern = /^(```|~~~)/;
-
-  const handleLine = (line: string) => {
-    let cursor = 0;
-
-    while (cursor < line.length) {
-      const nextInput = line.indexOf("%%", cursor);
-      const nextDrag = line.indexOf("`", cursor);
-      const nextMarker = Math.min(
-        nextInput === -1 ? Number.POSITIVE_INFINITY : nextInput,
-        nextDrag === -1 ? Number.POSITIVE_INFINITY : nextDrag,
-      );
-
-      if (!Number.isFinite(nextMarker)) {
-        appendText(segments, line.slice(cursor));
-        break;
-      }
-
-      if (nextMarker > cursor) {
-        appendText(segments, line.slice(cursor, nextMarker));
-      }
+const scanClozeBlanks = (state: ClozeState, line: string) => {
+  const { segments } = state;
+  let cursor = 0;
+
+  while (cursor < line.length) {
+    const nextInput = line.indexOf("%%", cursor);
+    const nextDrag = line.indexOf("`", cursor);
+    const nextMarker = Math.min(
+      nextInput === -1 ? Number.POSITIVE_INFINITY : nextInput,
+      nextDrag === -1 ? Number.POSITIVE_INFINITY : nextDrag,
+    );
+
+    if (!Number.isFinite(nextMarker)) {
+      appendText(segments, line.slice(cursor));
+      break;
+    }
 
-      if (nextMarker === nextInput) {
-        const end = line.indexOf("%%", nextInput + 2);
-        if (end === -1) {
-          appendText(segments, line.slice(nextInput));
-          break;
-        }
-        const rawSolution = line.slice(nextInput + 2, end);
-        const solution = rawSolution.trim();
-        if (!solution) {
-          return null;
-        }
-        segments.push({
-          type: "blank",
-          id: `blank-${blankIndex}`,
-          kind: "input",
-          solution,
-        });
-        blankIndex += 1;
-        cursor = end + 2;
-        continue;
-      }
+    if (nextMarker > cursor) {
+      appendText(segments, line.slice(cursor, nextMarker));
+    }
 
-      const end = line.indexOf("`", nextDrag + 1);
+    if (nextMarker === nextInput) {
+      const end = line.indexOf("%%", nextInput + 2);
       if (end === -1) {
-        appendText(segments, line.slice(nextDrag));
+        appendText(segments, line.slice(nextInput));
         break;
       }
-      const rawToken = line.slice(nextDrag + 1, end);
-      const value = rawToken.trim();
-      if (!value) {
-        appendText(segments, line.slice(nextDrag, end + 1));
-        cursor = end + 1;
-        continue;
+      const solution = line.slice(nextInput + 2, end).trim();
+      if (!solution) {
+        return false;
       }
       segments.push({
         type: "blank",
-        id: `blank-${blankIndex}`,
-        kind: "drag",
-        solution: value,
+        id: `blank-${state.blankIndex}`,
+        kind: "input",
+        solution,
       });
-      dragTokens.push({ id: `token-${tokenIndex}`, value });
-      blankIndex += 1;
-      tokenIndex += 1;
-      cursor = end + 1;
+      state.blankIndex += 1;
+      state.hasInputBlanks = true;
+      cursor = end + 2;
+      continue;
     }
 
-    return true;
-  };
-
-  const trimmedLines = trimEmptyLines(lines);
-  for (let lineIndex = 0; lineIndex < trimmedLines.length; lineIndex += 1) {
-    const line = trimmedLines[lineIndex];
-    const trimmed = line.trimStart();
-    if (fencePattern.test(trimmed)) {
-      inFence = !inFence;
-      appendText(segments, line);
-    } else if (inFence) {
-      appendText(segments, line);
-    } else {
-      const parsed = handleLine(line);
-      if (!parsed) {
-        return null;
-      }
+    const end = line.indexOf("`", nextDrag + 1);
+    if (end === -1) {
+      appendText(segments, line.slice(nextDrag));
+      break;
     }
-
-    if (lineIndex < trimmedLines.length - 1) {
-      appendText(segments, "\n");
+    const value = line.slice(nextDrag + 1, end).trim();
+    if (!value) {
+      appendText(segments, line.slice(nextDrag, end + 1));
+      cursor = end + 1;
+      continue;
     }
+    segments.push({
+      type: "blank",
+      id: `blank-${state.blankIndex}`,
+      kind: "drag",
+      solution: value,
+    });
+    state.dragTokens.push({ id: `token-${state.tokenIndex}`, value });
+    state.blankIndex += 1;
+    state.tokenIndex += 1;
+    state.hasDragBlanks = true;
+    cursor = end + 1;
   }
 
-  return { segments, dragTokens };
+  return true;
+};
+
+/** Feeds one cloze line (options and markers excluded; blank lines as ""). */
+const scanClozeLine = (state: ClozeState, line: string) => {
+  if (!state.valid) {
+    return;
+  }
+  if (!line) {
+    if (state.started) {
+      state.pendingBreaks += 1;
+    }
+    return;
+  }
+  if (state.started) {
+    appendText(state.segments, "\n".repeat(state.pendingBreaks + 1));
+  }
+  state.started = true;
+  state.pendingBreaks = 0;
+
+  if (fencePattern.test(line.trimStart())) {
+    state.inFence = !state.inFence;
+    appendText(state.segments, line);
+  } else if (state.inFence) {
+    appendText(state.segments, line);
+  } else if (!scanClozeBlanks(state, line)) {
+    state.valid = false;
+  }
 };
 
 const normalizeTrueFalseMarker = (value: string) => {
@@ -261,253 +318,431 @@ const normalizeTrueFalseMarker = (value: string) => {
   return null;
 };
 
-const parseTrueFalseItems = (lines: string[]) => {
-  const items: TrueFalseItem[] = [];
-
-  for (let index = 0; index < lines.length; index += 1) {
-    const question = lines[index].trim();
-    if (!question) {
-      continue;
-    }
-
-    let markerIndex = index + 1;
-    while (markerIndex < lines.length && lines[markerIndex].trim() === "") {
-      markerIndex += 1;
-    }
-    if (markerIndex >= lines.length) {
-      continue;
+/** `prefix` is lowercase ASCII. */
+const startsWithAsciiIgnoringCase = (value: string, prefix: string) => {
+  if (value.length < prefix.length) {
+    return false;
+  }
+  for (let index = 0; index < prefix.length; index += 1) {
+    const code = value.charCodeAt(index);
+    const lower = code >= 0x41 && code <= 0x5a ? code + 0x20 : code;
+    if (lower !== prefix.charCodeAt(index)) {
+      return false;
     }
+  }
+  return true;
+};
 
-    const marker = normalizeTrueFalseMarker(lines[markerIndex].trim());
-    if (!marker) {
-      continue;
-    }
+const findAnswerMarkerMatch = (line: string) => {
+  const trimmedLine = line.trimStart();
+  // ASCII normalizes to its lowercase, so NFKD is only needed when a non-ASCII
+  // character falls within marker length.
+  const limit = Math.min(trimmedLine.length, longestAnswerMarker);
+  let asciiLength = 0;
+  while (asciiLength < limit && trimmedLine.charCodeAt(asciiLength) < 0x80) {
+    asciiLength += 1;
+  }
+  let marker: AnswerMarker | undefined;
+  if (asciiLength === limit) {
+    marker = asciiAnswerMarkers
+      .get(trimmedLine.charAt(0).toLowerCase())
+      ?.find((candidate) => startsWithAsciiIgnoringCase(trimmedLine, candidate.normalized));
+  } else {
+    const normalizedLine = normalizeKeyword(trimmedLine);
+    marker = normalizedAnswerMarkers.find((candidate) =>
+      normalizedLine.startsWith(candidate.normalized),
+    );
+  }
+  if (!marker) {
+    return null;
+  }
+  const colonIndex = trimmedLine.indexOf(":");
+  const markerEndIndex = colonIndex >= 0 ? colonIndex + 1 : marker.raw.length;
+  return { trimmedLine, markerEndIndex };
+};
 
-    items.push({
-      id: `tf-${items.length}`,
-      question,
-      correct: marker,
-    });
-    index = markerIndex;
+const pushUnique = (items: string[], value: string) => {
+  if (!items.includes(value)) {
+    items.push(value);
   }
+};
 
-  return items;
+type CardDraft = {
+  /** Line index of the question (first non-empty line), -1 until seen. */
+  questionIndex: number;
+  question: string;
+  options: FlashcardOption[];
+  correctKeys: string[];
+  trueFalseItems: TrueFalseItem[];
+  /** Statement still waiting for its `-wahr`/`-falsch` line. */
+  pendingStatement: string | null;
+  /** Line index of the first answer marker, -1 if none yet. */
+  answerIndex: number;
+  inlineAnswer: string;
+  cloze: ClozeState;
 };
 
-const findAnswerMarkerMatch = (line: string) => {
-  const trimmedLine = line.trimStart();
-  const normalizedLine = normalizeKeyword(trimmedLine);
-  for (const marker of normalizedAnswerMarkers) {
-    if (normalizedLine.startsWith(marker.normalized)) {
-      const colonIndex = trimmedLine.indexOf(":");
-      const markerEndIndex = colonIndex >= 0 ? colonIndex + 1 : marker.raw.length;
-      return { trimmedLine, markerEndIndex };
+const createCardDraft = (): CardDraft => ({
+  questionIndex: -1,
+  question: "",
+  options: [],
+  correctKeys: [],
+  trueFalseItems: [],
+  pendingStatement: null,
+  answerIndex: -1,
+  inlineAnswer: "",
+  cloze: {
+    segments: [],
+    dragTokens: [],
+    blankIndex: 0,
+    tokenIndex: 0,
+    inFence: false,
+    started: false,
+    pendingBreaks: 0,
+    valid: true,
+    hasInputBlanks: false,
+    hasDragBlanks: false,
+  },
+});
+
+/** True/false and answer detection run over the question and every body line. */
+const scanContentLine = (draft: CardDraft, index: number, raw: string, trimmed: string) => {
+  const statement = draft.pendingStatement;
+  const correct = statement === null ? null : normalizeTrueFalseMarker(trimmed);
+  if (statement !== null && correct) {
+    draft.trueFalseItems.push({
+      id: `tf-${draft.trueFalseItems.length}`,
+      question: statement,
+      correct,
+    });
+    draft.pendingStatement = null;
+  } else {
+    draft.pendingStatement = trimmed;
+  }
+
+  if (draft.answerIndex === -1) {
+    const match = findAnswerMarkerMatch(raw);
+    if (match) {
+      draft.answerIndex = index;
+      draft.inlineAnswer = match.trimmedLine.slice(match.markerEndIndex).trimStart();
     }
   }
-  return null;
 };
 
-const findAnswerMarkerLine = (lines: string[]) => {
-  for (let index = 0; index < lines.length; index += 1) {
-    const match = findAnswerMarkerMatch(lines[index] ?? "");
-    if (match) {
-      return { index, match };
+const scanCardLine = (draft: CardDraft, index: number, raw: string, trimmed: string) => {
+  if (draft.questionIndex === -1) {
+    if (trimmed) {
+      draft.questionIndex = index;
+      draft.question = trimmed;
+      scanContentLine(draft, index, raw, trimmed);
     }
+    return;
   }
-  return null;
+
+  const token = tokenizeBodyLine(trimmed);
+  switch (token.kind) {
+    case "empty":
+      scanClozeLine(draft.cloze, "");
+      return;
+    case "option":
+      if (token.text) {
+        draft.options.push({ key: token.key, text: token.text });
+      }
+      break;
+    case "marker":
+      pushUnique(draft.correctKeys, token.key);
+      break;
+    case "text":
+      scanClozeLine(draft.cloze, raw);
+      break;
+  }
+  scanContentLine(draft, index, raw, trimmed);
 };
 
-const splitAnswerCard = (lines: string[]) => {
-  const markerInfo = findAnswerMarkerLine(lines);
-  if (!markerInfo) {
+const splitAnswerCard = (draft: CardDraft, lines: string[], endIndex: number) => {
+  if (draft.answerIndex === -1) {
     return null;
   }
-  const frontLines = trimEmptyLines(lines.slice(0, markerInfo.index));
-  const inlineAnswer = markerInfo.match.trimmedLine
-    .slice(markerInfo.match.markerEndIndex)
-    .trimStart();
-  const backLines = [inlineAnswer, ...lines.slice(markerInfo.index + 1)];
-  const normalizedFront = trimEmptyLines(frontLines).join("\n").trim();
-  const normalizedBack = trimEmptyLines(backLines).join("\n").trim();
-  if (!normalizedFront || !normalizedBack) {
+  // Joining and trimming drops the blank edge lines as well.
+  const front = lines.slice(draft.questionIndex, draft.answerIndex).join("\n").trim();
+  const back = [draft.inlineAnswer, ...lines.slice(draft.answerIndex + 1, endIndex)]
+    .join("\n")
+    .trim();
+  if (!front || !back) {
     return null;
   }
-  return {
-    front: normalizedFront,
-    back: normalizedBack,
-  };
+  return { front, back };
 };
 
-const pushUnique = (items: string[], value: string) => {
-  if (!items.includes(value)) {
-    items.push(value);
+/** 32-bit FNV-1a over UTF-16 code units, in hex. Only legacy card IDs use it. */
+export const hashString = (value: string) => {
+  let hash = 2166136261;
+  for (let index = 0; index < value.length; index += 1) {
+    hash ^= value.charCodeAt(index);
+    hash = Math.imul(hash, 16777619);
   }
+  return (hash >>> 0).toString(16);
 };
 
-export const parseFlashcards = (markdown: string): Flashcard[] => {
-  const lines = normalizeLines(markdown);
-  const cards: Flashcard[] = [];
-  let index = 0;
+/**
+ * 64-bit FNV-1a over UTF-16 code units, as 16 hex digits. The hash is kept in four
+ * 16-bit limbs so it runs on plain numbers; the prime is 2^40 + 435.
+ */
+export const hashString64 = (value: string) => {
+  let h0 = 0x2325;
+  let h1 = 0x8422;
+  let h2 = 0x9ce4;
+  let h3 = 0xcbf2;
+  for (let index = 0; index < value.length; index += 1) {
+    h0 ^= value.charCodeAt(index);
+    const t0 = h0 * 435;
+    const t1 = h1 * 435 + (t0 >>> 16);
+    const t2 = h2 * 435 + (h0 << 8) + (t1 >>> 16);
+    h3 = (h3 * 435 + (h1 << 8) + (t2 >>> 16)) & 0xffff;
+    h2 = t2 & 0xffff;
+    h1 = t1 & 0xffff;
+    h0 = t0 & 0xffff;
+  }
+  return [h3, h2, h1, h0].map((limb) => limb.toString(16).padStart(4, "0")).join("");
+};
 
-  while (index < lines.length) {
-    const line = lines[index].trim();
-    if (line !== "#card") {
-      index += 1;
-      continue;
-    }
+const getFlashcardIdentityPayload = (card: Flashcard) => {
+  if (card.kind === "multiple-choice") {
+    return {
+      kind: card.kind,
+      question: card.question,
+      options: card.options,
+      correctKeys: [...card.correctKeys].sort((a, b) => a.localeCompare(b)),
+    };
+  }
 
-    const cardLines: string[] = [];
-    let foundEnd = false;
+  if (card.kind === "true-false") {
+    return {
+      kind: card.kind,
+      items: card.items,
+    };
+  }
 
-    index += 1;
+  if (card.kind === "free-text") {
+    return {
+      kind: card.kind,
+      front: card.front,
+      back: card.back,
+    };
+  }
 
-    while (index < lines.length) {
-      const trimmed = lines[index].trim();
-      if (trimmed === "#") {
-        foundEnd = true;
-        index += 1;
-        break;
-      }
-      if (trimmed === "#card") {
-        break;
-      }
-      cardLines.push(lines[index]);
-      index += 1;
-    }
+  return {
+    kind: card.kind,
+    question: card.question,
+    segments: card.segments,
+    dragTokens: card.dragTokens,
+  };
+};
 
-    if (!foundEnd) {
-      continue;
-    }
+/**
+ * The ID spaced repetition progress is keyed by, a 64-bit hash of the card's
+ * content. Parsers store it on each card as `id` (see `FlashcardMetadata`).
+ */
+export const createFlashcardId = (card: Flashcard) =>
+  `card-${hashString64(JSON.stringify(getFlashcardIdentityPayload(card)))}`;
 
-    const questionIndex = cardLines.findIndex((entry) => entry.trim() !== "");
-    if (questionIndex === -1) {
-      continue;
+/** The 32-bit ID cards had before `createFlashcardId` (spaced repetition schema 1). */
+export const createLegacyFlashcardId = (card: Flashcard) =>
+  `card-${hashString(JSON.stringify(getFlashcardIdentityPayload(card)))}`;
+
+/**
+ * IDs shared by cards with different content, which would share their spaced
+ * repetition progress. Contents are only compared for cards whose IDs match, so
+ * this costs one map lookup per card.
+ */
+export const findFlashcardIdCollisions = (cards: Flashcard[]) => {
+  const firstCardById = new Map<string, Flashcard>();
+  const collisions = new Set<string>();
+  for (const card of cards) {
+    const cardId = card.id ?? createFlashcardId(card);
+    const first = firstCardById.get(cardId);
+    if (!first) {
+      firstCardById.set(cardId, card);
+    } else if (
+      JSON.stringify(getFlashcardIdentityPayload(first)) !==
+      JSON.stringify(getFlashcardIdentityPayload(card))
+    ) {
+      collisions.add(cardId);
     }
-    const question = cardLines[questionIndex].trim();
-    const bodyLines = cardLines.slice(questionIndex + 1);
-    const contentLines = cardLines.slice(questionIndex);
-
-    const options: FlashcardOption[] = [];
-    const correctKeys: string[] = [];
-    const clozeLines: string[] = [];
-
-    bodyLines.forEach((rawLine) => {
-      const trimmed = rawLine.trim();
-      if (!trimmed) {
-        clozeLines.push("");
-        return;
-      }
+  }
+  return [...collisions];
+};
 
-      const optionMatch = trimmed.match(optionPattern);
-      if (optionMatch) {
-        const text = optionMatch[2].trim();
-        if (text) {
-          options.push({
-            key: optionMatch[1].toLowerCase(),
-            text,
-          });
-        }
-        return;
-      }
+const buildCard = (draft: CardDraft, lines: string[], endIndex: number): Flashcard | null => {
+  if (draft.questionIndex === -1) {
+    return null;
+  }
+  const { question, options, correctKeys, trueFalseItems, cloze } = draft;
 
-      const markerMatch = trimmed.match(markerPattern);
-      if (markerMatch) {
-        pushUnique(correctKeys, markerMatch[1].toLowerCase());
-        return;
-      }
+  const detectedTypes: FlashcardDetectedType[] = [];
+  if (options.length > 0) {
+    detectedTypes.push("multiple-choice");
+  }
+  if (trueFalseItems.length > 0) {
+    detectedTypes.push("true-false");
+  }
+  const answerCard = splitAnswerCard(draft, lines, endIndex);
+  if (answerCard) {
+    detectedTypes.push("qa");
+  }
+  const hasInputBlanks = cloze.valid && cloze.hasInputBlanks;
+  const hasDragBlanks = cloze.valid && cloze.hasDragBlanks;
+  if (hasInputBlanks) {
+    detectedTypes.push("fill-blank");
+  }
+  if (hasDragBlanks) {
+    detectedTypes.push("assignment");
+  }
+  const isMixed = detectedTypes.length >= 2;
 
-      clozeLines.push(rawLine);
-    });
+  if (options.length > 0) {
+    return {
+      kind: "multiple-choice",
+      question,
+      options,
+      correctKeys,
+      primaryType: "multiple-choice",
+      detectedTypes,
+      isMixed,
+    };
+  }
 
-    const detectedTypes: FlashcardDetectedType[] = [];
-    if (options.length > 0) {
-      pushUnique(detectedTypes, "multiple-choice");
-    }
+  if (trueFalseItems.length > 0) {
+    return {
+      kind: "true-false",
+      items: trueFalseItems,
+      primaryType: "true-false",
+      detectedTypes,
+      isMixed,
+    };
+  }
 
-    const trueFalseItems = parseTrueFalseItems(cardLines.slice(questionIndex));
-    if (trueFalseItems.length > 0) {
-      pushUnique(detectedTypes, "true-false");
-    }
+  if (answerCard) {
+    return {
+      kind: "free-text",
+      ...answerCard,
+      primaryType: "qa",
+      detectedTypes,
+      isMixed,
+    };
+  }
 
-    const answerCard = splitAnswerCard(contentLines);
-    if (answerCard) {
-      pushUnique(detectedTypes, "qa");
-    }
+  if (hasInputBlanks || hasDragBlanks) {
+    return {
+      kind: "cloze",
+      question,
+      segments: cloze.segments,
+      dragTokens: cloze.dragTokens,
+      primaryType: hasInputBlanks ? "fill-blank" : "assignment",
+      detectedTypes,
+      isMixed,
+    };
+  }
 
-    const parsed = parseClozeSegments(clozeLines);
-    let hasInputBlanks = false;
-    let hasDragBlanks = false;
-    if (parsed) {
-      parsed.segments.forEach((segment) => {
-        if (segment.type !== "blank") {
-          return;
-        }
-        if (segment.kind === "input") {
-          hasInputBlanks = true;
-        } else {
-          hasDragBlanks = true;
-        }
-      });
-    }
-    if (hasInputBlanks) {
-      pushUnique(detectedTypes, "fill-blank");
-    }
-    if (hasDragBlanks) {
-      pushUnique(detectedTypes, "assignment");
-    }
-    const isMixed = detectedTypes.length >= 2;
-
-    if (options.length > 0) {
-      cards.push({
-        kind: "multiple-choice",
-        question,
-        options,
-        correctKeys,
-        primaryType: "multiple-choice",
-        detectedTypes,
-        isMixed,
-      });
+  return null;
+};
+
+const finishCard = (draft: CardDraft, lines: string[], endIndex: number): Flashcard | null => {
+  const card = buildCard(draft, lines, endIndex);
+  return card && { id: createFlashcardId(card), ...card };
+};
+
+export const parseFlashcards = (markdown: string): Flashcard[] => {
+  const lines = normalizeLines(markdown);
+  const cards: Flashcard[] = [];
+  let draft: CardDraft | null = null;
+
+  for (let index = 0; index < lines.length; index += 1) {
+    const raw = lines[index];
+    const trimmed = raw.trim();
+    if (trimmed === "#card") {
+      // A new `#card` before the `#` end marker drops the unterminated card.
+      draft = createCardDraft();
       continue;
     }
-
-    if (trueFalseItems.length > 0) {
-      cards.push({
-        kind: "true-false",
-        items: trueFalseItems,
-        primaryType: "true-false",
-        detectedTypes,
-        isMixed,
-      });
+    if (!draft) {
       continue;
     }
-
-    if (answerCard) {
-      cards.push({
-        kind: "free-text",
-        ...answerCard,
-        primaryType: "qa",
-        detectedTypes,
-        isMixed,
-      });
+    if (trimmed === "#") {
+      const card = finishCard(draft, lines, index);
+      if (card) {
+        cards.push(card);
+      }
+      draft = null;
       continue;
     }
+    scanCardLine(draft, index, raw, trimmed);
+  }
 
-    if (!parsed) {
-      continue;
+  return cards;
+};
+
+/**
+ * Cards of one note plus what `reparseFlashcards` needs to reuse them: the cards
+ * produced by each `#card` block, keyed by the block's text.
+ */
+export type ParsedFlashcards = {
+  cards: Flashcard[];
+  blocks: Map<string, (Flashcard | null)[]>;
+};
+
+/**
+ * Terminated `#card` blocks of `text` (newlines already normalized), from the
+ * `#card` line through its `#` line. Only lines containing `#` are inspected.
+ */
+const findCardBlocks = (text: string) => {
+  const blocks: string[] = [];
+  let blockStart = -1;
+  let hashIndex = text.indexOf("#");
+
+  while (hashIndex !== -1) {
+    const lineStart = text.lastIndexOf("\n", hashIndex) + 1;
+    const newlineIndex = text.indexOf("\n", hashIndex);
+    const lineEnd = newlineIndex === -1 ? text.length : newlineIndex;
+    const trimmed = text.slice(lineStart, lineEnd).trim();
+    if (trimmed === "#card") {
+      blockStart = lineStart;
+    } else if (trimmed === "#" && blockStart !== -1) {
+      blocks.push(text.slice(blockStart, lineEnd));
+      blockStart = -1;
     }
-    if (hasInputBlanks || hasDragBlanks) {
-      const clozePrimaryType = hasInputBlanks ? "fill-blank" : "assignment";
-      cards.push({
-        kind: "cloze",
-        question,
-        segments: parsed.segments,
-        dragTokens: parsed.dragTokens,
-        primaryType: clozePrimaryType,
-        detectedTypes,
-        isMixed,
-      });
+    hashIndex = newlineIndex === -1 ? -1 : text.indexOf("#", newlineIndex);
+  }
+
+  return blocks;
+};
+
+/**
+ * Same cards as `parseFlashcards`, but blocks whose text is unchanged since
+ * `previous` keep their `Flashcard` objects (and with them their card IDs), so
+ * after an edit only the touched blocks are parsed and hashed again.
+ */
+export const reparseFlashcards = (
+  markdown: string,
+  previous?: ParsedFlashcards | null,
+): ParsedFlashcards => {
+  const cards: Flashcard[] = [];
+  const blocks = new Map<string, (Flashcard | null)[]>();
+
+  for (const block of findCardBlocks(normalizeNewlines(markdown))) {
+    const parsed = blocks.get(block) ?? [];
+    // Identical blocks each keep their own previous card, in order.
+    const reusable = previous?.blocks.get(block);
+    const card =
+      reusable && parsed.length < reusable.length
+        ? reusable[parsed.length]
+        : (parseFlashcards(block)[0] ?? null);
+    parsed.push(card);
+    blocks.set(block, parsed);
+    if (card) {
+      cards.push(card);
     }
   }
 
-  return cards;
+  return { cards, blocks };
 };
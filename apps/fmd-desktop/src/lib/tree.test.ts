@@ -0,0 +1,180 @@
+import { describe, expect, it } from "vitest";
+import {
+  applyTreeDelta,
+  applyVaultDelta,
+  buildTree,
+  decodeListing,
+  mergeVaultFiles,
+  patchTree,
+  type CompactListing,
+  type TreeNode,
+  type VaultDelta,
+  type VaultFile,
+} from "./tree";
+
+const file = (relativePath: string): VaultFile => ({
+  path: `/vault/${relativePath}`,
+  relative_path: relativePath,
+});
+
+const delta = (changes: Partial<VaultDelta>): VaultDelta => ({
+  vault_path: "/vault",
+  added: [],
+  removed: [],
+  renamed: [],
+  changed: [],
+  ...changes,
+});
+
+const child = (nodes: TreeNode[], name: string) => {
+  const node = nodes.find((entry) => entry.name === name);
+  if (!node) {
+    throw new Error(`missing ${name}`);
+  }
+  return node;
+};
+
+const files = [
+  "zeta.md",
+  "Alpha/one.md",
+  "Alpha/Nested/deep.md",
+  "beta/two.md",
+  "beta/a.md",
+  "Alpha/Nested/Deeper/deepest.md",
+  "root.md",
+].map(file);
+
+const sorted = (list: VaultFile[]) =>
+  [...list].sort((a, b) =>
+    a.relative_path < b.relative_path ? -1 : a.relative_path > b.relative_path ? 1 : 0,
+  );
+
+describe("patchTree", () => {
+  it("builds the same tree from batches in any order", () => {
+    const batches = [files.slice(4), files.slice(0, 2), files.slice(2, 4)];
+
+    const tree = batches.reduce((nodes, batch) => patchTree(nodes, batch), [] as TreeNode[]);
+    const list = batches.reduce((list, batch) => mergeVaultFiles(list, batch), [] as VaultFile[]);
+
+    expect(tree).toEqual(buildTree(files));
+    expect(list).toEqual(sorted(files));
+    expect(tree.map((node) => node.name)).toEqual(["Alpha", "beta", "root.md", "zeta.md"]);
+  });
+
+  it("prunes directories a removal leaves empty", () => {
+    const tree = buildTree(files);
+
+    const next = patchTree(tree, [], ["Alpha/Nested/Deeper/deepest.md", "Alpha/Nested/deep.md"]);
+
+    const remaining = files.filter((entry) => !entry.relative_path.includes("Nested"));
+    expect(next).toEqual(buildTree(remaining));
+    expect(child(next, "Alpha").children?.map((node) => node.name)).toEqual(["one.md"]);
+    expect(patchTree(next, [], ["Alpha/one.md", "beta/a.md", "beta/two.md"])).toEqual(
+      buildTree(["zeta.md", "root.md"].map(file)),
+    );
+  });
+
+  it("replaces a file that is added again", () => {
+    const tree = buildTree(files);
+    const moved = { path: "/elsewhere/beta/a.md", relative_path: "beta/a.md" };
+
+    const next = patchTree(tree, [moved]);
+
+    const beta = child(next, "beta").children ?? [];
+    expect(beta.map((node) => node.name)).toEqual(["a.md", "two.md"]);
+    expect(child(beta, "a.md").fullPath).toBe(moved.path);
+  });
+
+  it("keeps the identity of untouched subtrees", () => {
+    const tree = buildTree(files);
+
+    const next = patchTree(tree, [file("beta/three.md")]);
+
+    expect(child(next, "Alpha")).toBe(child(tree, "Alpha"));
+    expect(child(next, "zeta.md")).toBe(child(tree, "zeta.md"));
+    expect(child(next, "beta")).not.toBe(child(tree, "beta"));
+    expect(child(tree, "beta").children).toHaveLength(2);
+    expect(patchTree(tree, [], [])).toBe(tree);
+  });
+});
+
+describe("applyTreeDelta", () => {
+  it("moves a file renamed across directories", () => {
+    const tree = buildTree(files);
+    const change = delta({
+      renamed: [{ from: "Alpha/Nested/Deeper/deepest.md", to: file("beta/deepest.md") }],
+    });
+
+    const next = applyTreeDelta(tree, change);
+    const list = applyVaultDelta(sorted(files), change);
+
+    expect(next).toEqual(buildTree(list));
+    expect(list.map((entry) => entry.relative_path)).toEqual([
+      "Alpha/Nested/deep.md",
+      "Alpha/one.md",
+      "beta/a.md",
+      "beta/deepest.md",
+      "beta/two.md",
+      "root.md",
+      "zeta.md",
+    ]);
+    const nested = child(child(next, "Alpha").children ?? [], "Nested");
+    expect(nested.children?.map((node) => node.name)).toEqual(["deep.md"]);
+  });
+});
+
+describe("applyVaultDelta", () => {
+  it("lists a re-added file once", () => {
+    const list = sorted(files);
+
+    const next = applyVaultDelta(list, delta({ added: [file("beta/a.md")] }));
+
+    expect(next).toEqual(list);
+    expect(next).not.toBe(list);
+  });
+
+  it("returns the list itself when nothing was added or removed", () => {
+    const list = sorted(files);
+
+    expect(applyVaultDelta(list, delta({ changed: [file("root.md")] }))).toBe(list);
+  });
+});
+
+describe("decodeListing", () => {
+  // What `CompactListing::new` in src-tauri/src/lib.rs sends for these files,
+  // whether or not the vault root ends with a separator.
+  const relativePaths = ["top.md", "a/notes/x.md", "b/notes/x.md", "a/notes/deep/x.md"];
+  const listing = (root: string, separator: string): CompactListing => ({
+    root,
+    separator,
+    names: ["", "top.md", "a", "notes", "x.md", "b", "deep"],
+    dirs: [
+      [0, 0],
+      [0, 2],
+      [1, 3],
+      [0, 5],
+      [3, 3],
+      [2, 6],
+    ],
+    files: [
+      [0, 1],
+      [2, 4],
+      [4, 4],
+      [5, 4],
+    ],
+  });
+
+  it("restores nested paths and names shared across directories", () => {
+    expect(decodeListing(listing("/vault/", "/"))).toEqual(relativePaths.map(file));
+  });
+
+  it("joins with the separator of the scanning platform", () => {
+    const decoded = decodeListing(listing("C:\\vault\\", "\\"));
+
+    expect(decoded.map((entry) => entry.relative_path)).toEqual(
+      relativePaths.map((path) => path.replace(/\//g, "\\")),
+    );
+    expect(decoded[3].path).toBe("C:\\vault\\a\\notes\\deep\\x.md");
+    expect(buildTree(decoded).map((node) => node.name)).toEqual(["a", "b", "top.md"]);
+  });
+});
@@ -14,75 +14,273 @@ export type TreeNode = {
   fullPath?: string;
 };
 
-export const buildTree = (files: VaultFile[]): TreeNode[] => {
+// Wire format of scan listings: the vault root is sent once, `dirs[0]` is the
+// root and every other directory is [parent, name], every file [dir, name],
+// indexing `dirs` and the interned `names`. Parents precede their children.
+export type CompactListing = {
+  root: string;
+  separator: string;
+  names: string[];
+  dirs: [number, number][];
+  files: [number, number][];
+};
+
+export const decodeListing = (listing: CompactListing): VaultFile[] => {
+  const { root, separator, names, dirs } = listing;
+  const joinName = (parent: string, name: number) =>
+    parent ? parent + separator + names[name] : names[name];
+  const dirPaths: string[] = new Array(dirs.length);
+  dirPaths[0] = "";
+  for (let index = 1; index < dirs.length; index += 1) {
+    const [parent, name] = dirs[index];
+    dirPaths[index] = joinName(dirPaths[parent], name);
+  }
+  return listing.files.map(([dir, name]) => {
+    const relative = joinName(dirPaths[dir], name);
+    return { path: root + relative, relative_path: relative };
+  });
+};
+
+const compareRelativePath = (a: VaultFile, b: VaultFile) =>
+  a.relative_path < b.relative_path ? -1 : a.relative_path > b.relative_path ? 1 : 0;
+
+// Merges a batch of scanned files into an already sorted list (by relative path).
+export const mergeVaultFiles = (
+  sorted: VaultFile[],
+  batch: VaultFile[],
+): VaultFile[] => {
+  const incoming = [...batch].sort(compareRelativePath);
+  const merged: VaultFile[] = [];
+  let left = 0;
+  let right = 0;
+  while (left < sorted.length && right < incoming.length) {
+    if (compareRelativePath(sorted[left], incoming[right]) <= 0) {
+      merged.push(sorted[left]);
+      left += 1;
+    } else {
+      merged.push(incoming[right]);
+      right += 1;
+    }
+  }
+  return merged.concat(sorted.slice(left), incoming.slice(right));
+};
+
+export type VaultDelta = {
+  vault_path: string;
+  added: VaultFile[];
+  removed: string[];
+  renamed: { from: string; to: VaultFile }[];
+  changed: VaultFile[];
+};
+
+// Applies a watcher delta to a sorted file list; `changed` files keep their place.
+export const applyVaultDelta = (sorted: VaultFile[], delta: VaultDelta): VaultFile[] => {
+  const gone = new Set([...delta.removed, ...delta.renamed.map((entry) => entry.from)]);
+  const added = [...delta.added, ...delta.renamed.map((entry) => entry.to)];
+  if (gone.size === 0 && added.length === 0) {
+    return sorted;
+  }
+  const present = new Set(added.map((file) => file.relative_path));
+  const kept = sorted.filter(
+    (file) => !gone.has(file.relative_path) && !present.has(file.relative_path),
+  );
+  return mergeVaultFiles(kept, added);
+};
+
+// Sibling order of the tree: directories first, then by name. A shared
+// collator is much cheaper than `localeCompare` on large directories.
+const nameCollator = new Intl.Collator();
+
+type NodeKey = Pick<TreeNode, "type" | "name">;
+
+const compareNodes = (a: NodeKey, b: TreeNode) => {
+  if (a.type !== b.type) {
+    return a.type === "dir" ? -1 : 1;
+  }
+  return nameCollator.compare(a.name, b.name);
+};
+
+const childKey = (type: TreeNode["type"], name: string) => `${type}:${name}`;
+
+const splitTreePath = (relativePath: string) => {
+  const path = normalizeRelativePath(relativePath)
+    .split("/")
+    .filter(Boolean)
+    .join("/");
+  const slash = path.lastIndexOf("/");
+  return {
+    path,
+    parent: slash < 0 ? "" : path.slice(0, slash),
+    name: path.slice(slash + 1),
+  };
+};
+
+const parentPath = (path: string) => {
+  const slash = path.lastIndexOf("/");
+  return slash < 0 ? "" : path.slice(0, slash);
+};
+
+const pathDepth = (path: string) => (path ? path.split("/").length : 0);
+
+// First index at or after `from` whose node does not sort before `probe`.
+const lowerBound = (
+  nodes: TreeNode[],
+  probe: NodeKey,
+  from = 0,
+) => {
+  let low = from;
+  let high = nodes.length;
+  while (low < high) {
+    const middle = (low + high) >> 1;
+    if (compareNodes(probe, nodes[middle]) > 0) {
+      low = middle + 1;
+    } else {
+      high = middle;
+    }
+  }
+  return low;
+};
+
+// Index of the sibling with exactly this type and name, starting the scan at
+// its lower bound: the collator may rank distinct names equal.
+const findSibling = (
+  nodes: TreeNode[],
+  probe: NodeKey,
+  from = 0,
+) => {
+  for (let index = lowerBound(nodes, probe, from); index < nodes.length; index += 1) {
+    const node = nodes[index];
+    if (compareNodes(probe, node) !== 0) {
+      break;
+    }
+    if (node.name === probe.name) {
+      return index;
+    }
+  }
+  return -1;
+};
+
+type DirDraft = {
+  node: TreeNode;
+  added: Map<string, TreeNode>;
+  removed: Set<string>;
+};
+
+// Returns a new tree with `added` files inserted and `removed` relative paths
+// (files) taken out; directories left empty are pruned. Only the directories
+// on touched paths are copied, untouched subtrees keep their identity, and
+// each touched directory is merged once, so its children stay sorted without
+// re-sorting the tree.
+export const patchTree = (
+  nodes: TreeNode[],
+  added: VaultFile[],
+  removed: string[] = [],
+): TreeNode[] => {
+  if (added.length === 0 && removed.length === 0) {
+    return nodes;
+  }
   const root: TreeNode = {
     name: "__root__",
     path: "",
     type: "dir",
-    children: [],
+    children: [...nodes],
+  };
+  const drafts = new Map<string, DirDraft>([
+    ["", { node: root, added: new Map(), removed: new Set() }],
+  ]);
+
+  const draftDir = (path: string, create: boolean): DirDraft | null => {
+    const existing = drafts.get(path);
+    if (existing) {
+      return existing;
+    }
+    const parent = draftDir(parentPath(path), create);
+    if (!parent) {
+      return null;
+    }
+    const name = path.slice(path.lastIndexOf("/") + 1);
+    const siblings = parent.node.children ?? [];
+    const index = findSibling(siblings, { type: "dir", name });
+    let node: TreeNode;
+    if (index >= 0) {
+      node = { ...siblings[index], children: [...(siblings[index].children ?? [])] };
+      siblings[index] = node;
+    } else if (create) {
+      node = { name, path, type: "dir", children: [] };
+      parent.added.set(childKey("dir", name), node);
+    } else {
+      return null;
+    }
+    const draft = { node, added: new Map(), removed: new Set<string>() };
+    drafts.set(path, draft);
+    return draft;
   };
 
-  for (const file of files) {
-    const relative = normalizeRelativePath(file.relative_path);
-    const parts = relative.split("/").filter(Boolean);
-    if (parts.length === 0) {
+  for (const relativePath of removed) {
+    const { path, parent, name } = splitTreePath(relativePath);
+    if (path) {
+      draftDir(parent, false)?.removed.add(childKey("file", name));
+    }
+  }
+  for (const file of added) {
+    const { path, parent, name } = splitTreePath(file.relative_path);
+    if (!path) {
       continue;
     }
-    let current = root;
-    let currentPath = "";
-
-    parts.forEach((part, index) => {
-      const isFile = index === parts.length - 1;
-      currentPath = currentPath ? `${currentPath}/${part}` : part;
-      if (isFile) {
-        const existing = current.children?.find(
-          (child) => child.type === "file" && child.path === currentPath,
-        );
-        if (!existing) {
-          current.children = current.children ?? [];
-          current.children.push({
-            name: part,
-            path: currentPath,
-            type: "file",
-            file,
-            fullPath: file.path,
-          });
-        }
-        return;
-      }
+    const draft = draftDir(parent, true);
+    draft?.removed.delete(childKey("file", name));
+    draft?.added.set(childKey("file", name), {
+      name,
+      path,
+      type: "file",
+      file,
+      fullPath: file.path,
+    });
+  }
 
-      let next = current.children?.find(
-        (child) => child.type === "dir" && child.name === part,
-      );
-      if (!next) {
-        next = {
-          name: part,
-          path: currentPath,
-          type: "dir",
-          children: [],
-        };
-        current.children = current.children ?? [];
-        current.children.push(next);
+  // Deepest directories first, so emptied ones can be pruned from their parent.
+  const ordered = [...drafts.entries()].sort(([a], [b]) => pathDepth(b) - pathDepth(a));
+  for (const [path, draft] of ordered) {
+    const existing = draft.node.children ?? [];
+    const kept =
+      draft.removed.size === 0
+        ? existing
+        : existing.filter((child) => !draft.removed.has(childKey(child.type, child.name)));
+    const incoming = [...draft.added.values()].sort(compareNodes);
+    const children: TreeNode[] = [];
+    let left = 0;
+    const copyKept = (to: number) => {
+      for (; left < to; left += 1) {
+        children.push(kept[left]);
       }
-      current = next;
-    });
+    };
+    for (const node of incoming) {
+      // A re-added file replaces the listed one.
+      const replaced = findSibling(kept, node, left);
+      if (replaced >= 0) {
+        copyKept(replaced);
+        left += 1;
+      } else {
+        copyKept(lowerBound(kept, node, left));
+      }
+      children.push(node);
+    }
+    copyKept(kept.length);
+    draft.node.children = children;
+    if (path && draft.node.children.length === 0) {
+      drafts.get(parentPath(path))?.removed.add(childKey("dir", draft.node.name));
+    }
   }
 
-  return sortNodes(root.children ?? []);
+  return root.children ?? [];
 };
 
-export const sortNodes = (nodes: TreeNode[]): TreeNode[] => {
-  const sorted = [...nodes].sort((a, b) => {
-    if (a.type !== b.type) {
-      return a.type === "dir" ? -1 : 1;
-    }
-    return a.name.localeCompare(b.name);
-  });
+export const buildTree = (files: VaultFile[]): TreeNode[] => patchTree([], files);
 
-  return sorted.map((node) => {
-    if (node.type === "dir" && node.children) {
-      return { ...node, children: sortNodes(node.children) };
-    }
-    return node;
-  });
-};
+// Applies a watcher delta to a tree built by `patchTree`.
+export const applyTreeDelta = (nodes: TreeNode[], delta: VaultDelta): TreeNode[] =>
+  patchTree(
+    nodes,
+    [...delta.added, ...delta.renamed.map((entry) => entry.to)],
+    [...delta.removed, ...delta.renamed.map((entry) => entry.from)],
+  );
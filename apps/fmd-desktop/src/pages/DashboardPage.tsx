@@ -85,11 +85,11 @@ export const DashboardPage = () => {
       <div className="workspace">
         <VaultTree
           fileCountLabel={fileCountLabel}
-          files={vault.files}
           listError={vault.listError}
           listState={vault.listState}
           onSelectFile={actions.handleSelectFile}
           selectedFile={preview.selectedFile}
+          tree={vault.tree}
           vaultPath={vault.vaultPath}
         />
 
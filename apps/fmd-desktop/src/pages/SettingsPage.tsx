@@ -18,8 +18,9 @@ export const SettingsPage = () => {
   const { language, setLanguage } = settings;
   const lastOpenedFile = preview.selectedFile?.relative_path ?? null;
   const vaultIndexedComplete = useMemo(
-    () => Boolean(vault.vaultPath) && vault.listState === "idle",
-    [vault.listState, vault.vaultPath],
+    () =>
+      Boolean(vault.vaultPath) && vault.listState === "idle" && !vault.scanTruncated,
+    [vault.listState, vault.scanTruncated, vault.vaultPath],
   );
   const handleLanguageChange = useCallback(
     (nextLanguage: "de" | "en") => {
@@ -50,9 +51,12 @@ export const SettingsPage = () => {
           lastOpenedFile={lastOpenedFile}
           listState={vault.listState}
           onCopyVaultPath={actions.handleCopyVaultPath}
+          onContinueScan={actions.handleContinueScan}
           onRescanVault={actions.handleRescanVault}
+          scanTruncated={vault.scanTruncated}
           vaultIndexedComplete={vaultIndexedComplete}
           vaultPath={vault.vaultPath}
+          watcherActive={vault.watcherActive}
         />
         <DataSyncSection
           language={language}
@@ -90,7 +94,9 @@ export const SettingsPage = () => {
         <PerformanceSection
           maxFilesPerScan={settings.maxFilesPerScan}
           onMaxFilesPerScanChange={actions.handleMaxFilesPerScanChange}
+          scanExcludePatterns={settings.scanExcludePatterns}
           scanParallelism={settings.scanParallelism}
+          setScanExcludePatterns={settings.setScanExcludePatterns}
           setScanParallelism={settings.setScanParallelism}
         />
         <AppearanceSection
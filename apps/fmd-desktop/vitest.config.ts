@@ -4,5 +4,8 @@ export default defineConfig({
   test: {
     environment: "node",
     include: ["src/**/*.test.ts"],
+    benchmark: {
+      include: ["src/**/*.bench.ts"],
+    },
   },
 });
@@ -5,6 +5,12 @@ Project control entry point.
 Examples:
     ./control.py --doctor
     ./control.py --doctor --json
+    ./control.py --index apps/VaultTest
+    ./control.py --vault-profile ~/Notes --top 20
+    ./control.py --lint ~/Notes --lint-changes staged
+    ./control.py --gen-vault /tmp/vault-10k --notes 10000
+    ./control.py --bench --bench-scales 1000,10000,100000
+    ./control.py --migrate-ids ~/Notes --dry-run
 """
 
 from __future__ import annotations
@@ -19,7 +25,8 @@ from typing import Callable, cast
 
 SCRIPT_DIR = Path(__file__).resolve().parent
 PY_DIR = SCRIPT_DIR / "inst"
-for extra_dir in (PY_DIR, PY_DIR / "linux", PY_DIR / "mac", PY_DIR / "win"):
+VAULT_DIR = SCRIPT_DIR / "vault"
+for extra_dir in (PY_DIR, PY_DIR / "linux", PY_DIR / "mac", PY_DIR / "win", VAULT_DIR):
     if extra_dir.exists() and str(extra_dir) not in sys.path:
         sys.path.insert(0, str(extra_dir))
 
@@ -111,6 +118,21 @@ def _load_run_runner() -> Callable[..., int] | None:
     return cast(Callable[..., int], fn)
 
 
+def _load_vault_tool_run(mod_name: str) -> Callable[..., int] | None:
+    """Load a vault tool from tools/vault/ (indexer, ...)."""
+    try:
+        mod = importlib.import_module(mod_name)
+    except Exception as e:
+        print(f"Could not load vault tool module: {mod_name} ({e})")
+        return None
+
+    fn = getattr(mod, "run", None)
+    if not callable(fn):
+        print(f"Vault tool module '{mod_name}' has no run(...) function.")
+        return None
+    return cast(Callable[..., int], fn)
+
+
 def parse_args(argv: list[str]) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Project toolbox launcher.")
     parser.add_argument(
@@ -126,7 +148,7 @@ def parse_args(argv: list[str]) -> argparse.Namespace:
     parser.add_argument(
         "--json",
         action="store_true",
-        help="Additional JSON output for --doctor.",
+        help="Additional JSON output for --doctor and the vault tools.",
     )
     parser.add_argument(
         "--install",
@@ -152,10 +174,142 @@ def parse_args(argv: list[str]) -> argparse.Namespace:
         action="store_true",
         help="Runs the Tauri desktop app (pnpm tauri dev).",
     )
+    parser.add_argument(
+        "--index",
+        metavar="VAULT",
+        help="Builds/updates the SQLite card index for a vault (incremental).",
+    )
+    parser.add_argument(
+        "--index-db",
+        metavar="PATH",
+        help="Index database path for --index (default: VAULT/.fmd/index.sqlite).",
+    )
+    parser.add_argument(
+        "--parallelism",
+        choices=("low", "medium", "high"),
+        default="medium",
+        help="Worker pool size for vault parsing, like the scan_parallelism setting.",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Drops and rebuilds the index instead of updating it.",
+    )
+    parser.add_argument(
+        "--vault-profile",
+        metavar="PATH",
+        help="Profiles a vault: largest notes, parse time, broken blocks, fan-out, IPC bytes.",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        help="Entries per section for --vault-profile.",
+    )
+    parser.add_argument(
+        "--lint",
+        metavar="VAULT",
+        help="Lints #card syntax in changed notes (exit code 1 on errors).",
+    )
+    parser.add_argument(
+        "--lint-changes",
+        choices=("cache", "git", "staged", "all"),
+        default="cache",
+        help="How --lint finds changed notes: mtime cache, git diff/untracked, staged, or all.",
+    )
+    parser.add_argument(
+        "--lint-rev",
+        default="HEAD",
+        metavar="REV",
+        help="Revision to diff against for --lint-changes git.",
+    )
+    parser.add_argument(
+        "--lint-format",
+        choices=("text", "jsonl"),
+        default="text",
+        help="Diagnostic output for --lint (jsonl prints only diagnostics).",
+    )
+    parser.add_argument(
+        "--gen-vault",
+        metavar="DIR",
+        help="Generates a synthetic vault (see --notes/--depth/--fanout/--card-mix).",
+    )
+    parser.add_argument(
+        "--notes",
+        type=int,
+        default=1000,
+        help="Number of notes for --gen-vault.",
+    )
+    parser.add_argument(
+        "--depth",
+        type=int,
+        default=3,
+        help="Maximum directory depth of generated vaults.",
+    )
+    parser.add_argument(
+        "--fanout",
+        type=int,
+        default=8,
+        help="Sub-directories per level in generated vaults.",
+    )
+    parser.add_argument(
+        "--cards-per-note",
+        default="0-12",
+        metavar="MIN-MAX",
+        help="Card blocks per generated note.",
+    )
+    parser.add_argument(
+        "--card-mix",
+        metavar="KIND=W,...",
+        help="Card kind weights, kinds: mc, tf, qa, cloze, drag, mixed.",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Random seed for generated vaults.",
+    )
+    parser.add_argument(
+        "--bench",
+        action="store_true",
+        help="Runs the end-to-end scale benchmark on synthetic vaults.",
+    )
+    parser.add_argument(
+        "--bench-scales",
+        default="1000,10000",
+        metavar="N,N,...",
+        help="Vault sizes (notes) for --bench.",
+    )
+    parser.add_argument(
+        "--bench-out",
+        default="bench_output.json",
+        metavar="PATH",
+        help="JSON report path for --bench.",
+    )
+    parser.add_argument(
+        "--bench-compare",
+        metavar="PATH",
+        help="Earlier --bench report to compare against.",
+    )
+    parser.add_argument(
+        "--bench-dir",
+        metavar="DIR",
+        help="Keeps the generated bench vaults in DIR instead of a temp dir.",
+    )
+    parser.add_argument(
+        "--migrate-ids",
+        metavar="VAULT",
+        help="Re-keys spaced repetition data from legacy card IDs to current ones (app closed).",
+    )
+    parser.add_argument(
+        "--sr-data",
+        metavar="PATH",
+        help="spaced_repetition.json for --migrate-ids (default: the app data directory).",
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
-        help="Only show which commands would run.",
+        help="Only show which commands would run (--migrate-ids: report, write nothing).",
     )
     return parser.parse_args(argv)
 
@@ -220,12 +374,126 @@ def main(argv: list[str] | None = None) -> int:
             except Exception:
                 exit_code = max(exit_code, run_runner(args.dry_run))
 
+    if args.index:
+        handled = True
+        run_index = _load_vault_tool_run("vaultindex")
+        if not run_index:
+            print("No vault indexer found. Expected: tools/vault/vaultindex.py")
+            exit_code = max(exit_code, 1)
+        else:
+            exit_code = max(
+                exit_code,
+                run_index(
+                    args.index,
+                    args.index_db,
+                    rebuild=args.rebuild,
+                    want_json=args.json,
+                    parallelism=args.parallelism,
+                ),
+            )
+
+    if args.vault_profile:
+        handled = True
+        run_profile = _load_vault_tool_run("vaultprofile")
+        if not run_profile:
+            print("No vault profiler found. Expected: tools/vault/vaultprofile.py")
+            exit_code = max(exit_code, 1)
+        else:
+            exit_code = max(
+                exit_code,
+                run_profile(args.vault_profile, want_json=args.json, top=args.top),
+            )
+
+    if args.lint:
+        handled = True
+        run_lint = _load_vault_tool_run("vaultlint")
+        if not run_lint:
+            print("No card linter found. Expected: tools/vault/vaultlint.py")
+            exit_code = max(exit_code, 1)
+        else:
+            exit_code = max(
+                exit_code,
+                run_lint(
+                    args.lint,
+                    source=args.lint_changes,
+                    rev=args.lint_rev,
+                    output_format=args.lint_format,
+                    want_json=args.json,
+                    parallelism=args.parallelism,
+                ),
+            )
+
+    if args.gen_vault:
+        handled = True
+        run_gen = _load_vault_tool_run("vaultgen")
+        if not run_gen:
+            print("No vault generator found. Expected: tools/vault/vaultgen.py")
+            exit_code = max(exit_code, 1)
+        else:
+            exit_code = max(
+                exit_code,
+                run_gen(
+                    args.gen_vault,
+                    notes=args.notes,
+                    depth=args.depth,
+                    fanout=args.fanout,
+                    cards_per_note=args.cards_per_note,
+                    card_mix=args.card_mix,
+                    seed=args.seed,
+                    want_json=args.json,
+                ),
+            )
+
+    if args.bench:
+        handled = True
+        run_bench = _load_vault_tool_run("vaultbench")
+        if not run_bench:
+            print("No vault benchmark found. Expected: tools/vault/vaultbench.py")
+            exit_code = max(exit_code, 1)
+        else:
+            exit_code = max(
+                exit_code,
+                run_bench(
+                    args.bench_scales,
+                    args.bench_out,
+                    compare_path=args.bench_compare,
+                    work_dir=args.bench_dir,
+                    depth=args.depth,
+                    fanout=args.fanout,
+                    cards_per_note=args.cards_per_note,
+                    card_mix=args.card_mix,
+                    seed=args.seed,
+                    want_json=args.json,
+                ),
+            )
+
+    if args.migrate_ids:
+        handled = True
+        run_migrate = _load_vault_tool_run("idmigrate")
+        if not run_migrate:
+            print("No card ID migration found. Expected: tools/vault/idmigrate.py")
+            exit_code = max(exit_code, 1)
+        else:
+            exit_code = max(
+                exit_code,
+                run_migrate(
+                    args.migrate_ids,
+                    args.sr_data,
+                    dry_run=args.dry_run,
+                    want_json=args.json,
+                    parallelism=args.parallelism,
+                ),
+            )
+
     if args.doctor or args.check:
         handled = True
         exit_code = max(exit_code, run_doctor(args.json))
 
     if not handled:
-        print("Please specify a command (e.g. --doctor, --install, --tauri, or --start/--run).")
+        print(
+            "Please specify a command "
+            "(e.g. --doctor, --install, --tauri, --start/--run, --index VAULT, or --bench)."
+        )
         return 1
 
     return exit_code
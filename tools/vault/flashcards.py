@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+"""
+Python port of the `#card ... #` parser from apps/fmd-desktop/src/lib/flashcards.ts.
+
+The output mirrors the TypeScript `Flashcard` objects (same keys, same key order),
+so `flashcard_id()` yields the exact IDs the desktop app stores in
+spaced_repetition.json; parsed cards carry theirs under `"id"`. Keep it in sync
+with the TypeScript parser and its Rust port (src-tauri/src/flashcards.rs) when
+the card syntax changes.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+# Bump whenever the parser output changes, so persisted indexes get rebuilt.
+PARSER_VERSION = 3
+
+ANSWER_MARKERS = [
+    "Answer:",
+    "Antwort:",
+    "Réponse:",
+    "Respuesta:",
+    "Resposta:",
+    "Risposta:",
+    "Antwoord:",
+    "Svar:",
+    "Vastaus:",
+    "Odpowiedź:",
+    "Odpověď:",
+    "Odpoveď:",
+    "Válasz:",
+    "Răspuns:",
+    "Cevap:",
+    "Ответ:",
+    "Απάντηση:",
+    "إجابة:",
+]
+
+TRUE_TOKENS = [
+    "true",
+    "wahr",
+    "vrai",
+    "verdadero",
+    "verdadeiro",
+    "vero",
+    "waar",
+    "sant",
+    "sann",
+    "sandt",
+    "tosi",
+    "prawda",
+    "pravda",
+    "igaz",
+    "adevărat",
+    "doğru",
+    "правда",
+    "αληθές",
+    "صحيح",
+]
+
+FALSE_TOKENS = [
+    "false",
+    "falsch",
+    "faux",
+    "falso",
+    "onwaar",
+    "falskt",
+    "usann",
+    "falsk",
+    "epätosi",
+    "fałsz",
+    "nepravda",
+    "hamis",
+    "fals",
+    "yanlış",
+    "ложь",
+    "ψευδές",
+    "خطأ",
+]
+
+Flashcard = Dict[str, Any]
+
+# ECMAScript WhiteSpace + LineTerminator, i.e. what String.prototype.trim() removes.
+_JS_WS = (
+    "\t\n\u000b\u000c\r \u00a0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006"
+    "\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000\ufeff"
+)
+_JS_WS_CLASS = "[" + re.escape(_JS_WS) + "]"
+_JS_DOT = "[^\n\r\u2028\u2029]"
+
+OPTION_PATTERN = re.compile(rf"^([A-Za-z])\){_JS_WS_CLASS}+({_JS_DOT}*)$")
+MARKER_PATTERN = re.compile(r"^-([A-Za-z])$")
+FENCE_PATTERN = re.compile(r"^(```|~~~)")
+_TRAILING_PUNCTUATION = re.compile(r"[.,;:!?]+$")
+_COMBINING_MARKS = re.compile("[\u0300-\u036f]")
+_NEWLINES = re.compile(r"\r\n?")
+
+
+def js_trim(value: str) -> str:
+    return value.strip(_JS_WS)
+
+
+def js_trim_start(value: str) -> str:
+    return value.lstrip(_JS_WS)
+
+
+def normalize_lines(markdown: str) -> List[str]:
+    return _NEWLINES.sub("\n", markdown).split("\n")
+
+
+def normalize_keyword(value: str) -> str:
+    normalized = unicodedata.normalize("NFKD", js_trim(value).lower())
+    return _COMBINING_MARKS.sub("", normalized)
+
+
+_NORMALIZED_TRUE_TOKENS = {normalize_keyword(token) for token in TRUE_TOKENS}
+_NORMALIZED_FALSE_TOKENS = {normalize_keyword(token) for token in FALSE_TOKENS}
+_NORMALIZED_ANSWER_MARKERS = [(marker, normalize_keyword(marker)) for marker in ANSWER_MARKERS]
+
+
+def trim_empty_lines(lines: List[str]) -> List[str]:
+    start = 0
+    end = len(lines)
+    while start < end and js_trim(lines[start]) == "":
+        start += 1
+    while end > start and js_trim(lines[end - 1]) == "":
+        end -= 1
+    return lines[start:end]
+
+
+def _append_text(segments: List[Dict[str, Any]], text: str) -> None:
+    if not text:
+        return
+    if segments and segments[-1]["type"] == "text":
+        segments[-1]["value"] += text
+    else:
+        segments.append({"type": "text", "value": text})
+
+
+def parse_cloze_segments(lines: List[str]) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    segments: List[Dict[str, Any]] = []
+    drag_tokens: List[Dict[str, Any]] = []
+    counters = {"blank": 0, "token": 0}
+
+    def handle_line(line: str) -> bool:
+        cursor = 0
+        while cursor < len(line):
+            next_input = line.find("%%", cursor)
+            next_drag = line.find("`", cursor)
+            candidates = [pos for pos in (next_input, next_drag) if pos != -1]
+            if not candidates:
+                _append_text(segments, line[cursor:])
+                break
+            next_marker = min(candidates)
+
+            if next_marker > cursor:
+                _append_text(segments, line[cursor:next_marker])
+
+            if next_marker == next_input:
+                end = line.find("%%", next_input + 2)
+                if end == -1:
+                    _append_text(segments, line[next_input:])
+                    break
+                solution = js_trim(line[next_input + 2 : end])
+                if not solution:
+                    return False
+                segments.append(
+                    {
+                        "type": "blank",
+                        "id": f"blank-{counters['blank']}",
+                        "kind": "input",
+                        "solution": solution,
+                    }
+                )
+                counters["blank"] += 1
+                cursor = end + 2
+                continue
+
+            end = line.find("`", next_drag + 1)
+            if end == -1:
+                _append_text(segments, line[next_drag:])
+                break
+            value = js_trim(line[next_drag + 1 : end])
+            if not value:
+                _append_text(segments, line[next_drag : end + 1])
+                cursor = end + 1
+                continue
+            segments.append(
+                {
+                    "type": "blank",
+                    "id": f"blank-{counters['blank']}",
+                    "kind": "drag",
+                    "solution": value,
+                }
+            )
+            drag_tokens.append({"id": f"token-{counters['token']}", "value": value})
+            counters["blank"] += 1
+            counters["token"] += 1
+            cursor = end + 1
+        return True
+
+    in_fence = False
+    trimmed_lines = trim_empty_lines(lines)
+    for line_index, line in enumerate(trimmed_lines):
+        if FENCE_PATTERN.search(js_trim_start(line)):
+            in_fence = not in_fence
+            _append_text(segments, line)
+        elif in_fence:
+            _append_text(segments, line)
+        elif not handle_line(line):
+            return None
+
+        if line_index < len(trimmed_lines) - 1:
+            _append_text(segments, "\n")
+
+    return {"segments": segments, "dragTokens": drag_tokens}
+
+
+def _normalize_true_false_marker(value: str) -> Optional[str]:
+    trimmed = js_trim(value)
+    if not trimmed.startswith("-"):
+        return None
+    raw_token = js_trim(trimmed[1:])
+    if not raw_token:
+        return None
+    normalized = normalize_keyword(_TRAILING_PUNCTUATION.sub("", raw_token))
+    if normalized in _NORMALIZED_TRUE_TOKENS:
+        return "wahr"
+    if normalized in _NORMALIZED_FALSE_TOKENS:
+        return "falsch"
+    return None
+
+
+def parse_true_false_items(lines: List[str]) -> List[Dict[str, Any]]:
+    items: List[Dict[str, Any]] = []
+    index = 0
+    while index < len(lines):
+        question = js_trim(lines[index])
+        if not question:
+            index += 1
+            continue
+
+        marker_index = index + 1
+        while marker_index < len(lines) and js_trim(lines[marker_index]) == "":
+            marker_index += 1
+        if marker_index >= len(lines):
+            index += 1
+            continue
+
+        marker = _normalize_true_false_marker(js_trim(lines[marker_index]))
+        if not marker:
+            index += 1
+            continue
+
+        items.append({"id": f"tf-{len(items)}", "question": question, "correct": marker})
+        index = marker_index + 1
+    return items
+
+
+def _find_answer_marker_match(line: str) -> Optional[tuple[str, int]]:
+    trimmed_line = js_trim_start(line)
+    normalized_line = normalize_keyword(trimmed_line)
+    for raw, normalized in _NORMALIZED_ANSWER_MARKERS:
+        if normalized_line.startswith(normalized):
+            colon_index = trimmed_line.find(":")
+            marker_end_index = colon_index + 1 if colon_index >= 0 else len(raw)
+            return trimmed_line, marker_end_index
+    return None
+
+
+def split_answer_card(lines: List[str]) -> Optional[Dict[str, str]]:
+    for index, line in enumerate(lines):
+        match = _find_answer_marker_match(line)
+        if not match:
+            continue
+        trimmed_line, marker_end_index = match
+        front_lines = trim_empty_lines(lines[:index])
+        inline_answer = js_trim_start(trimmed_line[marker_end_index:])
+        back_lines = [inline_answer, *lines[index + 1 :]]
+        front = js_trim("\n".join(trim_empty_lines(front_lines)))
+        back = js_trim("\n".join(trim_empty_lines(back_lines)))
+        if not front or not back:
+            return None
+        return {"front": front, "back": back}
+    return None
+
+
+def _push_unique(items: List[str], value: str) -> None:
+    if value not in items:
+        items.append(value)
+
+
+def iter_card_blocks(lines: List[str]):
+    """Yield `(start_line, end_line, card_lines, terminated)` for every `#card` block.
+
+    Line numbers are 0-based indexes into `lines`; `start_line` points at the
+    `#card` opener and `end_line` at the closing `#` (or where the block stopped).
+    """
+    index = 0
+    while index < len(lines):
+        if js_trim(lines[index]) != "#card":
+            index += 1
+            continue
+
+        start = index
+        card_lines: List[str] = []
+        terminated = False
+        index += 1
+        while index < len(lines):
+            trimmed = js_trim(lines[index])
+            if trimmed == "#":
+                terminated = True
+                index += 1
+                break
+            if trimmed == "#card":
+                break
+            card_lines.append(lines[index])
+            index += 1
+
+        yield start, index - 1, card_lines, terminated
+
+
+def _build_card(card_lines: List[str]) -> Optional[Flashcard]:
+    question_index = next(
+        (i for i, entry in enumerate(card_lines) if js_trim(entry) != ""), -1
+    )
+    if question_index == -1:
+        return None
+    question = js_trim(card_lines[question_index])
+    body_lines = card_lines[question_index + 1 :]
+    content_lines = card_lines[question_index:]
+
+    options: List[Dict[str, str]] = []
+    correct_keys: List[str] = []
+    cloze_lines: List[str] = []
+
+    for raw_line in body_lines:
+        trimmed = js_trim(raw_line)
+        if not trimmed:
+            cloze_lines.append("")
+            continue
+        option_match = OPTION_PATTERN.match(trimmed)
+        if option_match:
+            text = js_trim(option_match.group(2))
+            if text:
+                options.append({"key": option_match.group(1).lower(), "text": text})
+            continue
+        marker_match = MARKER_PATTERN.match(trimmed)
+        if marker_match:
+            _push_unique(correct_keys, marker_match.group(1).lower())
+            continue
+        cloze_lines.append(raw_line)
+
+    detected_types: List[str] = []
+    if options:
+        _push_unique(detected_types, "multiple-choice")
+
+    true_false_items = parse_true_false_items(content_lines)
+    if true_false_items:
+        _push_unique(detected_types, "true-false")
+
+    answer_card = split_answer_card(content_lines)
+    if answer_card:
+        _push_unique(detected_types, "qa")
+
+    parsed = parse_cloze_segments(cloze_lines)
+    has_input_blanks = False
+    has_drag_blanks = False
+    if parsed:
+        for segment in parsed["segments"]:
+            if segment["type"] != "blank":
+                continue
+            if segment["kind"] == "input":
+                has_input_blanks = True
+            else:
+                has_drag_blanks = True
+    if has_input_blanks:
+        _push_unique(detected_types, "fill-blank")
+    if has_drag_blanks:
+        _push_unique(detected_types, "assignment")
+    is_mixed = len(detected_types) >= 2
+
+    if options:
+        return {
+            "kind": "multiple-choice",
+            "question": question,
+            "options": options,
+            "correctKeys": correct_keys,
+            "primaryType": "multiple-choice",
+            "detectedTypes": detected_types,
+            "isMixed": is_mixed,
+        }
+    if true_false_items:
+        return {
+            "kind": "true-false",
+            "items": true_false_items,
+            "primaryType": "true-false",
+            "detectedTypes": detected_types,
+            "isMixed": is_mixed,
+        }
+    if answer_card:
+        return {
+            "kind": "free-text",
+            **answer_card,
+            "primaryType": "qa",
+            "detectedTypes": detected_types,
+            "isMixed": is_mixed,
+        }
+    if not parsed:
+        return None
+    if has_input_blanks or has_drag_blanks:
+        return {
+            "kind": "cloze",
+            "question": question,
+            "segments": parsed["segments"],
+            "dragTokens": parsed["dragTokens"],
+            "primaryType": "fill-blank" if has_input_blanks else "assignment",
+            "detectedTypes": detected_types,
+            "isMixed": is_mixed,
+        }
+    return None
+
+
+def parse_card_block(card_lines: List[str]) -> Optional[Flashcard]:
+    """The card in `card_lines`, with its ID stored first under `"id"` like the app's parsers."""
+    card = _build_card(card_lines)
+    return card and {"id": flashcard_id(card), **card}
+
+
+def parse_flashcards(markdown: str) -> List[Flashcard]:
+    cards: List[Flashcard] = []
+    for _start, _end, card_lines, terminated in iter_card_blocks(normalize_lines(markdown)):
+        if not terminated:
+            continue
+        card = parse_card_block(card_lines)
+        if card is not None:
+            cards.append(card)
+    return cards
+
+
+def hash_string(value: str) -> str:
+    """32-bit FNV-1a over UTF-16 code units, like `hashString` in src/lib/flashcards.ts.
+
+    Only legacy card IDs use it.
+    """
+    data = value.encode("utf-16-le", "surrogatepass")
+    hash_value = 2166136261
+    for index in range(0, len(data), 2):
+        hash_value ^= data[index] | (data[index + 1] << 8)
+        hash_value = (hash_value * 16777619) & 0xFFFFFFFF
+    return format(hash_value, "x")
+
+
+def hash_string_64(value: str) -> str:
+    """64-bit FNV-1a over UTF-16 code units as 16 hex digits, like `hashString64`."""
+    data = value.encode("utf-16-le", "surrogatepass")
+    hash_value = 0xCBF29CE484222325
+    for index in range(0, len(data), 2):
+        hash_value ^= data[index] | (data[index + 1] << 8)
+        hash_value = (hash_value * 0x100000001B3) & 0xFFFFFFFFFFFFFFFF
+    return format(hash_value, "016x")
+
+
+def _js_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def identity_payload(card: Flashcard, legacy: bool = False) -> Dict[str, Any]:
+    kind = card["kind"]
+    if kind == "multiple-choice":
+        correct_keys = list(card["correctKeys"]) if legacy else sorted(card["correctKeys"])
+        return {
+            "kind": kind,
+            "question": card["question"],
+            "options": card["options"],
+            "correctKeys": correct_keys,
+        }
+    if kind == "true-false":
+        return {"kind": kind, "items": card["items"]}
+    if kind == "free-text":
+        return {"kind": kind, "front": card["front"], "back": card["back"]}
+    return {
+        "kind": kind,
+        "question": card["question"],
+        "segments": card["segments"],
+        "dragTokens": card["dragTokens"],
+    }
+
+
+def flashcard_id(card: Flashcard) -> str:
+    return f"card-{hash_string_64(_js_json(identity_payload(card)))}"
+
+
+def flashcard_legacy_ids(card: Flashcard) -> List[str]:
+    """IDs older data may key the card's state by, the most recent first.
+
+    The 32-bit ID (spaced repetition schema 1) and, for multiple-choice cards whose
+    correct keys are out of order, the 32-bit ID of the keys in note order.
+    """
+    legacy_ids = [f"card-{hash_string(_js_json(identity_payload(card)))}"]
+    unsorted_id = f"card-{hash_string(_js_json(identity_payload(card, legacy=True)))}"
+    if unsorted_id != legacy_ids[0]:
+        legacy_ids.append(unsorted_id)
+    return legacy_ids
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+One-shot card ID migration used by `tools/control.py --migrate-ids VAULT`.
+
+Older app versions keyed spaced repetition card states by legacy card IDs:
+32-bit hashes, at first of multiple-choice correct keys in note order. This tool
+re-keys them to the current 64-bit IDs of the vault's cards in
+`spaced_repetition.json` (after replaying the review journal next to it) and
+records schema version 2, after which the app skips the legacy lookup. A 32-bit
+ID that several cards shared hands its state to each of them. Card IDs that
+cards with different content share are reported. It is the offline twin of the
+backend command `migrate_spaced_repetition_card_ids`, which the app runs by
+itself on start.
+
+Run it while the app is closed: the snapshot is replaced and the journal
+emptied. Builds with the `sqlite` feature keep their data in
+`spaced_repetition.sqlite` instead; those are only migrated by the app.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import platform
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from vaultindex import parse_files
+from vaultscan import DEFAULT_SCAN_PARALLELISM, list_markdown_files, scan_worker_count
+
+# Keep in sync with SPACED_REPETITION_SCHEMA_VERSION in src-tauri/src/lib.rs.
+SPACED_REPETITION_SCHEMA_VERSION = 2
+APP_IDENTIFIER = "com.blobbite.fmdflashcard"
+DATA_FILE_NAME = "spaced_repetition.json"
+
+ICONS = {
+    "ok": "✅",
+    "err": "❌",
+    "info": "ℹ️",
+    "warn": "⚠️",
+    "dot": "•",
+}
+
+Storage = Dict[str, Any]
+
+
+@dataclass
+class MigrationStats:
+    data: str
+    vault: str
+    users: int = 0
+    journal_entries: int = 0
+    legacy_cards: int = 0
+    renamed: int = 0
+    dropped: int = 0
+    shared_legacy_ids: int = 0
+    id_collisions: List[str] = field(default_factory=list)
+    already_migrated: bool = False
+    written: bool = False
+    elapsed_ms: float = 0.0
+
+
+def default_data_path() -> Path:
+    """`spaced_repetition.json` in the app data directory Tauri uses."""
+    system = platform.system()
+    if system == "Windows":
+        base = Path(os.environ.get("APPDATA") or Path.home() / "AppData" / "Roaming")
+    elif system == "Darwin":
+        base = Path.home() / "Library" / "Application Support"
+    else:
+        base = Path(os.environ.get("XDG_DATA_HOME") or Path.home() / ".local" / "share")
+    return base / APP_IDENTIFIER / DATA_FILE_NAME
+
+
+def _user_state(storage: Storage, user_id: str) -> Dict[str, Any]:
+    state = storage["userStateById"].setdefault(user_id, {})
+    state.setdefault("cardStates", {})
+    state.setdefault("lastLoadedAt", None)
+    return state
+
+
+def apply_journal_entry(storage: Storage, entry: Dict[str, Any]) -> None:
+    """Same effect as `JournalEntry::apply` in src-tauri/src/review_journal.rs."""
+    op = entry.get("op")
+    if op == "users":
+        storage["users"] = entry.get("users") or []
+        storage["lastActiveUserId"] = entry.get("lastActiveUserId")
+    elif op == "removeUserState":
+        storage["userStateById"].pop(entry["userId"], None)
+    elif op == "lastLoaded":
+        _user_state(storage, entry["userId"])["lastLoadedAt"] = entry.get("lastLoadedAt")
+    elif op == "card":
+        card_states = _user_state(storage, entry["userId"])["cardStates"]
+        if entry.get("state") is None:
+            card_states.pop(entry["cardId"], None)
+        else:
+            card_states[entry["cardId"]] = entry["state"]
+    elif op == "completed":
+        completed = _user_state(storage, entry["userId"]).setdefault("completedPerDay", {})
+        if entry.get("count") is None:
+            completed.pop(entry["day"], None)
+        else:
+            completed[entry["day"]] = entry["count"]
+    elif op == "schemaVersion":
+        storage["schemaVersion"] = entry["version"]
+    else:
+        raise ValueError(f"unknown journal entry: {op!r}")
+
+
+def load_storage(data_path: Path) -> tuple[Storage, int]:
+    """Snapshot plus journal, replayed up to the last complete line like the app."""
+    storage: Storage = {}
+    if data_path.exists():
+        storage = json.loads(data_path.read_text(encoding="utf-8"))
+    storage.setdefault("users", [])
+    storage.setdefault("userStateById", {})
+    storage.setdefault("lastActiveUserId", None)
+
+    entries = 0
+    journal_path = data_path.with_suffix(".journal")
+    if journal_path.exists():
+        for line in journal_path.read_bytes().split(b"\n")[:-1]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            apply_journal_entry(storage, entry)
+            entries += 1
+    return storage, entries
+
+
+def legacy_card_ids(vault: Path, parallelism: str) -> tuple[Dict[str, List[str]], List[str]]:
+    """Current card ID to legacy IDs (most recent first) for the vault's cards,
+    and the card IDs that cards with different content share.
+
+    Cards with the same content also share their 32-bit legacy ID, which is
+    hashed from the same payload independently of the card ID, so a card ID
+    seen with another one belongs to distinct payloads.
+    """
+    files = list_markdown_files(vault)
+    legacy_ids: Dict[str, List[str]] = {}
+    collisions: Dict[str, None] = {}
+    for parsed in parse_files(files, workers=scan_worker_count(parallelism)):
+        if parsed.error:
+            raise OSError(f"{parsed.file.relative_path}: {parsed.error}")
+        for card in parsed.cards:
+            known = legacy_ids.setdefault(card.card_id, [])
+            if known and known[0] != card.legacy_ids[0]:
+                collisions[card.card_id] = None
+            known.extend(legacy_id for legacy_id in card.legacy_ids if legacy_id not in known)
+    return legacy_ids, list(collisions)
+
+
+def migrate_storage(
+    storage: Storage, legacy_ids: Dict[str, List[str]], stats: MigrationStats
+) -> None:
+    """Gives cards without a current state their most recent legacy state and
+    removes the legacy states; a state already under the current ID wins."""
+    sharing: Dict[str, int] = {}
+    for ids in legacy_ids.values():
+        for legacy_id in ids:
+            sharing[legacy_id] = sharing.get(legacy_id, 0) + 1
+    stats.shared_legacy_ids = sum(1 for count in sharing.values() if count > 1)
+
+    for state in storage["userStateById"].values():
+        card_states = state.get("cardStates") or {}
+        legacy_states = set()
+        for card_id, ids in legacy_ids.items():
+            found = [legacy_id for legacy_id in ids if legacy_id in card_states]
+            if not found:
+                continue
+            if card_id in card_states:
+                stats.dropped += 1
+            else:
+                card_states[card_id] = card_states[found[0]]
+                stats.renamed += 1
+            legacy_states.update(found)
+        for legacy_id in legacy_states:
+            del card_states[legacy_id]
+        stats.legacy_cards += len(legacy_states)
+    storage["schemaVersion"] = SPACED_REPETITION_SCHEMA_VERSION
+
+
+def write_storage(data_path: Path, storage: Storage) -> None:
+    """Replaces the snapshot atomically, then empties the journal it now contains."""
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = data_path.with_name(data_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        json.dump(storage, handle, ensure_ascii=False, separators=(",", ":"))
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp_path, data_path)
+    journal_path = data_path.with_suffix(".journal")
+    if journal_path.exists():
+        with open(journal_path, "r+b") as handle:
+            handle.truncate(0)
+            os.fsync(handle.fileno())
+
+
+def migrate(
+    vault: Path,
+    data_path: Path,
+    dry_run: bool = False,
+    parallelism: str = DEFAULT_SCAN_PARALLELISM,
+) -> MigrationStats:
+    started = time.perf_counter()
+    stats = MigrationStats(data=str(data_path), vault=str(vault))
+    storage, stats.journal_entries = load_storage(data_path)
+    stats.users = len(storage["userStateById"])
+    if (storage.get("schemaVersion") or 0) >= SPACED_REPETITION_SCHEMA_VERSION:
+        stats.already_migrated = True
+    else:
+        legacy_ids, stats.id_collisions = legacy_card_ids(vault, parallelism)
+        migrate_storage(storage, legacy_ids, stats)
+        if not dry_run:
+            write_storage(data_path, storage)
+            stats.written = True
+    stats.elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+    return stats
+
+
+def print_stats(stats: MigrationStats, dry_run: bool = False) -> None:
+    print(f"\n{ICONS['dot']} Card ID migration")
+    print(f"  {ICONS['info']} data         {stats.data}")
+    print(f"  {ICONS['info']} vault        {stats.vault}")
+    if stats.already_migrated:
+        print(f"  {ICONS['ok']} already at schema version {SPACED_REPETITION_SCHEMA_VERSION}")
+        return
+    print(f"  {ICONS['ok']} users        {stats.users}")
+    print(f"  {ICONS['ok']} journal      {stats.journal_entries} entries replayed")
+    print(f"  {ICONS['ok']} legacy IDs   {stats.legacy_cards}")
+    print(f"  {ICONS['ok']} renamed      {stats.renamed}")
+    if stats.dropped:
+        print(f"  {ICONS['warn']} dropped      {stats.dropped} (current ID already had a state)")
+    if stats.shared_legacy_ids:
+        print(f"  {ICONS['info']} shared IDs   {stats.shared_legacy_ids} (state copied to each)")
+    for card_id in stats.id_collisions:
+        print(f"  {ICONS['warn']} collision    {card_id} (cards with different content)")
+    if dry_run:
+        print(f"  {ICONS['info']} dry run, nothing written")
+    print(f"  {ICONS['info']} elapsed      {stats.elapsed_ms} ms")
+
+
+def run(
+    vault: str,
+    data_path: Optional[str] = None,
+    dry_run: bool = False,
+    want_json: bool = False,
+    parallelism: str = DEFAULT_SCAN_PARALLELISM,
+) -> int:
+    path = Path(data_path) if data_path else default_data_path()
+    if path.with_suffix(".sqlite").exists():
+        print(
+            f"{ICONS['warn']} {path.with_suffix('.sqlite')} exists; "
+            "that data is migrated by the app, not by this tool."
+        )
+    try:
+        stats = migrate(Path(vault), path, dry_run=dry_run, parallelism=parallelism)
+    except (OSError, ValueError) as e:
+        print(f"{ICONS['err']} Migration failed: {e}")
+        return 1
+
+    print_stats(stats, dry_run=dry_run)
+    if want_json:
+        print("\nJSON:")
+        print(json.dumps(asdict(stats), indent=2, ensure_ascii=False))
+    return 0
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Python port of the spaced repetition session logic from
+apps/fmd-desktop/src/features/spaced-repetition/logic.ts.
+
+Used by the vault tools (benchmarks, migrations) so they behave like the app.
+"""
+
+from __future__ import annotations
+
+import math
+import random
+from typing import Any, Dict, List, Optional
+
+from flashcards import Flashcard, flashcard_id, flashcard_legacy_ids
+
+MAX_SPACED_REPETITION_BOX = 8
+
+# Index 0..7 maps to boxes 1..8 for weighted repetition order.
+REPETITION_WEIGHTS = {
+    "weak": [6, 5, 4, 3, 2, 2, 1, 1],
+    "medium": [8, 5, 3, 2, 1, 1, 1, 1],
+    "strong": [12, 6, 3, 2, 1, 1, 1, 1],
+}
+
+CardProgress = Dict[str, Any]
+
+
+def _is_finite_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def normalize_card_progress(progress: Optional[Dict[str, Any]]) -> CardProgress:
+    progress = progress if isinstance(progress, dict) else {}
+    if _is_finite_number(progress.get("boxCanonical")):
+        raw_box = progress["boxCanonical"]
+    elif _is_finite_number(progress.get("box")):
+        raw_box = progress["box"]
+    else:
+        raw_box = 1
+    attempts = progress.get("attempts")
+    last_result = progress.get("lastResult")
+    last_reviewed_at = progress.get("lastReviewedAt")
+    return {
+        "boxCanonical": min(MAX_SPACED_REPETITION_BOX, max(1, raw_box)),
+        "attempts": max(0, attempts) if _is_finite_number(attempts) else 0,
+        "lastResult": last_result if last_result in ("correct", "incorrect") else "neutral",
+        "lastReviewedAt": last_reviewed_at if isinstance(last_reviewed_at, str) else None,
+    }
+
+
+def effective_box(progress: CardProgress, box_count: int) -> int:
+    return min(progress["boxCanonical"], box_count)
+
+
+def build_weighted_order(
+    entries: List[Dict[str, Any]],
+    box_count: int,
+    strength: str,
+    rng: random.Random,
+) -> List[Dict[str, Any]]:
+    """Weighted sampling without replacement via exponential keys, O(n log n)."""
+    weights = REPETITION_WEIGHTS[strength]
+    keyed = []
+    for entry in entries:
+        box = effective_box(entry["progress"], box_count)
+        if box >= box_count:
+            continue
+        weight = max(1, weights[box - 1])
+        keyed.append((-math.log(1.0 - rng.random()) / weight, entry))
+    keyed.sort(key=lambda item: item[0])
+    return [entry for _key, entry in keyed]
+
+
+def build_session(
+    cards: List[Flashcard],
+    existing_card_states: Optional[Dict[str, Any]] = None,
+    order: str = "in-order",
+    box_count: int = MAX_SPACED_REPETITION_BOX,
+    strength: str = "medium",
+    rng: Optional[random.Random] = None,
+    legacy_card_ids: bool = False,
+) -> Dict[str, Any]:
+    """Mirror of `buildSpacedRepetitionSession` (IDs, legacy migration, ordering).
+
+    `legacy_card_ids` also looks up states under legacy IDs, as the app does for
+    data that idmigrate.py (or the app itself) has not migrated yet.
+    """
+    rng = rng or random.Random()
+    next_states = {
+        card_id: normalize_card_progress(progress)
+        for card_id, progress in (existing_card_states or {}).items()
+    }
+
+    card_ids = []
+    migrated_legacy_ids = set()
+    for card in cards:
+        card_id = card.get("id") or flashcard_id(card)
+        if card_id not in next_states:
+            legacy_ids = flashcard_legacy_ids(card) if legacy_card_ids else []
+            legacy_id = next((lid for lid in legacy_ids if lid in next_states), None)
+            if legacy_id is not None:
+                # Removed only afterwards, so every card that shared it gets the state.
+                next_states[card_id] = next_states[legacy_id]
+                migrated_legacy_ids.add(legacy_id)
+            else:
+                next_states[card_id] = normalize_card_progress(None)
+        card_ids.append(card_id)
+    for legacy_id in migrated_legacy_ids:
+        del next_states[legacy_id]
+
+    entries = [
+        {"card": card, "cardId": card_id, "progress": next_states[card_id]}
+        for card, card_id in zip(cards, card_ids)
+    ]
+    if order == "random":
+        entries = entries[:]
+        rng.shuffle(entries)
+    elif order == "repetition":
+        entries = build_weighted_order(entries, box_count, strength, rng)
+
+    return {
+        "flashcards": [entry["card"] for entry in entries],
+        "cardIds": [entry["cardId"] for entry in entries],
+        "cardProgressById": next_states,
+    }
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Checks the Python card parser against the IDs the desktop app computes.
+
+The expected kinds and IDs come from apps/fmd-desktop/src/lib/flashcards.ts
+(the same fixtures as its tests and the Rust parser's). Run from the repo root:
+
+    python3 -m unittest discover -s tools/vault
+"""
+
+from __future__ import annotations
+
+import unittest
+from pathlib import Path
+from typing import List, Tuple
+
+from flashcards import flashcard_id, flashcard_legacy_ids, parse_flashcards
+from vaultscan import list_markdown_files, read_text
+
+APPS_DIR = Path(__file__).resolve().parents[2] / "apps"
+
+VAULT_CARDS = {
+    "VaultTest": {
+        "IDBS01-ExamL1.md": [
+            ("multiple-choice", "card-ad52355e391ef4ad"),
+            ("multiple-choice", "card-22c2e7a4754a9c31"),
+            ("multiple-choice", "card-c22bf1838f0a6bab"),
+            ("multiple-choice", "card-a5c0a5f134e2a431"),
+            ("multiple-choice", "card-90afb5d5a0e279ef"),
+            ("multiple-choice", "card-2d916fe2a5bd704a"),
+            ("multiple-choice", "card-18ea8bda8ef4362f"),
+        ],
+        "notes/flashcards.md": [("multiple-choice", "card-06ef39d2f8c65900")],
+    },
+    # No note in the second test vault holds a #card block.
+    "VaultTest2": {},
+}
+
+FIXTURES = [
+    (
+        "multiple-choice markers",
+        "#card\nChoose two.\na) One\nb) Two\nc) Three\n\n-a\n-d\n#",
+        [("multiple-choice", "card-891c1903ba2e024d")],
+    ),
+    (
+        "true/false items",
+        "#card\n2. Water boils at 100C. Wahr/Falsch?\n-wahr\n"
+        "3. The moon is a planet. Wahr/Falsch?\n-FALSCH\n#\n"
+        "#card\nSpacing check.\n- falsch,\n#\n"
+        "#card\nMissing marker. Wahr/Falsch?\n#",
+        [("true-false", "card-314e5f86c79e91bc"), ("true-false", "card-fdf3e13c5b2f79d5")],
+    ),
+    (
+        "answer markers",
+        "#card\nWhat is SQL used for?\nAnswer: Defining and querying data.\n#\n"
+        "#card\n1. Was ist eine Transaktion?\nAntwort:\nEine atomare Einheit von Operationen.\n#\n"
+        "#card\nQue signifie SQL ?\nReponse: Un langage de requete.\n#",
+        [
+            ("free-text", "card-be8c302c1e5cbbc7"),
+            ("free-text", "card-9fb286b987731a48"),
+            ("free-text", "card-613529e522062261"),
+        ],
+    ),
+    (
+        "input and drag blanks",
+        "#card\nDefine foreign key.\n"
+        "A foreign key is an %% attribute set %% that references a `primary key`.\n#",
+        [("cloze", "card-38496698438f62a2")],
+    ),
+    (
+        "CRLF cloze with inner blank lines",
+        "#card\r\nGaps\r\n\r\nFirst %%one%%\r\n\r\n\r\nSecond `two`\r\n\r\n#",
+        [("cloze", "card-6d1c9ee344ce222e")],
+    ),
+    (
+        "unclosed markers and empty blanks",
+        "#card\nBroken markers.\nValid %%answer%% and %%unfinished and `open.\n#\n"
+        "#card\nEmpty blank.\n%%%%\n#",
+        [("cloze", "card-46f05e5dd0de45c6")],
+    ),
+    (
+        "mixed blocks between notes",
+        "Intro text.\n- Not a marker.\n---\n#card\nFirst question?\na) One\nb) Two\n-b\n#\n---\n"
+        "#card\nSecond.\nOnly `beta`.\n#\nNotes between.\n"
+        "#card\nThe earth orbits the sun.\n-wahr\n#\n"
+        "#card\nWhat is a key?\nAnswer: An identifier.\n#\nMore text.",
+        [
+            ("multiple-choice", "card-2b535bd8205c1af1"),
+            ("cloze", "card-fe79b7c6e6da366b"),
+            ("true-false", "card-29a15aa05456a098"),
+            ("free-text", "card-a9ced30e54719f04"),
+        ],
+    ),
+    (
+        "unterminated blocks",
+        "#card\nDropped question?\na) Option\n"
+        "#card\nKept question?\na) One\n-a\n#\n"
+        "#card\nQuestion without end?\na) Option",
+        [("multiple-choice", "card-402f74ba3bfa4cb0")],
+    ),
+    (
+        "fenced code",
+        "#card\nQuestion.\nCode:\n~~~\n`ignored`\n%%not%%\n~~~\nOutside `token` and %%blank%%.\n#",
+        [("cloze", "card-9763ac484ddc65e1")],
+    ),
+]
+
+
+def kinds_and_ids(markdown: str) -> List[Tuple[str, str]]:
+    return [(card["kind"], card["id"]) for card in parse_flashcards(markdown)]
+
+
+class ParseFlashcardsTest(unittest.TestCase):
+    def test_test_vaults(self) -> None:
+        for vault_name, expected in VAULT_CARDS.items():
+            vault = APPS_DIR / vault_name
+            found = {}
+            for file in list_markdown_files(vault):
+                cards = kinds_and_ids(read_text(file.path))
+                if cards:
+                    found[Path(file.relative_path).as_posix()] = cards
+            self.assertEqual(found, expected, vault_name)
+
+    def test_fixtures(self) -> None:
+        for name, markdown, expected in FIXTURES:
+            with self.subTest(name):
+                self.assertEqual(kinds_and_ids(markdown), expected)
+
+    def test_ids_ignore_the_order_of_correct_keys(self) -> None:
+        first, reordered = parse_flashcards(
+            "#card\nPick\na) A\nb) B\nc) C\n-c\n-a\n#\n#card\nPick\na) A\nb) B\nc) C\n-a\n-c\n#"
+        )
+        self.assertEqual(first["id"], "card-4679ed5ba455911a")
+        self.assertEqual(reordered["id"], first["id"])
+        self.assertEqual(flashcard_id(first), first["id"])
+        self.assertEqual(len(flashcard_legacy_ids(first)), 2)
+        self.assertEqual(flashcard_legacy_ids(reordered), flashcard_legacy_ids(first)[:1])
+
+
+if __name__ == "__main__":
+    unittest.main()
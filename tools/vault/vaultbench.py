@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+End-to-end scale benchmark used by `tools/control.py --bench`.
+
+Generates synthetic vaults at each requested scale and times the same stages
+the desktop app runs when loading a deck: directory listing, file reads,
+parsing, card-ID hashing and session building. Results are written as a JSON
+report that can be diffed against a report from another commit.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from flashcards import flashcard_id, flashcard_legacy_ids, parse_flashcards
+from spacedrep import build_session
+from vaultgen import GenSpec, build_spec, generate_vault
+from vaultscan import list_markdown_files, read_text
+
+REPORT_VERSION = 1
+
+ICONS = {
+    "ok": "✅",
+    "err": "❌",
+    "info": "ℹ️",
+    "warn": "⚠️",
+    "dot": "•",
+}
+
+
+@dataclass
+class ScaleResult:
+    notes: int
+    files: int = 0
+    bytes: int = 0
+    cards: int = 0
+    stages_ms: Dict[str, Optional[float]] = field(default_factory=dict)
+
+
+def _timed(stages: Dict[str, Optional[float]], name: str, fn):
+    started = time.perf_counter()
+    result = fn()
+    stages[name] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+def bench_vault(vault: Path, notes: int, seed: int = 0) -> ScaleResult:
+    result = ScaleResult(notes=notes)
+    stages = result.stages_ms
+
+    files = _timed(stages, "list", lambda: list_markdown_files(vault))
+    contents = _timed(stages, "read", lambda: [read_text(file.path) for file in files])
+    per_file = _timed(stages, "parse", lambda: [parse_flashcards(text) for text in contents])
+    cards = [card for file_cards in per_file for card in file_cards]
+    _timed(stages, "ids", lambda: [(flashcard_id(c), flashcard_legacy_ids(c)) for c in cards])
+    _timed(stages, "session_in_order", lambda: build_session(cards, {}, order="in-order"))
+    _timed(
+        stages,
+        "session_repetition",
+        lambda: build_session(cards, {}, order="repetition", rng=random.Random(seed)),
+    )
+
+    result.files = len(files)
+    result.bytes = sum(len(text.encode("utf-8")) for text in contents)
+    result.cards = len(cards)
+    stages["total"] = round(sum(value or 0 for value in stages.values()), 2)
+    return result
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=str(Path(__file__).resolve().parent),
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        return out.strip() or None
+    except Exception:
+        return None
+
+
+def run_bench(
+    scales: List[int],
+    spec: GenSpec,
+    work_dir: Optional[Path] = None,
+) -> Dict[str, Any]:
+    temp_dir = None
+    if work_dir is None:
+        temp_dir = tempfile.mkdtemp(prefix="fmd-bench-")
+        work_dir = Path(temp_dir)
+
+    results: List[ScaleResult] = []
+    try:
+        for notes in scales:
+            vault = Path(work_dir) / f"vault-{notes}"
+            print(f"{ICONS['info']} Generating {notes} notes in {vault} ...")
+            generate_vault(vault, GenSpec(**{**asdict(spec), "notes": notes}))
+            print(f"{ICONS['info']} Benchmarking {notes} notes ...")
+            results.append(bench_vault(vault, notes, seed=spec.seed))
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    return {
+        "version": REPORT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "spec": {key: value for key, value in asdict(spec).items() if key != "notes"},
+        "scales": [asdict(result) for result in results],
+    }
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    previous = {entry["notes"]: entry for entry in (baseline or {}).get("scales", [])}
+    for entry in report["scales"]:
+        print(
+            f"\n{ICONS['dot']} {entry['notes']} notes  "
+            f"({entry['files']} files, {entry['cards']} cards, {entry['bytes']} bytes)"
+        )
+        before = previous.get(entry["notes"], {}).get("stages_ms", {})
+        for stage, value in entry["stages_ms"].items():
+            if value is None:
+                print(f"  {ICONS['warn']} {stage:<20} skipped")
+                continue
+            line = f"  {ICONS['ok']} {stage:<20} {value:>10.2f} ms"
+            old = before.get(stage)
+            if old:
+                line += f"   (was {old:.2f} ms, x{value / old:.2f})"
+            print(line)
+
+
+def parse_scales(text: str) -> List[int]:
+    scales = [int(part) for part in text.split(",") if part.strip()]
+    if not scales or any(scale <= 0 for scale in scales):
+        raise ValueError(f"Invalid scales '{text}' (expected e.g. 1000,10000,100000)")
+    return scales
+
+
+def run(
+    scales: str,
+    out_path: str,
+    compare_path: Optional[str] = None,
+    work_dir: Optional[str] = None,
+    depth: int = 3,
+    fanout: int = 8,
+    cards_per_note: str = "0-12",
+    card_mix: Optional[str] = None,
+    seed: int = 0,
+    want_json: bool = False,
+) -> int:
+    baseline = None
+    if compare_path:
+        try:
+            baseline = json.loads(Path(compare_path).read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"{ICONS['err']} Could not read baseline report {compare_path}: {e}")
+            return 1
+
+    try:
+        spec = build_spec(0, depth, fanout, cards_per_note, card_mix, seed)
+        report = run_bench(parse_scales(scales), spec, Path(work_dir) if work_dir else None)
+    except (OSError, ValueError) as e:
+        print(f"{ICONS['err']} Benchmark failed: {e}")
+        return 1
+
+    print_report(report, baseline)
+    Path(out_path).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    print(f"\n{ICONS['ok']} Report written to {out_path}")
+    if want_json:
+        print("\nJSON:")
+        print(json.dumps(report, indent=2))
+    return 0
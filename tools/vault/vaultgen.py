@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Synthetic vault generator used by `tools/control.py --gen-vault DIR` and `--bench`.
+
+Produces reproducible vaults of a given size, directory depth and card mix,
+covering every card syntax the parser understands (multiple choice with `-x`
+markers, true/false, Q&A, `%%input%%` cloze, drag tokens and mixed blocks).
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import shutil
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Written into every generated vault; only such directories are ever wiped.
+MARKER_FILE = ".fmd-synthetic"
+
+DEFAULT_CARD_MIX = {
+    "mc": 4,
+    "tf": 2,
+    "qa": 2,
+    "cloze": 2,
+    "drag": 1,
+    "mixed": 1,
+}
+
+ICONS = {
+    "ok": "✅",
+    "err": "❌",
+    "info": "ℹ️",
+    "dot": "•",
+}
+
+WORDS = (
+    "relation schema tuple attribute key index query join table view trigger "
+    "transaction commit rollback lock isolation cursor normal form entity "
+    "cardinality projection selection aggregate group order constraint domain "
+    "Datenbank Abfrage Tabelle Spalte Zeile Schluessel Wert Menge Ergebnis"
+).split()
+
+
+@dataclass
+class GenSpec:
+    notes: int = 1000
+    depth: int = 3
+    fanout: int = 8
+    cards_per_note: Tuple[int, int] = (0, 12)
+    mix: Dict[str, int] = field(default_factory=lambda: dict(DEFAULT_CARD_MIX))
+    prose_lines: int = 6
+    seed: int = 0
+
+
+@dataclass
+class GenStats:
+    target: str
+    notes: int = 0
+    directories: int = 0
+    card_blocks: int = 0
+    bytes: int = 0
+    blocks_by_kind: Dict[str, int] = field(default_factory=dict)
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def _sentence(rng: random.Random, low: int = 4, high: int = 12) -> str:
+    text = _words(rng, rng.randint(low, high))
+    return text[:1].upper() + text[1:]
+
+
+def _mc_card(rng: random.Random, n: int) -> List[str]:
+    count = rng.choice((2, 4, 4, 5))
+    keys = "ABCDE"[:count]
+    lines = [f"{n}. {_sentence(rng)}?"]
+    lines += [f"{key}) {_sentence(rng, 2, 6)}" for key in keys]
+    lines.append("")
+    correct = rng.sample(keys, rng.choice((1, 1, 1, 2)))
+    lines += [f"-{key.lower()}" for key in sorted(correct)]
+    return lines
+
+
+def _tf_card(rng: random.Random, n: int) -> List[str]:
+    lines: List[str] = []
+    for index in range(rng.randint(1, 4)):
+        lines.append(f"{n}.{index + 1} {_sentence(rng)}. Wahr/Falsch?")
+        lines.append(rng.choice(("-wahr", "-falsch", "-true", "-false", "- Falsch.")))
+    return lines
+
+
+def _qa_card(rng: random.Random, n: int) -> List[str]:
+    marker = rng.choice(("Answer:", "Antwort:", "Réponse:"))
+    lines = [f"{n}. {_sentence(rng)}?"]
+    if rng.random() < 0.5:
+        lines.append(f"{marker} {_sentence(rng, 6, 20)}")
+    else:
+        lines.append(marker)
+        lines += [_sentence(rng, 6, 16) for _ in range(rng.randint(1, 4))]
+    return lines
+
+
+def _cloze_line(rng: random.Random, input_blanks: int, drag_blanks: int) -> str:
+    parts = [_words(rng, rng.randint(2, 6))]
+    blanks = ["input"] * input_blanks + ["drag"] * drag_blanks
+    rng.shuffle(blanks)
+    for kind in blanks:
+        value = _words(rng, rng.randint(1, 2))
+        parts.append(f"%%{value}%%" if kind == "input" else f"`{value}`")
+        parts.append(_words(rng, rng.randint(1, 5)))
+    return " ".join(parts) + "."
+
+
+def _cloze_card(rng: random.Random, n: int) -> List[str]:
+    lines = [f"{n}. {_sentence(rng)}"]
+    lines += [_cloze_line(rng, rng.randint(1, 3), 0) for _ in range(rng.randint(1, 3))]
+    return lines
+
+
+def _drag_card(rng: random.Random, n: int) -> List[str]:
+    lines = [f"{n}. {_sentence(rng)}"]
+    lines += [_cloze_line(rng, 0, rng.randint(1, 3)) for _ in range(rng.randint(1, 3))]
+    return lines
+
+
+def _mixed_card(rng: random.Random, n: int) -> List[str]:
+    # Same shape as issus/text.md: options + marker, then cloze/drag lines.
+    lines = _mc_card(rng, n)
+    lines.append("")
+    lines.append(f"{n + 1}. {_sentence(rng)}")
+    lines += [_cloze_line(rng, 1, 1) for _ in range(rng.randint(1, 4))]
+    return lines
+
+
+CARD_BUILDERS: Dict[str, Callable[[random.Random, int], List[str]]] = {
+    "mc": _mc_card,
+    "tf": _tf_card,
+    "qa": _qa_card,
+    "cloze": _cloze_card,
+    "drag": _drag_card,
+    "mixed": _mixed_card,
+}
+
+
+def parse_card_mix(text: str) -> Dict[str, int]:
+    """Parse `mc=4,tf=2,...`; unknown kinds raise ValueError."""
+    mix: Dict[str, int] = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in CARD_BUILDERS:
+            raise ValueError(f"Unknown card kind '{kind}' (expected: {', '.join(CARD_BUILDERS)})")
+        mix[kind] = int(weight) if weight else 1
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("Card mix needs at least one kind with a positive weight.")
+    return mix
+
+
+def parse_range(text: str) -> Tuple[int, int]:
+    low, _, high = text.partition("-")
+    low_value = int(low)
+    high_value = int(high) if high else low_value
+    if low_value < 0 or high_value < low_value:
+        raise ValueError(f"Invalid range '{text}'")
+    return low_value, high_value
+
+
+def render_note(rng: random.Random, spec: GenSpec, title: str) -> Tuple[str, Dict[str, int]]:
+    kinds = list(spec.mix)
+    weights = [spec.mix[kind] for kind in kinds]
+    counts: Dict[str, int] = {}
+    lines = [f"# {title}", ""]
+    lines += [_sentence(rng, 8, 20) for _ in range(rng.randint(0, spec.prose_lines))]
+    for index in range(rng.randint(*spec.cards_per_note)):
+        kind = rng.choices(kinds, weights)[0]
+        counts[kind] = counts.get(kind, 0) + 1
+        lines += ["", "#card", *CARD_BUILDERS[kind](rng, index + 1), "#", ""]
+        if rng.random() < 0.3:
+            lines += [_sentence(rng, 8, 20) for _ in range(rng.randint(1, spec.prose_lines))]
+    lines.append("")
+    return "\n".join(lines), counts
+
+
+def _prepare_target(target: Path) -> None:
+    if target.exists():
+        if not target.is_dir():
+            raise NotADirectoryError(f"{target} is not a directory.")
+        if any(target.iterdir()):
+            if not (target / MARKER_FILE).exists():
+                raise FileExistsError(
+                    f"{target} is not empty and was not created by the generator."
+                )
+            shutil.rmtree(target)
+    target.mkdir(parents=True, exist_ok=True)
+    (target / MARKER_FILE).write_text("generated by tools/vault/vaultgen.py\n", encoding="utf-8")
+
+
+def generate_vault(target: Path, spec: GenSpec) -> GenStats:
+    target = Path(target)
+    _prepare_target(target)
+    rng = random.Random(spec.seed)
+    stats = GenStats(target=str(target))
+    directories = set()
+
+    for index in range(spec.notes):
+        parts = [f"dir{rng.randrange(spec.fanout)}" for _ in range(rng.randint(0, spec.depth))]
+        folder = target.joinpath(*parts)
+        if folder not in directories:
+            folder.mkdir(parents=True, exist_ok=True)
+            directories.add(folder)
+        extension = rng.choices((".md", ".markdown", ".mdx"), (90, 5, 5))[0]
+        title = f"Note {index:07d}"
+        text, counts = render_note(rng, spec, title)
+        data = text.encode("utf-8")
+        (folder / f"note-{index:07d}{extension}").write_bytes(data)
+        stats.notes += 1
+        stats.bytes += len(data)
+        for kind, count in counts.items():
+            stats.card_blocks += count
+            stats.blocks_by_kind[kind] = stats.blocks_by_kind.get(kind, 0) + count
+
+    stats.directories = len(directories)
+    return stats
+
+
+def print_stats(stats: GenStats) -> None:
+    print(f"\n{ICONS['dot']} Synthetic vault")
+    print(f"  {ICONS['info']} target       {stats.target}")
+    print(f"  {ICONS['ok']} notes        {stats.notes}")
+    print(f"  {ICONS['ok']} directories  {stats.directories}")
+    print(f"  {ICONS['ok']} card blocks  {stats.card_blocks}")
+    for kind, count in sorted(stats.blocks_by_kind.items()):
+        print(f"      {kind:<10} {count}")
+    print(f"  {ICONS['ok']} bytes        {stats.bytes}")
+
+
+def build_spec(
+    notes: int,
+    depth: int = 3,
+    fanout: int = 8,
+    cards_per_note: str = "0-12",
+    card_mix: Optional[str] = None,
+    seed: int = 0,
+) -> GenSpec:
+    if notes < 0 or depth < 0 or fanout < 1:
+        raise ValueError("--notes/--depth must be >= 0 and --fanout >= 1.")
+    return GenSpec(
+        notes=notes,
+        depth=depth,
+        fanout=fanout,
+        cards_per_note=parse_range(cards_per_note),
+        mix=parse_card_mix(card_mix) if card_mix else dict(DEFAULT_CARD_MIX),
+        seed=seed,
+    )
+
+
+def run(
+    target: str,
+    notes: int = 1000,
+    depth: int = 3,
+    fanout: int = 8,
+    cards_per_note: str = "0-12",
+    card_mix: Optional[str] = None,
+    seed: int = 0,
+    want_json: bool = False,
+) -> int:
+    try:
+        spec = build_spec(notes, depth, fanout, cards_per_note, card_mix, seed)
+        stats = generate_vault(Path(target), spec)
+    except (OSError, ValueError) as e:
+        print(f"{ICONS['err']} Vault generation failed: {e}")
+        return 1
+
+    print_stats(stats)
+    if want_json:
+        print("\nJSON:")
+        print(json.dumps(asdict(stats), indent=2, ensure_ascii=False))
+    return 0
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Headless vault indexer used by `tools/control.py --index VAULT`.
+
+Walks the vault like the desktop app, parses every `#card ... #` block and
+stores files, cards, kinds and card IDs in a SQLite index. Re-runs only
+re-parse files whose size or mtime changed.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from flashcards import (
+    PARSER_VERSION,
+    flashcard_legacy_ids,
+    iter_card_blocks,
+    normalize_lines,
+    parse_card_block,
+)
+from vaultscan import (
+    DEFAULT_SCAN_PARALLELISM,
+    VaultFile,
+    list_markdown_files,
+    read_text,
+    scan_worker_count,
+)
+
+SCHEMA_VERSION = 2
+DEFAULT_INDEX_DIR = ".fmd"
+DEFAULT_INDEX_NAME = "index.sqlite"
+# Below this many files the process pool start-up costs more than it saves.
+PARALLEL_MIN_FILES = 64
+
+ICONS = {
+    "ok": "✅",
+    "err": "❌",
+    "info": "ℹ️",
+    "warn": "⚠️",
+    "dot": "•",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    relative_path TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    card_count INTEGER NOT NULL,
+    error TEXT,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cards (
+    relative_path TEXT NOT NULL REFERENCES files(relative_path) ON DELETE CASCADE,
+    ordinal INTEGER NOT NULL,
+    line INTEGER NOT NULL,
+    card_id TEXT NOT NULL,
+    legacy_ids TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    primary_type TEXT,
+    detected_types TEXT NOT NULL,
+    is_mixed INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (relative_path, ordinal)
+);
+CREATE INDEX IF NOT EXISTS cards_card_id ON cards(card_id);
+CREATE INDEX IF NOT EXISTS cards_kind ON cards(kind);
+"""
+
+
+@dataclass
+class ParsedCard:
+    ordinal: int
+    line: int
+    card_id: str
+    legacy_ids: List[str]
+    card: Dict[str, Any]
+
+
+@dataclass
+class ParsedFile:
+    file: VaultFile
+    cards: List[ParsedCard] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass
+class IndexStats:
+    vault: str
+    database: str
+    files: int = 0
+    parsed: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    errors: int = 0
+    cards: int = 0
+    id_collisions: List[str] = field(default_factory=list)
+    workers: int = 1
+    rebuilt: bool = False
+    elapsed_ms: float = 0.0
+
+
+def parse_markdown(markdown: str) -> List[ParsedCard]:
+    cards: List[ParsedCard] = []
+    for start, _end, card_lines, terminated in iter_card_blocks(normalize_lines(markdown)):
+        if not terminated:
+            continue
+        card = parse_card_block(card_lines)
+        if card is None:
+            continue
+        cards.append(
+            ParsedCard(
+                ordinal=len(cards),
+                line=start + 1,
+                card_id=card["id"],
+                legacy_ids=flashcard_legacy_ids(card),
+                card=card,
+            )
+        )
+    return cards
+
+
+def parse_file(file: VaultFile) -> ParsedFile:
+    try:
+        contents = read_text(file.path)
+    except (OSError, UnicodeDecodeError) as e:
+        return ParsedFile(file=file, error=str(e))
+    return ParsedFile(file=file, cards=parse_markdown(contents))
+
+
+def parse_files(files: List[VaultFile], workers: int = 1) -> Iterator[ParsedFile]:
+    """Parse `files` on a process pool, yielding results in input order."""
+    if workers <= 1 or len(files) < PARALLEL_MIN_FILES:
+        yield from map(parse_file, files)
+        return
+    chunksize = max(1, min(256, len(files) // (workers * 8)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(parse_file, files, chunksize=chunksize)
+
+
+def default_index_path(vault: Path) -> Path:
+    return Path(vault) / DEFAULT_INDEX_DIR / DEFAULT_INDEX_NAME
+
+
+def connect(db_path: Path) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+def _read_meta(conn: sqlite3.Connection) -> Dict[str, str]:
+    try:
+        return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+    except sqlite3.OperationalError:
+        return {}
+
+
+def _ensure_schema(conn: sqlite3.Connection, vault: Path, rebuild: bool) -> bool:
+    meta = _read_meta(conn)
+    expected = {
+        "schema_version": str(SCHEMA_VERSION),
+        "parser_version": str(PARSER_VERSION),
+        "vault": str(vault),
+    }
+    stale = bool(meta) and any(meta.get(key) != value for key, value in expected.items())
+    if rebuild or stale:
+        conn.executescript(
+            "DROP TABLE IF EXISTS cards; DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS meta;"
+        )
+    conn.executescript(SCHEMA)
+    conn.executemany(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", list(expected.items())
+    )
+    return rebuild or stale
+
+
+def _store(conn: sqlite3.Connection, parsed: ParsedFile) -> None:
+    file = parsed.file
+    conn.execute("DELETE FROM cards WHERE relative_path = ?", (file.relative_path,))
+    conn.execute(
+        "INSERT OR REPLACE INTO files "
+        "(relative_path, path, size, mtime_ns, card_count, error, indexed_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            file.relative_path,
+            file.path,
+            file.size,
+            file.mtime_ns,
+            len(parsed.cards),
+            parsed.error,
+            time.time(),
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO cards "
+        "(relative_path, ordinal, line, card_id, legacy_ids, kind, primary_type, "
+        "detected_types, is_mixed, payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (
+                file.relative_path,
+                entry.ordinal,
+                entry.line,
+                entry.card_id,
+                json.dumps(entry.legacy_ids),
+                entry.card["kind"],
+                entry.card.get("primaryType"),
+                json.dumps(entry.card.get("detectedTypes", [])),
+                int(bool(entry.card.get("isMixed"))),
+                json.dumps(entry.card, ensure_ascii=False, separators=(",", ":")),
+            )
+            for entry in parsed.cards
+        ],
+    )
+
+
+def find_id_collisions(conn: sqlite3.Connection) -> List[str]:
+    """Card IDs that cards with different content share across the index.
+
+    Cards with the same content also share their 32-bit legacy ID, the first of
+    `legacy_ids`, which is hashed from the same payload independently of the
+    card ID; a card ID with several of them belongs to distinct payloads.
+    """
+    return [
+        row[0]
+        for row in conn.execute(
+            "SELECT card_id FROM cards GROUP BY card_id "
+            "HAVING COUNT(DISTINCT json_extract(legacy_ids, '$[0]')) > 1 ORDER BY card_id"
+        )
+    ]
+
+
+def index_vault(
+    vault: Path,
+    db_path: Optional[Path] = None,
+    rebuild: bool = False,
+    parallelism: str = DEFAULT_SCAN_PARALLELISM,
+) -> IndexStats:
+    started = time.perf_counter()
+    vault = Path(vault).resolve()
+    db_path = Path(db_path) if db_path else default_index_path(vault)
+    stats = IndexStats(
+        vault=str(vault), database=str(db_path), workers=scan_worker_count(parallelism)
+    )
+
+    files = list_markdown_files(vault)
+    stats.files = len(files)
+
+    conn = connect(db_path)
+    try:
+        with conn:
+            stats.rebuilt = _ensure_schema(conn, vault, rebuild)
+            known = {
+                row[0]: (row[1], row[2])
+                for row in conn.execute("SELECT relative_path, size, mtime_ns FROM files")
+            }
+            changed = [
+                file
+                for file in files
+                if known.get(file.relative_path) != (file.size, file.mtime_ns)
+            ]
+            stats.unchanged = len(files) - len(changed)
+            # `files` is sorted by relative_path and parse_files keeps input order,
+            # so rows are written in the same order whatever the worker count.
+            for parsed in parse_files(changed, stats.workers):
+                _store(conn, parsed)
+                stats.parsed += 1
+                if parsed.error:
+                    stats.errors += 1
+
+            seen = {file.relative_path for file in files}
+            removed = [path for path in known if path not in seen]
+            conn.executemany("DELETE FROM files WHERE relative_path = ?", [(p,) for p in removed])
+            stats.removed = len(removed)
+            stats.cards = conn.execute("SELECT COUNT(*) FROM cards").fetchone()[0]
+            stats.id_collisions = find_id_collisions(conn)
+    finally:
+        conn.close()
+
+    stats.elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+    return stats
+
+
+def print_stats(stats: IndexStats) -> None:
+    print(f"\n{ICONS['dot']} Vault index")
+    print(f"  {ICONS['info']} vault      {stats.vault}")
+    print(f"  {ICONS['info']} database   {stats.database}")
+    if stats.rebuilt:
+        print(f"  {ICONS['info']} rebuilt    (schema/parser version changed or --rebuild)")
+    print(f"  {ICONS['ok']} files      {stats.files}")
+    print(f"  {ICONS['ok']} parsed     {stats.parsed}")
+    print(f"  {ICONS['ok']} unchanged  {stats.unchanged}")
+    print(f"  {ICONS['ok']} removed    {stats.removed}")
+    print(f"  {ICONS['ok']} cards      {stats.cards}")
+    for card_id in stats.id_collisions:
+        print(f"  {ICONS['warn']} collision  {card_id} (cards with different content)")
+    print(f"  {ICONS['info']} workers    {stats.workers}")
+    if stats.errors:
+        print(f"  {ICONS['err']} errors     {stats.errors}")
+    print(f"  {ICONS['info']} elapsed    {stats.elapsed_ms} ms")
+
+
+def run(
+    vault: str,
+    db_path: Optional[str] = None,
+    rebuild: bool = False,
+    want_json: bool = False,
+    parallelism: str = DEFAULT_SCAN_PARALLELISM,
+) -> int:
+    try:
+        stats = index_vault(
+            Path(vault),
+            Path(db_path) if db_path else None,
+            rebuild=rebuild,
+            parallelism=parallelism,
+        )
+    except (OSError, sqlite3.Error) as e:
+        print(f"{ICONS['err']} Indexing failed: {e}")
+        return 1
+
+    print_stats(stats)
+    if want_json:
+        print("\nJSON:")
+        print(json.dumps(asdict(stats), indent=2, ensure_ascii=False))
+    return 1 if stats.errors else 0
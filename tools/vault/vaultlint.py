@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Card-syntax linter used by `tools/control.py --lint VAULT`.
+
+Reports the `#card` blocks that `parseFlashcards` would silently skip or
+mis-read (missing `#` end marker, empty question, unusable body, empty cloze
+blanks, unknown `-x` markers). Only changed notes are checked: either the ones
+git reports as modified/untracked, or the ones whose size/mtime differ from the
+lint cache in `VAULT/.fmd/lint-cache.json`.
+
+Diagnostics are printed as `path:line: severity [code] message`, or as JSON
+lines with `--lint-format jsonl`.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from flashcards import (
+    FENCE_PATTERN,
+    MARKER_PATTERN,
+    OPTION_PATTERN,
+    PARSER_VERSION,
+    iter_card_blocks,
+    js_trim,
+    js_trim_start,
+    normalize_lines,
+    parse_card_block,
+    parse_cloze_segments,
+)
+from vaultscan import (
+    DEFAULT_SCAN_PARALLELISM,
+    VaultFile,
+    is_hidden,
+    is_markdown,
+    list_markdown_files,
+    read_text,
+    scan_worker_count,
+)
+
+LINT_VERSION = 1
+CACHE_DIR = ".fmd"
+CACHE_NAME = "lint-cache.json"
+CHANGE_SOURCES = ("cache", "git", "staged", "all")
+DEFAULT_CHANGE_SOURCE = "cache"
+# Below this many files the process pool start-up costs more than it saves.
+PARALLEL_MIN_FILES = 64
+
+ICONS = {
+    "ok": "✅",
+    "err": "❌",
+    "info": "ℹ️",
+    "warn": "⚠️",
+    "dot": "•",
+}
+
+
+@dataclass
+class Diagnostic:
+    path: str
+    line: int
+    severity: str
+    code: str
+    message: str
+
+    def format(self) -> str:
+        return f"{self.path}:{self.line}: {self.severity} [{self.code}] {self.message}"
+
+
+@dataclass
+class LintStats:
+    vault: str
+    source: str
+    files: int = 0
+    checked: int = 0
+    cached: int = 0
+    errors: int = 0
+    warnings: int = 0
+    workers: int = 1
+    elapsed_ms: float = 0.0
+    diagnostics: List[Diagnostic] = field(default_factory=list)
+
+
+def _block_diagnostics(
+    path: str, start: int, card_lines: List[str]
+) -> Iterator[Tuple[int, str, str, str]]:
+    """Yield `(line, severity, code, message)` for one terminated block.
+
+    Walks the body lines like `parse_card_block`: the question line is never
+    cloze, option and marker lines are set aside first (markers count inside
+    fences too), fences are toggled on the remaining lines only, and the first
+    empty blank ends cloze parsing.
+    """
+    question_index = next((i for i, line in enumerate(card_lines) if js_trim(line)), -1)
+    if question_index == -1:
+        yield start + 1, "error", "empty-card", "`#card` block has no question; it is skipped."
+        return
+
+    in_fence = False
+    markers: List[Tuple[int, str]] = []
+    cloze_valid = True
+    for offset in range(question_index + 1, len(card_lines)):
+        raw_line = card_lines[offset]
+        line = start + 2 + offset
+        trimmed = js_trim(raw_line)
+        if not trimmed or OPTION_PATTERN.match(trimmed):
+            continue
+        marker = MARKER_PATTERN.match(trimmed)
+        if marker:
+            markers.append((line, marker.group(1).lower()))
+            continue
+        if FENCE_PATTERN.match(js_trim_start(raw_line)):
+            in_fence = not in_fence
+            continue
+        if in_fence or not cloze_valid:
+            continue
+        # Same pairing rules as the cloze parser: None means an empty blank.
+        parsed = parse_cloze_segments([raw_line])
+        if parsed is None:
+            cloze_valid = False
+            yield (
+                line,
+                "error",
+                "empty-blank",
+                "Empty `%% %%` blank; the whole cloze part of this card is dropped.",
+            )
+        elif any(s["type"] == "text" and "%%" in s["value"] for s in parsed["segments"]):
+            yield (
+                line,
+                "warning",
+                "unclosed-blank",
+                "Unpaired `%%`; the rest of the line is shown as plain text.",
+            )
+
+    card = parse_card_block(card_lines)
+    if card is None:
+        yield (
+            start + 1,
+            "error",
+            "unrecognized-card",
+            "No options, true/false items, answer marker or cloze blanks; the card is skipped.",
+        )
+        return
+
+    if card["kind"] == "multiple-choice":
+        if not card["correctKeys"]:
+            yield (
+                start + 1,
+                "warning",
+                "no-correct-option",
+                "Multiple-choice card without `-x` marker; no option counts as correct.",
+            )
+        option_keys = {option["key"] for option in card["options"]}
+        for line, key in markers:
+            if key not in option_keys:
+                yield line, "warning", "unknown-marker", f"Marker `-{key}` matches no option."
+
+
+def lint_markdown(path: str, markdown: str) -> List[Diagnostic]:
+    diagnostics: List[Diagnostic] = []
+    for start, _end, card_lines, terminated in iter_card_blocks(normalize_lines(markdown)):
+        if not terminated:
+            diagnostics.append(
+                Diagnostic(
+                    path=path,
+                    line=start + 1,
+                    severity="error",
+                    code="unterminated-card",
+                    message="`#card` block is not closed by a `#` line; it is skipped.",
+                )
+            )
+            continue
+        for line, severity, code, message in _block_diagnostics(path, start, card_lines):
+            diagnostics.append(
+                Diagnostic(path=path, line=line, severity=severity, code=code, message=message)
+            )
+    diagnostics.sort(key=lambda d: d.line)
+    return diagnostics
+
+
+def lint_file(file: VaultFile) -> List[Diagnostic]:
+    try:
+        contents = read_text(file.path)
+    except (OSError, UnicodeDecodeError) as e:
+        return [Diagnostic(file.relative_path, 1, "error", "unreadable", str(e))]
+    return lint_markdown(file.relative_path, contents)
+
+
+def lint_files(files: List[VaultFile], workers: int = 1) -> Iterator[List[Diagnostic]]:
+    """Lint `files` on a process pool, yielding results in input order."""
+    if workers <= 1 or len(files) < PARALLEL_MIN_FILES:
+        yield from map(lint_file, files)
+        return
+    chunksize = max(1, min(256, len(files) // (workers * 8)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(lint_file, files, chunksize=chunksize)
+
+
+def _git_paths(vault: Path, args: List[str]) -> List[str]:
+    out = subprocess.check_output(
+        ["git", "-C", str(vault), *args], stderr=subprocess.PIPE, text=True
+    )
+    return [line for line in out.splitlines() if line]
+
+
+def _is_git_work_tree(vault: Path) -> bool:
+    result = subprocess.run(
+        ["git", "-C", str(vault), "rev-parse", "--is-inside-work-tree"],
+        capture_output=True,
+        text=True,
+    )
+    return result.returncode == 0 and result.stdout.strip() == "true"
+
+
+def git_changed_files(vault: Path, source: str, rev: str = "HEAD") -> List[VaultFile]:
+    """Markdown files git reports as changed (relative to `rev`) or untracked."""
+    # Outside a work tree `git diff` falls back to --no-index and prints its usage.
+    if not _is_git_work_tree(vault):
+        raise ValueError(f"{vault} is not a git work tree; use --lint-changes cache")
+    filters = ["--name-only", "--relative", "--diff-filter=ACMR"]
+    if source == "staged":
+        names = _git_paths(vault, ["diff", "--cached", *filters])
+    else:
+        names = _git_paths(vault, ["diff", *filters, rev])
+        names += _git_paths(vault, ["ls-files", "--others", "--exclude-standard"])
+
+    files: List[VaultFile] = []
+    for name in sorted(set(names)):
+        relative = Path(name)
+        if any(is_hidden(part) for part in relative.parts) or not is_markdown(relative.name):
+            continue
+        path = vault / relative
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        files.append(
+            VaultFile(
+                path=str(path),
+                relative_path=str(relative),
+                size=stat.st_size,
+                mtime_ns=stat.st_mtime_ns,
+            )
+        )
+    return files
+
+
+def cache_path(vault: Path) -> Path:
+    return vault / CACHE_DIR / CACHE_NAME
+
+
+def load_cache(path: Path) -> Dict[str, Dict]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != LINT_VERSION or data.get("parser_version") != PARSER_VERSION:
+        return {}
+    files = data.get("files")
+    return files if isinstance(files, dict) else {}
+
+
+def save_cache(path: Path, files: Dict[str, Dict]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {"version": LINT_VERSION, "parser_version": PARSER_VERSION, "files": files}
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def lint_vault(
+    vault: Path,
+    source: str = DEFAULT_CHANGE_SOURCE,
+    rev: str = "HEAD",
+    parallelism: str = DEFAULT_SCAN_PARALLELISM,
+) -> LintStats:
+    started = time.perf_counter()
+    vault = Path(vault).resolve()
+    stats = LintStats(vault=str(vault), source=source, workers=scan_worker_count(parallelism))
+
+    if source in ("git", "staged"):
+        files = git_changed_files(vault, source, rev)
+        stats.files = stats.checked = len(files)
+        for diagnostics in lint_files(files, stats.workers):
+            stats.diagnostics.extend(diagnostics)
+    else:
+        files = list_markdown_files(vault)
+        stats.files = len(files)
+        cache_file = cache_path(vault)
+        cache = load_cache(cache_file) if source == "cache" else {}
+        changed = []
+        for file in files:
+            entry = cache.get(file.relative_path) or {}
+            if (entry.get("size"), entry.get("mtime_ns")) == (file.size, file.mtime_ns):
+                stats.cached += 1
+            else:
+                changed.append(file)
+        stats.checked = len(changed)
+        for file, diagnostics in zip(changed, lint_files(changed, stats.workers)):
+            cache[file.relative_path] = {
+                "size": file.size,
+                "mtime_ns": file.mtime_ns,
+                "diagnostics": [asdict(d) for d in diagnostics],
+            }
+        # Unchanged files keep their cached diagnostics so a broken note keeps failing.
+        cache = {file.relative_path: cache[file.relative_path] for file in files}
+        for file in files:
+            stats.diagnostics.extend(
+                Diagnostic(**d) for d in cache[file.relative_path]["diagnostics"]
+            )
+        save_cache(cache_file, cache)
+
+    stats.errors = sum(1 for d in stats.diagnostics if d.severity == "error")
+    stats.warnings = len(stats.diagnostics) - stats.errors
+    stats.elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+    return stats
+
+
+def print_stats(stats: LintStats) -> None:
+    print(f"\n{ICONS['dot']} Card lint")
+    print(f"  {ICONS['info']} vault      {stats.vault}")
+    print(f"  {ICONS['info']} changes    {stats.source}")
+    print(f"  {ICONS['ok']} files      {stats.files}")
+    print(f"  {ICONS['ok']} checked    {stats.checked}")
+    if stats.source in ("cache", "all"):
+        print(f"  {ICONS['ok']} cached     {stats.cached}")
+    print(f"  {ICONS['info']} workers    {stats.workers}")
+    icon = ICONS["err"] if stats.errors else ICONS["ok"]
+    print(f"  {icon} errors     {stats.errors}")
+    icon = ICONS["warn"] if stats.warnings else ICONS["ok"]
+    print(f"  {icon} warnings   {stats.warnings}")
+    print(f"  {ICONS['info']} elapsed    {stats.elapsed_ms} ms")
+
+
+def run(
+    vault: str,
+    source: str = DEFAULT_CHANGE_SOURCE,
+    rev: str = "HEAD",
+    output_format: str = "text",
+    want_json: bool = False,
+    parallelism: str = DEFAULT_SCAN_PARALLELISM,
+) -> int:
+    try:
+        stats = lint_vault(Path(vault), source=source, rev=rev, parallelism=parallelism)
+    except subprocess.CalledProcessError as e:
+        print(f"{ICONS['err']} git failed: {(e.stderr or '').strip() or e}", file=sys.stderr)
+        return 2
+    except ValueError as e:
+        print(f"{ICONS['err']} {e}", file=sys.stderr)
+        return 2
+    except OSError as e:
+        print(f"{ICONS['err']} Lint failed: {e}", file=sys.stderr)
+        return 2
+
+    if output_format == "jsonl":
+        for diagnostic in stats.diagnostics:
+            print(json.dumps(asdict(diagnostic), ensure_ascii=False))
+        return 1 if stats.errors else 0
+
+    for diagnostic in stats.diagnostics:
+        print(diagnostic.format())
+    print_stats(stats)
+    if want_json:
+        print("\nJSON:")
+        print(json.dumps(asdict(stats), indent=2, ensure_ascii=False))
+    return 1 if stats.errors else 0
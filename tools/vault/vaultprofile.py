@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Vault profiler used by `tools/control.py --vault-profile PATH`.
+
+Loads a vault the way the desktop app does (listing, reads, `parseFlashcards`)
+and reports where the time and bytes go: largest notes, cards and parse time
+per file, unterminated `#card` blocks, huge cloze segments, directory fan-out
+and the payload sizes pushed over Tauri IPC.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from flashcards import Flashcard, iter_card_blocks, normalize_lines, parse_card_block
+from vaultscan import VaultFile, compact_listing, list_markdown_files, read_text
+
+DEFAULT_TOP = 10
+# A single cloze text/blank segment this long is rendered as one huge node.
+HUGE_SEGMENT_CHARS = 2000
+
+ICONS = {
+    "ok": "✅",
+    "err": "❌",
+    "info": "ℹ️",
+    "warn": "⚠️",
+    "dot": "•",
+}
+
+
+@dataclass
+class BlockIssue:
+    line: int
+    detail: str
+
+
+@dataclass
+class FileProfile:
+    relative_path: str
+    bytes: int = 0
+    lines: int = 0
+    blocks: int = 0
+    cards: int = 0
+    skipped_blocks: int = 0
+    parse_ms: float = 0.0
+    unterminated: List[BlockIssue] = field(default_factory=list)
+    huge_segments: List[BlockIssue] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass
+class DirProfile:
+    relative_path: str
+    files: int = 0
+    subdirs: int = 0
+
+    @property
+    def fanout(self) -> int:
+        return self.files + self.subdirs
+
+
+@dataclass
+class IpcProfile:
+    list_response_bytes: int = 0
+    read_request_bytes: int = 0
+    read_response_bytes: int = 0
+
+    @property
+    def total_bytes(self) -> int:
+        return self.list_response_bytes + self.read_request_bytes + self.read_response_bytes
+
+
+@dataclass
+class VaultProfile:
+    vault: str
+    files: int = 0
+    bytes: int = 0
+    cards: int = 0
+    list_ms: float = 0.0
+    read_ms: float = 0.0
+    parse_ms: float = 0.0
+    max_depth: int = 0
+    ipc: IpcProfile = field(default_factory=IpcProfile)
+    file_profiles: List[FileProfile] = field(default_factory=list)
+    directories: List[DirProfile] = field(default_factory=list)
+
+
+def _json_bytes(value) -> int:
+    # serde_json output: compact and UTF-8, non-ASCII left unescaped.
+    return len(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def profile_markdown(profile: FileProfile, markdown: str) -> List[Flashcard]:
+    """Parse like `parseFlashcards`, recording timing and block-level issues.
+    Returns the cards `parseFlashcards` would."""
+    started = time.perf_counter()
+    cards: List[Flashcard] = []
+    lines = normalize_lines(markdown)
+    for start, _end, card_lines, terminated in iter_card_blocks(lines):
+        profile.blocks += 1
+        if not terminated:
+            profile.unterminated.append(
+                BlockIssue(line=start + 1, detail="`#card` block without closing `#`")
+            )
+            continue
+        card = parse_card_block(card_lines)
+        if card is None:
+            profile.skipped_blocks += 1
+            continue
+        cards.append(card)
+        profile.cards += 1
+        for segment in card.get("segments", []):
+            size = len(segment.get("value") or segment.get("solution") or "")
+            if size >= HUGE_SEGMENT_CHARS:
+                profile.huge_segments.append(
+                    BlockIssue(line=start + 1, detail=f"{segment['type']} segment of {size} chars")
+                )
+    profile.parse_ms = round((time.perf_counter() - started) * 1000, 3)
+    profile.lines = len(lines)
+    return cards
+
+
+def _directory_profiles(files: List[VaultFile]) -> Dict[str, DirProfile]:
+    directories: Dict[str, DirProfile] = {"": DirProfile(relative_path="")}
+    for file in files:
+        parts = Path(file.relative_path).parts
+        parent = ""
+        for part in parts[:-1]:
+            current = str(Path(parent) / part) if parent else part
+            if current not in directories:
+                directories[current] = DirProfile(relative_path=current)
+                directories[parent].subdirs += 1
+            parent = current
+        directories[parent].files += 1
+    return directories
+
+
+def profile_vault(vault: Path) -> VaultProfile:
+    vault = Path(vault).resolve()
+    report = VaultProfile(vault=str(vault))
+
+    started = time.perf_counter()
+    files = list_markdown_files(vault)
+    report.list_ms = round((time.perf_counter() - started) * 1000, 2)
+    report.files = len(files)
+
+    report.ipc.list_response_bytes = _json_bytes(compact_listing(vault, files))
+    report.ipc.read_request_bytes = _json_bytes({"paths": [f.path for f in files]})
+
+    for file in files:
+        profile = FileProfile(relative_path=file.relative_path, bytes=file.size)
+        started = time.perf_counter()
+        try:
+            contents = read_text(file.path)
+        except (OSError, UnicodeDecodeError) as e:
+            profile.error = str(e)
+            contents = None
+        report.read_ms += (time.perf_counter() - started) * 1000
+        cards = profile_markdown(profile, contents) if contents is not None else None
+        # read_flashcard_files ships the parsed cards, not the file contents.
+        report.ipc.read_response_bytes += _json_bytes(
+            {"path": file.path, "cards": cards, "error": profile.error}
+        )
+        report.bytes += profile.bytes
+        report.cards += profile.cards
+        report.parse_ms += profile.parse_ms
+        report.file_profiles.append(profile)
+
+    # Array brackets and separators of the read_flashcard_files response.
+    report.ipc.read_response_bytes += max(1, len(files)) + 1
+    report.read_ms = round(report.read_ms, 2)
+    report.parse_ms = round(report.parse_ms, 2)
+
+    directories = _directory_profiles(files)
+    report.directories = list(directories.values())
+    report.max_depth = max(
+        (len(Path(f.relative_path).parts) - 1 for f in files), default=0
+    )
+    return report
+
+
+def _top(items, key, count: int):
+    return sorted(items, key=key, reverse=True)[:count]
+
+
+def print_profile(report: VaultProfile, top: int = DEFAULT_TOP) -> None:
+    print(f"\n{ICONS['dot']} Vault profile")
+    print(f"  {ICONS['info']} vault        {report.vault}")
+    print(f"  {ICONS['ok']} files        {report.files}")
+    print(f"  {ICONS['ok']} bytes        {report.bytes}")
+    print(f"  {ICONS['ok']} cards        {report.cards}")
+    print(f"  {ICONS['ok']} directories  {len(report.directories)} (max depth {report.max_depth})")
+    print(f"  {ICONS['info']} list         {report.list_ms} ms")
+    print(f"  {ICONS['info']} read         {report.read_ms} ms")
+    print(f"  {ICONS['info']} parse        {report.parse_ms} ms")
+
+    print(f"\n{ICONS['dot']} IPC payload (bytes)")
+    print(f"  {ICONS['info']} start_vault_scan listings     {report.ipc.list_response_bytes}")
+    print(f"  {ICONS['info']} read_flashcard_files request  {report.ipc.read_request_bytes}")
+    print(f"  {ICONS['info']} read_flashcard_files response {report.ipc.read_response_bytes}")
+    print(f"  {ICONS['ok']} total                         {report.ipc.total_bytes}")
+
+    profiles = report.file_profiles
+    sections = (
+        ("Largest notes", lambda p: p.bytes, lambda p: f"{p.bytes} bytes, {p.lines} lines"),
+        ("Most cards", lambda p: p.cards, lambda p: f"{p.cards} cards, {p.blocks} blocks"),
+        ("Slowest parse", lambda p: p.parse_ms, lambda p: f"{p.parse_ms} ms"),
+    )
+    for title, key, describe in sections:
+        print(f"\n{ICONS['dot']} {title}")
+        for profile in _top(profiles, key, top):
+            print(f"  {describe(profile):<28} {profile.relative_path}")
+
+    print(f"\n{ICONS['dot']} Directory fan-out")
+    for directory in _top(report.directories, lambda d: d.fanout, top):
+        name = directory.relative_path or "."
+        print(f"  {directory.fanout:>6} entries ({directory.files} notes, {directory.subdirs} dirs)  {name}")
+
+    issues = (
+        ("Unterminated #card blocks", "unterminated"),
+        ("Huge cloze segments", "huge_segments"),
+    )
+    for title, attribute in issues:
+        found = [(p, issue) for p in profiles for issue in getattr(p, attribute)]
+        icon = ICONS["warn"] if found else ICONS["ok"]
+        print(f"\n{icon} {title}: {len(found)}")
+        for profile, issue in found[: top * 5]:
+            print(f"  {profile.relative_path}:{issue.line}  {issue.detail}")
+
+    errors = [p for p in profiles if p.error]
+    if errors:
+        print(f"\n{ICONS['err']} Unreadable files: {len(errors)}")
+        for profile in errors[: top * 5]:
+            print(f"  {profile.relative_path}  {profile.error}")
+
+
+def _as_json(report: VaultProfile) -> Dict:
+    data = asdict(report)
+    data["ipc"]["total_bytes"] = report.ipc.total_bytes
+    for entry, directory in zip(data["directories"], report.directories):
+        entry["fanout"] = directory.fanout
+    return data
+
+
+def run(vault: str, want_json: bool = False, top: int = DEFAULT_TOP) -> int:
+    try:
+        report = profile_vault(Path(vault))
+    except OSError as e:
+        print(f"{ICONS['err']} Profiling failed: {e}")
+        return 1
+
+    print_profile(report, top)
+    if want_json:
+        print("\nJSON:")
+        print(json.dumps(_as_json(report), indent=2, ensure_ascii=False))
+    return 0
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Vault walker shared by the vault tools.
+
+Follows the same rules as the vault scan in src-tauri/src/lib.rs:
+hidden entries (dot-prefixed) and paths matched by the vault's `.fmdignore`
+are skipped, symlinked directories are followed once (symlinked files are not)
+and only `.md`, `.markdown` and `.mdx` files are returned, sorted by relative
+path.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+MARKDOWN_EXTENSIONS = (".md", ".markdown", ".mdx")
+IGNORE_FILE_NAME = ".fmdignore"
+
+# Same levels as the `scan_parallelism` app setting (Settings -> Performance).
+SCAN_PARALLELISM_LEVELS = ("low", "medium", "high")
+DEFAULT_SCAN_PARALLELISM = "medium"
+
+
+@dataclass
+class VaultFile:
+    path: str
+    relative_path: str
+    size: int
+    mtime_ns: int
+
+
+def scan_worker_count(level: str | None) -> int:
+    """Worker pool size for a `scan_parallelism` level (mirrors the Rust backend)."""
+    cpus = os.cpu_count() or 1
+    if level == "low":
+        return max(1, cpus // 4)
+    if level == "high":
+        return cpus
+    return max(1, cpus // 2)
+
+
+def is_hidden(name: str) -> bool:
+    return name.startswith(".")
+
+
+def is_markdown(name: str) -> bool:
+    return name.lower().endswith(MARKDOWN_EXTENSIONS)
+
+
+def _glob_regex(glob: str) -> str:
+    out = []
+    index = 0
+    while index < len(glob):
+        char = glob[index]
+        if glob.startswith("**/", index):
+            out.append("(?:.*/)?")
+            index += 3
+            continue
+        if glob.startswith("/**", index) and index + 3 == len(glob):
+            out.append("/.*")
+            break
+        if char == "*":
+            out.append("[^/]*")
+        elif char == "?":
+            out.append("[^/]")
+        elif char == "[":
+            end = glob.find("]", index + 1)
+            if end < 0:
+                out.append(re.escape(char))
+            else:
+                body = glob[index + 1 : end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                index = end
+        elif char == "\\" and index + 1 < len(glob):
+            index += 1
+            out.append(re.escape(glob[index]))
+        else:
+            out.append(re.escape(char))
+        index += 1
+    return "".join(out)
+
+
+class ScanFilter:
+    """Gitignore-style exclude rules (the subset `.fmdignore` files use)."""
+
+    def __init__(self, lines: List[str]):
+        self.rules: List[Tuple["re.Pattern[str]", bool, bool]] = []
+        for raw in lines:
+            line = raw.rstrip("\r\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            line = line.rstrip(" ")
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            anchored = "/" in line
+            glob = _glob_regex(line.lstrip("/"))
+            pattern = glob if anchored else f"(?:.*/)?{glob}"
+            self.rules.append((re.compile(f"^{pattern}$"), dir_only, negate))
+
+    @classmethod
+    def load(cls, root: Path, exclude_patterns: Optional[str] = None) -> "ScanFilter":
+        lines: List[str] = []
+        try:
+            lines += (root / IGNORE_FILE_NAME).read_text(encoding="utf-8").splitlines()
+        except (OSError, UnicodeDecodeError):
+            pass
+        lines += (exclude_patterns or "").splitlines()
+        return cls(lines)
+
+    def excludes(self, relative_path: str, is_dir: bool) -> bool:
+        """For walk entries whose parent directories were already checked."""
+        relative_path = relative_path.replace(os.sep, "/")
+        excluded = False
+        for pattern, dir_only, negate in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if pattern.match(relative_path):
+                excluded = not negate
+        return excluded
+
+
+def _dir_key(path: str):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_dev, stat.st_ino
+
+
+def list_markdown_files(vault: Path, exclude_patterns: Optional[str] = None) -> List[VaultFile]:
+    root = Path(vault)
+    if not root.exists():
+        raise FileNotFoundError("Vault path does not exist.")
+    if not root.is_dir():
+        raise NotADirectoryError("Vault path is not a directory.")
+
+    scan_filter = ScanFilter.load(root, exclude_patterns)
+    files: List[VaultFile] = []
+    pending = [str(root)]
+    visited = set()
+    root_prefix = len(str(root).rstrip(os.sep)) + 1
+    while pending:
+        current = pending.pop()
+        key = _dir_key(current)
+        if key is not None:
+            if key in visited:
+                continue
+            visited.add(key)
+        try:
+            entries = list(os.scandir(current))
+        except OSError:
+            continue
+        for entry in entries:
+            if is_hidden(entry.name):
+                continue
+            relative_path = entry.path[root_prefix:]
+            try:
+                if entry.is_dir():
+                    if not scan_filter.excludes(relative_path, True):
+                        pending.append(entry.path)
+                    continue
+                if not entry.is_file(follow_symlinks=False) or not is_markdown(entry.name):
+                    continue
+                if scan_filter.excludes(relative_path, False):
+                    continue
+                stat = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            files.append(
+                VaultFile(
+                    path=entry.path,
+                    relative_path=relative_path,
+                    size=stat.st_size,
+                    mtime_ns=stat.st_mtime_ns,
+                )
+            )
+
+    files.sort(key=lambda f: f.relative_path)
+    return files
+
+
+def compact_listing(vault: Path, files: List[VaultFile]) -> Dict[str, Any]:
+    """The `CompactListing` the backend sends for `files` (root once, interned names)."""
+    root = str(vault)
+    if not root.endswith(os.sep):
+        root += os.sep
+    names = [""]
+    name_ids: Dict[str, int] = {}
+    dirs = [[0, 0]]
+    dir_ids: Dict[Tuple[int, int], int] = {}
+    entries = []
+
+    def intern(name: str) -> int:
+        if name not in name_ids:
+            name_ids[name] = len(names)
+            names.append(name)
+        return name_ids[name]
+
+    for file in files:
+        parts = [part for part in file.relative_path.split(os.sep) if part]
+        if not parts:
+            continue
+        directory = 0
+        for part in parts[:-1]:
+            key = (directory, intern(part))
+            if key not in dir_ids:
+                dir_ids[key] = len(dirs)
+                dirs.append(list(key))
+            directory = dir_ids[key]
+        entries.append([directory, intern(parts[-1])])
+
+    return {"root": root, "separator": os.sep, "names": names, "dirs": dirs, "files": entries}
+
+
+def read_text(path: str) -> str:
+    with open(path, "r", encoding="utf-8", newline="") as handle:
+        return handle.read()